@@ -486,6 +486,9 @@ class MetaMaquinaAdmin(admin.ModelAdmin):
     
     ordering = ['-año', '-mes', 'contrato', 'maquina']
     
+    # El PU de cada fila se resuelve en memoria (drilling/utils/precios.py)
+    list_select_related = ['contrato', 'maquina', 'servicio', 'created_by']
+    
     raw_id_fields = ['contrato', 'maquina', 'servicio', 'created_by']
     
     readonly_fields = ['created_at', 'updated_at', 'get_valor_meta_display']
@@ -626,6 +629,19 @@ class PrecioUnitarioServicioAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 
+@admin.register(TipoCambio)
+class TipoCambioAdmin(admin.ModelAdmin):
+    list_display = ['fecha', 'moneda', 'unidades_por_usd', 'fuente']
+    
+    list_filter = ['moneda', 'fuente']
+    
+    date_hierarchy = 'fecha'
+    
+    ordering = ['-fecha', 'moneda']
+    
+    readonly_fields = ['created_at']
+
+
 # ======================================
 # ORGANIGRAMA SEMANAL
 # ======================================
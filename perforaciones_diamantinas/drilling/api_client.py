@@ -1,30 +1,286 @@
 """
 Cliente para APIs de Vilbragroup TIC
 Maneja la conexión con las APIs de trabajadores y almacén
+
+Las peticiones GET pasan por una capa por proceso:
+- Caché por (endpoint, params) en la caché de Django durante
+  VILBRAGROUP_API_CACHE_TTL segundos.
+- Pasado el TTL y hasta VILBRAGROUP_API_STALE_TTL se responde con el dato
+  viejo y se refresca en segundo plano (stale-while-revalidate).
+- Peticiones concurrentes iguales comparten una sola llamada a la API.
+- Circuit breaker por URL base: tras VILBRAGROUP_API_FALLOS_CIRCUITO fallos
+  seguidos no se llama a la API durante VILBRAGROUP_API_CIRCUITO_ABIERTO
+  segundos (se responde con el dato viejo si hay, o None); luego se deja
+  pasar una petición de prueba.
+
+Para catálogos grandes, iterar_articulos_almacen lee la respuesta en
+streaming (sin caché) y entrega los artículos por lotes a medida que llegan.
+ijson es una dependencia opcional: sin ella se lee la respuesta completa.
+
+Para vistas async (despliegue ASGI) están aobtener_articulos_almacen y
+aobtener_stock_almacen (PDD y ADIT en paralelo). Usan la misma caché y el
+mismo circuit breaker, con un httpx.AsyncClient compartido por event loop
+(pool de conexiones). httpx es opcional: sin él la petición sync corre en un
+hilo aparte.
 """
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import weakref
+
 import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from typing import Optional, List, Dict, Any
+from django.core.cache import cache
+from typing import Optional, List, Dict, Any, Callable
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class CircuitBreaker:
+    """Corta las llamadas a un servicio que está fallando"""
+    
+    CERRADO = 'CERRADO'
+    ABIERTO = 'ABIERTO'
+    SEMIABIERTO = 'SEMIABIERTO'
+    
+    def __init__(self, fallos_max: int = 5, segundos_abierto: float = 60):
+        self.fallos_max = fallos_max
+        self.segundos_abierto = segundos_abierto
+        self.estado = self.CERRADO
+        self.fallos = 0
+        self.abierto_desde = 0.0
+        self.prueba_desde = 0.0
+        self._lock = threading.Lock()
+    
+    def permitir(self) -> bool:
+        """
+        Indica si se puede llamar al servicio (en SEMIABIERTO solo una prueba a la vez).
+        Si la prueba no informa exito/fallo en segundos_abierto (hilo o tarea
+        cancelados), se deja pasar otra para no quedar SEMIABIERTO para siempre.
+        """
+        with self._lock:
+            if self.estado == self.CERRADO:
+                return True
+            ahora = time.monotonic()
+            if (self.estado == self.ABIERTO and ahora - self.abierto_desde >= self.segundos_abierto
+                    or self.estado == self.SEMIABIERTO and ahora - self.prueba_desde >= self.segundos_abierto):
+                self.estado = self.SEMIABIERTO
+                self.prueba_desde = ahora
+                return True
+            return False
+    
+    def exito(self):
+        with self._lock:
+            self.estado = self.CERRADO
+            self.fallos = 0
+    
+    def fallo(self):
+        with self._lock:
+            self.fallos += 1
+            if self.estado == self.SEMIABIERTO or self.fallos >= self.fallos_max:
+                if self.estado != self.ABIERTO:
+                    logger.warning(f"Circuito abierto tras {self.fallos} fallos seguidos")
+                self.estado = self.ABIERTO
+                self.abierto_desde = time.monotonic()
+
+
+class ErrorAPI(Exception):
+    """La API no respondió o respondió con un formato inválido"""
+
+
+# Prefijos (ijson) de la lista de artículos según el formato de la respuesta
+PREFIJOS_ARTICULOS = ('articulos.item', 'data.item', 'item')
+
+
+def _extraer_articulos(data: Any) -> Optional[List[Dict[str, Any]]]:
+    """Lista de artículos de una respuesta de la API (None si el formato no se reconoce)"""
+    # La API retorna un diccionario con clave 'articulos'
+    if isinstance(data, dict) and 'articulos' in data:
+        return data['articulos']
+    elif isinstance(data, dict) and 'data' in data:
+        return data['data']
+    elif isinstance(data, list):
+        return data
+    return None
+
+
+def _items_json(archivo) -> Any:
+    """
+    Artículos de la respuesta JSON a medida que se leen del archivo (ijson).
+    Acepta los mismos formatos que _extraer_articulos.
+    """
+    import ijson
+    from ijson.common import ObjectBuilder
+
+    try:
+        yield from _construir_items(ijson.parse(archivo, use_float=True), ObjectBuilder)
+    except ijson.JSONError as e:
+        raise ValueError(f"JSON inválido: {e}") from e
+
+
+def _construir_items(eventos, ObjectBuilder) -> Any:
+    prefijo = None
+    profundidad = 0
+    builder = None
+    for prefix, event, value in eventos:
+        if builder is None:
+            if event in ('start_map', 'start_array') and prefix in PREFIJOS_ARTICULOS:
+                # El primer prefijo que aparece fija el formato
+                if prefijo is None or prefix == prefijo:
+                    prefijo = prefix
+                    builder = ObjectBuilder()
+                    builder.event(event, value)
+                    profundidad = 1
+            continue
+        builder.event(event, value)
+        if event in ('start_map', 'start_array'):
+            profundidad += 1
+        elif event in ('end_map', 'end_array'):
+            profundidad -= 1
+            if profundidad == 0:
+                yield builder.value
+                builder = None
+
+
+# Estado compartido por todos los clientes del proceso
+_circuitos: Dict[str, CircuitBreaker] = {}
+_vuelos: Dict[str, '_Vuelo'] = {}
+_lock = threading.Lock()
+
+
+class _Vuelo:
+    """Petición en curso que comparten los que piden lo mismo"""
+    
+    def __init__(self):
+        self.terminado = threading.Event()
+        self.resultado = None
+
+
+def _circuito(base_url: str) -> CircuitBreaker:
+    with _lock:
+        if base_url not in _circuitos:
+            _circuitos[base_url] = CircuitBreaker(
+                fallos_max=getattr(settings, 'VILBRAGROUP_API_FALLOS_CIRCUITO', 5),
+                segundos_abierto=getattr(settings, 'VILBRAGROUP_API_CIRCUITO_ABIERTO', 60),
+            )
+        return _circuitos[base_url]
+
+
+def _una_sola_vez(clave: str, funcion: Callable[[], Any], espera: float) -> Any:
+    """
+    Ejecuta funcion una sola vez para todos los hilos que piden la misma
+    clave a la vez; los demás esperan (hasta `espera` segundos) su resultado.
+    """
+    with _lock:
+        vuelo = _vuelos.get(clave)
+        lider = vuelo is None
+        if lider:
+            vuelo = _vuelos[clave] = _Vuelo()
+    if not lider:
+        vuelo.terminado.wait(espera)
+        return vuelo.resultado
+    try:
+        vuelo.resultado = funcion()
+    finally:
+        with _lock:
+            del _vuelos[clave]
+        vuelo.terminado.set()
+    return vuelo.resultado
+
+
+def _en_segundo_plano(clave: str, funcion: Callable[[], Any], espera: float):
+    """Refresca la clave en otro hilo, salvo que ya haya una petición en curso"""
+    with _lock:
+        if clave in _vuelos:
+            return
+    threading.Thread(target=_una_sola_vez, args=(clave, funcion, espera), daemon=True).start()
+
+
+# Por event loop: cliente httpx (pool de conexiones) y peticiones en curso
+_clientes_async = weakref.WeakKeyDictionary()
+_vuelos_async = weakref.WeakKeyDictionary()
+_guardianes = set()
+
+
+async def _cerrar_al_terminar(cliente):
+    """
+    Espera mientras viva el event loop y cierra el cliente al cancelarse.
+    asyncio.run (y async_to_sync bajo WSGI, que crea un loop por petición)
+    cancela las tareas pendientes al terminar; con uvicorn el loop dura lo que
+    el worker y el pool se reutiliza entre peticiones.
+    """
+    try:
+        await asyncio.get_running_loop().create_future()
+    finally:
+        await cliente.aclose()
+
+
+def _cliente_http_async(timeout: float):
+    """httpx.AsyncClient compartido del event loop actual (None si httpx no está instalado)"""
+    try:
+        import httpx
+    except ImportError:
+        return None
+    loop = asyncio.get_running_loop()
+    cliente = _clientes_async.get(loop)
+    if cliente is None or cliente.is_closed:
+        cliente = _clientes_async[loop] = httpx.AsyncClient(
+            headers={'User-Agent': 'DrillControl/1.0', 'Accept': 'application/json'},
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=getattr(settings, 'VILBRAGROUP_API_MAX_CONEXIONES', 20),
+                max_keepalive_connections=10,
+            ),
+        )
+        guardian = loop.create_task(_cerrar_al_terminar(cliente))
+        _guardianes.add(guardian)
+        guardian.add_done_callback(_guardianes.discard)
+    return cliente
+
+
+async def _una_sola_vez_async(clave: str, corrutina: Callable[[], Any]) -> Any:
+    """
+    Versión async de _una_sola_vez: una sola tarea por clave en el event loop;
+    los demás esperan la misma tarea.
+    """
+    vuelos = _vuelos_async.setdefault(asyncio.get_running_loop(), {})
+    tarea = vuelos.get(clave)
+    if tarea is None:
+        tarea = vuelos[clave] = asyncio.ensure_future(corrutina())
+        tarea.add_done_callback(lambda _: vuelos.pop(clave, None))
+    # shield: si cancelan a uno de los que esperan no se cancela la petición
+    return await asyncio.shield(tarea)
+
+
 class VilbragroupAPIClient:
     """Cliente para consumir APIs de Vilbragroup TIC"""
     
     BASE_URL = "https://tic.vilbragroup.net/API/DrillControl"
     
-    def __init__(self, token: Optional[str] = None, centro_costo: Optional[str] = None):
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        centro_costo: Optional[str] = None,
+        base_url: Optional[str] = None,
+    ):
         """
         Inicializa el cliente de API
         
         Args:
             token: Token de autenticación (si no se provee, se obtiene de settings)
             centro_costo: Centro de costo por defecto (si no se provee, se obtiene de settings)
+            base_url: URL base de la API (si no se provee, VILBRAGROUP_API_URL o BASE_URL)
         """
         self.token = token or getattr(settings, 'VILBRAGROUP_API_TOKEN', '')
         self.centro_costo = centro_costo or getattr(settings, 'CENTRO_COSTO_DEFAULT', '')
+        self.base_url = (base_url or getattr(settings, 'VILBRAGROUP_API_URL', '') or self.BASE_URL).rstrip('/')
+        self.timeout = getattr(settings, 'VILBRAGROUP_API_TIMEOUT', 30)
+        self.cache_ttl = getattr(settings, 'VILBRAGROUP_API_CACHE_TTL', 300)
+        self.stale_ttl = getattr(settings, 'VILBRAGROUP_API_STALE_TTL', 3600)
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'DrillControl/1.0',
@@ -33,7 +289,8 @@ class VilbragroupAPIClient:
     
     def _make_request(self, endpoint: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
-        Realiza una petición GET a la API
+        Realiza una petición GET a la API, con caché, coalescencia de
+        peticiones iguales y circuit breaker (ver docstring del módulo)
         
         Args:
             endpoint: Endpoint de la API (ej: 'perforistas')
@@ -42,10 +299,109 @@ class VilbragroupAPIClient:
         Returns:
             Respuesta JSON o None si hay error
         """
-        url = f"{self.BASE_URL}/{endpoint}"
+        clave = self._clave_cache(endpoint, params)
+        entrada = cache.get(clave)
+        if entrada is not None:
+            if time.time() - entrada['obtenido'] < self.cache_ttl:
+                return entrada['data']
+            # Vencido: se responde con lo que hay y se refresca aparte
+            _en_segundo_plano(clave, lambda: self._consultar(clave, endpoint, params), self.timeout)
+            return entrada['data']
+        return _una_sola_vez(clave, lambda: self._consultar(clave, endpoint, params), self.timeout)
+    
+    async def _amake_request(self, endpoint: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Versión async de _make_request (misma caché y circuit breaker)"""
+        clave = self._clave_cache(endpoint, params)
+        entrada = await cache.aget(clave)
+        if entrada is not None:
+            if time.time() - entrada['obtenido'] < self.cache_ttl:
+                return entrada['data']
+            # El refresco va en un hilo (como en _make_request): una tarea en
+            # este loop se cancelaría al terminar la petición bajo WSGI
+            # (async_to_sync crea un loop por petición)
+            _en_segundo_plano(clave, lambda: self._consultar(clave, endpoint, params), self.timeout)
+            return entrada['data']
+        return await _una_sola_vez_async(clave, lambda: self._aconsultar(clave, endpoint, params))
+    
+    async def _aconsultar(self, clave: str, endpoint: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        circuito = _circuito(self.base_url)
+        if not circuito.permitir():
+            logger.warning(f"Circuito abierto, no se llama a {self.base_url}/{endpoint}")
+            entrada = await cache.aget(clave)
+            return entrada['data'] if entrada else None
+        
+        try:
+            data = await self._aget(endpoint, params)
+        except BaseException:
+            # Cancelada o con error inesperado: la prueba no deja el circuito SEMIABIERTO
+            circuito.fallo()
+            raise
+        if data is None:
+            circuito.fallo()
+            entrada = await cache.aget(clave)
+            return entrada['data'] if entrada else None
+        
+        circuito.exito()
+        await cache.aset(clave, {'obtenido': time.time(), 'data': data}, self.cache_ttl + self.stale_ttl)
+        return data
+    
+    async def _aget(self, endpoint: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Versión async de _get"""
+        cliente = _cliente_http_async(self.timeout)
+        if cliente is None:
+            # Sin httpx: la petición sync en un hilo aparte, sin bloquear el event loop
+            return await sync_to_async(self._get, thread_sensitive=False)(endpoint, params)
+        
+        import httpx
+        url = f"{self.base_url}/{endpoint}"
+        try:
+            response = await cliente.get(url, params=params)
+            response.raise_for_status()
+            return response.json()
+        except httpx.TimeoutException:
+            logger.error(f"Timeout al conectar con {url}")
+            return None
+        except httpx.HTTPError as e:
+            logger.error(f"Error en petición a {url}: {str(e)}")
+            return None
+        except ValueError as e:
+            logger.error(f"Error al parsear JSON de {url}: {str(e)}")
+            return None
+    
+    def _clave_cache(self, endpoint: str, params: Dict[str, Any]) -> str:
+        texto = json.dumps([self.base_url, endpoint, sorted(params.items())], default=str)
+        return 'vilbragroup:' + hashlib.sha256(texto.encode('utf-8')).hexdigest()
+    
+    def _consultar(self, clave: str, endpoint: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Llama a la API si el circuito lo permite y guarda la respuesta en caché"""
+        circuito = _circuito(self.base_url)
+        if not circuito.permitir():
+            logger.warning(f"Circuito abierto, no se llama a {self.base_url}/{endpoint}")
+            entrada = cache.get(clave)
+            return entrada['data'] if entrada else None
+        
+        data = self._get(endpoint, params)
+        if data is None:
+            circuito.fallo()
+            # Si falla, mejor el dato viejo que nada
+            entrada = cache.get(clave)
+            return entrada['data'] if entrada else None
+        
+        circuito.exito()
+        cache.set(clave, {'obtenido': time.time(), 'data': data}, self.cache_ttl + self.stale_ttl)
+        return data
+    
+    def _get(self, endpoint: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Realiza una petición GET a la API, sin caché
+        
+        Returns:
+            Respuesta JSON o None si hay error
+        """
+        url = f"{self.base_url}/{endpoint}"
         
         try:
-            response = self.session.get(url, params=params, timeout=30)
+            response = self.session.get(url, params=params, timeout=self.timeout)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.Timeout:
@@ -86,42 +442,137 @@ class VilbragroupAPIClient:
                 }
             ]
         """
+        params = self._params_articulos(familia, centro_costo)
+        if params is None:
+            return []
+        
+        logger.info(f"Obteniendo artículos familia {familia} para centro de costo: {params['cc']}")
+        return self._articulos_de_datos(self._make_request('articulos', params))
+    
+    async def aobtener_articulos_almacen(self, familia: str, centro_costo: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Versión async de obtener_articulos_almacen"""
+        params = self._params_articulos(familia, centro_costo)
+        if params is None:
+            return []
+        
+        logger.info(f"Obteniendo artículos familia {familia} para centro de costo: {params['cc']} (async)")
+        return self._articulos_de_datos(await self._amake_request('articulos', params))
+    
+    async def aobtener_stock_almacen(self, centro_costo: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Stock PDD y ADIT del centro de costo, pedidos a la API en paralelo
+        
+        Returns:
+            {'PDD': [...], 'ADIT': [...]}
+        """
+        pdd, adit = await asyncio.gather(
+            self.aobtener_articulos_almacen('PDD', centro_costo),
+            self.aobtener_articulos_almacen('ADIT', centro_costo),
+        )
+        return {'PDD': pdd, 'ADIT': adit}
+    
+    def _params_articulos(self, familia: str, centro_costo: Optional[str]) -> Optional[Dict[str, str]]:
+        """Parámetros de la petición de artículos (None si faltan datos)"""
         cc = centro_costo or self.centro_costo
         
         if not self.token:
             logger.error("Token de API no configurado")
-            return []
+            return None
         
         if not cc:
             logger.error("Centro de costo no especificado")
-            return []
+            return None
         
         if familia not in ['PDD', 'ADIT']:
             logger.error(f"Familia inválida: {familia}. Debe ser 'PDD' o 'ADIT'")
-            return []
+            return None
         
-        params = {
+        return {
             'token': self.token,
             'cc': cc,
             'fam': familia
         }
-        
-        logger.info(f"Obteniendo artículos familia {familia} para centro de costo: {cc}")
-        data = self._make_request('articulos', params)
-        
+    
+    def _articulos_de_datos(self, data: Any) -> List[Dict[str, Any]]:
         if data is None:
             return []
         
-        # La API retorna un diccionario con clave 'articulos'
-        if isinstance(data, dict) and 'articulos' in data:
-            return data['articulos']
-        elif isinstance(data, dict) and 'data' in data:
-            return data['data']
-        elif isinstance(data, list):
-            return data
-        else:
+        articulos = _extraer_articulos(data)
+        if articulos is None:
             logger.warning(f"Formato de respuesta inesperado: {type(data)}. Keys: {data.keys() if isinstance(data, dict) else 'N/A'}")
             return []
+        return articulos
+    
+    def iterar_articulos_almacen(
+        self,
+        familia: str,
+        centro_costo: Optional[str] = None,
+        tamano_lote: int = 500,
+    ):
+        """
+        Stock de artículos del almacén en lotes, leyendo la respuesta en
+        streaming (no pasa por la caché). Con ijson la memoria queda acotada
+        por el tamaño del lote; sin ijson se lee la respuesta completa.
+        
+        A diferencia de obtener_articulos_almacen, los errores se lanzan como
+        ErrorAPI (aunque ocurran a mitad de la respuesta), para que quien
+        consume no tome un stock incompleto por el completo.
+        
+        Args:
+            familia: Código de familia ('PDD' o 'ADIT')
+            centro_costo: Centro de costo específico (opcional)
+            tamano_lote: Artículos por lote
+            
+        Yields:
+            Listas de hasta tamano_lote artículos
+        """
+        cc = centro_costo or self.centro_costo
+        if not self.token:
+            raise ErrorAPI("Token de API no configurado")
+        if not cc:
+            raise ErrorAPI("Centro de costo no especificado")
+        if familia not in ['PDD', 'ADIT']:
+            raise ErrorAPI(f"Familia inválida: {familia}. Debe ser 'PDD' o 'ADIT'")
+        
+        circuito = _circuito(self.base_url)
+        if not circuito.permitir():
+            raise ErrorAPI(f"Circuito abierto, no se llama a {self.base_url}/articulos")
+        
+        url = f"{self.base_url}/articulos"
+        logger.info(f"Obteniendo artículos familia {familia} para centro de costo: {cc} (streaming)")
+        lote = []
+        try:
+            with self.session.get(
+                url, params={'token': self.token, 'cc': cc, 'fam': familia}, timeout=self.timeout, stream=True,
+            ) as response:
+                response.raise_for_status()
+                for articulo in self._articulos_respuesta(response):
+                    lote.append(articulo)
+                    if len(lote) >= tamano_lote:
+                        yield lote
+                        lote = []
+        except (requests.exceptions.RequestException, ValueError) as e:
+            circuito.fallo()
+            logger.error(f"Error en petición a {url}: {str(e)}")
+            raise ErrorAPI(f"Error en petición a {url}: {str(e)}") from e
+        circuito.exito()
+        if lote:
+            yield lote
+    
+    def _articulos_respuesta(self, response):
+        try:
+            import ijson
+        except ImportError:
+            ijson = None
+        if ijson is None:
+            logger.debug("ijson no instalado: se lee la respuesta completa")
+            articulos = _extraer_articulos(response.json())
+            if articulos is None:
+                raise ValueError("Formato de respuesta inesperado")
+            yield from articulos
+            return
+        response.raw.decode_content = True
+        yield from _items_json(response.raw)
     
     def obtener_productos_diamantados(self, centro_costo: Optional[str] = None) -> List[Dict[str, Any]]:
         """
@@ -0,0 +1,517 @@
+"""
+API de ingesta de turnos por lotes (sincronización offline desde tablets).
+
+Los supervisores en campo registran turnos sin conexión y los envían todos
+juntos al recuperar señal. Cada turno trae una clave de idempotencia generada
+en la tablet (ej: UUID): si el envío se corta y se reintenta, los turnos ya
+registrados con esa clave se devuelven como DUPLICADO en lugar de crearse de
+nuevo o chocar con unique_together.
+
+Flujo:
+1. Se precargan en memoria todos los catálogos referenciados por el lote
+   (sondajes, máquinas, trabajadores, tipos...) con una query por catálogo.
+2. Cada turno se valida contra esos catálogos sin tocar la BD.
+3. Los turnos válidos se guardan con bulk_create en una sola transacción.
+4. Se responde con el resultado de cada turno (CREADO, DUPLICADO o ERROR).
+
+Request (POST JSON):
+    {
+      "turnos": [
+        {
+          "clave": "6f1c2a9e-...",
+          "fecha": "2025-03-14",
+          "maquina_id": 3,
+          "tipo_turno_id": 1,
+          "sondajes": [{"sondaje_id": 10, "metros": 12.5}],
+          "maquina": {"horometro_inicio": 1200.5, "horometro_fin": 1211.0,
+                      "estado_bomba": "OPERATIVO", "estado_unidad": "OPERATIVO",
+                      "estado_rotacion": "OPERATIVO"},
+          "trabajadores": [{"dni": "12345678", "funcion": "PERFORISTA", "observaciones": ""}],
+          "complementos": [{"tipo_complemento_id": 2, "codigo_serie": "B-001",
+                            "metros_inicio": 0, "metros_fin": 12.5, "sondaje_id": 10}],
+          "aditivos": [{"tipo_aditivo_id": 4, "cantidad_usada": 2, "unidad_medida_id": 1,
+                        "sondaje_id": 10}],
+          "actividades": [{"actividad_id": 7, "hora_inicio": "07:00", "hora_fin": "19:00",
+                           "observaciones": ""}],
+          "corridas": [{"corrida_numero": 1, "desde": 0, "hasta": 3, "longitud_testigo": 2.9,
+                        "pct_recuperacion": 96.7, "pct_retorno_agua": 80, "litologia": "Andesita"}]
+        }
+      ]
+    }
+
+Response:
+    {"success": true, "creados": 1, "duplicados": 0, "errores": 0,
+     "resultados": [{"clave": "6f1c2a9e-...", "estado": "CREADO", "turno_id": 981, "errores": []}]}
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth.decorators import login_required
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+
+from .models import (
+    HistorialBroca, IngestaTurno, Maquina, Sondaje, TipoActividad, TipoAditivo,
+    TipoComplemento, TipoTurno, Trabajador, Turno, TurnoActividad, TurnoAditivo,
+    TurnoAvance, TurnoComplemento, TurnoCorrida, TurnoMaquina, TurnoSondaje,
+    TurnoTrabajador, UnidadMedida,
+)
+from .views import convert_to_time
+from .utils.pronostico_metas import invalidar_por_turnos
+from .utils.valorizacion_turnos import programar_valorizacion
+
+logger = logging.getLogger(__name__)
+
+MAX_TURNOS_POR_LOTE = 200
+
+FUNCIONES_VALIDAS = {codigo for codigo, _ in TurnoTrabajador.FUNCION_CHOICES}
+ESTADOS_MAQUINA = {codigo for codigo, _ in TurnoMaquina.ESTADO_CHOICES}
+
+
+def _entero(valor):
+    """int(valor) o None si no es un entero válido."""
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _decimal(valor, campo, errores, requerido=True):
+    """Decimal(valor); registra el error y retorna None si falta o no es numérico."""
+    if valor in (None, ''):
+        if requerido:
+            errores.append(f'{campo}: es requerido')
+        return None
+    try:
+        numero = Decimal(str(valor))
+    except InvalidOperation:
+        errores.append(f'{campo}: valor numérico inválido ({valor})')
+        return None
+    if not numero.is_finite():
+        errores.append(f'{campo}: valor numérico inválido ({valor})')
+        return None
+    return numero
+
+
+def _lista(datos, clave):
+    valor = datos.get(clave) or []
+    return valor if isinstance(valor, list) else []
+
+
+def hash_turno(datos):
+    """SHA-256 del turno normalizado (claves ordenadas) para detectar claves reutilizadas."""
+    contenido = json.dumps(datos, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def cargar_catalogos(turnos_raw):
+    """
+    Precarga todos los registros referenciados por el lote (una query por catálogo).
+
+    Returns:
+        dict: {'sondajes': {id: Sondaje}, 'maquinas': {...}, 'trabajadores': {dni: Trabajador}, ...}
+    """
+    ids = {
+        'sondajes': set(), 'maquinas': set(), 'tipos_turno': set(), 'tipos_complemento': set(),
+        'tipos_aditivo': set(), 'unidades': set(), 'actividades': set(),
+    }
+    dnis = set()
+    for t in turnos_raw:
+        if not isinstance(t, dict):
+            continue
+        ids['maquinas'].add(_entero(t.get('maquina_id')))
+        ids['tipos_turno'].add(_entero(t.get('tipo_turno_id')))
+        for s in _lista(t, 'sondajes'):
+            ids['sondajes'].add(_entero(s.get('sondaje_id')) if isinstance(s, dict) else None)
+        for c in _lista(t, 'complementos'):
+            if isinstance(c, dict):
+                ids['tipos_complemento'].add(_entero(c.get('tipo_complemento_id')))
+                ids['sondajes'].add(_entero(c.get('sondaje_id')))
+        for a in _lista(t, 'aditivos'):
+            if isinstance(a, dict):
+                ids['tipos_aditivo'].add(_entero(a.get('tipo_aditivo_id')))
+                ids['unidades'].add(_entero(a.get('unidad_medida_id')))
+                ids['sondajes'].add(_entero(a.get('sondaje_id')))
+        for act in _lista(t, 'actividades'):
+            if isinstance(act, dict):
+                ids['actividades'].add(_entero(act.get('actividad_id')))
+        for tr in _lista(t, 'trabajadores'):
+            if isinstance(tr, dict) and tr.get('dni'):
+                dnis.add(str(tr['dni']))
+    for conjunto in ids.values():
+        conjunto.discard(None)
+
+    return {
+        'sondajes': Sondaje.objects.select_related('contrato').in_bulk(ids['sondajes']),
+        'maquinas': Maquina.objects.in_bulk(ids['maquinas']),
+        'tipos_turno': TipoTurno.objects.in_bulk(ids['tipos_turno']),
+        'tipos_complemento': TipoComplemento.objects.in_bulk(ids['tipos_complemento']),
+        'tipos_aditivo': TipoAditivo.objects.in_bulk(ids['tipos_aditivo']),
+        'unidades': UnidadMedida.objects.in_bulk(ids['unidades']),
+        'actividades': TipoActividad.objects.in_bulk(ids['actividades']),
+        'trabajadores': Trabajador.objects.in_bulk(dnis, field_name='dni'),
+    }
+
+
+def validar_turno(datos, catalogos, usuario):
+    """
+    Valida un turno del lote en memoria y arma los objetos a insertar.
+
+    Returns:
+        tuple: (plan, errores). plan es None si hay errores; si no, un dict con
+        el Turno sin guardar y sus registros hijos.
+    """
+    errores = []
+
+    try:
+        fecha = datetime.strptime(str(datos.get('fecha', '')), '%Y-%m-%d').date()
+    except ValueError:
+        fecha = None
+        errores.append('fecha: formato inválido, use YYYY-MM-DD')
+
+    maquina = catalogos['maquinas'].get(_entero(datos.get('maquina_id')))
+    if maquina is None:
+        errores.append(f"maquina_id: no existe ({datos.get('maquina_id')})")
+    tipo_turno = catalogos['tipos_turno'].get(_entero(datos.get('tipo_turno_id')))
+    if tipo_turno is None:
+        errores.append(f"tipo_turno_id: no existe ({datos.get('tipo_turno_id')})")
+
+    # Sondajes: todos del mismo contrato, que define el contrato del turno
+    sondajes = []
+    for s in _lista(datos, 'sondajes'):
+        sondaje = catalogos['sondajes'].get(_entero(s.get('sondaje_id'))) if isinstance(s, dict) else None
+        if sondaje is None:
+            errores.append(f"sondajes: sondaje inexistente ({s.get('sondaje_id') if isinstance(s, dict) else s})")
+            continue
+        metros = _decimal(s.get('metros'), f'sondajes[{sondaje.pk}].metros', errores, requerido=False)
+        sondajes.append((sondaje, metros or Decimal('0')))
+    if not sondajes:
+        errores.append('sondajes: debe indicar al menos un sondaje')
+        return None, errores
+
+    contrato = sondajes[0][0].contrato
+    if len({sondaje.contrato_id for sondaje, _ in sondajes}) > 1:
+        errores.append('sondajes: pertenecen a contratos diferentes')
+    if not usuario.can_manage_all_contracts() and contrato.pk != usuario.contrato_id:
+        errores.append('No tiene permisos para crear turnos en este contrato')
+    if maquina is not None and maquina.contrato_id != contrato.pk:
+        errores.append('La máquina seleccionada no pertenece al contrato del turno')
+
+    def _sondaje_del_turno(item, seccion):
+        sondaje_id = _entero(item.get('sondaje_id'))
+        if sondaje_id is None:
+            return None
+        sondaje = catalogos['sondajes'].get(sondaje_id)
+        if sondaje is None or sondaje.contrato_id != contrato.pk:
+            errores.append(f'{seccion}: el sondaje {sondaje_id} no pertenece al contrato del turno')
+        return sondaje_id
+
+    turno = Turno(
+        contrato=contrato, maquina=maquina, tipo_turno=tipo_turno, fecha=fecha, estado='BORRADOR'
+    )
+
+    # Trabajadores (identificados por DNI, igual que el formulario)
+    trabajadores = []
+    for tr in _lista(datos, 'trabajadores'):
+        trabajador = catalogos['trabajadores'].get(str(tr.get('dni'))) if isinstance(tr, dict) else None
+        if trabajador is None:
+            errores.append(f"trabajadores: DNI no registrado ({tr.get('dni') if isinstance(tr, dict) else tr})")
+            continue
+        if tr.get('funcion') not in FUNCIONES_VALIDAS:
+            errores.append(f"trabajadores[{trabajador.dni}]: función inválida ({tr.get('funcion')})")
+            continue
+        trabajadores.append(TurnoTrabajador(
+            turno=turno, trabajador=trabajador, funcion=tr['funcion'],
+            observaciones=tr.get('observaciones', '') or '',
+        ))
+    if len({t.trabajador.pk for t in trabajadores}) != len(trabajadores):
+        errores.append('trabajadores: hay trabajadores repetidos')
+
+    complementos = []
+    for i, c in enumerate(_lista(datos, 'complementos')):
+        tipo = catalogos['tipos_complemento'].get(_entero(c.get('tipo_complemento_id')))
+        if tipo is None:
+            errores.append(f"complementos[{i}]: tipo de complemento inexistente ({c.get('tipo_complemento_id')})")
+            continue
+        inicio = _decimal(c.get('metros_inicio'), f'complementos[{i}].metros_inicio', errores)
+        fin = _decimal(c.get('metros_fin'), f'complementos[{i}].metros_fin', errores)
+        if inicio is None or fin is None:
+            continue
+        if fin < inicio:
+            errores.append(f'complementos[{i}]: metros_fin es menor que metros_inicio')
+            continue
+        complementos.append(TurnoComplemento(
+            turno=turno, tipo_complemento=tipo, codigo_serie=str(c.get('codigo_serie', '') or ''),
+            metros_inicio=inicio, metros_fin=fin, metros_turno_calc=fin - inicio,
+            sondaje_id=_sondaje_del_turno(c, f'complementos[{i}]'),
+        ))
+
+    aditivos = []
+    for i, a in enumerate(_lista(datos, 'aditivos')):
+        tipo = catalogos['tipos_aditivo'].get(_entero(a.get('tipo_aditivo_id')))
+        unidad = catalogos['unidades'].get(_entero(a.get('unidad_medida_id')))
+        cantidad = _decimal(a.get('cantidad_usada'), f'aditivos[{i}].cantidad_usada', errores)
+        if tipo is None or unidad is None:
+            errores.append(f'aditivos[{i}]: tipo de aditivo o unidad de medida inexistente')
+            continue
+        if cantidad is None:
+            continue
+        aditivos.append(TurnoAditivo(
+            turno=turno, tipo_aditivo=tipo, cantidad_usada=cantidad, unidad_medida=unidad,
+            sondaje_id=_sondaje_del_turno(a, f'aditivos[{i}]'),
+        ))
+
+    actividades = []
+    for i, act in enumerate(_lista(datos, 'actividades')):
+        actividad = catalogos['actividades'].get(_entero(act.get('actividad_id')))
+        if actividad is None:
+            errores.append(f"actividades[{i}]: actividad inexistente ({act.get('actividad_id')})")
+            continue
+        obj = TurnoActividad(
+            turno=turno, actividad=actividad,
+            hora_inicio=convert_to_time(act.get('hora_inicio')),
+            hora_fin=convert_to_time(act.get('hora_fin')),
+            observaciones=act.get('observaciones', '') or '',
+        )
+        obj.tiempo_calc = obj.calcular_tiempo()
+        actividades.append(obj)
+
+    corridas = []
+    for i, cr in enumerate(_lista(datos, 'corridas')):
+        numero = _entero(cr.get('corrida_numero'))
+        if numero is None or numero < 0:
+            errores.append(f'corridas[{i}]: corrida_numero inválido')
+            continue
+        valores = {
+            campo: _decimal(cr.get(campo), f'corridas[{i}].{campo}', errores)
+            for campo in ('desde', 'hasta', 'longitud_testigo', 'pct_recuperacion', 'pct_retorno_agua')
+        }
+        if None in valores.values():
+            continue
+        if not all(Decimal('0') <= valores[p] <= Decimal('100') for p in ('pct_recuperacion', 'pct_retorno_agua')):
+            errores.append(f'corridas[{i}]: los porcentajes deben estar entre 0 y 100')
+            continue
+        corridas.append(TurnoCorrida(
+            turno=turno, corrida_numero=numero, total_calc=valores['hasta'] - valores['desde'],
+            litologia=cr.get('litologia', '') or '', **valores,
+        ))
+    if len({c.corrida_numero for c in corridas}) != len(corridas):
+        errores.append('corridas: hay números de corrida repetidos')
+
+    # Estado de la máquina: solo si se envió algún dato
+    maquina_estado = None
+    datos_maquina = datos.get('maquina') if isinstance(datos.get('maquina'), dict) else {}
+    if datos_maquina:
+        estados = {
+            campo: datos_maquina.get(campo) or 'OPERATIVO'
+            for campo in ('estado_bomba', 'estado_unidad', 'estado_rotacion')
+        }
+        invalidos = [campo for campo, valor in estados.items() if valor not in ESTADOS_MAQUINA]
+        if invalidos:
+            errores.append(f"maquina: estado inválido en {', '.join(invalidos)}")
+        maquina_estado = TurnoMaquina(
+            turno=turno,
+            horometro_inicio=_decimal(datos_maquina.get('horometro_inicio'), 'maquina.horometro_inicio', errores, requerido=False),
+            horometro_fin=_decimal(datos_maquina.get('horometro_fin'), 'maquina.horometro_fin', errores, requerido=False),
+            hora_inicio=convert_to_time(datos_maquina.get('hora_inicio')),
+            hora_fin=convert_to_time(datos_maquina.get('hora_fin')),
+            **estados,
+        )
+        maquina_estado.horas_trabajadas_calc = maquina_estado.calcular_horas_trabajadas()
+
+    # Misma regla que el formulario: las actividades deben cubrir la duración del turno
+    duracion_esperada = float(contrato.duracion_turno or 0)
+    total_horas = sum(float(a.tiempo_calc) for a in actividades)
+    if duracion_esperada > 0:
+        if total_horas < duracion_esperada:
+            errores.append(
+                f'Faltan horas al turno: se han registrado {total_horas:.2f}h, '
+                f'se requieren {duracion_esperada:.2f}h (faltan {duracion_esperada - total_horas:.2f}h).'
+            )
+        else:
+            turno.estado = 'COMPLETADO'
+
+    if errores:
+        return None, errores
+
+    return {
+        'turno': turno,
+        'sondajes': [
+            TurnoSondaje(turno=turno, sondaje=sondaje, metros_turno=metros) for sondaje, metros in sondajes
+        ],
+        'maquina_estado': maquina_estado,
+        'trabajadores': trabajadores,
+        'complementos': complementos,
+        'aditivos': aditivos,
+        'actividades': actividades,
+        'corridas': corridas,
+        'metros': sum((metros for _, metros in sondajes), Decimal('0')),
+    }, []
+
+
+def guardar_lote(planes):
+    """
+    Inserta los turnos validados y sus registros hijos con bulk_create.
+    Debe llamarse dentro de transaction.atomic().
+    """
+    turnos = [plan['turno'] for plan in planes]
+    Turno.objects.bulk_create(turnos)
+
+    def _hijos(clave):
+        return [obj for plan in planes for obj in plan[clave]]
+
+    TurnoSondaje.objects.bulk_create(_hijos('sondajes'))
+    TurnoTrabajador.objects.bulk_create(_hijos('trabajadores'))
+    complementos = _hijos('complementos')
+    TurnoComplemento.objects.bulk_create(complementos)
+    HistorialBroca.registrar_usos(complementos)
+    TurnoAditivo.objects.bulk_create(_hijos('aditivos'))
+    TurnoActividad.objects.bulk_create(_hijos('actividades'))
+    TurnoCorrida.objects.bulk_create(_hijos('corridas'))
+
+    estados_maquina = [plan['maquina_estado'] for plan in planes if plan['maquina_estado']]
+    TurnoMaquina.objects.bulk_create(estados_maquina)
+    # Sumar al horómetro de cada máquina las horas de todos sus turnos del lote
+    horas_por_maquina = {}
+    for tm in estados_maquina:
+        if tm.horas_trabajadas_calc and tm.horas_trabajadas_calc > 0:
+            horas_por_maquina[tm.turno.maquina_id] = (
+                horas_por_maquina.get(tm.turno.maquina_id, Decimal('0')) + tm.horas_trabajadas_calc
+            )
+    for maquina_id, horas in horas_por_maquina.items():
+        Maquina.objects.filter(pk=maquina_id).update(horometro=F('horometro') + horas)
+
+    avances = [
+        TurnoAvance(turno=plan['turno'], metros_perforados=plan['metros'])
+        for plan in planes if plan['metros'] > 0
+    ]
+    TurnoAvance.objects.bulk_create(avances)
+    # bulk_create no ejecuta TurnoAvance.save(): calcular horas extras explícitamente
+    for avance in avances:
+        avance.calcular_horas_extras()
+    invalidar_por_turnos(turnos)
+    programar_valorizacion([turno.pk for turno in turnos])
+
+
+@login_required
+@require_http_methods(["POST"])
+def api_ingesta_turnos_lote(request):
+    """
+    Crea un lote de turnos completos enviados desde una tablet.
+    Los turnos con errores se reportan sin impedir que se guarden los válidos.
+    """
+    if not request.user.can_supervise_operations():
+        return JsonResponse({'success': False, 'error': 'Requiere permisos de Supervisor o superior'}, status=403)
+
+    try:
+        data = json.loads(request.body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+
+    turnos_raw = data.get('turnos') if isinstance(data, dict) else None
+    if not isinstance(turnos_raw, list) or not turnos_raw:
+        return JsonResponse({'success': False, 'error': 'Debe enviar una lista "turnos" no vacía'}, status=400)
+    if len(turnos_raw) > MAX_TURNOS_POR_LOTE:
+        return JsonResponse({
+            'success': False,
+            'error': f'Máximo {MAX_TURNOS_POR_LOTE} turnos por lote (recibidos: {len(turnos_raw)})'
+        }, status=400)
+
+    claves = [str(t.get('clave', '')).strip() if isinstance(t, dict) else '' for t in turnos_raw]
+    ingestas_previas = {
+        ingesta.clave: ingesta
+        for ingesta in IngestaTurno.objects.filter(clave__in=[c for c in claves if c])
+    }
+    catalogos = cargar_catalogos(turnos_raw)
+
+    # Turnos ya existentes para detectar choques con unique_together antes de insertar
+    fechas, maquinas = set(), set()
+    for t in turnos_raw:
+        if isinstance(t, dict):
+            fechas.add(str(t.get('fecha', '')))
+            maquinas.add(_entero(t.get('maquina_id')))
+    ocupados = set(Turno.objects.filter(
+        maquina_id__in=maquinas - {None},
+        fecha__in=[f for f in fechas if len(f) == 10],
+    ).values_list('contrato_id', 'maquina_id', 'fecha', 'tipo_turno_id'))
+
+    resultados = []
+    planes = []
+    claves_vistas = set()
+    for clave, datos in zip(claves, turnos_raw):
+        resultado = {'clave': clave, 'estado': 'ERROR', 'turno_id': None, 'errores': []}
+        resultados.append(resultado)
+        if not isinstance(datos, dict):
+            resultado['errores'].append('El turno debe ser un objeto JSON')
+            continue
+        if not clave or len(clave) > 100:
+            resultado['errores'].append('clave: es requerida (máximo 100 caracteres)')
+            continue
+        if clave in claves_vistas:
+            resultado['errores'].append('clave: repetida dentro del mismo lote')
+            continue
+        claves_vistas.add(clave)
+
+        firma = hash_turno(datos)
+        previa = ingestas_previas.get(clave)
+        if previa is not None:
+            if previa.hash_payload != firma:
+                resultado['errores'].append('clave: ya fue usada para un turno con datos distintos')
+            else:
+                resultado.update(estado='DUPLICADO', turno_id=previa.turno_id)
+            continue
+
+        try:
+            plan, errores = validar_turno(datos, catalogos, request.user)
+        except Exception as e:
+            logger.exception(f'Error validando turno del lote (clave {clave})')
+            plan, errores = None, [f'Error inesperado al validar: {e}']
+        if plan is not None:
+            turno = plan['turno']
+            unico = (turno.contrato_id, turno.maquina_id, turno.fecha, turno.tipo_turno_id)
+            if unico in ocupados:
+                errores = ['Ya existe un turno para esta máquina, fecha y tipo de turno']
+                plan = None
+            else:
+                ocupados.add(unico)
+        if plan is None:
+            resultado['errores'] = errores
+            continue
+
+        plan['clave'] = clave
+        plan['hash'] = firma
+        plan['resultado'] = resultado
+        planes.append(plan)
+
+    if planes:
+        try:
+            with transaction.atomic():
+                guardar_lote(planes)
+                IngestaTurno.objects.bulk_create([
+                    IngestaTurno(clave=plan['clave'], turno=plan['turno'], hash_payload=plan['hash'], usuario=request.user)
+                    for plan in planes
+                ])
+        except IntegrityError as e:
+            # Otro envío concurrente registró alguna de estas claves o turnos: el
+            # lote completo se revierte y el cliente puede reintentar sin riesgo
+            logger.warning(f'Conflicto al guardar lote de turnos: {e}')
+            return JsonResponse({
+                'success': False,
+                'error': 'Conflicto con un envío simultáneo; reintente el lote',
+            }, status=409)
+        for plan in planes:
+            plan['resultado'].update(estado='CREADO', turno_id=plan['turno'].pk)
+
+    conteo = {estado: sum(1 for r in resultados if r['estado'] == estado) for estado in ('CREADO', 'DUPLICADO', 'ERROR')}
+    return JsonResponse({
+        'success': True,
+        'creados': conteo['CREADO'],
+        'duplicados': conteo['DUPLICADO'],
+        'errores': conteo['ERROR'],
+        'resultados': resultados,
+    })
@@ -1,22 +1,25 @@
 """
 Vistas para integración con APIs de Vilbragroup
 """
+from functools import wraps
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from .api_client import get_api_client
+from .utils.fotos_almacen import articulos_de_fotos, tomar_foto, ultimas_fotos
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-@login_required
-@require_http_methods(["GET"])
-def api_stock_productos_diamantados(request):
+def _stock_sincronizado(request, familia):
     """
-    Endpoint para obtener stock de productos diamantados desde API
-    Retorna JSON para consumo desde frontend (AJAX)
+    Stock de la familia según la última sincronización diaria
+    (sync_stock_diario.py), sin llamar a la API de Vilbragroup.
     """
     # Obtener centro de costo del usuario logueado
     centro_costo = None
@@ -28,51 +31,101 @@ def api_stock_productos_diamantados(request):
         centro_costo = request.GET.get('centro_costo')
     
     try:
-        client = get_api_client()
-        productos = client.obtener_productos_diamantados(centro_costo=centro_costo or None)
+        fotos = ultimas_fotos(familia, centro_costo=centro_costo or None)
+        if not fotos:
+            return JsonResponse({
+                'success': False,
+                'centro_costo_usado': centro_costo,
+                'error': 'Aún no hay una sincronización del stock de almacén para este centro de costo',
+            })
+        articulos = articulos_de_fotos(fotos)
         
         return JsonResponse({
             'success': True,
             'centro_costo_usado': centro_costo,
-            'data': productos,
-            'count': len(productos)
+            'data': articulos,
+            'count': len(articulos),
+            'tomada_en': min(f.tomada_en for f in fotos),
+            'verificada_en': min(f.verificada_en or f.tomada_en for f in fotos),
         })
     except Exception as e:
-        logger.error(f"Error obteniendo productos diamantados: {str(e)}")
+        logger.error(f"Error obteniendo stock {familia}: {str(e)}")
         return JsonResponse({
             'success': False,
             'error': str(e)
         }, status=500)
 
 
+@login_required
+@require_http_methods(["GET"])
+def api_stock_productos_diamantados(request):
+    """
+    Endpoint para obtener stock de productos diamantados (última sincronización)
+    Retorna JSON para consumo desde frontend (AJAX)
+    """
+    return _stock_sincronizado(request, 'PDD')
+
+
 @login_required
 @require_http_methods(["GET"])
 def api_stock_aditivos(request):
     """
-    Endpoint para obtener stock de aditivos desde API
+    Endpoint para obtener stock de aditivos (última sincronización)
     Retorna JSON para consumo desde frontend (AJAX)
     """
-    # Obtener centro de costo del usuario logueado
-    centro_costo = None
-    if hasattr(request.user, 'contrato') and request.user.contrato:
-        centro_costo = request.user.contrato.codigo_centro_costo
+    return _stock_sincronizado(request, 'ADIT')
+
+
+def _login_requerido_async(vista):
+    """
+    login_required para vistas async (el de Django 5.0 solo envuelve vistas
+    sync); el usuario se obtiene con request.auser() sin bloquear el loop.
+    """
+    @wraps(vista)
+    async def _wrapped_view(request, *args, **kwargs):
+        if not (await request.auser()).is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await vista(request, *args, **kwargs)
+    return _wrapped_view
+
+
+@_login_requerido_async
+@require_http_methods(["GET"])
+async def api_stock_en_vivo(request):
+    """
+    Endpoint async para obtener el stock PDD y ADIT desde la API en este
+    momento, con ambas familias en paralelo. Si es el centro de costo del
+    contrato del usuario, también actualiza las fotos del almacén.
+    Retorna JSON para consumo desde frontend (AJAX)
+    """
+    from .models import Contrato
+
+    usuario = await request.auser()
+    contrato = None
+    if getattr(usuario, 'contrato_id', None):
+        contrato = await Contrato.objects.filter(pk=usuario.contrato_id).afirst()
+    centro_costo = contrato.codigo_centro_costo if contrato else None
     
     # Permitir override por query param (para testing o admin)
     if request.GET.get('centro_costo'):
         centro_costo = request.GET.get('centro_costo')
     
     try:
-        client = get_api_client()
-        aditivos = client.obtener_aditivos(centro_costo=centro_costo or None)
+        stock = await get_api_client().aobtener_stock_almacen(centro_costo=centro_costo or None)
+        
+        if contrato and centro_costo == contrato.codigo_centro_costo:
+            for familia, articulos in stock.items():
+                if articulos:
+                    await sync_to_async(tomar_foto)(contrato, familia, articulos)
         
         return JsonResponse({
             'success': True,
             'centro_costo_usado': centro_costo,
-            'data': aditivos,
-            'count': len(aditivos)
+            'pdd': {'data': stock['PDD'], 'count': len(stock['PDD'])},
+            'aditivos': {'data': stock['ADIT'], 'count': len(stock['ADIT'])},
         })
     except Exception as e:
-        logger.error(f"Error obteniendo aditivos: {str(e)}")
+        logger.error(f"Error obteniendo stock en vivo: {str(e)}")
         return JsonResponse({
             'success': False,
             'error': str(e)
@@ -88,6 +141,55 @@ def vista_stock_almacen(request):
     return render(request, 'drilling/almacen/stock.html')
 
 
+@login_required
+@require_http_methods(["GET"])
+def reporte_discrepancias_stock(request):
+    """
+    Reporte de discrepancias entre el stock del almacén y el saldo local,
+    desde la tabla que llena la conciliación (conciliar_stock_almacen);
+    no llama a la API
+    """
+    from django.contrib import messages
+    from django.shortcuts import redirect
+    from .models import Contrato, DiscrepanciaStock, FotoStockAlmacen, FAMILIA_ALMACEN_CHOICES
+    
+    if not request.user.can_supervise_operations():
+        messages.error(request, "No tiene permisos para ver este reporte")
+        return redirect('dashboard')
+    
+    contratos = Contrato.objects.filter(estado='ACTIVO').order_by('nombre_contrato')
+    if not request.user.can_manage_all_contracts():
+        contratos = contratos.filter(id=request.user.contrato_id)
+    contrato_id = request.GET.get('contrato', '')
+    contrato = contratos.filter(pk=contrato_id).first() if contrato_id.isdigit() else contratos.first()
+    familia = request.GET.get('familia')
+    tipo = request.GET.get('tipo')
+    
+    discrepancias = DiscrepanciaStock.objects.none()
+    fotos = []
+    if contrato:
+        discrepancias = DiscrepanciaStock.objects.filter(contrato=contrato)
+        if familia in dict(FAMILIA_ALMACEN_CHOICES):
+            discrepancias = discrepancias.filter(familia=familia)
+        if tipo in dict(DiscrepanciaStock.TIPO_CHOICES):
+            discrepancias = discrepancias.filter(tipo=tipo)
+        # Foto conciliada de cada familia (la de sus discrepancias)
+        fotos = FotoStockAlmacen.objects.filter(
+            pk__in=DiscrepanciaStock.objects.filter(contrato=contrato).values('foto_id').distinct()
+        ).order_by('familia')
+    
+    return render(request, 'drilling/almacen/discrepancias.html', {
+        'contratos': contratos,
+        'contrato': contrato,
+        'familia': familia,
+        'tipo': tipo,
+        'familias': FAMILIA_ALMACEN_CHOICES,
+        'tipos': DiscrepanciaStock.TIPO_CHOICES,
+        'discrepancias': discrepancias,
+        'fotos': fotos,
+    })
+
+
 @login_required
 @require_http_methods(["GET"])
 def api_sondaje_estado(request, sondaje_id):
@@ -0,0 +1,148 @@
+"""
+Enrutamiento de lecturas a una réplica de solo lectura.
+
+Los reportes y listados pesados (metas, horas extras, metraje, tareo) compiten
+con el registro de turnos en el mismo servidor. Las vistas marcadas con
+@usar_replica (o ReplicaReadMixin) leen de la réplica configurada en
+settings.REPLICA_DB_ALIAS; el resto sigue usando el primario.
+
+Reglas:
+- Las escrituras siempre van al primario.
+- Dentro de una transacción abierta en el primario las lecturas también van al
+  primario, para ver lo escrito en esa misma transacción.
+- Si el alias de réplica no está configurado o no responde, se lee del primario.
+- Después de que un usuario escribe (POST/PUT/PATCH/DELETE), sus lecturas van
+  al primario durante REPLICA_STICKY_SECONDS para que vea sus propios cambios
+  aunque la réplica tenga retraso (ver ReplicaStickyMiddleware).
+
+Uso:
+    @login_required
+    @usar_replica
+    def reporte_horas_extras(request): ...
+
+    class TrabajadorListView(ReplicaReadMixin, AdminOrContractFilterMixin, ListView): ...
+
+    # En comandos o scripts
+    with lectura_en_replica():
+        ...
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import OperationalError
+
+logger = logging.getLogger(__name__)
+
+# Clave de sesión con el timestamp de la última escritura del usuario
+SESION_ULTIMA_ESCRITURA = '_replica_ultima_escritura'
+
+# Apps cuyas lecturas pueden ir a la réplica (sesiones, auth, etc. siempre al primario)
+APPS_REPLICA = {'drilling'}
+
+# Segundos que se deja de intentar la réplica después de un fallo de conexión
+PAUSA_TRAS_FALLO = 60
+
+_usar_replica = ContextVar('usar_replica', default=False)
+_replica_caida_hasta = 0.0
+
+
+def alias_replica():
+    """Alias de la réplica si está configurado en DATABASES, o None."""
+    alias = getattr(settings, 'REPLICA_DB_ALIAS', None)
+    if alias and alias != DEFAULT_DB_ALIAS and alias in settings.DATABASES:
+        return alias
+    return None
+
+
+def replica_disponible(alias):
+    """
+    Verifica que la réplica acepte conexiones. Ante un fallo se usa el primario
+    y no se reintenta durante PAUSA_TRAS_FALLO segundos.
+    """
+    global _replica_caida_hasta
+    if time.monotonic() < _replica_caida_hasta:
+        return False
+    try:
+        connections[alias].ensure_connection()
+        return True
+    except OperationalError as e:
+        logger.warning(f'Réplica "{alias}" no disponible, leyendo del primario: {e}')
+        _replica_caida_hasta = time.monotonic() + PAUSA_TRAS_FALLO
+        return False
+
+
+def marcar_escritura(request):
+    """Registra en la sesión que el usuario acaba de escribir."""
+    session = getattr(request, 'session', None)
+    if session is not None:
+        session[SESION_ULTIMA_ESCRITURA] = time.time()
+
+
+def en_ventana_post_escritura(request):
+    """True si el usuario escribió hace menos de REPLICA_STICKY_SECONDS."""
+    session = getattr(request, 'session', None)
+    if session is None:
+        return False
+    ultima = session.get(SESION_ULTIMA_ESCRITURA)
+    ventana = getattr(settings, 'REPLICA_STICKY_SECONDS', 15)
+    return bool(ultima) and time.time() - ultima < ventana
+
+
+@contextmanager
+def lectura_en_replica(request=None):
+    """
+    Envía a la réplica las lecturas ejecutadas dentro del bloque, salvo que no
+    haya réplica disponible, haya una transacción abierta en el primario o el
+    usuario del request esté en la ventana post-escritura.
+    """
+    alias = alias_replica()
+    activar = (
+        alias is not None
+        and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        and not (request is not None and en_ventana_post_escritura(request))
+        and replica_disponible(alias)
+    )
+    token = _usar_replica.set(activar)
+    try:
+        yield
+    finally:
+        _usar_replica.reset(token)
+
+
+def usar_replica(view_func):
+    """Decorador para vistas de solo lectura que toleran datos con segundos de retraso."""
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        with lectura_en_replica(request):
+            return view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+
+class ReplicaRouter:
+    """Router de Django: lecturas marcadas a la réplica, todo lo demás al primario."""
+
+    def db_for_read(self, model, **hints):
+        if (
+            _usar_replica.get()
+            and model._meta.app_label in APPS_REPLICA
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return alias_replica()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primario y réplica contienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica se alimenta por replicación, nunca se migra directamente
+        return db != alias_replica()
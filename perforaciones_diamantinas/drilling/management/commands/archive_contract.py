@@ -0,0 +1,134 @@
+"""
+Comando para archivar en Parquet los turnos de un contrato FINALIZADO.
+
+Pasos (ver drilling/utils/archivo_contrato.py):
+1. Exporta turnos y tablas hijas a Parquet, un archivo por tabla y mes.
+2. Verifica filas, suma de ids y checksum de cada archivo contra la base de datos.
+3. Borra los turnos del contrato por lotes y marca el contrato como ARCHIVADO.
+
+Si el comando se interrumpe durante el borrado, al volver a ejecutarlo no se
+exporta de nuevo: se reverifican los archivos y se continúa borrando.
+
+Requiere pyarrow.
+
+Uso:
+    python manage.py archive_contract 12 --dry-run
+    python manage.py archive_contract 12 --solo-exportar
+    python manage.py archive_contract 12
+    python manage.py archive_contract 12 --verificar
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from drilling.models import ArchivoContrato, Contrato, Turno
+from drilling.utils.archivo_contrato import (
+    TABLAS_ARCHIVO, ArchivoError, borrar_turnos, directorio_contrato, exportar_contrato,
+    resumen_manifiesto, turnos_sin_archivar, verificar_archivos, verificar_contra_bd,
+)
+
+
+class Command(BaseCommand):
+    help = 'Archiva en Parquet los turnos de un contrato finalizado y los elimina de la base de datos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('contrato_id', type=int, help='ID del contrato a archivar')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Mostrar cuántas filas se archivarían sin escribir ni borrar',
+        )
+        parser.add_argument(
+            '--solo-exportar',
+            action='store_true',
+            help='Exportar y verificar, sin borrar las filas de la base de datos',
+        )
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Solo reverificar los archivos de un contrato ya archivado',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Turnos por transacción al borrar (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            contrato = Contrato.objects.get(pk=options['contrato_id'])
+        except Contrato.DoesNotExist:
+            raise CommandError(f"No existe el contrato {options['contrato_id']}")
+
+        archivo = ArchivoContrato.objects.filter(contrato=contrato).first()
+
+        if options['verificar']:
+            if archivo is None:
+                raise CommandError('El contrato no tiene archivo')
+            self._verificar(lambda: verificar_archivos(contrato.pk, archivo.manifiesto))
+            self.stdout.write(self.style.SUCCESS('✓ Archivos íntegros'))
+            return
+
+        if contrato.estado != 'FINALIZADO':
+            raise CommandError(f'Solo se archivan contratos FINALIZADOS (estado actual: {contrato.estado})')
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(f'Contrato: {contrato.nombre_contrato}')
+        self.stdout.write(f'Destino: {directorio_contrato(contrato.pk)}')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('MODO SIMULACIÓN - No se escribirán cambios'))
+            for nombre, modelo, prefijo in TABLAS_ARCHIVO:
+                filas = modelo.objects.filter(**{f'{prefijo}contrato_id': contrato.pk}).count()
+                self.stdout.write(f'  {nombre:<20} {filas:>10} filas')
+            return
+
+        if archivo is not None and archivo.estado == 'ARCHIVADO':
+            self.stdout.write(self.style.SUCCESS('✓ El contrato ya está archivado'))
+            return
+
+        if archivo is None:
+            turnos = Turno.objects.filter(contrato=contrato)
+            if not turnos.exists():
+                raise CommandError('El contrato no tiene turnos para archivar')
+            fechas = turnos.order_by('fecha').values_list('fecha', flat=True)
+            manifiesto = exportar_contrato(contrato)
+            self._verificar(lambda: verificar_contra_bd(contrato, manifiesto))
+            totales = resumen_manifiesto(manifiesto)
+            archivo = ArchivoContrato.objects.create(
+                contrato=contrato,
+                ruta=str(directorio_contrato(contrato.pk)),
+                manifiesto=manifiesto,
+                total_turnos=totales['turnos'],
+                fecha_desde=fechas.first(),
+                fecha_hasta=fechas.last(),
+            )
+            for nombre, filas in totales.items():
+                self.stdout.write(f'  {nombre:<20} {filas:>10} filas exportadas')
+            self.stdout.write(self.style.SUCCESS('✓ Exportación verificada contra la base de datos'))
+        else:
+            # Borrado interrumpido: los archivos ya se verificaron contra la BD al exportar
+            self._verificar(lambda: verificar_archivos(contrato.pk, archivo.manifiesto))
+            nuevos = turnos_sin_archivar(contrato)
+            if nuevos:
+                raise CommandError(
+                    f'{len(nuevos)} turnos se crearon después de la exportación; '
+                    'elimine el registro de archivo y vuelva a exportar'
+                )
+            self.stdout.write('Exportación previa encontrada y verificada; se continúa con el borrado')
+
+        if options['solo_exportar']:
+            self.stdout.write('=' * 60)
+            return
+
+        borrados = borrar_turnos(contrato, tamano_lote=options['lote'])
+        archivo.estado = 'ARCHIVADO'
+        archivo.save(update_fields=['estado', 'updated_at'])
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS(f'✓ {borrados} turnos eliminados de la base de datos'))
+
+    def _verificar(self, verificacion):
+        try:
+            verificacion()
+        except ArchivoError as e:
+            raise CommandError(f'Verificación fallida, no se borró nada: {e}')
@@ -0,0 +1,164 @@
+"""
+Comando para medir el costo de arranque de un worker (tiempo de import y memoria).
+
+Lanza un proceso Python limpio con `-X importtime` que hace lo mismo que un
+worker de gunicorn al arrancar: django.setup() y carga de las URLs (que importa
+todas las vistas). Reporta:
+- Tiempo y RSS después de django.setup() y después de cargar las URLs
+- Los módulos con mayor tiempo de import acumulado
+- Qué librerías pesadas (pandas, openpyxl, numpy...) quedaron cargadas
+
+Las librerías de Excel deben cargarse solo al usarlas; si aparecen aquí, algún
+módulo las está importando a nivel de módulo.
+
+Uso:
+    python manage.py boot_profile
+    python manage.py boot_profile --top=40 --filtro=drilling
+    python manage.py boot_profile --output=boot.json
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Librerías cuya presencia en el arranque se reporta explícitamente
+LIBRERIAS_PESADAS = ['pandas', 'numpy', 'openpyxl', 'xlrd', 'pyarrow', 'duckdb']
+
+# Script que se ejecuta en el proceso hijo; imprime un JSON en stdout
+SCRIPT_ARRANQUE = '''
+import json, sys, time
+
+def rss_kb():
+    try:
+        with open('/proc/self/status') as f:
+            for linea in f:
+                if linea.startswith('VmRSS:'):
+                    return int(linea.split()[1])
+    except OSError:
+        pass
+    try:
+        import resource
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maximo // 1024 if sys.platform == 'darwin' else maximo
+    except ImportError:
+        return None
+
+inicio = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+rss_setup = rss_kb()
+
+from django.urls import get_resolver
+get_resolver().url_patterns
+urls = time.perf_counter()
+
+print(json.dumps({
+    'setup_ms': round((setup - inicio) * 1000, 1),
+    'urls_ms': round((urls - setup) * 1000, 1),
+    'rss_setup_kb': rss_setup,
+    'rss_urls_kb': rss_kb(),
+    'librerias_cargadas': sorted(m for m in %r if m in sys.modules),
+    'total_modulos': len(sys.modules),
+}))
+''' % (LIBRERIAS_PESADAS,)
+
+
+def parsear_importtime(salida):
+    """
+    Convierte la salida de `-X importtime` en una lista de
+    {'modulo', 'propio_ms', 'acumulado_ms', 'nivel'}.
+    """
+    modulos = []
+    for linea in salida.splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        try:
+            propio, acumulado, nombre = linea[len('import time:'):].split('|')
+            modulos.append({
+                'modulo': nombre.strip(),
+                'propio_ms': int(propio) / 1000,
+                'acumulado_ms': int(acumulado) / 1000,
+                # La indentación del nombre indica la profundidad del import
+                'nivel': (len(nombre) - len(nombre.lstrip()) - 1) // 2,
+            })
+        except ValueError:
+            continue
+    return modulos
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de import por módulo y la memoria (RSS) de un worker tras django.setup()'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=25,
+            help='Cantidad de módulos a mostrar, ordenados por tiempo acumulado (default: 25)',
+        )
+        parser.add_argument(
+            '--filtro',
+            type=str,
+            help='Mostrar solo módulos cuyo nombre empiece con este prefijo (ej: drilling)',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Guardar el resultado completo en un archivo JSON',
+        )
+
+    def handle(self, *args, **options):
+        proceso = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', SCRIPT_ARRANQUE],
+            cwd=str(settings.BASE_DIR),
+            env=os.environ.copy(),
+            capture_output=True,
+            text=True,
+        )
+        if proceso.returncode != 0:
+            raise CommandError(f'El proceso de arranque falló:\n{proceso.stderr[-2000:]}')
+
+        try:
+            resumen = json.loads(proceso.stdout.strip().splitlines()[-1])
+        except (IndexError, ValueError):
+            raise CommandError(f'Salida inesperada del proceso de arranque: {proceso.stdout[-500:]}')
+
+        modulos = parsear_importtime(proceso.stderr)
+        seleccion = modulos
+        if options['filtro']:
+            seleccion = [m for m in modulos if m['modulo'].startswith(options['filtro'])]
+        seleccion = sorted(seleccion, key=lambda m: m['acumulado_ms'], reverse=True)[:options['top']]
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(dict(resumen, modulos=modulos), f, indent=2, ensure_ascii=False)
+
+        self.stdout.write('=' * 60)
+        self.stdout.write('PERFIL DE ARRANQUE')
+        self.stdout.write('=' * 60)
+        self.stdout.write(f"django.setup():  {resumen['setup_ms']} ms")
+        self.stdout.write(f"Carga de URLs:   {resumen['urls_ms']} ms")
+        if resumen['rss_setup_kb'] is not None:
+            self.stdout.write(f"RSS tras setup:  {resumen['rss_setup_kb'] / 1024:.1f} MB")
+            self.stdout.write(f"RSS tras URLs:   {resumen['rss_urls_kb'] / 1024:.1f} MB")
+        self.stdout.write(f"Módulos cargados: {resumen['total_modulos']}")
+
+        self.stdout.write(f"\n{'Acumulado (ms)':>15} {'Propio (ms)':>12}  Módulo")
+        for m in seleccion:
+            self.stdout.write(f"{m['acumulado_ms']:>15.1f} {m['propio_ms']:>12.1f}  {m['modulo']}")
+
+        self.stdout.write('')
+        if resumen['librerias_cargadas']:
+            self.stdout.write(self.style.WARNING(
+                f"⚠ Librerías pesadas cargadas al arrancar: {', '.join(resumen['librerias_cargadas'])}"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('✓ Ninguna librería pesada se carga al arrancar'))
+        if options['output']:
+            self.stdout.write(f"Resultado guardado en {options['output']}")
@@ -0,0 +1,94 @@
+"""
+Comando para cargar tipos de cambio diarios desde un CSV.
+
+El archivo tiene encabezado y las columnas fecha (YYYY-MM-DD), moneda (BOB,
+PEN) y unidades_por_usd (unidades de la moneda por 1 USD); fuente es
+opcional. Las filas se insertan por lotes y las fechas ya cargadas se
+actualizan (upsert por moneda y fecha), así el mismo archivo se puede volver
+a cargar con correcciones.
+
+Uso:
+    python manage.py cargar_tipos_cambio tipos_cambio.csv
+    python manage.py cargar_tipos_cambio tipos_cambio.csv --fuente=BCB
+    python manage.py cargar_tipos_cambio tipos_cambio.csv --delimitador=";"
+"""
+
+import csv
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from drilling.models import MONEDA_CHOICES, TipoCambio
+from drilling.utils.tipo_cambio import MONEDA_PIVOTE
+
+TAMANO_LOTE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Carga tipos de cambio diarios (unidades por USD) desde un CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', type=str, help='Ruta del CSV')
+        parser.add_argument(
+            '--fuente',
+            type=str,
+            default='',
+            help='Fuente para las filas sin columna fuente (ej: BCB, SBS)',
+        )
+        parser.add_argument(
+            '--delimitador',
+            type=str,
+            default=',',
+            help='Delimitador del CSV (default: ,)',
+        )
+
+    def handle(self, *args, **options):
+        monedas = set(dict(MONEDA_CHOICES)) - {MONEDA_PIVOTE}
+        tipos = {}
+        errores = []
+        try:
+            with open(options['archivo'], newline='', encoding='utf-8-sig') as f:
+                for linea, fila in enumerate(csv.DictReader(f, delimiter=options['delimitador']), start=2):
+                    try:
+                        fecha = datetime.strptime(fila['fecha'].strip(), '%Y-%m-%d').date()
+                        moneda = fila['moneda'].strip().upper()
+                        tasa = Decimal(fila['unidades_por_usd'].strip())
+                    except (KeyError, AttributeError, ValueError, InvalidOperation):
+                        errores.append(f'Línea {linea}: fecha, moneda o unidades_por_usd inválidos')
+                        continue
+                    if moneda not in monedas:
+                        errores.append(f'Línea {linea}: moneda {moneda} no soportada')
+                        continue
+                    if tasa <= 0:
+                        errores.append(f'Línea {linea}: unidades_por_usd debe ser mayor a 0')
+                        continue
+                    # Si el archivo repite (moneda, fecha), gana la última fila
+                    tipos[(moneda, fecha)] = TipoCambio(
+                        fecha=fecha, moneda=moneda, unidades_por_usd=tasa,
+                        fuente=(fila.get('fuente') or options['fuente']).strip(),
+                    )
+        except OSError as e:
+            raise CommandError(f'No se pudo leer el archivo: {e}')
+
+        if errores:
+            for error in errores[:20]:
+                self.stderr.write(error)
+            raise CommandError(f'{len(errores)} filas con errores; no se cargó nada')
+
+        with transaction.atomic():
+            TipoCambio.objects.bulk_create(
+                list(tipos.values()),
+                batch_size=TAMANO_LOTE,
+                update_conflicts=True,
+                unique_fields=['moneda', 'fecha'],
+                update_fields=['unidades_por_usd', 'fuente'],
+            )
+
+        self.stdout.write('=' * 60)
+        for moneda in sorted({m for m, _ in tipos}):
+            fechas = [f for m, f in tipos if m == moneda]
+            self.stdout.write(f'  {moneda}: {len(fechas)} días ({min(fechas)} a {max(fechas)})')
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS(f'✓ {len(tipos)} tipos de cambio cargados'))
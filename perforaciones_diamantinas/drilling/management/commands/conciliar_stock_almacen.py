@@ -0,0 +1,56 @@
+"""
+Comando para conciliar el stock del almacén (API de Vilbragroup) con el saldo local.
+
+Por cada contrato toma una foto del stock PDD y ADIT de su centro de costo,
+la cruza con los saldos de abastecimientos y consumos y guarda las diferencias
+en discrepancia_stock (ver drilling/utils/conciliacion_stock.py). El reporte
+de discrepancias lee esa tabla, sin llamar a la API.
+
+Uso:
+    python manage.py conciliar_stock_almacen
+    python manage.py conciliar_stock_almacen --contratos=3,5
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from drilling.api_client import get_api_client
+from drilling.models import Contrato
+from drilling.utils.conciliacion_stock import conciliar_contrato
+
+
+class Command(BaseCommand):
+    help = 'Concilia el stock del almacén con los saldos locales y guarda las discrepancias'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--contratos',
+            type=str,
+            help='IDs de contrato separados por coma (default: contratos activos con centro de costo)',
+        )
+
+    def handle(self, *args, **options):
+        contratos = Contrato.objects.exclude(codigo_centro_costo__isnull=True).exclude(codigo_centro_costo='')
+        if options['contratos']:
+            try:
+                ids = [int(c) for c in options['contratos'].split(',') if c.strip()]
+            except ValueError:
+                raise CommandError('--contratos debe ser una lista de IDs separados por coma')
+            contratos = contratos.filter(id__in=ids)
+        else:
+            contratos = contratos.filter(estado='ACTIVO')
+
+        client = get_api_client()
+        self.stdout.write('=' * 60)
+        for contrato in contratos.order_by('nombre_contrato'):
+            self.stdout.write(f"{contrato.nombre_contrato} (CC: {contrato.codigo_centro_costo})")
+            for familia, resumen in conciliar_contrato(contrato, client).items():
+                if resumen is None:
+                    self.stdout.write(self.style.WARNING(f"  {familia}: sin datos de la API, no se concilió"))
+                    continue
+                estilo = self.style.WARNING if resumen['discrepancias'] else self.style.SUCCESS
+                self.stdout.write(estilo(
+                    f"  {familia}: {resumen['articulos']} artículos, {resumen['coinciden']} coinciden, "
+                    f"{resumen['discrepancias']} discrepancias"
+                ))
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS('✓ Conciliación terminada'))
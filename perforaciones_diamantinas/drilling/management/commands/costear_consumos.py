@@ -0,0 +1,67 @@
+"""
+Comando para reconstruir el costeo FIFO de los consumos de stock (costo_consumo_fifo)
+y el libro de movimientos con saldos (movimiento_stock).
+
+Ambos se mantienen solos al guardar lotes, consumos y turnos (ver
+drilling/utils/costeo_fifo.py y drilling/utils/movimientos_stock.py). La
+migración 0065 llena movimiento_stock con el historial existente; este comando
+llena costo_consumo_fifo por primera vez y reconstruye ambos después de cargas
+masivas que no pasan por save() (importaciones, bulk_create,
+queryset.update/delete). Los contratos ARCHIVADOS se omiten: sus consumos
+están en Parquet (archive_contract).
+
+Uso:
+    python manage.py costear_consumos
+    python manage.py costear_consumos --contratos=3,5
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+
+from drilling.models import CostoConsumoFIFO
+from drilling.utils.costeo_fifo import recalcular_costeo
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el costeo FIFO de los consumos y los movimientos de stock'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--contratos',
+            type=str,
+            help='IDs de contrato separados por coma (default: todos)',
+        )
+
+    def handle(self, *args, **options):
+        contratos = None
+        if options['contratos']:
+            try:
+                contratos = [int(c) for c in options['contratos'].split(',') if c.strip()]
+            except ValueError:
+                raise CommandError('--contratos debe ser una lista de IDs separados por coma')
+
+        inicio = time.perf_counter()
+        resumen = recalcular_costeo(contratos)
+        segundos = time.perf_counter() - inicio
+
+        sin_lote = CostoConsumoFIFO.objects.filter(lote__isnull=True)
+        if contratos:
+            sin_lote = sin_lote.filter(contrato_id__in=contratos)
+        faltantes = sin_lote.values('contrato_id', 'codigo_producto').annotate(
+            cantidad=Sum('cantidad'),
+        ).order_by('contrato_id', 'codigo_producto')
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(f"Productos costeados: {resumen['productos']}")
+        self.stdout.write(f"Filas de costeo escritas: {resumen['filas']}")
+        self.stdout.write(f"Movimientos de stock escritos: {resumen['movimientos']}")
+        self.stdout.write(f"Duración: {segundos:.1f}s")
+        for fila in faltantes:
+            codigo = fila['codigo_producto'] or '(sin código)'
+            self.stdout.write(self.style.WARNING(
+                f"  Contrato {fila['contrato_id']} - {codigo}: {fila['cantidad']} consumidos sin stock ingresado"
+            ))
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS('✓ Costeo FIFO y movimientos de stock actualizados'))
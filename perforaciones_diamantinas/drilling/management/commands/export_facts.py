@@ -0,0 +1,103 @@
+"""
+Comando para exportar el modelo de hechos de perforación a datasets Parquet.
+
+Escribe turnos, metros por sondaje, complementos, aditivos, actividades (con
+es_cobrable), horas extras y metas, particionados por contrato y mes (ver
+drilling/utils/hechos_parquet.py). Los análisis pesados (Power BI, pandas,
+DuckDB) leen los archivos en lugar de las vistas de sql_views/ sobre la red.
+
+Pensado para correr en cron: la primera vez sin filtros (todo el histórico) y
+luego solo los meses recientes con --desde, que reescribe esas particiones.
+
+Requiere pyarrow.
+
+Uso:
+    python manage.py export_facts --format parquet
+    python manage.py export_facts --format parquet --desde=2025-01
+    python manage.py export_facts --format parquet --contratos=3,5 --datasets=turnos,actividades
+    python manage.py export_facts --format parquet --destino=/datos/hechos
+"""
+
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from drilling.utils.hechos_parquet import DATASETS, exportar_dataset
+
+
+class Command(BaseCommand):
+    help = 'Exporta los hechos de perforación a Parquet particionado por contrato y mes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=['parquet'],
+            default='parquet',
+            help='Formato de salida (default: parquet)',
+        )
+        parser.add_argument(
+            '--destino',
+            type=str,
+            help='Directorio de salida (default: settings.HECHOS_PARQUET_DIR)',
+        )
+        parser.add_argument(
+            '--datasets',
+            type=str,
+            help=f"Datasets separados por coma (default: {','.join(DATASETS)})",
+        )
+        parser.add_argument(
+            '--contratos',
+            type=str,
+            help='IDs de contrato separados por coma (default: todos)',
+        )
+        parser.add_argument(
+            '--desde',
+            type=str,
+            help='Primer mes a exportar (YYYY-MM)',
+        )
+        parser.add_argument(
+            '--hasta',
+            type=str,
+            help='Último mes a exportar (YYYY-MM)',
+        )
+
+    def handle(self, *args, **options):
+        destino = options['destino'] or settings.HECHOS_PARQUET_DIR
+
+        datasets = list(DATASETS)
+        if options['datasets']:
+            datasets = [d.strip() for d in options['datasets'].split(',') if d.strip()]
+            desconocidos = set(datasets) - set(DATASETS)
+            if desconocidos:
+                raise CommandError(f"Datasets no soportados: {', '.join(sorted(desconocidos))}")
+
+        contratos = None
+        if options['contratos']:
+            try:
+                contratos = [int(c) for c in options['contratos'].split(',') if c.strip()]
+            except ValueError:
+                raise CommandError('--contratos debe ser una lista de IDs separados por coma')
+
+        for opcion in ('desde', 'hasta'):
+            if options[opcion]:
+                try:
+                    datetime.strptime(options[opcion], '%Y-%m')
+                except ValueError:
+                    raise CommandError(f'Formato de mes inválido en --{opcion}. Use YYYY-MM')
+        if options['desde'] and options['hasta'] and options['desde'] > options['hasta']:
+            raise CommandError('--desde debe ser anterior o igual a --hasta')
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(f'Destino: {destino}')
+        for nombre in datasets:
+            inicio = time.perf_counter()
+            resumen = exportar_dataset(nombre, destino, contratos, options['desde'], options['hasta'])
+            segundos = time.perf_counter() - inicio
+            linea = f"  {nombre:<14} {resumen['filas']:>10} filas en {resumen['particiones']:>4} particiones ({segundos:.1f}s)"
+            if resumen['eliminadas']:
+                linea += f", {resumen['eliminadas']} vacías eliminadas"
+            self.stdout.write(linea)
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS('✓ Exportación completada'))
@@ -0,0 +1,140 @@
+"""
+Comando para particionar por mes (PostgreSQL 15+) las tablas de turnos.
+
+Tablas: turnos, turno_avance, turno_complemento, turno_aditivo, turno_actividad,
+turno_trabajador, turno_hora_extra y asistencia_trabajador. Ver
+drilling/utils/particiones.py para el detalle y las restricciones.
+
+Sin --aplicar solo muestra el estado de cada tabla. Con --aplicar:
+1. Convierte las tablas que aún no están particionadas (copia los datos a
+   particiones mensuales; cada tabla en su propia transacción, con la tabla
+   bloqueada mientras dura la copia).
+   Las vistas que dependen de cada tabla (Power BI) se recrean sobre la
+   tabla particionada.
+2. Crea por adelantado las particiones de los próximos meses.
+3. Con --desprender-antes, desprende las particiones de meses anteriores.
+
+Pensado para correr una vez en una ventana de mantenimiento (conversión) y
+luego mensualmente en cron (particiones futuras).
+
+Uso:
+    python manage.py partition_turnos
+    python manage.py partition_turnos --aplicar
+    python manage.py partition_turnos --aplicar --meses-futuros=6
+    python manage.py partition_turnos --aplicar --tablas=turnos,turno_avance
+    python manage.py partition_turnos --aplicar --desprender-antes=2023-01
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from drilling.utils.particiones import (
+    TABLAS, ParticionError, convertir_tabla, crear_particiones_futuras,
+    desprender_particiones, esta_particionada, particiones, rango_datos,
+    verificar_servidor,
+)
+
+
+class Command(BaseCommand):
+    help = 'Particiona por mes las tablas de turnos (PostgreSQL) y mantiene las particiones futuras'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--aplicar',
+            action='store_true',
+            help='Ejecutar los cambios (sin esta opción solo se muestra el estado)',
+        )
+        parser.add_argument(
+            '--meses-futuros',
+            type=int,
+            default=3,
+            help='Meses por adelantado con partición creada (default: 3)',
+        )
+        parser.add_argument(
+            '--tablas',
+            type=str,
+            help='Lista de tablas separadas por coma (default: todas)',
+        )
+        parser.add_argument(
+            '--desprender-antes',
+            type=str,
+            help='Desprender las particiones de meses anteriores a este (YYYY-MM)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            verificar_servidor(connection)
+        except ParticionError as e:
+            raise CommandError(str(e))
+
+        tablas = [tabla for tabla, _ in TABLAS]
+        if options['tablas']:
+            pedidas = [t.strip() for t in options['tablas'].split(',') if t.strip()]
+            desconocidas = set(pedidas) - set(tablas)
+            if desconocidas:
+                raise CommandError(f"Tablas no soportadas: {', '.join(sorted(desconocidas))}")
+            tablas = [t for t in tablas if t in pedidas]
+
+        desprender_antes = None
+        if options['desprender_antes']:
+            try:
+                desprender_antes = datetime.strptime(options['desprender_antes'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('Formato de mes inválido. Use YYYY-MM')
+
+        self.stdout.write('=' * 60)
+        if not options['aplicar']:
+            self.stdout.write(self.style.WARNING('MODO CONSULTA - Use --aplicar para ejecutar'))
+            self.mostrar_estado(tablas)
+            return
+
+        for tabla in tablas:
+            try:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    if not esta_particionada(cursor, tabla):
+                        resumen = convertir_tabla(cursor, tabla, options['meses_futuros'])
+                        self.stdout.write(self.style.SUCCESS(
+                            f"✓ {tabla}: {resumen['filas']} filas en {len(resumen['particiones'])} particiones"
+                        ))
+                        for fk in resumen['fks_eliminadas']:
+                            self.stdout.write(f'  FK eliminada: {fk}')
+                        for indice in resumen['indices_omitidos']:
+                            self.stdout.write(self.style.WARNING(f'  Índice único omitido: {indice}'))
+                        for vista in resumen['vistas_recreadas']:
+                            self.stdout.write(f'  Vista recreada: {vista}')
+                    else:
+                        creadas = crear_particiones_futuras(cursor, tabla, options['meses_futuros'])
+                        self.stdout.write(f'✓ {tabla}: {len(creadas)} particiones nuevas')
+            except ParticionError as e:
+                raise CommandError(f'{tabla}: {e}')
+
+        if desprender_antes:
+            # Hijas primero: la FK compuesta impide desprender meses de turnos con hijos adjuntos
+            for tabla in reversed(tablas):
+                with transaction.atomic(), connection.cursor() as cursor:
+                    desprendidas = desprender_particiones(cursor, tabla, desprender_antes)
+                for nombre in desprendidas:
+                    self.stdout.write(f'  Desprendida: {nombre}')
+
+        self.stdout.write('=' * 60)
+        self.mostrar_estado(tablas)
+
+    def mostrar_estado(self, tablas):
+        with connection.cursor() as cursor:
+            for tabla in tablas:
+                try:
+                    particionada = esta_particionada(cursor, tabla)
+                except ParticionError as e:
+                    self.stdout.write(self.style.ERROR(str(e)))
+                    continue
+                columna = dict(TABLAS)[tabla]
+                minimo, maximo, filas = rango_datos(cursor, tabla, columna)
+                if particionada:
+                    meses = [p for p in particiones(cursor, tabla) if p[1] is not None]
+                    rango = f'{meses[0][1]:%Y-%m} a {meses[-1][1]:%Y-%m}' if meses else 'sin particiones'
+                    estado = f'particionada ({len(meses)} meses: {rango})'
+                else:
+                    estado = 'sin particionar'
+                self.stdout.write(f'{tabla:<24} {estado:<45} {filas} filas ({minimo or "-"} a {maximo or "-"})')
@@ -0,0 +1,76 @@
+"""
+Comando para refrescar las tablas de hechos de Power BI.
+
+Mantiene fact_turno, fact_complemento, fact_horas_extras y fact_meta_cumplimiento
+de forma incremental: solo reprocesa los turnos y metas que cambiaron desde la
+última ejecución (marca de agua en bi_watermark). La primera ejecución, o con
+--full, reconstruye todo. Ver drilling/utils/bi_facts.py.
+
+Pensado para correr en cron antes del refresco programado de Power BI.
+
+Uso:
+    python manage.py refresh_bi_facts
+    python manage.py refresh_bi_facts --full
+    python manage.py refresh_bi_facts --desde=2025-01-01
+    python manage.py refresh_bi_facts --dry-run
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from drilling.utils.bi_facts import refrescar_hechos
+
+
+class Command(BaseCommand):
+    help = 'Refresca incrementalmente las tablas de hechos de Power BI (fact_*)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Reconstruir todas las tablas de hechos ignorando la marca de agua',
+        )
+        parser.add_argument(
+            '--desde',
+            type=str,
+            help='Reprocesar cambios desde esta fecha (YYYY-MM-DD) en lugar de la marca guardada',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Mostrar cuántos turnos se reprocesarían sin escribir',
+        )
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['desde']:
+            try:
+                desde = timezone.make_aware(datetime.strptime(options['desde'], '%Y-%m-%d'))
+            except ValueError:
+                raise CommandError('Formato de fecha inválido. Use YYYY-MM-DD')
+
+        resumen = refrescar_hechos(
+            desde=desde,
+            completo=options['full'],
+            dry_run=options['dry_run'],
+        )
+
+        self.stdout.write('=' * 60)
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('MODO SIMULACIÓN - No se escribieron cambios'))
+        self.stdout.write(f"Modo: {resumen['modo']}")
+        if resumen['marca_anterior']:
+            self.stdout.write(f"Cambios desde: {resumen['marca_anterior']:%Y-%m-%d %H:%M:%S}")
+        self.stdout.write(f"Turnos reprocesados: {resumen['turnos']}")
+        if not options['dry_run']:
+            self.stdout.write(f"Turnos eliminados: {resumen['turnos_eliminados']}")
+            self.stdout.write(f"Metas recalculadas: {resumen['metas']}")
+            self.stdout.write(f"Filas escritas: {resumen['filas']}")
+            self.stdout.write(f"Duración: {resumen['segundos']}s")
+        self.stdout.write('=' * 60)
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ Marca de agua actualizada a {resumen['marca_nueva']:%Y-%m-%d %H:%M:%S}"
+            ))
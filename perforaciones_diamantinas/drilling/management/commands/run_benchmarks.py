@@ -0,0 +1,356 @@
+"""
+Comando para medir tiempos y cantidad de queries de las vistas y comandos críticos.
+
+Recorre un conjunto fijo de escenarios (dashboards, listado y creación de turnos,
+metas, reportes, exportación del tareo y recálculo de horas extras) usando el
+cliente de pruebas de Django contra la base de datos configurada, y guarda los
+resultados en JSON. Cada ejecución corre dentro de una transacción que se
+revierte, por lo que la base de datos queda intacta.
+
+Está pensado para usarse sobre el dataset de seed_benchmark_data en SQLite o
+Postgres local. Con --baseline compara contra una corrida anterior y falla si
+algún escenario aumentó sus queries o empeoró su tiempo más allá de la tolerancia.
+
+Uso:
+    python manage.py run_benchmarks
+    python manage.py run_benchmarks --iterations=10 --output=bench_actual.json
+    python manage.py run_benchmarks --baseline=bench_main.json --tolerance=0.25
+    python manage.py run_benchmarks --only=dashboard_gerencia,listar_turnos
+"""
+
+import io
+import json
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from drilling.models import (
+    CustomUser, Maquina, Sondaje, TipoActividad, TipoAditivo, TipoComplemento,
+    TipoTurno, Trabajador, Turno, UnidadMedida,
+)
+from drilling.utils.benchmark import PREFIJO_BENCHMARK, descripcion_base_datos, es_base_datos_local
+
+
+class Command(BaseCommand):
+    help = 'Mide tiempos y queries de las vistas/comandos críticos y guarda los resultados en JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5, help='Repeticiones medidas por escenario')
+        parser.add_argument('--warmup', type=int, default=1, help='Repeticiones de calentamiento (no medidas)')
+        parser.add_argument('--output', type=str, default='benchmark_results.json', help='Archivo JSON de salida')
+        parser.add_argument('--prefix', type=str, default=PREFIJO_BENCHMARK, help='Prefijo de los datos sintéticos')
+        parser.add_argument('--only', type=str, help='Lista de escenarios a ejecutar separada por comas')
+        parser.add_argument('--baseline', type=str, help='JSON de una corrida anterior para detectar regresiones')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Aumento relativo de la mediana tolerado frente al baseline (0.25 = 25%%)'
+        )
+        parser.add_argument(
+            '--min-delta-ms',
+            type=float,
+            default=5.0,
+            help='Diferencia mínima en ms para considerar regresión de tiempo (evita ruido)'
+        )
+        parser.add_argument('--cold-cache', action='store_true', help='Limpiar la caché antes de cada repetición')
+        parser.add_argument(
+            '--allow-remote',
+            action='store_true',
+            help='Permitir ejecutar contra una base de datos que no es local (NO recomendado)'
+        )
+
+    def handle(self, *args, **options):
+        if not options['allow_remote'] and not es_base_datos_local():
+            raise CommandError(
+                'La base de datos configurada no es local. Ejecute los benchmarks contra SQLite o '
+                'Postgres local, o use --allow-remote si realmente sabe lo que hace.'
+            )
+        if options['iterations'] < 1:
+            raise CommandError('--iterations debe ser mayor a 0')
+
+        self.prefix = options['prefix'].strip().upper()
+        escenarios = self._construir_escenarios()
+
+        if options['only']:
+            seleccion = {nombre.strip() for nombre in options['only'].split(',') if nombre.strip()}
+            desconocidos = seleccion - {e['nombre'] for e in escenarios}
+            if desconocidos:
+                raise CommandError(f'Escenarios desconocidos: {", ".join(sorted(desconocidos))}')
+            escenarios = [e for e in escenarios if e['nombre'] in seleccion]
+
+        self.stdout.write(f"\n{'='*70}")
+        self.stdout.write(self.style.SUCCESS('BENCHMARKS'))
+        self.stdout.write(f"{'='*70}")
+        self.stdout.write(f'Iteraciones: {options["iterations"]} (+{options["warmup"]} de calentamiento)\n')
+
+        resultados = []
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            clientes = {}
+            for escenario in escenarios:
+                usuario = escenario.get('usuario')
+                if usuario and usuario.pk not in clientes:
+                    cliente = Client(raise_request_exception=False)
+                    cliente.force_login(usuario)
+                    clientes[usuario.pk] = cliente
+                resultado = self._medir(escenario, clientes.get(getattr(usuario, 'pk', None)), options)
+                resultados.append(resultado)
+                self._imprimir_resultado(resultado)
+
+        reporte = {
+            'generated_at': timezone.now().isoformat(),
+            'database': descripcion_base_datos(),
+            'iterations': options['iterations'],
+            'warmup': options['warmup'],
+            'cold_cache': options['cold_cache'],
+            'results': resultados,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as archivo:
+            json.dump(reporte, archivo, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f'\n✓ Resultados guardados en {options["output"]}'))
+
+        if options['baseline']:
+            regresiones = self._comparar_baseline(resultados, options)
+            if regresiones:
+                self.stdout.write(self.style.ERROR(f'\n✗ {len(regresiones)} regresiones detectadas:'))
+                for regresion in regresiones:
+                    self.stdout.write(self.style.ERROR(f'  - {regresion}'))
+                raise CommandError('Benchmark con regresiones frente al baseline')
+            self.stdout.write(self.style.SUCCESS('✓ Sin regresiones frente al baseline'))
+
+        errores = [r['nombre'] for r in resultados if r.get('error')]
+        if errores:
+            raise CommandError(f'Escenarios con error: {", ".join(errores)}')
+
+    # ------------------------------------------------------------------
+    # Escenarios
+    # ------------------------------------------------------------------
+
+    def _construir_escenarios(self):
+        """Arma los escenarios a partir de los datos generados por seed_benchmark_data"""
+        prefijo_usuario = self.prefix.lower()
+        gerencia = CustomUser.objects.filter(username=f'{prefijo_usuario}_gerencia').first()
+        admin = CustomUser.objects.filter(username=f'{prefijo_usuario}_admin_01').select_related('contrato').first()
+        if not gerencia or not admin:
+            raise CommandError(
+                f'No se encontraron los usuarios de benchmark con prefijo "{self.prefix}". '
+                'Ejecute primero: python manage.py seed_benchmark_data'
+            )
+
+        contrato = admin.contrato
+        ultima_fecha = Turno.objects.filter(contrato=contrato).aggregate(m=Max('fecha'))['m'] or date.today()
+        inicio_mes = ultima_fecha.replace(day=1)
+        hace_30 = ultima_fecha - timedelta(days=30)
+
+        return [
+            {'nombre': 'dashboard_gerencia', 'usuario': gerencia, 'url': reverse('dashboard')},
+            {'nombre': 'dashboard_administrador', 'usuario': admin, 'url': reverse('dashboard')},
+            {'nombre': 'listar_turnos', 'usuario': gerencia, 'url': reverse('listar-turnos')},
+            {
+                'nombre': 'listar_turnos_filtrado',
+                'usuario': admin,
+                'url': reverse('listar-turnos'),
+                'params': {'fecha_desde': hace_30.isoformat(), 'fecha_hasta': ultima_fecha.isoformat(), 'page': 2},
+            },
+            {
+                'nombre': 'crear_turno_completo_post',
+                'usuario': gerencia,
+                'metodo': 'post',
+                'url': reverse('crear-turno-completo'),
+                'data': self._payload_turno(contrato, ultima_fecha + timedelta(days=1)),
+                'redirect_esperado': reverse('listar-turnos'),
+            },
+            {'nombre': 'metas_maquina_list', 'usuario': gerencia, 'url': reverse('metas-maquina-list')},
+            {
+                'nombre': 'metas_valorizacion_reporte',
+                'usuario': gerencia,
+                'url': reverse('metas-valorizacion-reporte'),
+                'params': {'contrato': contrato.pk, 'año': ultima_fecha.year, 'mes': ultima_fecha.month},
+            },
+            {
+                'nombre': 'reporte_horas_extras',
+                'usuario': gerencia,
+                'url': reverse('reporte-horas-extras'),
+                'params': {'fecha_inicio': hace_30.isoformat(), 'fecha_fin': ultima_fecha.isoformat()},
+            },
+            {
+                'nombre': 'tareo_exportar_excel',
+                'usuario': admin,
+                'url': reverse('tareo-exportar-excel'),
+                'params': {'modo': 'mes', 'fecha_inicio': inicio_mes.isoformat()},
+            },
+            {
+                'nombre': 'recalcular_horas_extras',
+                'comando': 'recalcular_horas_extras',
+                'argumentos': [f'--contrato={contrato.pk}', f'--desde={hace_30.isoformat()}'],
+            },
+        ]
+
+    def _payload_turno(self, contrato, fecha):
+        """POST equivalente al formulario de turno completo (12 horas de actividades)"""
+        maquina = Maquina.objects.filter(contrato=contrato).order_by('id').first()
+        sondaje = Sondaje.objects.filter(contrato=contrato, estado='ACTIVO').order_by('id').first()
+        trabajadores = list(
+            Trabajador.objects.filter(contrato=contrato, estado='ACTIVO').order_by('id').values_list('dni', flat=True)[1:3]
+        )
+        actividades = list(
+            TipoActividad.objects.filter(nombre__startswith=f'{self.prefix} ').order_by('id').values_list('id', flat=True)
+        )
+        broca = TipoComplemento.objects.filter(contrato=contrato).order_by('id').first()
+        aditivo = TipoAditivo.objects.filter(contrato=contrato).order_by('id').first()
+        unidad = UnidadMedida.objects.order_by('id').first()
+        tipo_turno = TipoTurno.objects.filter(nombre='DIA').first() or TipoTurno.objects.order_by('id').first()
+        if not all([maquina, sondaje, actividades, broca, aditivo, unidad, tipo_turno]):
+            raise CommandError('El dataset de benchmark está incompleto; regenere con seed_benchmark_data --flush')
+
+        horarios = [('07:00', '15:00'), ('15:00', '16:00'), ('16:00', '19:00')]
+        return {
+            'sondajes': [sondaje.pk],
+            'sondajes_metraje': ['32.50'],
+            'maquina': maquina.pk,
+            'tipo_turno': tipo_turno.pk,
+            'fecha': fecha.isoformat(),
+            'hora_inicio_maq': '1000',
+            'hora_fin_maq': '1010.5',
+            'estado_bomba': 'OPERATIVO',
+            'estado_unidad': 'OPERATIVO',
+            'estado_rotacion': 'OPERATIVO',
+            'trabajadores': json.dumps([
+                {'trabajador_id': dni, 'funcion': funcion}
+                for dni, funcion in zip(trabajadores, ['PERFORISTA', 'AYUDANTE'])
+            ]),
+            'complementos': json.dumps([{
+                'tipo_complemento_id': broca.pk, 'codigo_serie': broca.serie,
+                'metros_inicio': '0', 'metros_fin': '32.50', 'sondaje_id': sondaje.pk,
+            }]),
+            'aditivos': json.dumps([{
+                'tipo_aditivo_id': aditivo.pk, 'cantidad_usada': 5, 'unidad_medida_id': unidad.pk,
+                'sondaje_id': sondaje.pk,
+            }]),
+            'actividades': json.dumps([
+                {'actividad_id': act_id, 'hora_inicio': inicio, 'hora_fin': fin}
+                for act_id, (inicio, fin) in zip(actividades, horarios)
+            ]),
+            'corridas': json.dumps([{
+                'corrida_numero': 1, 'desde': 0, 'hasta': 32.5, 'longitud_testigo': 31,
+                'pct_recuperacion': 95, 'pct_retorno_agua': 80, 'litologia': 'Andesita',
+            }]),
+        }
+
+    # ------------------------------------------------------------------
+    # Medición
+    # ------------------------------------------------------------------
+
+    def _ejecutar(self, escenario, cliente):
+        """Ejecuta una vez el escenario; retorna (status, bytes, error)"""
+        if 'comando' in escenario:
+            salida = io.StringIO()
+            call_command(escenario['comando'], *escenario.get('argumentos', []), stdout=salida)
+            return 0, len(salida.getvalue()), None
+
+        if escenario.get('metodo') == 'post':
+            respuesta = cliente.post(escenario['url'], escenario.get('data', {}))
+        else:
+            respuesta = cliente.get(escenario['url'], escenario.get('params', {}))
+        contenido = b''.join(respuesta) if respuesta.streaming else respuesta.content
+
+        error = None
+        if respuesta.status_code >= 500:
+            error = f'HTTP {respuesta.status_code}'
+        elif escenario.get('redirect_esperado') and respuesta.get('Location') != escenario['redirect_esperado']:
+            # El POST del turno redirige al formulario cuando falla: no medir un camino de error
+            error = f'Redirección inesperada a {respuesta.get("Location")}'
+        return respuesta.status_code, len(contenido), error
+
+    def _medir(self, escenario, cliente, options):
+        tiempos = []
+        queries = []
+        status = None
+        tamano = 0
+        error = None
+        total = options['warmup'] + options['iterations']
+
+        for i in range(total):
+            if options['cold_cache']:
+                cache.clear()
+            try:
+                with transaction.atomic():
+                    with CaptureQueriesContext(connection) as capturadas:
+                        inicio = time.perf_counter()
+                        status, tamano, error_respuesta = self._ejecutar(escenario, cliente)
+                        transcurrido = (time.perf_counter() - inicio) * 1000
+                    transaction.set_rollback(True)
+            except Exception as e:
+                error = f'{type(e).__name__}: {e}'
+                break
+
+            if error_respuesta:
+                error = error_respuesta
+            if i >= options['warmup']:
+                tiempos.append(transcurrido)
+                queries.append(len(capturadas.captured_queries))
+
+        resultado = {
+            'nombre': escenario['nombre'],
+            'tipo': 'comando' if 'comando' in escenario else 'vista',
+            'status': status,
+            'bytes': tamano,
+            'error': error,
+        }
+        if tiempos:
+            ordenados = sorted(tiempos)
+            resultado.update({
+                'queries': max(queries),
+                'queries_min': min(queries),
+                'ms_min': round(ordenados[0], 2),
+                'ms_median': round(statistics.median(ordenados), 2),
+                'ms_mean': round(statistics.mean(ordenados), 2),
+                'ms_p95': round(ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))], 2),
+                'ms_max': round(ordenados[-1], 2),
+            })
+        return resultado
+
+    def _imprimir_resultado(self, resultado):
+        if resultado.get('error') and 'ms_median' not in resultado:
+            self.stdout.write(self.style.ERROR(f"  ✗ {resultado['nombre']:<32} {resultado['error']}"))
+            return
+        linea = (f"  {resultado['nombre']:<32} mediana {resultado['ms_median']:>9.2f} ms | "
+                 f"p95 {resultado['ms_p95']:>9.2f} ms | {resultado['queries']:>5} queries")
+        if resultado.get('error'):
+            self.stdout.write(self.style.ERROR(f"✗ {linea} [{resultado['error']}]"))
+        else:
+            self.stdout.write(f'✓ {linea}')
+
+    def _comparar_baseline(self, resultados, options):
+        try:
+            with open(options['baseline'], encoding='utf-8') as archivo:
+                baseline = {r['nombre']: r for r in json.load(archivo).get('results', [])}
+        except (OSError, ValueError) as e:
+            raise CommandError(f'No se pudo leer el baseline: {e}')
+
+        regresiones = []
+        for resultado in resultados:
+            anterior = baseline.get(resultado['nombre'])
+            if not anterior or 'queries' not in anterior or 'queries' not in resultado:
+                continue
+            if resultado['queries'] > anterior['queries']:
+                regresiones.append(
+                    f"{resultado['nombre']}: queries {anterior['queries']} → {resultado['queries']}"
+                )
+            limite = anterior['ms_median'] * (1 + options['tolerance'])
+            delta = resultado['ms_median'] - anterior['ms_median']
+            if resultado['ms_median'] > limite and delta > options['min_delta_ms']:
+                regresiones.append(
+                    f"{resultado['nombre']}: mediana {anterior['ms_median']} ms → {resultado['ms_median']} ms"
+                )
+        return regresiones
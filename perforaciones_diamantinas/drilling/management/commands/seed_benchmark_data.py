@@ -0,0 +1,564 @@
+"""
+Comando para generar un dataset sintético y reproducible para benchmarks.
+
+Crea N contratos con máquinas, trabajadores, sondajes y productos, y luego
+varios años de turnos completos (sondajes, trabajadores, actividades,
+complementos, aditivos, corridas, avance y horas extras), junto con asistencias,
+metas, precios unitarios, abastecimientos y consumos. Todo se inserta con
+bulk_create en lotes y con un generador aleatorio con semilla fija: la misma
+semilla y la misma fecha --hasta producen exactamente los mismos datos.
+
+Solo se ejecuta contra bases de datos locales (SQLite o Postgres en localhost),
+salvo que se indique --allow-remote explícitamente.
+
+Uso:
+    python manage.py seed_benchmark_data
+    python manage.py seed_benchmark_data --contratos=5 --dias=1095 --seed=7
+    python manage.py seed_benchmark_data --hasta=2025-06-30 --flush
+"""
+
+import random
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from drilling.models import (
+    Abastecimiento, AsistenciaTrabajador, Cargo, Cliente, ConfiguracionHoraExtra,
+    ConsumoStock, Contrato, ContratoActividad, CostoConsumoFIFO, CustomUser, HistorialBroca, Maquina,
+    MetaMaquina, PrecioUnitarioServicio, Sondaje, TipoActividad, TipoAditivo,
+    TipoComplemento, TipoTurno, Trabajador, Turno, TurnoActividad, TurnoAditivo,
+    TurnoAvance, TurnoComplemento, TurnoCorrida, TurnoHoraExtra, TurnoMaquina,
+    TurnoSondaje, TurnoTrabajador, UnidadMedida, ValorizacionTurno,
+)
+from drilling.utils.benchmark import PREFIJO_BENCHMARK, es_base_datos_local
+from drilling.utils.costeo_fifo import recalcular_costeo
+from drilling.utils.precios import invalidar_precios
+from drilling.utils.valorizacion_turnos import recalcular_valorizacion
+
+
+MESES = [
+    '', 'ENERO', 'FEBRERO', 'MARZO', 'ABRIL', 'MAYO', 'JUNIO',
+    'JULIO', 'AGOSTO', 'SEPTIEMBRE', 'OCTUBRE', 'NOVIEMBRE', 'DICIEMBRE'
+]
+
+# (estado, peso) para la distribución de asistencias diarias
+ESTADOS_ASISTENCIA = [
+    ('TRABAJADO', 70),
+    ('DIA_LIBRE', 20),
+    ('VACACIONES', 5),
+    ('DESCANSO_MEDICO', 3),
+    ('FALTA', 2),
+]
+
+# Actividades sintéticas: (sufijo, tipo_actividad, es_cobrable)
+ACTIVIDADES = [
+    ('Perforación', 'OPERATIVO', True),
+    ('Traslado de equipo', 'OTROS', False),
+    ('Stand By Cliente', 'STAND_BY_CLIENTE', False),
+    ('Mantenimiento', 'INOPERATIVO', False),
+]
+
+# Cargos reales usados por la asignación automática de grupos
+CARGOS = [
+    ('RESIDENTE', 1),
+    ('PERFORISTA DDH-I', 4),
+    ('AYUDANTE DDH-I', 4),
+    ('CONDUCTOR', 4),
+]
+
+
+def _dec(valor):
+    """Redondea un float a Decimal con 2 decimales"""
+    return Decimal(f'{valor:.2f}')
+
+
+def _horas(hora_inicio, hora_fin):
+    """Horas decimales entre dos time (cruza medianoche si corresponde)"""
+    inicio = datetime.combine(date.today(), hora_inicio)
+    fin = datetime.combine(date.today(), hora_fin)
+    if fin < inicio:
+        fin += timedelta(days=1)
+    return Decimal(str((fin - inicio).total_seconds() / 3600))
+
+
+class Command(BaseCommand):
+    help = 'Genera un dataset sintético y determinista de varios contratos para benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--contratos', type=int, default=3, help='Cantidad de contratos a generar')
+        parser.add_argument('--maquinas', type=int, default=4, help='Máquinas por contrato')
+        parser.add_argument('--trabajadores', type=int, default=30, help='Trabajadores por contrato')
+        parser.add_argument('--sondajes', type=int, default=8, help='Sondajes por contrato')
+        parser.add_argument('--brocas', type=int, default=40, help='Productos diamantados (series) por contrato')
+        parser.add_argument('--dias', type=int, default=730, help='Días de historia de turnos a generar')
+        parser.add_argument(
+            '--hasta',
+            type=str,
+            help='Última fecha generada (YYYY-MM-DD). Por defecto hoy; fijarla para datasets idénticos entre días'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Semilla del generador aleatorio')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Tamaño de lote para bulk_create')
+        parser.add_argument('--prefix', type=str, default=PREFIJO_BENCHMARK, help='Prefijo de los datos sintéticos')
+        parser.add_argument('--password', type=str, default='benchmark123', help='Contraseña de los usuarios sintéticos')
+        parser.add_argument(
+            '--flush',
+            action='store_true',
+            help='Eliminar los datos sintéticos previos con el mismo prefijo antes de generar'
+        )
+        parser.add_argument(
+            '--allow-remote',
+            action='store_true',
+            help='Permitir ejecutar contra una base de datos que no es local (NO recomendado)'
+        )
+
+    def handle(self, *args, **options):
+        if not options['allow_remote'] and not es_base_datos_local():
+            raise CommandError(
+                'La base de datos configurada no es local. Ejecute los benchmarks contra SQLite o '
+                'Postgres local, o use --allow-remote si realmente sabe lo que hace.'
+            )
+
+        if options['hasta']:
+            try:
+                self.hasta = datetime.strptime(options['hasta'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Formato de fecha inválido. Use YYYY-MM-DD')
+        else:
+            self.hasta = date.today()
+
+        if options['dias'] < 1 or options['contratos'] < 1:
+            raise CommandError('--dias y --contratos deben ser mayores a 0')
+
+        self.desde = self.hasta - timedelta(days=options['dias'] - 1)
+        self.prefix = options['prefix'].strip().upper()
+        self.batch_size = options['batch_size']
+        self.rng = random.Random(options['seed'])
+        self.options = options
+
+        existentes = Contrato.objects.filter(nombre_contrato__startswith=f'{self.prefix} ')
+        if existentes.exists():
+            if not options['flush']:
+                raise CommandError(
+                    f'Ya existen datos con prefijo "{self.prefix}". Use --flush para regenerarlos.'
+                )
+            self.stdout.write(self.style.WARNING(f'Eliminando datos previos con prefijo "{self.prefix}"...'))
+            self._eliminar_datos_previos()
+
+        self.stdout.write(f"\n{'='*60}")
+        self.stdout.write(self.style.SUCCESS('GENERACIÓN DE DATOS DE BENCHMARK'))
+        self.stdout.write(f"{'='*60}")
+        self.stdout.write(f'Período: {self.desde} → {self.hasta} ({options["dias"]} días)')
+        self.stdout.write(f'Contratos: {options["contratos"]} | Semilla: {options["seed"]}\n')
+
+        self.totales = defaultdict(int)
+        inicio = datetime.now()
+
+        with transaction.atomic():
+            self._crear_catalogos()
+            for idx in range(1, options['contratos'] + 1):
+                self._generar_contrato(idx)
+
+        duracion = (datetime.now() - inicio).total_seconds()
+
+        self.stdout.write(f"\n{'='*60}")
+        self.stdout.write(self.style.SUCCESS('RESUMEN'))
+        self.stdout.write(f"{'='*60}")
+        for modelo, total in sorted(self.totales.items()):
+            self.stdout.write(f'  {modelo}: {total}')
+        self.stdout.write(f'\nUsuarios: {self._username("gerencia")} / {self._username("admin_01")} '
+                          f'(contraseña: {options["password"]})')
+        self.stdout.write(self.style.SUCCESS(f'\n✓ Datos generados en {duracion:.1f}s'))
+
+    # ------------------------------------------------------------------
+    # Utilidades
+    # ------------------------------------------------------------------
+
+    def _username(self, sufijo):
+        return f'{self.prefix.lower()}_{sufijo}'
+
+    def _bulk(self, modelo, objetos, **kwargs):
+        """bulk_create en lotes, acumulando el total por modelo"""
+        if not objetos:
+            return objetos
+        creados = modelo.objects.bulk_create(objetos, batch_size=self.batch_size, **kwargs)
+        self.totales[modelo.__name__] += len(objetos)
+        return creados
+
+    def _obtener_o_crear(self, modelo, defaults=None, **lookup):
+        """Como get_or_create, pero tolerante a duplicados existentes en la BD"""
+        obj = modelo.objects.filter(**lookup).first()
+        if obj is None:
+            obj = modelo.objects.create(**lookup, **(defaults or {}))
+        return obj
+
+    # ------------------------------------------------------------------
+    # Catálogos compartidos
+    # ------------------------------------------------------------------
+
+    def _crear_catalogos(self):
+        self.turno_dia = self._obtener_o_crear(TipoTurno, nombre='DIA')
+        self.turno_noche = self._obtener_o_crear(TipoTurno, nombre='NOCHE')
+        self.unidad_kg = self._obtener_o_crear(UnidadMedida, nombre='Kilogramo', defaults={'simbolo': 'kg'})
+        self.unidad_und = self._obtener_o_crear(UnidadMedida, nombre='Unidad', defaults={'simbolo': 'und'})
+
+        self.actividades = []
+        for sufijo, tipo, cobrable in ACTIVIDADES:
+            self.actividades.append(self._obtener_o_crear(
+                TipoActividad,
+                nombre=f'{self.prefix} {sufijo}',
+                defaults={'tipo_actividad': tipo, 'es_cobrable': cobrable}
+            ))
+        self.servicio = self.actividades[0]
+
+        self.cargos = {}
+        siguiente_id = (Cargo.objects.order_by('-id_cargo').values_list('id_cargo', flat=True).first() or 0) + 1
+        for nombre, nivel in CARGOS:
+            cargo = Cargo.objects.filter(nombre=nombre).first()
+            if cargo is None:
+                cargo = Cargo.objects.create(id_cargo=siguiente_id, nombre=nombre, nivel_jerarquico=nivel)
+                siguiente_id += 1
+            self.cargos[nombre] = cargo
+
+        self.cliente = Cliente.objects.create(nombre=f'{self.prefix} Cliente')
+        self.password_hash = make_password(self.options['password'])
+
+        if not CustomUser.objects.filter(username=self._username('gerencia')).exists():
+            self._bulk(CustomUser, [CustomUser(
+                username=self._username('gerencia'),
+                password=self.password_hash,
+                first_name='Gerencia',
+                last_name=self.prefix,
+                role='GERENCIA',
+                is_system_admin=True,
+                is_staff=True,
+                is_superuser=True,
+                is_account_active=True,
+            )])
+
+    # ------------------------------------------------------------------
+    # Generación por contrato
+    # ------------------------------------------------------------------
+
+    def _generar_contrato(self, idx):
+        rng = self.rng
+        opts = self.options
+        contrato = Contrato.objects.create(
+            cliente=self.cliente,
+            nombre_contrato=f'{self.prefix} Contrato {idx:02d}',
+            codigo_centro_costo=f'9{idx:05d}',
+            duracion_turno=12,
+            estado='ACTIVO',
+        )
+        self.totales['Contrato'] += 1
+        self.stdout.write(f'\nContrato {contrato.nombre_contrato}')
+
+        # La tabla legacy contratos_actividades no existe en BDs creadas desde cero
+        # (modelo managed=False); usar savepoint para no romper la transacción
+        try:
+            with transaction.atomic():
+                self._bulk(ContratoActividad, [
+                    ContratoActividad(contrato=contrato, tipoactividad=act) for act in self.actividades
+                ], ignore_conflicts=True)
+        except Exception:
+            self.stdout.write(self.style.WARNING('  ⚠️  Tabla contratos_actividades no disponible, se omite'))
+
+        admin, residente = self._bulk(CustomUser, [
+            CustomUser(
+                username=self._username(f'{sufijo}_{idx:02d}'), password=self.password_hash,
+                first_name=rol.capitalize(), last_name=f'{self.prefix} {idx:02d}',
+                role=rol, contrato=contrato, is_staff=(rol == 'ADMINISTRADOR'), is_account_active=True,
+            ) for rol, sufijo in (('ADMINISTRADOR', 'admin'), ('RESIDENTE', 'residente'))
+        ])
+
+        maquinas = self._bulk(Maquina, [
+            Maquina(
+                contrato=contrato, nombre=f'{self.prefix}-M{idx:02d}{m:02d}', tipo='DIAMANTINA',
+                horometro=_dec(rng.uniform(1000, 5000)), estado='OPERATIVO',
+            ) for m in range(1, opts['maquinas'] + 1)
+        ])
+
+        sondajes = self._bulk(Sondaje, [
+            Sondaje(
+                contrato=contrato, nombre_sondaje=f'{self.prefix}-DDH-{idx:02d}-{s:03d}',
+                fecha_inicio=self.desde, profundidad=_dec(rng.uniform(300, 1500)),
+                inclinacion=_dec(rng.uniform(-90, -55)), cota_collar=_dec(rng.uniform(3500, 4500)),
+                estado='ACTIVO' if s <= max(1, opts['sondajes'] - 2) else 'FINALIZADO',
+            ) for s in range(1, opts['sondajes'] + 1)
+        ])
+
+        trabajadores = []
+        for w in range(1, opts['trabajadores'] + 1):
+            if w == 1:
+                cargo = self.cargos['RESIDENTE']
+            elif w % 10 == 0:
+                cargo = self.cargos['CONDUCTOR']
+            elif w % 2 == 0:
+                cargo = self.cargos['PERFORISTA DDH-I']
+            else:
+                cargo = self.cargos['AYUDANTE DDH-I']
+            trabajador = Trabajador(
+                contrato=contrato, nombres=f'Trabajador {w:03d}', apellidos=f'{self.prefix} {idx:02d}',
+                cargo=cargo, dni=f'{self.prefix[:4]}{idx:02d}{w:05d}', fecha_ingreso=self.desde,
+                guardia_asignada='ABC'[w % 3], maquina_asignada=maquinas[w % len(maquinas)],
+            )
+            trabajador.grupo = trabajador.asignar_grupo_automatico()
+            trabajadores.append(trabajador)
+        trabajadores = self._bulk(Trabajador, trabajadores)
+        perforistas = [t for t in trabajadores if t.cargo_id == self.cargos['PERFORISTA DDH-I'].pk]
+        ayudantes = [t for t in trabajadores if t.cargo_id == self.cargos['AYUDANTE DDH-I'].pk]
+        if not perforistas or not ayudantes:
+            raise CommandError('Se requieren al menos 3 trabajadores por contrato')
+
+        brocas = self._bulk(TipoComplemento, [
+            TipoComplemento(
+                nombre=f'Broca HQ {self.prefix} {b:04d}', categoria='BROCA', codigo=f'PDD{idx:02d}{b:04d}',
+                serie=f'{self.prefix}-{idx:02d}-B{b:04d}', contrato=contrato,
+                estado='EN_USO' if b % 4 else 'NUEVO',
+            ) for b in range(1, opts['brocas'] + 1)
+        ])
+        aditivos = self._bulk(TipoAditivo, [
+            TipoAditivo(
+                nombre=f'{nombre} {self.prefix}', categoria=categoria, codigo=f'ADIT{idx:02d}{a:02d}',
+                unidad_medida_default=self.unidad_kg, contrato=contrato,
+            ) for a, (nombre, categoria) in enumerate(
+                [('Bentonita', 'BENTONITA'), ('Polímero', 'POLIMEROS'), ('CMC', 'CMC'), ('Soda Ash', 'SODA_ASH')], 1
+            )
+        ])
+
+        config_he = ConfiguracionHoraExtra.objects.create(
+            contrato=contrato, metros_minimos=Decimal('20.00'), horas_extra=Decimal('1.00'),
+            observaciones='Configuración sintética de benchmark',
+        )
+        self._bulk(PrecioUnitarioServicio, [PrecioUnitarioServicio(
+            contrato=contrato, servicio=self.servicio, precio_unitario=_dec(rng.uniform(80, 120)),
+            moneda='USD', fecha_inicio_vigencia=self.desde, created_by=admin,
+        )])
+        # bulk_create no pasa por PrecioUnitarioServicio.save
+        invalidar_precios()
+
+        estado = {
+            'profundidad': {s.pk: Decimal('0') for s in sondajes},
+            'horometro': {m.pk: m.horometro for m in maquinas},
+            'brocas': defaultdict(lambda: {'metros': Decimal('0'), 'usos': 0, 'primero': None, 'ultimo': None}),
+        }
+        sondajes_activos = [s for s in sondajes if s.estado == 'ACTIVO']
+
+        # Procesar por mes calendario para acotar la memoria usada
+        cursor = self.desde
+        while cursor <= self.hasta:
+            fin_bloque = min(self._fin_de_mes(cursor), self.hasta)
+            abast_aditivos = self._generar_abastecimientos(contrato, cursor, brocas, aditivos)
+            self._generar_turnos(
+                contrato, cursor, fin_bloque, maquinas, sondajes_activos, perforistas, ayudantes,
+                brocas, aditivos, abast_aditivos, config_he, estado,
+            )
+            self._generar_asistencias(trabajadores, cursor, fin_bloque, admin)
+            cursor = fin_bloque + timedelta(days=1)
+
+        self._generar_metas(contrato, maquinas, admin)
+        recalcular_valorizacion(contratos=[contrato.pk])
+        recalcular_costeo(contratos=[contrato.pk])
+
+        self._bulk(HistorialBroca, [
+            HistorialBroca(
+                serie=serie, tipo_complemento_id=datos['tipo_complemento_id'], contrato_actual=contrato,
+                metraje_acumulado=datos['metros'], numero_usos=datos['usos'],
+                estado='EN_USO', fecha_primer_uso=datos['primero'], fecha_ultimo_uso=datos['ultimo'],
+            ) for serie, datos in estado['brocas'].items()
+        ])
+
+        for maquina in maquinas:
+            maquina.horometro = estado['horometro'][maquina.pk]
+        Maquina.objects.bulk_update(maquinas, ['horometro'])
+
+        self.stdout.write(self.style.SUCCESS(f'  ✓ {self.totales["Turno"]} turnos acumulados'))
+
+    @staticmethod
+    def _fin_de_mes(fecha):
+        siguiente = (fecha.replace(day=1) + timedelta(days=32)).replace(day=1)
+        return siguiente - timedelta(days=1)
+
+    def _generar_abastecimientos(self, contrato, inicio_mes, brocas, aditivos):
+        """Abastecimientos mensuales: aditivos (para consumos) y algunas brocas"""
+        rng = self.rng
+        mes = MESES[inicio_mes.month]
+        objetos = []
+        for aditivo in aditivos:
+            cantidad = _dec(rng.uniform(200, 600))
+            precio = _dec(rng.uniform(15, 60))
+            objetos.append(Abastecimiento(
+                mes=mes, fecha=inicio_mes, contrato=contrato, codigo_producto=aditivo.codigo,
+                descripcion=aditivo.nombre, familia='ADITIVOS_PERFORACION', unidad_medida=self.unidad_kg,
+                cantidad=cantidad, precio_unitario=precio, total=cantidad * precio, tipo_aditivo=aditivo,
+            ))
+        for broca in rng.sample(brocas, min(3, len(brocas))):
+            precio = _dec(rng.uniform(800, 1500))
+            objetos.append(Abastecimiento(
+                mes=mes, fecha=inicio_mes, contrato=contrato, codigo_producto=broca.codigo,
+                descripcion=broca.nombre, familia='PRODUCTOS_DIAMANTADOS', serie=broca.serie,
+                unidad_medida=self.unidad_und, cantidad=Decimal('1.00'), precio_unitario=precio,
+                total=precio, tipo_complemento=broca,
+            ))
+        creados = self._bulk(Abastecimiento, objetos)
+        return [a for a in creados if a.familia == 'ADITIVOS_PERFORACION']
+
+    def _generar_turnos(self, contrato, desde, hasta, maquinas, sondajes, perforistas, ayudantes,
+                        brocas, aditivos, abast_aditivos, config_he, estado):
+        rng = self.rng
+        limite_aprobacion = self.hasta - timedelta(days=30)
+        horarios = {
+            self.turno_dia.pk: [(time(7, 0), time(15, 0)), (time(15, 0), time(16, 0)), (time(16, 0), time(19, 0))],
+            self.turno_noche.pk: [(time(19, 0), time(3, 0)), (time(3, 0), time(4, 0)), (time(4, 0), time(7, 0))],
+        }
+
+        turnos = []
+        dia = desde
+        while dia <= hasta:
+            for maquina in maquinas:
+                for tipo_turno in (self.turno_dia, self.turno_noche):
+                    if dia < limite_aprobacion:
+                        estado_turno = 'APROBADO'
+                    else:
+                        estado_turno = 'BORRADOR' if rng.random() < 0.1 else 'COMPLETADO'
+                    turnos.append(Turno(
+                        contrato=contrato, maquina=maquina, tipo_turno=tipo_turno, fecha=dia, estado=estado_turno,
+                    ))
+            dia += timedelta(days=1)
+        turnos = self._bulk(Turno, turnos)
+
+        hijos = defaultdict(list)
+        for turno in turnos:
+            sondaje = rng.choice(sondajes)
+            metros = _dec(rng.uniform(4, 45))
+            inicio_prof = estado['profundidad'][sondaje.pk]
+            estado['profundidad'][sondaje.pk] = inicio_prof + metros
+
+            hijos[TurnoSondaje].append(TurnoSondaje(turno=turno, sondaje=sondaje, metros_turno=metros))
+            hijos[TurnoAvance].append(TurnoAvance(turno=turno, metros_perforados=metros))
+
+            cuadrilla = [(rng.choice(perforistas), 'PERFORISTA'), (rng.choice(ayudantes), 'AYUDANTE')]
+            for trabajador, funcion in cuadrilla:
+                hijos[TurnoTrabajador].append(TurnoTrabajador(turno=turno, trabajador=trabajador, funcion=funcion))
+                if metros > config_he.metros_minimos:
+                    hijos[TurnoHoraExtra].append(TurnoHoraExtra(
+                        turno=turno, trabajador=trabajador, horas_extra=config_he.horas_extra,
+                        metros_turno=metros, configuracion_aplicada=config_he,
+                    ))
+
+            for actividad, (hora_inicio, hora_fin) in zip(self.actividades, horarios[turno.tipo_turno_id]):
+                hijos[TurnoActividad].append(TurnoActividad(
+                    turno=turno, actividad=actividad, hora_inicio=hora_inicio, hora_fin=hora_fin,
+                    tiempo_calc=_horas(hora_inicio, hora_fin),
+                ))
+
+            horometro_inicio = estado['horometro'][turno.maquina_id]
+            horas_maquina = _dec(rng.uniform(8, 11.5))
+            estado['horometro'][turno.maquina_id] = horometro_inicio + horas_maquina
+            hijos[TurnoMaquina].append(TurnoMaquina(
+                turno=turno, horometro_inicio=horometro_inicio, horometro_fin=horometro_inicio + horas_maquina,
+                horas_trabajadas_calc=horas_maquina, estado_bomba='OPERATIVO', estado_unidad='OPERATIVO',
+                estado_rotacion='OPERATIVO',
+            ))
+
+            broca = rng.choice(brocas)
+            hijos[TurnoComplemento].append(TurnoComplemento(
+                turno=turno, sondaje=sondaje, tipo_complemento=broca, codigo_serie=broca.serie,
+                metros_inicio=inicio_prof, metros_fin=inicio_prof + metros, metros_turno_calc=metros,
+            ))
+            uso = estado['brocas'][broca.serie]
+            uso['tipo_complemento_id'] = broca.pk
+            uso['metros'] += metros
+            uso['usos'] += 1
+            uso['primero'] = uso['primero'] or turno.fecha
+            uso['ultimo'] = turno.fecha
+
+            aditivo_idx = rng.randrange(len(aditivos))
+            cantidad = _dec(rng.uniform(1, 12))
+            hijos[TurnoAditivo].append(TurnoAditivo(
+                turno=turno, sondaje=sondaje, tipo_aditivo=aditivos[aditivo_idx], cantidad_usada=cantidad,
+                unidad_medida=self.unidad_kg,
+            ))
+            hijos[ConsumoStock].append(ConsumoStock(
+                turno=turno, abastecimiento=abast_aditivos[aditivo_idx], cantidad_consumida=cantidad,
+            ))
+
+            recuperacion = _dec(rng.uniform(85, 100))
+            hijos[TurnoCorrida].append(TurnoCorrida(
+                turno=turno, corrida_numero=1, desde=inicio_prof, hasta=inicio_prof + metros,
+                total_calc=metros, longitud_testigo=metros * recuperacion / 100, pct_recuperacion=recuperacion,
+                pct_retorno_agua=_dec(rng.uniform(40, 100)), litologia=rng.choice(['Andesita', 'Diorita', 'Brecha']),
+            ))
+
+        for modelo, objetos in hijos.items():
+            self._bulk(modelo, objetos)
+
+    def _generar_asistencias(self, trabajadores, desde, hasta, registrado_por):
+        rng = self.rng
+        estados = [e for e, _ in ESTADOS_ASISTENCIA]
+        pesos = [p for _, p in ESTADOS_ASISTENCIA]
+        asistencias = []
+        dia = desde
+        while dia <= hasta:
+            for trabajador in trabajadores:
+                estado_asistencia = rng.choices(estados, weights=pesos)[0]
+                asistencias.append(AsistenciaTrabajador(
+                    trabajador=trabajador, fecha=dia, estado=estado_asistencia,
+                    tipo='PAGABLE' if estado_asistencia in AsistenciaTrabajador.ESTADOS_PAGABLES else 'NO_PAGABLE',
+                    registrado_por=registrado_por,
+                ))
+            dia += timedelta(days=1)
+        self._bulk(AsistenciaTrabajador, asistencias)
+
+    def _generar_metas(self, contrato, maquinas, creado_por):
+        """Una meta por máquina y mes operativo (26-25) que cae dentro del rango"""
+        rng = self.rng
+        metas = []
+        # El mes operativo M va del 26 de M-1 al 25 de M
+        referencia = self.desde + timedelta(days=6)
+        año, mes = referencia.year, referencia.month
+        while date(año, mes, 25) <= self.hasta + timedelta(days=31):
+            if año >= 2020:
+                for maquina in maquinas:
+                    metas.append(MetaMaquina(
+                        contrato=contrato, maquina=maquina, servicio=self.servicio, año=año, mes=mes,
+                        meta_metros=_dec(rng.uniform(900, 1400)), created_by=creado_por,
+                    ))
+            mes += 1
+            if mes > 12:
+                año, mes = año + 1, 1
+        self._bulk(MetaMaquina, metas)
+
+    # ------------------------------------------------------------------
+    # Limpieza
+    # ------------------------------------------------------------------
+
+    def _eliminar_datos_previos(self):
+        """Elimina los datos sintéticos del prefijo respetando las FK PROTECT"""
+        contratos = Contrato.objects.filter(nombre_contrato__startswith=f'{self.prefix} ')
+        ids = list(contratos.values_list('id', flat=True))
+        with transaction.atomic():
+            ConsumoStock.objects.filter(turno__contrato_id__in=ids).delete()
+            Turno.objects.filter(contrato_id__in=ids).delete()
+            ValorizacionTurno.objects.filter(contrato_id__in=ids).delete()
+            CostoConsumoFIFO.objects.filter(contrato_id__in=ids).delete()
+            Abastecimiento.objects.filter(contrato_id__in=ids).delete()
+            HistorialBroca.objects.filter(contrato_actual_id__in=ids).delete()
+            MetaMaquina.objects.filter(contrato_id__in=ids).delete()
+            PrecioUnitarioServicio.objects.filter(contrato_id__in=ids).delete()
+            invalidar_precios()
+            AsistenciaTrabajador.objects.filter(trabajador__contrato_id__in=ids).delete()
+            ConfiguracionHoraExtra.objects.filter(contrato_id__in=ids).delete()
+            TipoComplemento.objects.filter(contrato_id__in=ids).delete()
+            TipoAditivo.objects.filter(contrato_id__in=ids).delete()
+            Trabajador.objects.filter(contrato_id__in=ids).delete()
+            Sondaje.objects.filter(contrato_id__in=ids).delete()
+            Maquina.objects.filter(contrato_id__in=ids).delete()
+            ContratoActividad.objects.filter(contrato_id__in=ids).delete()
+            CustomUser.objects.filter(username__startswith=f'{self.prefix.lower()}_').delete()
+            contratos.delete()
+            Cliente.objects.filter(nombre=f'{self.prefix} Cliente').delete()
+            TipoActividad.objects.filter(nombre__startswith=f'{self.prefix} ').delete()
@@ -3,6 +3,9 @@ Comando para sincronizar aditivos de perforación (ADIT) desde la API de Vilbrag
 
 Este comando obtiene todos los aditivos del centro de costo especificado
 y los sincroniza con el modelo TipoAditivo en la base de datos local.
+La respuesta de la API se lee en streaming y se procesa por lotes (cada lote
+se compara con la BD y se escribe en su propia transacción), así la memoria
+no crece con el tamaño del catálogo.
 
 Uso:
     python manage.py sync_aditivos --contrato-id=1
@@ -12,8 +15,9 @@ Uso:
 
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
-from drilling.api_client import get_api_client
+from drilling.api_client import ErrorAPI, get_api_client
 from drilling.models import TipoAditivo, Contrato
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
@@ -44,6 +48,12 @@ class Command(BaseCommand):
             action='store_true',
             help='Muestra información detallada de cada aditivo sincronizado'
         )
+        parser.add_argument(
+            '--tamano-lote',
+            type=int,
+            default=500,
+            help='Aditivos por lote al leer la API (default: 500)'
+        )
 
     def handle(self, *args, **options):
         contrato_id = options['contrato_id']
@@ -74,20 +84,9 @@ class Command(BaseCommand):
         if dry_run:
             self.stdout.write(self.style.WARNING('MODO DRY-RUN: No se harán cambios en la base de datos\n'))
 
-        # Obtener aditivos desde la API
+        # Obtener aditivos desde la API y procesarlos por lotes a medida que llegan
         self.stdout.write('\nObteniendo aditivos desde la API...')
         api_client = get_api_client()
-        
-        try:
-            aditivos = api_client.obtener_aditivos(centro_costo)
-        except Exception as e:
-            raise CommandError(f'Error al obtener aditivos de la API: {str(e)}')
-
-        if not aditivos:
-            self.stdout.write(self.style.WARNING('No se encontraron aditivos en la API'))
-            return
-
-        self.stdout.write(self.style.SUCCESS(f'Se obtuvieron {len(aditivos)} aditivos de la API\n'))
 
         # Contadores
         creados = 0
@@ -95,120 +94,32 @@ class Command(BaseCommand):
         sin_cambios = 0
         errores = 0
         procesados = 0
-        total = len(aditivos)
-
-        # Pre-cargar códigos existentes para optimizar
-        self.stdout.write('Cargando aditivos existentes...')
-        codigos_existentes = set(
-            TipoAditivo.objects.filter(
-                contrato=contrato,
-                codigo__isnull=False
-            ).values_list('codigo', flat=True)
-        )
-        self.stdout.write(f'  {len(codigos_existentes)} aditivos encontrados en BD\n')
 
-        # Procesar cada aditivo
         self.stdout.write(f'{"─"*70}')
         self.stdout.write('Procesando aditivos...\n')
 
-        # Listas para bulk operations
-        aditivos_a_crear = []
-        aditivos_a_actualizar = []
-
-        for aditivo in aditivos:
-            procesados += 1
-            codigo = aditivo.get('codigo', '') or ''
-            descripcion = aditivo.get('descripcion', '') or ''
-            
-            # Strip solo si es string
-            if isinstance(codigo, str):
-                codigo = codigo.strip()
-            if isinstance(descripcion, str):
-                descripcion = descripcion.strip()
-            
-            # Mostrar progreso cada 5 aditivos
-            if procesados % 5 == 0 or procesados == total:
-                self.stdout.write(f'  Progreso: {procesados}/{total} aditivos procesados...')
-
-            # Validar descripción es requerida, código es opcional
-            if not descripcion:
-                if verbose:
-                    self.stdout.write(self.style.WARNING(f'  ⚠ Aditivo sin descripción omitido'))
-                errores += 1
-                continue
-            
-            # Si no hay código, generar uno basado en descripción
-            if not codigo:
-                # Generar código único basado en descripción (primeros 20 caracteres + hash)
-                import hashlib
-                codigo = f"ADIT_{hashlib.md5(descripcion.encode()).hexdigest()[:8].upper()}"
-
-            try:
-                if dry_run:
-                    # En modo dry-run, solo verificar si existe
-                    if codigo in codigos_existentes:
-                        sin_cambios += 1
-                    else:
-                        creados += 1
-                else:
-                    # Preparar para bulk operation
-                    if codigo in codigos_existentes:
-                        # Aditivo existe, agregar a lista de actualización
-                        aditivos_a_actualizar.append({
-                            'codigo': codigo,
-                            'nombre': descripcion,
-                            'contrato': contrato
-                        })
-                    else:
-                        # Aditivo nuevo, agregar a lista de creación
-                        aditivos_a_crear.append(TipoAditivo(
-                            codigo=codigo,
-                            nombre=descripcion,
-                            contrato=contrato
-                        ))
-
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'  ✗ Error en código {codigo}: {str(e)}')
+        try:
+            for lote in api_client.iterar_articulos_almacen('ADIT', centro_costo, options['tamano_lote']):
+                lote_creados, lote_actualizados, lote_sin_cambios, lote_errores = self._procesar_lote(
+                    lote, contrato, dry_run, verbose
                 )
-                errores += 1
-                logger.exception(f'Error sincronizando aditivo con código {codigo}')
+                creados += lote_creados
+                actualizados += lote_actualizados
+                sin_cambios += lote_sin_cambios
+                errores += lote_errores
+                procesados += len(lote)
+                self.stdout.write(f'  Progreso: {procesados} aditivos procesados...')
+        except ErrorAPI as e:
+            raise CommandError(f'Error al obtener aditivos de la API: {str(e)}')
 
-        # Ejecutar bulk operations
-        if not dry_run:
-            with transaction.atomic():
-                # Bulk create
-                if aditivos_a_crear:
-                    self.stdout.write(f'\n  Creando {len(aditivos_a_crear)} aditivos nuevos...')
-                    TipoAditivo.objects.bulk_create(aditivos_a_crear, ignore_conflicts=True)
-                    creados = len(aditivos_a_crear)
-                    if verbose:
-                        self.stdout.write(self.style.SUCCESS(f'  ✓ {creados} aditivos creados'))
-
-                # Bulk update
-                if aditivos_a_actualizar:
-                    self.stdout.write(f'\n  Actualizando {len(aditivos_a_actualizar)} aditivos existentes...')
-                    for adit_data in aditivos_a_actualizar:
-                        try:
-                            TipoAditivo.objects.filter(
-                                codigo=adit_data['codigo'],
-                                contrato=adit_data['contrato']
-                            ).update(nombre=adit_data['nombre'])
-                            actualizados += 1
-                        except Exception as e:
-                            errores += 1
-                            if verbose:
-                                self.stdout.write(self.style.ERROR(f'  ✗ Error actualizando {adit_data["codigo"]}: {e}'))
-                    
-                    if verbose:
-                        self.stdout.write(self.style.WARNING(f'  ↻ {actualizados} aditivos actualizados'))
-                
-                sin_cambios = total - creados - actualizados - errores
+        if not procesados:
+            self.stdout.write(self.style.WARNING('No se encontraron aditivos en la API'))
+            return
 
         # Resumen final
         self.stdout.write(f'\n{"─"*70}')
         self.stdout.write(self.style.SUCCESS('\nRESUMEN DE SINCRONIZACIÓN:'))
-        self.stdout.write(f'  Total aditivos en API: {len(aditivos)}')
+        self.stdout.write(f'  Total aditivos en API: {procesados}')
         self.stdout.write(self.style.SUCCESS(f'  ✓ Creados: {creados}'))
         self.stdout.write(self.style.WARNING(f'  ↻ Actualizados: {actualizados}'))
         self.stdout.write(f'  • Sin cambios: {sin_cambios}')
@@ -225,3 +136,62 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.SUCCESS('Sincronización completada exitosamente.')
             )
+
+    def _procesar_lote(self, lote, contrato, dry_run, verbose):
+        """
+        Compara un lote de aditivos de la API con la BD y crea o actualiza.
+
+        Returns:
+            (creados, actualizados, sin_cambios, errores)
+        """
+        nombres = {}
+        errores = 0
+        for aditivo in lote:
+            codigo = aditivo.get('codigo', '') or ''
+            descripcion = aditivo.get('descripcion', '') or ''
+
+            # Strip solo si es string
+            if isinstance(codigo, str):
+                codigo = codigo.strip()
+            if isinstance(descripcion, str):
+                descripcion = descripcion.strip()
+
+            # Validar descripción es requerida, código es opcional
+            if not descripcion:
+                if verbose:
+                    self.stdout.write(self.style.WARNING(f'  ⚠ Aditivo sin descripción omitido'))
+                errores += 1
+                continue
+
+            # Si no hay código, generar uno basado en descripción
+            if not codigo:
+                codigo = f"ADIT_{hashlib.md5(descripcion.encode()).hexdigest()[:8].upper()}"
+            nombres[codigo] = descripcion
+
+        # Solo los aditivos del lote, no todo el catálogo del contrato
+        existentes = {}
+        for tipo in TipoAditivo.objects.filter(contrato=contrato, codigo__in=list(nombres)):
+            existentes.setdefault(tipo.codigo, []).append(tipo)
+
+        aditivos_a_crear = [
+            TipoAditivo(codigo=codigo, nombre=nombre, contrato=contrato)
+            for codigo, nombre in nombres.items() if codigo not in existentes
+        ]
+        aditivos_a_actualizar = []
+        for codigo, tipos in existentes.items():
+            for tipo in tipos:
+                if tipo.nombre != nombres[codigo]:
+                    tipo.nombre = nombres[codigo]
+                    aditivos_a_actualizar.append(tipo)
+        actualizados = len({tipo.codigo for tipo in aditivos_a_actualizar})
+
+        if not dry_run:
+            with transaction.atomic():
+                TipoAditivo.objects.bulk_create(aditivos_a_crear, ignore_conflicts=True)
+                TipoAditivo.objects.bulk_update(aditivos_a_actualizar, ['nombre'])
+        if verbose:
+            for tipo in aditivos_a_crear:
+                self.stdout.write(self.style.SUCCESS(f'  ✓ {tipo.codigo}: {tipo.nombre}'))
+            for tipo in aditivos_a_actualizar:
+                self.stdout.write(self.style.WARNING(f'  ↻ {tipo.codigo}: {tipo.nombre}'))
+        return len(aditivos_a_crear), actualizados, len(existentes) - actualizados, errores
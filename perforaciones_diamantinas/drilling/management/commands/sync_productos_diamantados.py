@@ -3,6 +3,9 @@ Comando para sincronizar productos diamantados (PDD) desde la API de Vilbragroup
 
 Este comando obtiene todos los productos diamantados del centro de costo especificado
 y los sincroniza con el modelo TipoComplemento en la base de datos local.
+La respuesta de la API se lee en streaming y se procesa por lotes (cada lote
+se compara con la BD y se escribe en su propia transacción), así la memoria
+no crece con el tamaño del catálogo.
 
 Uso:
     python manage.py sync_productos_diamantados --contrato-id=1
@@ -12,7 +15,7 @@ Uso:
 
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
-from drilling.api_client import get_api_client
+from drilling.api_client import ErrorAPI, get_api_client
 from drilling.models import TipoComplemento, Contrato
 import logging
 
@@ -44,6 +47,12 @@ class Command(BaseCommand):
             action='store_true',
             help='Muestra información detallada de cada producto sincronizado'
         )
+        parser.add_argument(
+            '--tamano-lote',
+            type=int,
+            default=500,
+            help='Productos por lote al leer la API (default: 500)'
+        )
 
     def handle(self, *args, **options):
         contrato_id = options['contrato_id']
@@ -74,20 +83,9 @@ class Command(BaseCommand):
         if dry_run:
             self.stdout.write(self.style.WARNING('MODO DRY-RUN: No se harán cambios en la base de datos\n'))
 
-        # Obtener productos desde la API
+        # Obtener productos desde la API y procesarlos por lotes a medida que llegan
         self.stdout.write('\nObteniendo productos diamantados desde la API...')
         api_client = get_api_client()
-        
-        try:
-            productos = api_client.obtener_productos_diamantados(centro_costo)
-        except Exception as e:
-            raise CommandError(f'Error al obtener productos de la API: {str(e)}')
-
-        if not productos:
-            self.stdout.write(self.style.WARNING('No se encontraron productos diamantados en la API'))
-            return
-
-        self.stdout.write(self.style.SUCCESS(f'Se obtuvieron {len(productos)} productos de la API\n'))
 
         # Contadores
         creados = 0
@@ -95,120 +93,32 @@ class Command(BaseCommand):
         sin_cambios = 0
         errores = 0
         procesados = 0
-        total = len(productos)
-
-        # Pre-cargar series existentes para optimizar
-        self.stdout.write('Cargando productos existentes...')
-        series_existentes = set(
-            TipoComplemento.objects.filter(serie__isnull=False)
-            .values_list('serie', flat=True)
-        )
-        self.stdout.write(f'  {len(series_existentes)} productos encontrados en BD\n')
 
-        # Procesar cada producto
         self.stdout.write(f'{"─"*70}')
         self.stdout.write('Procesando productos...\n')
 
-        # Listas para bulk operations
-        productos_a_crear = []
-        productos_a_actualizar = []
-
-        for producto in productos:
-            procesados += 1
-            codigo = producto.get('codigo', '') or ''
-            serie = producto.get('serie', '') or ''
-            descripcion = producto.get('descripcion', '') or ''
-            
-            # Strip solo si es string
-            if isinstance(codigo, str):
-                codigo = codigo.strip()
-            if isinstance(serie, str):
-                serie = serie.strip()
-            if isinstance(descripcion, str):
-                descripcion = descripcion.strip()
-            
-            # Mostrar progreso cada 50 productos
-            if procesados % 50 == 0 or procesados == total:
-                self.stdout.write(f'  Progreso: {procesados}/{total} productos procesados...')
-
-            # Validar datos mínimos requeridos
-            if not serie:
-                errores += 1
-                continue
-
-            if not codigo:
-                errores += 1
-                continue
-
-            try:
-                if dry_run:
-                    # En modo dry-run, solo verificar si existe
-                    if serie in series_existentes:
-                        sin_cambios += 1
-                    else:
-                        creados += 1
-                else:
-                    # Preparar para bulk operation
-                    if serie in series_existentes:
-                        # Producto existe, agregar a lista de actualización
-                        productos_a_actualizar.append({
-                            'serie': serie,
-                            'nombre': descripcion or f'Producto {codigo}',
-                            'codigo': codigo,
-                            'contrato': contrato
-                        })
-                    else:
-                        # Producto nuevo, agregar a lista de creación
-                        productos_a_crear.append(TipoComplemento(
-                            serie=serie,
-                            nombre=descripcion or f'Producto {codigo}',
-                            codigo=codigo,
-                            contrato=contrato,
-                            estado='NUEVO'
-                        ))
-
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'  ✗ Error en serie {serie}: {str(e)}')
+        try:
+            for lote in api_client.iterar_articulos_almacen('PDD', centro_costo, options['tamano_lote']):
+                lote_creados, lote_actualizados, lote_sin_cambios, lote_errores = self._procesar_lote(
+                    lote, contrato, dry_run, verbose
                 )
-                errores += 1
-                logger.exception(f'Error sincronizando producto con serie {serie}')
+                creados += lote_creados
+                actualizados += lote_actualizados
+                sin_cambios += lote_sin_cambios
+                errores += lote_errores
+                procesados += len(lote)
+                self.stdout.write(f'  Progreso: {procesados} productos procesados...')
+        except ErrorAPI as e:
+            raise CommandError(f'Error al obtener productos de la API: {str(e)}')
 
-        # Ejecutar bulk operations
-        if not dry_run:
-            with transaction.atomic():
-                # Bulk create
-                if productos_a_crear:
-                    self.stdout.write(f'\n  Creando {len(productos_a_crear)} productos nuevos...')
-                    TipoComplemento.objects.bulk_create(productos_a_crear, ignore_conflicts=True)
-                    creados = len(productos_a_crear)
-                    if verbose:
-                        self.stdout.write(self.style.SUCCESS(f'  ✓ {creados} productos creados'))
-
-                # Bulk update
-                if productos_a_actualizar:
-                    self.stdout.write(f'\n  Actualizando {len(productos_a_actualizar)} productos existentes...')
-                    for prod_data in productos_a_actualizar:
-                        try:
-                            TipoComplemento.objects.filter(serie=prod_data['serie']).update(
-                                nombre=prod_data['nombre'],
-                                codigo=prod_data['codigo']
-                            )
-                            actualizados += 1
-                        except Exception as e:
-                            errores += 1
-                            if verbose:
-                                self.stdout.write(self.style.ERROR(f'  ✗ Error actualizando {prod_data["serie"]}: {e}'))
-                    
-                    if verbose:
-                        self.stdout.write(self.style.WARNING(f'  ↻ {actualizados} productos actualizados'))
-                
-                sin_cambios = total - creados - actualizados - errores
+        if not procesados:
+            self.stdout.write(self.style.WARNING('No se encontraron productos diamantados en la API'))
+            return
 
         # Resumen final
         self.stdout.write(f'\n{"─"*70}')
         self.stdout.write(self.style.SUCCESS('\nRESUMEN DE SINCRONIZACIÓN:'))
-        self.stdout.write(f'  Total productos en API: {len(productos)}')
+        self.stdout.write(f'  Total productos en API: {procesados}')
         self.stdout.write(self.style.SUCCESS(f'  ✓ Creados: {creados}'))
         self.stdout.write(self.style.WARNING(f'  ↻ Actualizados: {actualizados}'))
         self.stdout.write(f'  • Sin cambios: {sin_cambios}')
@@ -225,3 +135,60 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.SUCCESS('Sincronización completada exitosamente.')
             )
+
+    def _procesar_lote(self, lote, contrato, dry_run, verbose):
+        """
+        Compara un lote de productos de la API con la BD y crea o actualiza.
+
+        Returns:
+            (creados, actualizados, sin_cambios, errores)
+        """
+        datos = {}
+        errores = 0
+        for producto in lote:
+            codigo = producto.get('codigo', '') or ''
+            serie = producto.get('serie', '') or ''
+            descripcion = producto.get('descripcion', '') or ''
+
+            # Strip solo si es string
+            if isinstance(codigo, str):
+                codigo = codigo.strip()
+            if isinstance(serie, str):
+                serie = serie.strip()
+            if isinstance(descripcion, str):
+                descripcion = descripcion.strip()
+
+            # Validar datos mínimos requeridos
+            if not serie or not codigo:
+                errores += 1
+                continue
+            datos[serie] = {'nombre': descripcion or f'Producto {codigo}', 'codigo': codigo}
+
+        # Solo las series del lote, no todo el catálogo
+        existentes = TipoComplemento.objects.in_bulk(list(datos), field_name='serie')
+
+        productos_a_crear = [
+            TipoComplemento(serie=serie, contrato=contrato, estado='NUEVO', **valores)
+            for serie, valores in datos.items() if serie not in existentes
+        ]
+        productos_a_actualizar = []
+        for serie, producto in existentes.items():
+            valores = datos[serie]
+            if producto.nombre != valores['nombre'] or producto.codigo != valores['codigo']:
+                producto.nombre = valores['nombre']
+                producto.codigo = valores['codigo']
+                productos_a_actualizar.append(producto)
+
+        if not dry_run:
+            with transaction.atomic():
+                TipoComplemento.objects.bulk_create(productos_a_crear, ignore_conflicts=True)
+                TipoComplemento.objects.bulk_update(productos_a_actualizar, ['nombre', 'codigo'])
+        if verbose:
+            for producto in productos_a_crear:
+                self.stdout.write(self.style.SUCCESS(f'  ✓ {producto.serie}: {producto.nombre}'))
+            for producto in productos_a_actualizar:
+                self.stdout.write(self.style.WARNING(f'  ↻ {producto.serie}: {producto.nombre}'))
+        return (
+            len(productos_a_crear), len(productos_a_actualizar),
+            len(existentes) - len(productos_a_actualizar), errores,
+        )
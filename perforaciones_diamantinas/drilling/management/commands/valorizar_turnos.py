@@ -0,0 +1,73 @@
+"""
+Comando para reconstruir el libro de valorización por turno (valorizacion_turno).
+
+El libro se mantiene solo al guardar turnos y precios unitarios (ver
+drilling/utils/valorizacion_turnos.py). Este comando lo llena por primera vez
+y lo reconstruye después de cargas masivas que no pasan por save()
+(importaciones, bulk_create, queryset.update/delete).
+
+Uso:
+    python manage.py valorizar_turnos
+    python manage.py valorizar_turnos --contratos=3,5
+    python manage.py valorizar_turnos --desde=2025-01-01 --hasta=2025-03-25
+"""
+
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from drilling.utils.valorizacion_turnos import recalcular_valorizacion
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el libro de valorización por turno y servicio cobrable'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--contratos',
+            type=str,
+            help='IDs de contrato separados por coma (default: todos)',
+        )
+        parser.add_argument(
+            '--desde',
+            type=str,
+            help='Primera fecha de turno a valorizar (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--hasta',
+            type=str,
+            help='Última fecha de turno a valorizar (YYYY-MM-DD)',
+        )
+
+    def handle(self, *args, **options):
+        contratos = None
+        if options['contratos']:
+            try:
+                contratos = [int(c) for c in options['contratos'].split(',') if c.strip()]
+            except ValueError:
+                raise CommandError('--contratos debe ser una lista de IDs separados por coma')
+
+        fechas = {}
+        for opcion in ('desde', 'hasta'):
+            fechas[opcion] = None
+            if options[opcion]:
+                try:
+                    fechas[opcion] = datetime.strptime(options[opcion], '%Y-%m-%d').date()
+                except ValueError:
+                    raise CommandError(f'Formato de fecha inválido en --{opcion}. Use YYYY-MM-DD')
+        if fechas['desde'] and fechas['hasta'] and fechas['desde'] > fechas['hasta']:
+            raise CommandError('--desde debe ser anterior o igual a --hasta')
+
+        inicio = time.perf_counter()
+        resumen = recalcular_valorizacion(contratos, fechas['desde'], fechas['hasta'])
+        segundos = time.perf_counter() - inicio
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(f"Turnos procesados: {resumen['turnos']}")
+        self.stdout.write(f"Filas escritas: {resumen['filas']}")
+        if resumen['huerfanas']:
+            self.stdout.write(f"Turnos eliminados limpiados: {resumen['huerfanas']}")
+        self.stdout.write(f"Duración: {segundos:.1f}s")
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS('✓ Valorización actualizada'))
@@ -2,14 +2,18 @@ from django.utils import timezone
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.core.cache import cache
+from django.utils.deprecation import MiddlewareMixin
 
-class ContractSecurityMiddleware:
+from .db_router import marcar_escritura
+
+# Los middlewares usan MiddlewareMixin (process_request/process_response) para
+# funcionar también en ASGI: ahí solo esos pasos cortos corren en un hilo y
+# las vistas async no retienen un hilo mientras esperan a la API externa.
+
+class ContractSecurityMiddleware(MiddlewareMixin):
     """Middleware para seguridad por contrato"""
-    
-    def __init__(self, get_response):
-        self.get_response = get_response
 
-    def __call__(self, request):
+    def process_request(self, request):
         # Actualizar última actividad del usuario (solo cada 5 minutos para evitar writes constantes)
         if request.user.is_authenticated:
             try:
@@ -25,17 +29,11 @@ class ContractSecurityMiddleware:
             except Exception as e:
                 # Silenciar errores del middleware para no romper el request
                 pass
-        
-        response = self.get_response(request)
-        return response
 
-class RoleBasedTemplateMiddleware:
+class RoleBasedTemplateMiddleware(MiddlewareMixin):
     """Middleware para asignar template base según rol del usuario"""
-    
-    def __init__(self, get_response):
-        self.get_response = get_response
 
-    def __call__(self, request):
+    def process_request(self, request):
         if request.user.is_authenticated:
             # Asignar template base según el rol
             if request.user.role in ['GERENCIA', 'CONTROL_PROYECTOS']:
@@ -50,22 +48,29 @@ class RoleBasedTemplateMiddleware:
                 request.base_template = 'drilling/base.html'
         else:
             request.base_template = 'drilling/base.html'
-        
-        response = self.get_response(request)
+
+class ReplicaStickyMiddleware(MiddlewareMixin):
+    """
+    Marca en la sesión las escrituras del usuario para que sus lecturas vayan al
+    primario durante unos segundos (ver drilling.db_router).
+    """
+    
+    METODOS_ESCRITURA = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+    def process_response(self, request, response):
+        if request.method in self.METODOS_ESCRITURA and request.user.is_authenticated:
+            marcar_escritura(request)
         return response
 
-class LoginRequiredMiddleware:
+class LoginRequiredMiddleware(MiddlewareMixin):
     """Middleware para requerir login en todas las URLs excepto login"""
     
     def __init__(self, get_response):
-        self.get_response = get_response
+        super().__init__(get_response)
         self.exempt_urls = [
             reverse('login'),
         ]
 
-    def __call__(self, request):
+    def process_request(self, request):
         if not request.user.is_authenticated and request.path not in self.exempt_urls:
-            return redirect('login')
-        
-        response = self.get_response(request)
-        return response
\ No newline at end of file
+            return redirect('login')
\ No newline at end of file
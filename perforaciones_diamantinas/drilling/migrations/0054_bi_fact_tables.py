@@ -0,0 +1,130 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drilling', '0053_historial_broca'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BiWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('marca', models.DateTimeField(help_text='Se procesan las filas creadas/modificadas desde esta fecha', verbose_name='Marca de agua')),
+                ('filas_actualizadas', models.IntegerField(default=0)),
+                ('duracion_segundos', models.DecimalField(decimal_places=3, default=0, max_digits=10)),
+                ('ultima_ejecucion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Marca de agua BI',
+                'verbose_name_plural': 'Marcas de agua BI',
+                'db_table': 'bi_watermark',
+            },
+        ),
+        migrations.CreateModel(
+            name='FactComplemento',
+            fields=[
+                ('complemento', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='drilling.turnocomplemento')),
+                ('fecha', models.DateField()),
+                ('codigo_serie', models.CharField(max_length=100)),
+                ('metros_inicio', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('metros_fin', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('metros_turno', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('contrato', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.contrato')),
+                ('maquina', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.maquina')),
+                ('sondaje', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.sondaje')),
+                ('tipo_complemento', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.tipocomplemento')),
+                ('turno', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.turno')),
+            ],
+            options={
+                'db_table': 'fact_complemento',
+                'indexes': [models.Index(fields=['contrato', 'fecha'], name='fact_comple_contrat_bd6dad_idx'), models.Index(fields=['tipo_complemento', 'fecha'], name='fact_comple_tipo_co_829fb9_idx'), models.Index(fields=['codigo_serie'], name='fact_comple_codigo__fc0800_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='FactHorasExtras',
+            fields=[
+                ('hora_extra', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='drilling.turnohoraextra')),
+                ('fecha', models.DateField()),
+                ('año', models.IntegerField()),
+                ('mes', models.IntegerField()),
+                ('funcion', models.CharField(blank=True, max_length=30)),
+                ('horas_extra', models.DecimalField(decimal_places=2, max_digits=4)),
+                ('metros_turno', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('cargo', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.cargo')),
+                ('configuracion_aplicada', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.configuracionhoraextra')),
+                ('contrato', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.contrato')),
+                ('maquina', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.maquina')),
+                ('tipo_turno', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.tipoturno')),
+                ('trabajador', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.trabajador')),
+                ('turno', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.turno')),
+            ],
+            options={
+                'db_table': 'fact_horas_extras',
+                'indexes': [models.Index(fields=['contrato', 'fecha'], name='fact_horas__contrat_72683a_idx'), models.Index(fields=['trabajador', 'fecha'], name='fact_horas__trabaja_18d0d3_idx'), models.Index(fields=['contrato', 'año', 'mes'], name='fact_horas__contrat_1cd580_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='FactMetaCumplimiento',
+            fields=[
+                ('meta', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='drilling.metamaquina')),
+                ('año', models.IntegerField()),
+                ('mes', models.IntegerField()),
+                ('fecha_inicio_periodo', models.DateField()),
+                ('fecha_fin_periodo', models.DateField()),
+                ('es_periodo_personalizado', models.BooleanField(default=False)),
+                ('meta_metros', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('activo', models.BooleanField(default=True)),
+                ('total_turnos', models.IntegerField(default=0)),
+                ('metros_reales', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('brecha_metros', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('porcentaje_cumplimiento', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('estado_cumplimiento', models.CharField(max_length=20)),
+                ('fecha_primer_turno', models.DateField(null=True)),
+                ('fecha_ultimo_turno', models.DateField(null=True)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('contrato', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.contrato')),
+                ('maquina', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.maquina')),
+            ],
+            options={
+                'db_table': 'fact_meta_cumplimiento',
+                'indexes': [models.Index(fields=['contrato', 'año', 'mes'], name='fact_meta_c_contrat_f55263_idx'), models.Index(fields=['maquina', 'año', 'mes'], name='fact_meta_c_maquina_9eb875_idx'), models.Index(fields=['fecha_inicio_periodo', 'fecha_fin_periodo'], name='fact_meta_c_fecha_i_b25235_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='FactTurno',
+            fields=[
+                ('turno', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='drilling.turno')),
+                ('fecha', models.DateField()),
+                ('año', models.IntegerField()),
+                ('mes', models.IntegerField()),
+                ('estado', models.CharField(max_length=20)),
+                ('horometro_inicio', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('horometro_fin', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('horas_trabajadas', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('metros_perforados', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('metros_sondajes_total', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('metros_complementos', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('horas_extra_total', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('total_trabajadores', models.IntegerField(default=0)),
+                ('turno_created_at', models.DateTimeField()),
+                ('turno_updated_at', models.DateTimeField()),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('contrato', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.contrato')),
+                ('maquina', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.maquina')),
+                ('tipo_turno', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.tipoturno')),
+            ],
+            options={
+                'db_table': 'fact_turno',
+                'indexes': [models.Index(fields=['contrato', 'fecha'], name='fact_turno_contrat_1b1329_idx'), models.Index(fields=['maquina', 'fecha'], name='fact_turno_maquina_eb339e_idx'), models.Index(fields=['contrato', 'año', 'mes'], name='fact_turno_contrat_8d6e38_idx'), models.Index(fields=['estado', 'fecha'], name='fact_turno_estado_5aa952_idx')],
+            },
+        ),
+    ]
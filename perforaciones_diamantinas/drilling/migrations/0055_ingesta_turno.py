@@ -0,0 +1,31 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drilling', '0054_bi_fact_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestaTurno',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=100, unique=True, verbose_name='Clave de idempotencia')),
+                ('hash_payload', models.CharField(help_text='SHA-256 del turno enviado; detecta claves reutilizadas con otros datos', max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('turno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingestas', to='drilling.turno')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ingestas_turno', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Ingesta de Turno',
+                'verbose_name_plural': 'Ingestas de Turnos',
+                'db_table': 'ingesta_turno',
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:20
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+MODELOS_HIJOS = ['TurnoActividad', 'TurnoAditivo', 'TurnoAvance',
+                 'TurnoComplemento', 'TurnoHoraExtra', 'TurnoTrabajador']
+
+
+def poblar_fecha_turno(apps, schema_editor):
+    """Copiar turnos.fecha a fecha_turno en las tablas hijas (un UPDATE por tabla)"""
+    Turno = apps.get_model('drilling', 'Turno')
+    fecha = Subquery(Turno.objects.filter(pk=OuterRef('turno_id')).values('fecha')[:1])
+    for nombre in MODELOS_HIJOS:
+        apps.get_model('drilling', nombre).objects.filter(fecha_turno__isnull=True).update(fecha_turno=fecha)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drilling', '0055_ingesta_turno'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turnoactividad',
+            name='fecha_turno',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='turnoaditivo',
+            name='fecha_turno',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='turnoavance',
+            name='fecha_turno',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='turnocomplemento',
+            name='fecha_turno',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='turnohoraextra',
+            name='fecha_turno',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='turnotrabajador',
+            name='fecha_turno',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(
+            code=poblar_fecha_turno,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drilling', '0056_fecha_turno_hijos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoContrato',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ruta', models.CharField(help_text='Directorio con los archivos Parquet del contrato', max_length=500)),
+                ('estado', models.CharField(choices=[('EXPORTADO', 'Exportado (filas aún en la base de datos)'), ('ARCHIVADO', 'Archivado (filas eliminadas de la base de datos)')], default='EXPORTADO', max_length=20)),
+                ('manifiesto', models.JSONField(default=dict)),
+                ('total_turnos', models.IntegerField(default=0)),
+                ('fecha_desde', models.DateField(blank=True, null=True)),
+                ('fecha_hasta', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('contrato', models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, related_name='archivo', to='drilling.contrato')),
+            ],
+            options={
+                'verbose_name': 'Contrato Archivado',
+                'verbose_name_plural': 'Contratos Archivados',
+                'db_table': 'archivo_contrato',
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:32
+
+from datetime import date, timedelta
+
+from django.db import migrations, models
+
+
+def poblar_calendario(apps, schema_editor):
+    # Las funciones de calendario no dependen de modelos, se pueden usar aquí
+    from drilling.utils.calendario import fila_calendario
+
+    CalendarioOperativo = apps.get_model('drilling', 'CalendarioOperativo')
+    fecha, hasta = date(2020, 1, 1), date(2035, 12, 31)
+    dias = []
+    while fecha <= hasta:
+        dias.append(CalendarioOperativo(**fila_calendario(fecha)))
+        fecha += timedelta(days=1)
+    CalendarioOperativo.objects.bulk_create(dias, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drilling', '0057_archivo_contrato'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarioOperativo',
+            fields=[
+                ('fecha', models.DateField(primary_key=True, serialize=False)),
+                ('año', models.IntegerField()),
+                ('mes', models.IntegerField()),
+                ('dia_semana', models.IntegerField(help_text='1 = lunes ... 7 = domingo (ISO)')),
+                ('año_operativo', models.IntegerField()),
+                ('mes_operativo', models.IntegerField()),
+                ('inicio_mes_operativo', models.DateField()),
+                ('fin_mes_operativo', models.DateField()),
+                ('semana_operativa', models.IntegerField(help_text='Semana dentro del mes operativo (1 = desde el día 26)')),
+                ('año_iso', models.IntegerField()),
+                ('semana_iso', models.IntegerField()),
+            ],
+            options={
+                'verbose_name': 'Día del Calendario Operativo',
+                'verbose_name_plural': 'Calendario Operativo',
+                'db_table': 'calendario_operativo',
+                'indexes': [models.Index(fields=['año', 'mes'], name='calendario__año_18f6ae_idx'), models.Index(fields=['año_operativo', 'mes_operativo'], name='calendario__año_ope_dba924_idx'), models.Index(fields=['año_iso', 'semana_iso'], name='calendario__año_iso_99578f_idx')],
+            },
+        ),
+        migrations.RunPython(
+            poblar_calendario,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
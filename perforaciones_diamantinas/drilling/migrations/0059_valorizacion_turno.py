@@ -0,0 +1,39 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drilling', '0058_calendario_operativo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ValorizacionTurno',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('unidad', models.CharField(choices=[('METRO', 'Metro perforado'), ('HORA', 'Hora')], max_length=10)),
+                ('cantidad', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('precio_unitario', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('moneda', models.CharField(blank=True, max_length=3)),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=14, null=True)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('contrato', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.contrato')),
+                ('maquina', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.maquina')),
+                ('precio', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.preciounitarioservicio')),
+                ('servicio', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.tipoactividad')),
+                ('turno', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.turno')),
+            ],
+            options={
+                'verbose_name': 'Valorización de Turno',
+                'verbose_name_plural': 'Valorización de Turnos',
+                'db_table': 'valorizacion_turno',
+                'indexes': [models.Index(fields=['contrato', 'fecha'], name='valorizacio_contrat_9f4c57_idx'), models.Index(fields=['contrato', 'servicio', 'fecha'], name='valorizacio_contrat_91fea0_idx')],
+                'unique_together': {('turno', 'servicio')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:43
+
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drilling', '0059_valorizacion_turno'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TipoCambio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('moneda', models.CharField(choices=[('USD', 'Dólares (USD)'), ('BOB', 'Bolivianos (BOB)'), ('PEN', 'Soles (PEN)')], max_length=3, verbose_name='Moneda')),
+                ('unidades_por_usd', models.DecimalField(decimal_places=6, help_text='Cuántas unidades de la moneda equivalen a 1 USD (ej: 6.96 BOB)', max_digits=14, validators=[django.core.validators.MinValueValidator(Decimal('0.000001'))], verbose_name='Unidades por USD')),
+                ('fuente', models.CharField(blank=True, max_length=50, verbose_name='Fuente')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+            ],
+            options={
+                'verbose_name': 'Tipo de Cambio',
+                'verbose_name_plural': 'Tipos de Cambio',
+                'db_table': 'tipo_cambio',
+                'ordering': ['-fecha', 'moneda'],
+                'unique_together': {('moneda', 'fecha')},
+            },
+        ),
+    ]
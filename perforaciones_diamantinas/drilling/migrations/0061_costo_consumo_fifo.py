@@ -0,0 +1,38 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drilling', '0060_tipo_cambio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CostoConsumoFIFO',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('codigo_producto', models.CharField(blank=True, max_length=50)),
+                ('familia', models.CharField(choices=[('PRODUCTOS_DIAMANTADOS', 'Productos Diamantados'), ('ADITIVOS_PERFORACION', 'Aditivos de Perforación'), ('CONSUMIBLES', 'Consumibles'), ('REPUESTOS', 'Repuestos')], max_length=30)),
+                ('fecha_lote', models.DateField(null=True)),
+                ('cantidad', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('precio_unitario', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('costo', models.DecimalField(decimal_places=2, max_digits=14, null=True)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('consumo', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.consumostock')),
+                ('contrato', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.contrato')),
+                ('lote', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.abastecimiento')),
+                ('turno', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.turno')),
+            ],
+            options={
+                'verbose_name': 'Costo FIFO de Consumo',
+                'verbose_name_plural': 'Costos FIFO de Consumos',
+                'db_table': 'costo_consumo_fifo',
+                'indexes': [models.Index(fields=['contrato', 'codigo_producto', 'fecha'], name='costo_consu_contrat_33e04d_idx'), models.Index(fields=['contrato', 'fecha'], name='costo_consu_contrat_dbacec_idx'), models.Index(fields=['turno'], name='costo_consu_turno_i_8f021b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drilling', '0061_costo_consumo_fifo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigo_producto', models.CharField(blank=True, max_length=50)),
+                ('familia', models.CharField(choices=[('PRODUCTOS_DIAMANTADOS', 'Productos Diamantados'), ('ADITIVOS_PERFORACION', 'Aditivos de Perforación'), ('CONSUMIBLES', 'Consumibles'), ('REPUESTOS', 'Repuestos')], max_length=30)),
+                ('fecha', models.DateField()),
+                ('secuencia', models.PositiveIntegerField()),
+                ('tipo', models.CharField(choices=[('INGRESO', 'Ingreso'), ('CONSUMO', 'Consumo')], max_length=10)),
+                ('cantidad', models.DecimalField(decimal_places=2, help_text='Positiva en ingresos, negativa en consumos', max_digits=12)),
+                ('saldo_lote', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('saldo_producto', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('consumo', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.consumostock')),
+                ('contrato', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.contrato')),
+                ('lote', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='drilling.abastecimiento')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Stock',
+                'verbose_name_plural': 'Movimientos de Stock',
+                'db_table': 'movimiento_stock',
+                'indexes': [models.Index(fields=['contrato', 'codigo_producto', 'fecha', 'secuencia'], name='movimiento__contrat_bb762a_idx'), models.Index(fields=['contrato', 'fecha'], name='movimiento__contrat_19527f_idx'), models.Index(fields=['lote', 'fecha'], name='movimiento__lote_id_daba74_idx')],
+            },
+        ),
+    ]
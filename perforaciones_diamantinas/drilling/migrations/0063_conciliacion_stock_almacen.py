@@ -0,0 +1,82 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:55
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drilling', '0062_movimiento_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FotoStockAlmacen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('centro_costo', models.CharField(max_length=20)),
+                ('familia', models.CharField(choices=[('PDD', 'Productos Diamantados'), ('ADIT', 'Aditivos')], max_length=4)),
+                ('tomada_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('total_articulos', models.PositiveIntegerField(default=0)),
+                ('contrato', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fotos_stock_almacen', to='drilling.contrato')),
+            ],
+            options={
+                'verbose_name': 'Foto de Stock de Almacén',
+                'verbose_name_plural': 'Fotos de Stock de Almacén',
+                'db_table': 'foto_stock_almacen',
+            },
+        ),
+        migrations.CreateModel(
+            name='DiscrepanciaStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('familia', models.CharField(choices=[('PDD', 'Productos Diamantados'), ('ADIT', 'Aditivos')], max_length=4)),
+                ('codigo', models.CharField(blank=True, max_length=50)),
+                ('serie', models.CharField(blank=True, max_length=50)),
+                ('descripcion', models.CharField(blank=True, max_length=255)),
+                ('tipo', models.CharField(choices=[('SOLO_ALMACEN', 'Solo en almacén'), ('SOLO_LOCAL', 'Solo en registro local'), ('DIFERENCIA', 'Cantidad distinta')], max_length=15)),
+                ('stock_almacen', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('stock_local', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('diferencia', models.DecimalField(decimal_places=2, help_text='Almacén menos local', max_digits=12)),
+                ('contrato', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='discrepancias_stock', to='drilling.contrato')),
+                ('foto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='discrepancias', to='drilling.fotostockalmacen')),
+            ],
+            options={
+                'verbose_name': 'Discrepancia de Stock',
+                'verbose_name_plural': 'Discrepancias de Stock',
+                'db_table': 'discrepancia_stock',
+                'ordering': ['contrato', 'familia', 'codigo', 'serie'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArticuloStockAlmacen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigo', models.CharField(blank=True, max_length=50)),
+                ('serie', models.CharField(blank=True, max_length=50)),
+                ('descripcion', models.CharField(blank=True, max_length=255)),
+                ('unidad', models.CharField(blank=True, max_length=20)),
+                ('stock', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('foto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='articulos', to='drilling.fotostockalmacen')),
+            ],
+            options={
+                'verbose_name': 'Artículo de Foto de Stock',
+                'verbose_name_plural': 'Artículos de Foto de Stock',
+                'db_table': 'foto_stock_almacen_articulo',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='fotostockalmacen',
+            index=models.Index(fields=['contrato', 'familia', '-tomada_en'], name='foto_stock__contrat_3902bf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='discrepanciastock',
+            index=models.Index(fields=['contrato', 'familia'], name='discrepanci_contrat_1c7fc0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='articulostockalmacen',
+            index=models.Index(fields=['foto', 'codigo'], name='foto_stock__foto_id_f4bbbd_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drilling', '0063_conciliacion_stock_almacen'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioStockAlmacen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigo', models.CharField(blank=True, max_length=50)),
+                ('serie', models.CharField(blank=True, max_length=50)),
+                ('descripcion', models.CharField(blank=True, max_length=255)),
+                ('tipo', models.CharField(choices=[('ALTA', 'Nuevo en almacén'), ('BAJA', 'Ya no está en almacén'), ('CAMBIO', 'Cambio de stock')], max_length=10)),
+                ('stock_anterior', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('stock_nuevo', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'verbose_name': 'Cambio de Stock de Almacén',
+                'verbose_name_plural': 'Cambios de Stock de Almacén',
+                'db_table': 'foto_stock_almacen_cambio',
+            },
+        ),
+        migrations.AddField(
+            model_name='fotostockalmacen',
+            name='hash_contenido',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='fotostockalmacen',
+            name='verificada_en',
+            field=models.DateTimeField(blank=True, help_text='Última sincronización con el mismo contenido', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='fotostockalmacen',
+            index=models.Index(fields=['centro_costo', 'familia', '-tomada_en'], name='foto_stock__centro__6b5943_idx'),
+        ),
+        migrations.AddField(
+            model_name='cambiostockalmacen',
+            name='foto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cambios', to='drilling.fotostockalmacen'),
+        ),
+        migrations.AddField(
+            model_name='cambiostockalmacen',
+            name='foto_anterior',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='drilling.fotostockalmacen'),
+        ),
+        migrations.AddIndex(
+            model_name='cambiostockalmacen',
+            index=models.Index(fields=['foto', 'tipo'], name='foto_stock__foto_id_43b881_idx'),
+        ),
+    ]
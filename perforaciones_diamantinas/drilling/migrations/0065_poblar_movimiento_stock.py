@@ -0,0 +1,78 @@
+from decimal import Decimal
+
+from django.db import migrations
+
+
+TAMANO_LOTE = 1000
+
+
+def poblar_movimientos(apps, schema_editor):
+    """
+    Llenar movimiento_stock con el historial existente (mismo criterio que
+    drilling.utils.movimientos_stock.registrar_movimientos: por producto,
+    en orden fecha, ingresos antes que consumos, id). Sin esto la página de
+    stock y la conciliación quedan vacías hasta correr costear_consumos.
+    """
+    Abastecimiento = apps.get_model('drilling', 'Abastecimiento')
+    ConsumoStock = apps.get_model('drilling', 'ConsumoStock')
+    MovimientoStock = apps.get_model('drilling', 'MovimientoStock')
+
+    contratos = Abastecimiento.objects.values_list('contrato_id', flat=True).distinct().order_by()
+    for contrato_id in contratos:
+        eventos = {}
+        for lote in Abastecimiento.objects.filter(contrato_id=contrato_id).values(
+            'id', 'fecha', 'cantidad', 'familia', 'codigo_producto',
+        ).order_by():
+            eventos.setdefault(lote['codigo_producto'], []).append(
+                ((lote['fecha'], 0, lote['id']), lote['id'], None, lote['cantidad'], lote['familia'])
+            )
+        for c in ConsumoStock.objects.filter(abastecimiento__contrato_id=contrato_id).values(
+            'id', 'turno__fecha', 'abastecimiento_id', 'cantidad_consumida',
+            'abastecimiento__familia', 'abastecimiento__codigo_producto',
+        ).order_by():
+            eventos.setdefault(c['abastecimiento__codigo_producto'], []).append(
+                ((c['turno__fecha'], 1, c['id']), c['abastecimiento_id'], c['id'], -c['cantidad_consumida'],
+                 c['abastecimiento__familia'])
+            )
+
+        MovimientoStock.objects.filter(contrato_id=contrato_id).delete()
+        nuevas = []
+        for codigo_producto, lista in eventos.items():
+            lista.sort(key=lambda e: e[0])
+            saldos = {}
+            saldo_producto = Decimal('0')
+            for secuencia, ((fecha, _, _), lote_id, consumo_id, cantidad, familia) in enumerate(lista, 1):
+                saldos[lote_id] = saldos.get(lote_id, Decimal('0')) + cantidad
+                saldo_producto += cantidad
+                nuevas.append(MovimientoStock(
+                    contrato_id=contrato_id,
+                    codigo_producto=codigo_producto,
+                    familia=familia,
+                    lote_id=lote_id,
+                    consumo_id=consumo_id,
+                    fecha=fecha,
+                    secuencia=secuencia,
+                    tipo='CONSUMO' if consumo_id else 'INGRESO',
+                    cantidad=cantidad,
+                    saldo_lote=saldos[lote_id],
+                    saldo_producto=saldo_producto if codigo_producto else saldos[lote_id],
+                ))
+        MovimientoStock.objects.bulk_create(nuevas, batch_size=TAMANO_LOTE)
+
+
+def vaciar_movimientos(apps, schema_editor):
+    apps.get_model('drilling', 'MovimientoStock').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drilling', '0064_fotos_stock_almacen_cambios'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            code=poblar_movimientos,
+            reverse_code=vaciar_movimientos,
+        ),
+    ]
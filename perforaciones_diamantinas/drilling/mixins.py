@@ -1,6 +1,8 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
 
+from .db_router import lectura_en_replica
+
 class AdminOrContractFilterMixin(LoginRequiredMixin):
     """Mixin para filtrar datos por contrato o permitir acceso completo a admins"""
     
@@ -23,4 +25,16 @@ class SystemAdminRequiredMixin(LoginRequiredMixin):
     def dispatch(self, request, *args, **kwargs):
         if not request.user.can_manage_all_contracts():
             raise PermissionDenied("Necesita permisos de administrador del sistema")
-        return super().dispatch(request, *args, **kwargs)
\ No newline at end of file
+        return super().dispatch(request, *args, **kwargs)
+
+class ReplicaReadMixin:
+    """Mixin para listados de solo lectura: las consultas van a la réplica (ver db_router)"""
+    
+    def dispatch(self, request, *args, **kwargs):
+        with lectura_en_replica(request):
+            response = super().dispatch(request, *args, **kwargs)
+            # Las TemplateResponse se renderizan después de la vista; forzar el
+            # render aquí para que el queryset también se evalúe en la réplica
+            if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+                response.render()
+            return response
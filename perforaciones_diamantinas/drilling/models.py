@@ -926,7 +926,112 @@ class ConfiguracionHoraExtra(models.Model):
         return False
 
 
-class TurnoHoraExtra(models.Model):
+def asignar_fecha_turno(objetos):
+    """
+    Completa fecha_turno (copia de turno.fecha) en registros hijos de un turno.
+    Usa el turno ya cargado en la instancia; para el resto, una sola query.
+    """
+    sin_cargar = []
+    for obj in objetos:
+        if obj.fecha_turno is not None:
+            continue
+        turno = obj._state.fields_cache.get('turno')
+        if turno is not None:
+            obj.fecha_turno = turno.fecha
+        elif obj.turno_id is not None:
+            sin_cargar.append(obj)
+    if sin_cargar:
+        fechas = dict(Turno.objects.filter(pk__in={o.turno_id for o in sin_cargar}).values_list('pk', 'fecha'))
+        for obj in sin_cargar:
+            obj.fecha_turno = fechas.get(obj.turno_id)
+
+
+def marcar_turnos_modificados(turno_ids):
+    """
+    Mueve Turno.updated_at de los turnos indicados. El refresco incremental de
+    hechos BI (drilling.utils.bi_facts) detecta por esa columna los cambios
+    hechos en las tablas hijas, incluidos borrados.
+    """
+    from django.utils import timezone
+
+    turno_ids = {turno_id for turno_id in turno_ids if turno_id is not None}
+    if turno_ids:
+        Turno.objects.filter(pk__in=turno_ids).update(updated_at=timezone.now())
+
+
+class HijoTurnoQuerySet(models.QuerySet):
+    """Las escrituras masivas en tablas hijas también marcan el turno como modificado."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        resultado = super().bulk_create(objs, *args, **kwargs)
+        marcar_turnos_modificados(obj.turno_id for obj in objs)
+        return resultado
+
+    def _marcar_turnos(self):
+        from django.utils import timezone
+
+        Turno.objects.filter(pk__in=self.values('turno_id')).update(updated_at=timezone.now())
+
+    def update(self, **kwargs):
+        self._marcar_turnos()
+        return super().update(**kwargs)
+
+    def delete(self):
+        self._marcar_turnos()
+        return super().delete()
+
+
+class HijoTurno(models.Model):
+    """Base de las tablas hijas de Turno: guardar o borrar una fila marca el turno."""
+
+    objects = HijoTurnoQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        marcar_turnos_modificados([self.turno_id])
+
+    def delete(self, *args, **kwargs):
+        turno_id = self.turno_id
+        resultado = super().delete(*args, **kwargs)
+        marcar_turnos_modificados([turno_id])
+        return resultado
+
+
+class DatosTurnoQuerySet(HijoTurnoQuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        asignar_fecha_turno(objs)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class DatosTurno(HijoTurno):
+    """
+    Base de las tablas hijas de Turno que se pueden particionar por mes.
+    fecha_turno es la fecha del turno desnormalizada: es la clave de partición
+    (ver partition_turnos) y permite filtrar por fecha sin unir con turnos.
+    Se completa al guardar y en bulk_create; Turno.save la propaga si cambia la fecha.
+    """
+    fecha_turno = models.DateField(null=True, blank=True, editable=False)
+
+    objects = DatosTurnoQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self.fecha_turno is None:
+            asignar_fecha_turno([self])
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'fecha_turno' not in update_fields:
+                kwargs['update_fields'] = [*update_fields, 'fecha_turno']
+        super().save(*args, **kwargs)
+
+
+class TurnoHoraExtra(DatosTurno):
     """
     Registro de horas extras otorgadas a trabajadores en un turno específico.
     Se calcula automáticamente al guardar el turno basándose en ConfiguracionHoraExtra.
@@ -1222,10 +1327,57 @@ class Turno(models.Model):
                 'La máquina seleccionada no pertenece al contrato del turno'
             )
 
+    # Tablas hijas con fecha_turno desnormalizada (ver DatosTurno)
+    MODELOS_HIJOS_FECHA = ['TurnoAvance', 'TurnoComplemento', 'TurnoAditivo',
+                           'TurnoActividad', 'TurnoTrabajador', 'TurnoHoraExtra']
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._fecha_cargada = instancia.__dict__.get('fecha')
+        instancia._serie_cargada = (instancia.__dict__.get('contrato_id'), instancia.__dict__.get('maquina_id'))
+        return instancia
+
     def save(self, *args, **kwargs):
         """Override save para aplicar validaciones"""
+        from drilling.utils.pronostico_metas import invalidar_pronosticos
+        from drilling.utils.valorizacion_turnos import programar_valorizacion
+
         self.full_clean()
         super().save(*args, **kwargs)
+        fecha_cargada = getattr(self, '_fecha_cargada', None)
+        # Si el turno cambió de contrato o máquina, la serie anterior también pierde su metraje
+        contrato_cargado, maquina_cargada = getattr(self, '_serie_cargada', (None, None))
+        invalidar_pronosticos(self.contrato_id, self.maquina_id, {self.fecha, fecha_cargada})
+        if contrato_cargado is not None and (contrato_cargado, maquina_cargada) != (self.contrato_id, self.maquina_id):
+            invalidar_pronosticos(contrato_cargado, maquina_cargada, {self.fecha, fecha_cargada})
+        self._serie_cargada = (self.contrato_id, self.maquina_id)
+        programar_valorizacion([self.pk])
+        # Si cambió la fecha, mover la copia desnormalizada de los hijos
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'fecha' not in update_fields:
+            return
+        if fecha_cargada is not None and fecha_cargada != self.fecha:
+            from django.apps import apps
+            from drilling.utils.costeo_fifo import programar_costeo_turno
+            # _base_manager: el turno ya se guardó, no hace falta marcarlo otra vez
+            for nombre in self.MODELOS_HIJOS_FECHA:
+                apps.get_model('drilling', nombre)._base_manager.filter(turno=self).update(fecha_turno=self.fecha)
+            # Los consumos del turno cambian de lugar en la cola FIFO
+            programar_costeo_turno(self.pk, min(fecha_cargada, self.fecha))
+        self._fecha_cargada = self.fecha
+
+    def delete(self, *args, **kwargs):
+        from drilling.utils.pronostico_metas import invalidar_pronosticos
+        from drilling.utils.valorizacion_turnos import programar_valorizacion
+
+        from drilling.utils.costeo_fifo import programar_costeo_turno
+
+        invalidar_pronosticos(self.contrato_id, self.maquina_id, [self.fecha])
+        # valorizacion_turno y costo_consumo_fifo no tienen cascada: se limpian al confirmar
+        programar_valorizacion([self.pk])
+        programar_costeo_turno(self.pk, self.fecha)
+        return super().delete(*args, **kwargs)
 
     def __str__(self):
         try:
@@ -1241,7 +1393,7 @@ class Turno(models.Model):
             pass
         return f"Turno {self.id} - {self.fecha}"
 
-class TurnoTrabajador(models.Model):
+class TurnoTrabajador(DatosTurno):
     FUNCION_CHOICES = [
         ('PERFORISTA', 'Perforista'),
         ('AYUDANTE', 'Ayudante'),
@@ -1263,7 +1415,7 @@ class TurnoTrabajador(models.Model):
             models.Index(fields=['funcion']),
         ]
     
-class TurnoSondaje(models.Model):
+class TurnoSondaje(HijoTurno):
     """Modelo intermedio que asocia un Turno con un Sondaje.
 
     Dejarlo simple por ahora (turno, sondaje, created_at). En el futuro se
@@ -1301,7 +1453,7 @@ class TurnoSondaje(models.Model):
         return f"Turno {self.turno_id} - Sondaje {self.sondaje_id}"
 
 
-class TurnoAvance(models.Model):
+class TurnoAvance(DatosTurno):
     turno = models.OneToOneField(Turno, on_delete=models.CASCADE, related_name='avance')
     metros_perforados = models.DecimalField(max_digits=8, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -1318,9 +1470,21 @@ class TurnoAvance(models.Model):
         Guardar el avance y calcular horas extras para todos los trabajadores del turno
         """
         super().save(*args, **kwargs)
+        self._invalidar_pronosticos()
         
         # Después de guardar el avance, calcular horas extras
         self.calcular_horas_extras()
+
+    def delete(self, *args, **kwargs):
+        self._invalidar_pronosticos()
+        return super().delete(*args, **kwargs)
+
+    def _invalidar_pronosticos(self):
+        from drilling.utils.pronostico_metas import invalidar_pronosticos
+        from drilling.utils.valorizacion_turnos import programar_valorizacion
+
+        invalidar_pronosticos(self.turno.contrato_id, self.turno.maquina_id, [self.turno.fecha])
+        programar_valorizacion([self.turno_id])
     
     def calcular_horas_extras(self):
         """
@@ -1410,7 +1574,7 @@ class TurnoAvance(models.Model):
             if horas_extras_list:
                 TurnoHoraExtra.objects.bulk_create(horas_extras_list)
 
-class TurnoMaquina(models.Model):
+class TurnoMaquina(HijoTurno):
     ESTADO_CHOICES = [
         ('OPERATIVO', 'Operativo'),
         ('DEFICIENTE', 'Deficiente'),
@@ -1432,40 +1596,35 @@ class TurnoMaquina(models.Model):
     class Meta:
         db_table = 'turno_maquina'
 
-    def save(self, *args, **kwargs):
+    def calcular_horas_trabajadas(self):
+        """
+        Horas trabajadas del turno. Prioriza las lecturas de horómetro (contador:
+        la diferencia es lo trabajado); si no están completas, usa hora_inicio y
+        hora_fin considerando turnos que cruzan la medianoche.
+        """
         from datetime import datetime, timedelta
 
-        # Priorizar cálculo a partir de lecturas de horómetro (si se proporcionaron)
-        try:
-            if self.horometro_inicio is not None and self.horometro_fin is not None:
-                # Horómetro representa un contador; la diferencia es la cantidad a sumar
-                try:
-                    self.horas_trabajadas_calc = Decimal(self.horometro_fin) - Decimal(self.horometro_inicio)
-                except Exception:
-                    self.horas_trabajadas_calc = Decimal('0')
-                return super().save(*args, **kwargs)
-        except Exception:
-            # Caer a cálculo por tiempo si algo falla
-            pass
-
-        # Si no hay lecturas de horómetro completas, intentar calcular desde times
-        if not self.hora_inicio or not self.hora_fin:
+        if self.horometro_inicio is not None and self.horometro_fin is not None:
             try:
-                self.horas_trabajadas_calc = Decimal('0')
+                return Decimal(self.horometro_fin) - Decimal(self.horometro_inicio)
             except Exception:
-                self.horas_trabajadas_calc = 0
-            return super().save(*args, **kwargs)
+                return Decimal('0')
+
+        if not self.hora_inicio or not self.hora_fin:
+            return Decimal('0')
 
-        # Ambos tiempos presentes, calcular horas trabajadas (horas decimales)
         inicio = datetime.combine(datetime.today(), self.hora_inicio)
         fin = datetime.combine(datetime.today(), self.hora_fin)
         if fin < inicio:
             fin += timedelta(days=1)
         diff = fin - inicio
-        self.horas_trabajadas_calc = Decimal(str(diff.total_seconds() / 3600))
+        return Decimal(str(diff.total_seconds() / 3600))
+
+    def save(self, *args, **kwargs):
+        self.horas_trabajadas_calc = self.calcular_horas_trabajadas()
         super().save(*args, **kwargs)
 
-class TurnoComplemento(models.Model):
+class TurnoComplemento(DatosTurno):
     turno = models.ForeignKey(Turno, on_delete=models.CASCADE, related_name='complementos')
     sondaje = models.ForeignKey(Sondaje, on_delete=models.PROTECT, null=True, blank=True, related_name='complementos_turno')
     tipo_complemento = models.ForeignKey(TipoComplemento, on_delete=models.PROTECT)
@@ -1686,6 +1845,60 @@ class HistorialBroca(models.Model):
             self.observaciones = f"{self.observaciones}\n{observaciones}" if self.observaciones else observaciones
         self.save(update_fields=['estado', 'fecha_baja', 'observaciones', 'updated_at'])
     
+    @classmethod
+    def registrar_usos(cls, complementos):
+        """
+        Acumula en el historial el uso de complementos creados con bulk_create
+        (que no ejecuta TurnoComplemento.save()). Las series nuevas se crean en
+        un solo INSERT; las existentes se actualizan con F() (una query por serie).
+        
+        Args:
+            complementos (iterable): TurnoComplemento con `turno` asignado
+        """
+        from django.db.models import F
+        from django.utils import timezone
+        
+        usos = {}
+        for c in complementos:
+            if not c.codigo_serie:
+                continue
+            fecha = c.turno.fecha
+            uso = usos.setdefault(c.codigo_serie, {
+                'metros': Decimal('0'), 'usos': 0, 'primer': fecha, 'ultimo': fecha, 'complemento': c
+            })
+            uso['metros'] += c.metros_turno_calc or Decimal('0')
+            uso['usos'] += 1
+            uso['primer'] = min(uso['primer'], fecha)
+            if fecha >= uso['ultimo']:
+                uso['ultimo'] = fecha
+                uso['complemento'] = c
+        if not usos:
+            return
+        
+        existentes = cls.objects.in_bulk(list(usos), field_name='serie')
+        cls.objects.bulk_create([
+            cls(
+                serie=serie,
+                tipo_complemento_id=uso['complemento'].tipo_complemento_id,
+                contrato_actual_id=uso['complemento'].turno.contrato_id,
+                metraje_acumulado=uso['metros'],
+                numero_usos=uso['usos'],
+                estado='EN_USO',
+                fecha_primer_uso=uso['primer'],
+                fecha_ultimo_uso=uso['ultimo'],
+            )
+            for serie, uso in usos.items() if serie not in existentes
+        ])
+        for serie, historial in existentes.items():
+            uso = usos[serie]
+            cls.objects.filter(pk=historial.pk).update(
+                metraje_acumulado=F('metraje_acumulado') + uso['metros'],
+                numero_usos=F('numero_usos') + uso['usos'],
+                fecha_ultimo_uso=max(historial.fecha_ultimo_uso or uso['ultimo'], uso['ultimo']),
+                estado='EN_USO' if historial.estado == 'NUEVA' else historial.estado,
+                updated_at=timezone.now(),
+            )
+    
     def obtener_historial_detallado(self):
         """Obtiene todos los usos detallados de esta broca desde TurnoComplemento"""
         return TurnoComplemento.objects.filter(
@@ -1699,7 +1912,7 @@ class HistorialBroca(models.Model):
         ).order_by('turno__fecha')
 
 
-class TurnoAditivo(models.Model):
+class TurnoAditivo(DatosTurno):
     turno = models.ForeignKey(Turno, on_delete=models.CASCADE, related_name='aditivos')
     sondaje = models.ForeignKey(Sondaje, on_delete=models.PROTECT, null=True, blank=True, related_name='aditivos_turno')
     tipo_aditivo = models.ForeignKey(TipoAditivo, on_delete=models.PROTECT)
@@ -1741,7 +1954,7 @@ class TurnoCorrida(models.Model):
         self.total_calc = self.hasta - self.desde
         super().save(*args, **kwargs)
 
-class TurnoActividad(models.Model):
+class TurnoActividad(DatosTurno):
     turno = models.ForeignKey(Turno, on_delete=models.CASCADE, related_name='actividades')
     actividad = models.ForeignKey(TipoActividad, on_delete=models.PROTECT)
     hora_inicio = models.TimeField(null=True, blank=True)
@@ -1752,16 +1965,12 @@ class TurnoActividad(models.Model):
     class Meta:
         db_table = 'turno_actividad'
 
-    def save(self, *args, **kwargs):
+    def calcular_tiempo(self):
+        """Horas entre hora_inicio y hora_fin (0 si falta alguna; cruza medianoche)."""
         from datetime import datetime, timedelta
 
-        # Manejar casos donde las horas no estén completas
         if not self.hora_inicio or not self.hora_fin:
-            try:
-                self.tiempo_calc = Decimal('0')
-            except Exception:
-                self.tiempo_calc = 0
-            return super().save(*args, **kwargs)
+            return Decimal('0')
 
         inicio = datetime.combine(datetime.today(), self.hora_inicio)
         fin = datetime.combine(datetime.today(), self.hora_fin)
@@ -1770,8 +1979,34 @@ class TurnoActividad(models.Model):
             fin += timedelta(days=1)
 
         diff = fin - inicio
-        self.tiempo_calc = Decimal(str(diff.total_seconds() / 3600))
+        return Decimal(str(diff.total_seconds() / 3600))
+
+    def save(self, *args, **kwargs):
+        from drilling.utils.valorizacion_turnos import programar_valorizacion
+
+        self.tiempo_calc = self.calcular_tiempo()
         super().save(*args, **kwargs)
+        programar_valorizacion([self.turno_id])
+
+    def delete(self, *args, **kwargs):
+        from drilling.utils.valorizacion_turnos import programar_valorizacion
+
+        programar_valorizacion([self.turno_id])
+        return super().delete(*args, **kwargs)
+
+
+def valores_cargados(instancia, campos):
+    """
+    Tupla con los campos tal como se leyeron de la base, para from_db. Lee
+    instancia.__dict__: con campos diferidos (.only/.defer, cascadas de
+    borrado) devuelve None en lugar de disparar refresh_from_db, que volvería
+    a llamar a from_db. Quien guarda trata la falta de copia como un cambio.
+    """
+    valores = instancia.__dict__
+    if any(campo not in valores for campo in campos):
+        return None
+    return tuple(valores[campo] for campo in campos)
+
 
 class Abastecimiento(models.Model):
     FAMILIA_CHOICES = [
@@ -1812,9 +2047,35 @@ class Abastecimiento(models.Model):
             models.Index(fields=['serie']),
         ]
 
+    # Campos que cambian el costeo FIFO y los movimientos de stock (ver drilling.utils.costeo_fifo)
+    CAMPOS_COSTEO = ('contrato_id', 'codigo_producto', 'fecha', 'cantidad', 'precio_unitario', 'familia')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._costeo_cargado = valores_cargados(instancia, cls.CAMPOS_COSTEO)
+        return instancia
+
+    def _costeo(self):
+        return tuple(getattr(self, campo) for campo in self.CAMPOS_COSTEO)
+
     def save(self, *args, **kwargs):
+        from drilling.utils.costeo_fifo import programar_costeo_lote
+
         self.total = self.cantidad * self.precio_unitario
         super().save(*args, **kwargs)
+        cargado = getattr(self, '_costeo_cargado', None)
+        if cargado != self._costeo():
+            programar_costeo_lote(self.pk, self._costeo()[:3], cargado[:3] if cargado else None)
+        self._costeo_cargado = self._costeo()
+
+    def delete(self, *args, **kwargs):
+        from drilling.utils.costeo_fifo import programar_costeo
+
+        clave = self._costeo()[:3]
+        resultado = super().delete(*args, **kwargs)
+        programar_costeo([clave])
+        return resultado
 
     def __str__(self):
         return f"{self.contrato.nombre_contrato} - {self.descripcion[:50]} ({self.fecha})"
@@ -1843,10 +2104,41 @@ class ConsumoStock(models.Model):
         verbose_name = 'Consumo de Stock'
         verbose_name_plural = 'Consumos de Stock'
 
+    CAMPOS_COSTEO = ('turno_id', 'abastecimiento_id', 'cantidad_consumida')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._costeo_cargado = valores_cargados(instancia, cls.CAMPOS_COSTEO)
+        return instancia
+
+    def _costeo(self):
+        return tuple(getattr(self, campo) for campo in self.CAMPOS_COSTEO)
+
     def save(self, *args, **kwargs):
+        from drilling.utils.costeo_fifo import programar_costeo_consumos
+
         if self.metros_inicio and self.metros_fin:
             self.metros_utilizados = self.metros_fin - self.metros_inicio
         super().save(*args, **kwargs)
+        cargado = getattr(self, '_costeo_cargado', None)
+        if cargado != self._costeo():
+            programar_costeo_consumos([c[:2] for c in (self._costeo(), cargado) if c])
+        self._costeo_cargado = self._costeo()
+
+    def delete(self, *args, **kwargs):
+        from drilling.utils.costeo_fifo import programar_costeo_consumos
+
+        # La clave se resuelve antes de borrar: después ya no hay turno ni lote que leer
+        programar_costeo_consumos([self._costeo()[:2]])
+        return super().delete(*args, **kwargs)
+
+
+MONEDA_CHOICES = [
+    ('USD', 'Dólares (USD)'),
+    ('BOB', 'Bolivianos (BOB)'),
+    ('PEN', 'Soles (PEN)'),
+]
 
 
 class PrecioUnitarioServicio(models.Model):
@@ -1880,11 +2172,7 @@ class PrecioUnitarioServicio(models.Model):
     
     moneda = models.CharField(
         max_length=3,
-        choices=[
-            ('USD', 'Dólares (USD)'),
-            ('BOB', 'Bolivianos (BOB)'),
-            ('PEN', 'Soles (PEN)'),
-        ],
+        choices=MONEDA_CHOICES,
         default='USD',
         verbose_name='Moneda'
     )
@@ -1954,6 +2242,53 @@ class PrecioUnitarioServicio(models.Model):
         
         return True
     
+    @classmethod
+    def vigentes_por_servicio(cls, contrato, servicio_ids, fecha):
+        """
+        Retorna {servicio_id: precio} con el precio vigente de cada servicio del
+        contrato en la fecha dada (mismo criterio que
+        MetaMaquina.obtener_precio_unitario, ver drilling/utils/precios.py).
+        """
+        from drilling.utils.precios import precio_vigente
+        
+        contrato_id = getattr(contrato, 'pk', contrato)
+        vigentes = {}
+        for servicio_id in servicio_ids:
+            precio = precio_vigente(contrato_id, servicio_id, fecha)
+            if precio:
+                vigentes[servicio_id] = precio
+        return vigentes
+    
+    # (contrato_id, servicio_id, inicio, fin) para revalorizar valorizacion_turno
+    CAMPOS_VIGENCIA = ('contrato_id', 'servicio_id', 'fecha_inicio_vigencia', 'fecha_fin_vigencia')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._vigencia_cargada = valores_cargados(instancia, cls.CAMPOS_VIGENCIA)
+        return instancia
+    
+    def _vigencia(self):
+        return tuple(getattr(self, campo) for campo in self.CAMPOS_VIGENCIA)
+    
+    def save(self, *args, **kwargs):
+        from drilling.utils.precios import invalidar_precios
+        from drilling.utils.valorizacion_turnos import programar_revalorizacion
+        super().save(*args, **kwargs)
+        invalidar_precios()
+        vigencias = {self._vigencia(), getattr(self, '_vigencia_cargada', None)} - {None}
+        programar_revalorizacion(vigencias)
+        self._vigencia_cargada = self._vigencia()
+    
+    def delete(self, *args, **kwargs):
+        from drilling.utils.precios import invalidar_precios
+        from drilling.utils.valorizacion_turnos import programar_revalorizacion
+        vigencia = self._vigencia()
+        resultado = super().delete(*args, **kwargs)
+        invalidar_precios()
+        programar_revalorizacion([vigencia])
+        return resultado
+    
     def clean(self):
         """Validaciones personalizadas"""
         super().clean()
@@ -1965,6 +2300,50 @@ class PrecioUnitarioServicio(models.Model):
                 })
 
 
+class TipoCambio(models.Model):
+    """
+    Tipo de cambio diario expresado como unidades de la moneda por 1 USD
+    (USD es la moneda pivote y no tiene filas). Se carga por lotes con
+    `python manage.py cargar_tipos_cambio`; los reportes convierten con
+    drilling.utils.tipo_cambio.
+    """
+    
+    fecha = models.DateField(verbose_name='Fecha')
+    
+    moneda = models.CharField(
+        max_length=3,
+        choices=MONEDA_CHOICES,
+        verbose_name='Moneda'
+    )
+    
+    unidades_por_usd = models.DecimalField(
+        max_digits=14,
+        decimal_places=6,
+        validators=[MinValueValidator(Decimal('0.000001'))],
+        verbose_name='Unidades por USD',
+        help_text='Cuántas unidades de la moneda equivalen a 1 USD (ej: 6.96 BOB)'
+    )
+    
+    fuente = models.CharField(max_length=50, blank=True, verbose_name='Fuente')
+    
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')
+    
+    class Meta:
+        db_table = 'tipo_cambio'
+        verbose_name = 'Tipo de Cambio'
+        verbose_name_plural = 'Tipos de Cambio'
+        ordering = ['-fecha', 'moneda']
+        unique_together = [('moneda', 'fecha')]
+    
+    def __str__(self):
+        return f"{self.fecha} 1 USD = {self.unidades_por_usd} {self.moneda}"
+    
+    def clean(self):
+        super().clean()
+        if self.moneda == 'USD':
+            raise ValidationError({'moneda': 'USD es la moneda pivote: no necesita tipo de cambio'})
+
+
 class MetaMaquina(models.Model):
     """
     Metas de perforación para máquinas por período.
@@ -2121,29 +2500,87 @@ class MetaMaquina(models.Model):
         Obtiene la fecha de inicio del período.
         Si hay fecha personalizada, la usa; sino calcula mes operativo (día 26 del mes anterior)
         """
-        from datetime import date
-        from dateutil.relativedelta import relativedelta
+        from drilling.utils.calendario import rango_mes_operativo
         
         if self.fecha_inicio:
             return self.fecha_inicio
         
-        # Calcular día 26 del mes anterior
-        primer_dia_mes = date(self.año, self.mes, 1)
-        mes_anterior = primer_dia_mes - relativedelta(months=1)
-        return date(mes_anterior.year, mes_anterior.month, 26)
+        return rango_mes_operativo(self.año, self.mes)[0]
 
     def get_fecha_fin_periodo(self):
         """
         Obtiene la fecha de fin del período.
         Si hay fecha personalizada, la usa; sino calcula mes operativo (día 25 del mes actual)
         """
-        from datetime import date
+        from drilling.utils.calendario import rango_mes_operativo
         
         if self.fecha_fin:
             return self.fecha_fin
         
-        # Día 25 del mes operativo
-        return date(self.año, self.mes, 25)
+        return rango_mes_operativo(self.año, self.mes)[1]
+
+    @classmethod
+    def calcular_metros_reales(cls, metas, periodo=None):
+        """
+        Calcula los metros reales perforados de varias metas con una sola query.
+        
+        Agrupa el avance de turnos COMPLETADOS/APROBADOS por contrato, máquina y
+        fecha dentro del rango que cubre todas las metas, y luego reparte cada
+        fila entre las metas cuyo período la contiene.
+        
+        Args:
+            metas (iterable): Metas a evaluar
+            periodo (tuple): (fecha_inicio, fecha_fin) que reemplaza el período
+                de cada meta (opcional)
+            
+        Returns:
+            dict: {meta.pk: {'metros': Decimal, 'turnos': int,
+                             'primer_turno': date|None, 'ultimo_turno': date|None}}
+        """
+        metas = list(metas)
+        if not metas:
+            return {}
+        
+        periodos = {
+            meta.pk: periodo or (meta.get_fecha_inicio_periodo(), meta.get_fecha_fin_periodo())
+            for meta in metas
+        }
+        filas = TurnoAvance.objects.filter(
+            turno__contrato_id__in={meta.contrato_id for meta in metas},
+            turno__maquina_id__in={meta.maquina_id for meta in metas},
+            turno__fecha__gte=min(inicio for inicio, _ in periodos.values()),
+            turno__fecha__lte=max(fin for _, fin in periodos.values()),
+            turno__estado__in=['COMPLETADO', 'APROBADO']
+        ).values(
+            'turno__contrato_id', 'turno__maquina_id', 'turno__fecha'
+        ).annotate(
+            total=models.Sum('metros_perforados'),
+            turnos=models.Count('id')
+        ).order_by()
+        
+        avance_por_maquina = {}
+        for fila in filas:
+            clave = (fila['turno__contrato_id'], fila['turno__maquina_id'])
+            avance_por_maquina.setdefault(clave, []).append(fila)
+        
+        resultado = {}
+        for meta in metas:
+            inicio, fin = periodos[meta.pk]
+            metros = Decimal('0')
+            turnos = 0
+            fechas = []
+            for fila in avance_por_maquina.get((meta.contrato_id, meta.maquina_id), []):
+                if inicio <= fila['turno__fecha'] <= fin:
+                    metros += fila['total'] or Decimal('0')
+                    turnos += fila['turnos']
+                    fechas.append(fila['turno__fecha'])
+            resultado[meta.pk] = {
+                'metros': metros,
+                'turnos': turnos,
+                'primer_turno': min(fechas) if fechas else None,
+                'ultimo_turno': max(fechas) if fechas else None,
+            }
+        return resultado
 
     def get_periodo_display(self):
         """Retorna una representación legible del período"""
@@ -2204,25 +2641,16 @@ class MetaMaquina(models.Model):
             PrecioUnitarioServicio o None: Precio unitario vigente o None si no hay
         """
         from datetime import date as date_class
+        from drilling.utils.precios import precio_vigente
         
-        if not self.servicio:
+        if not self.servicio_id:
             return None
         
         if fecha is None:
             fecha = date_class.today()
         
-        # Buscar precio vigente para la fecha
-        precios = PrecioUnitarioServicio.objects.filter(
-            contrato=self.contrato,
-            servicio=self.servicio,
-            activo=True,
-            fecha_inicio_vigencia__lte=fecha
-        ).filter(
-            models.Q(fecha_fin_vigencia__isnull=True) | 
-            models.Q(fecha_fin_vigencia__gte=fecha)
-        ).order_by('-fecha_inicio_vigencia')
-        
-        return precios.first()
+        # Intervalos de precios en memoria (una query por versión de precios)
+        return precio_vigente(self.contrato_id, self.servicio_id, fecha)
     
     def calcular_valor_meta(self, fecha=None):
         """
@@ -2272,8 +2700,21 @@ class MetaMaquina(models.Model):
         Returns:
             dict: Diccionario con toda la información de valorización
         """
-        precio = self.obtener_precio_unitario(fecha)
+        return self.valorizar_con_precio(metros_reales, self.obtener_precio_unitario(fecha))
+
+    def valorizar_con_precio(self, metros_reales, precio):
+        """
+        Igual que calcular_valorizacion_completa pero con el precio unitario ya
+        resuelto, para reportes que cargan los precios de todas las metas en
+        una sola query.
         
+        Args:
+            metros_reales (Decimal): Metros realmente perforados
+            precio (PrecioUnitarioServicio): Precio vigente o None
+            
+        Returns:
+            dict: Diccionario con toda la información de valorización
+        """
         resultado = {
             'tiene_precio': precio is not None,
             'precio_unitario': precio.precio_unitario if precio else None,
@@ -2635,3 +3076,512 @@ class AsignacionEquipo(models.Model):
     
     def __str__(self):
         return f"{self.equipo} → {self.trabajador.nombres} {self.trabajador.apellidos} ({self.get_estado_display()})"
+
+
+# ============================================================
+# TABLAS DE HECHOS PARA POWER BI
+# Se mantienen con `python manage.py refresh_bi_facts` (ver drilling/utils/bi_facts.py).
+# Son copias desnormalizadas: las FK no tienen constraint ni cascada para no
+# encarecer las escrituras del registro de turnos.
+# ============================================================
+
+def _fk_hecho(modelo, **kwargs):
+    """FK de tabla de hechos: sin constraint, sin cascada y sin relación inversa."""
+    kwargs.setdefault('on_delete', models.DO_NOTHING)
+    return models.ForeignKey(modelo, db_constraint=False, related_name='+', **kwargs)
+
+
+class BiWatermark(models.Model):
+    """Marca de agua del último refresco incremental de las tablas de hechos."""
+    nombre = models.CharField(max_length=50, unique=True)
+    marca = models.DateTimeField(
+        verbose_name='Marca de agua',
+        help_text='Se procesan las filas creadas/modificadas desde esta fecha'
+    )
+    filas_actualizadas = models.IntegerField(default=0)
+    duracion_segundos = models.DecimalField(max_digits=10, decimal_places=3, default=0)
+    ultima_ejecucion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'bi_watermark'
+        verbose_name = 'Marca de agua BI'
+        verbose_name_plural = 'Marcas de agua BI'
+
+    def __str__(self):
+        return f"{self.nombre} @ {self.marca:%Y-%m-%d %H:%M:%S}"
+
+
+class FactTurno(models.Model):
+    """Una fila por turno con sus métricas ya agregadas (reemplaza vw_turnos_fact)."""
+    turno = models.OneToOneField(
+        Turno, on_delete=models.DO_NOTHING, db_constraint=False,
+        primary_key=True, related_name='+'
+    )
+    fecha = models.DateField()
+    año = models.IntegerField()
+    mes = models.IntegerField()
+    contrato = _fk_hecho(Contrato)
+    maquina = _fk_hecho(Maquina)
+    tipo_turno = _fk_hecho(TipoTurno)
+    estado = models.CharField(max_length=20)
+    horometro_inicio = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    horometro_fin = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    horas_trabajadas = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    metros_perforados = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    metros_sondajes_total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    metros_complementos = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    horas_extra_total = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    total_trabajadores = models.IntegerField(default=0)
+    turno_created_at = models.DateTimeField()
+    turno_updated_at = models.DateTimeField()
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'fact_turno'
+        indexes = [
+            models.Index(fields=['contrato', 'fecha']),
+            models.Index(fields=['maquina', 'fecha']),
+            models.Index(fields=['contrato', 'año', 'mes']),
+            models.Index(fields=['estado', 'fecha']),
+        ]
+
+
+class FactComplemento(models.Model):
+    """Uso de complementos (brocas, escariadores...) por turno con fecha y contrato."""
+    complemento = models.OneToOneField(
+        TurnoComplemento, on_delete=models.DO_NOTHING, db_constraint=False,
+        primary_key=True, related_name='+'
+    )
+    turno = _fk_hecho(Turno)
+    fecha = models.DateField()
+    contrato = _fk_hecho(Contrato)
+    maquina = _fk_hecho(Maquina)
+    sondaje = _fk_hecho(Sondaje, null=True)
+    tipo_complemento = _fk_hecho(TipoComplemento)
+    codigo_serie = models.CharField(max_length=100)
+    metros_inicio = models.DecimalField(max_digits=8, decimal_places=2)
+    metros_fin = models.DecimalField(max_digits=8, decimal_places=2)
+    metros_turno = models.DecimalField(max_digits=8, decimal_places=2)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'fact_complemento'
+        indexes = [
+            models.Index(fields=['contrato', 'fecha']),
+            models.Index(fields=['tipo_complemento', 'fecha']),
+            models.Index(fields=['codigo_serie']),
+        ]
+
+
+class FactHorasExtras(models.Model):
+    """Horas extras por trabajador y turno con las dimensiones del turno (reemplaza vw_horas_extras)."""
+    hora_extra = models.OneToOneField(
+        TurnoHoraExtra, on_delete=models.DO_NOTHING, db_constraint=False,
+        primary_key=True, related_name='+'
+    )
+    turno = _fk_hecho(Turno)
+    fecha = models.DateField()
+    año = models.IntegerField()
+    mes = models.IntegerField()
+    contrato = _fk_hecho(Contrato)
+    maquina = _fk_hecho(Maquina)
+    tipo_turno = _fk_hecho(TipoTurno)
+    trabajador = _fk_hecho(Trabajador)
+    cargo = _fk_hecho(Cargo, null=True)
+    funcion = models.CharField(max_length=30, blank=True)
+    horas_extra = models.DecimalField(max_digits=4, decimal_places=2)
+    metros_turno = models.DecimalField(max_digits=6, decimal_places=2)
+    configuracion_aplicada = _fk_hecho(ConfiguracionHoraExtra, null=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'fact_horas_extras'
+        indexes = [
+            models.Index(fields=['contrato', 'fecha']),
+            models.Index(fields=['trabajador', 'fecha']),
+            models.Index(fields=['contrato', 'año', 'mes']),
+        ]
+
+
+class FactMetaCumplimiento(models.Model):
+    """Cumplimiento de cada meta de máquina (reemplaza vw_cumplimiento_metas)."""
+    meta = models.OneToOneField(
+        MetaMaquina, on_delete=models.DO_NOTHING, db_constraint=False,
+        primary_key=True, related_name='+'
+    )
+    contrato = _fk_hecho(Contrato)
+    maquina = _fk_hecho(Maquina)
+    año = models.IntegerField()
+    mes = models.IntegerField()
+    fecha_inicio_periodo = models.DateField()
+    fecha_fin_periodo = models.DateField()
+    es_periodo_personalizado = models.BooleanField(default=False)
+    meta_metros = models.DecimalField(max_digits=10, decimal_places=2)
+    activo = models.BooleanField(default=True)
+    total_turnos = models.IntegerField(default=0)
+    metros_reales = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    brecha_metros = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    porcentaje_cumplimiento = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    estado_cumplimiento = models.CharField(max_length=20)
+    fecha_primer_turno = models.DateField(null=True)
+    fecha_ultimo_turno = models.DateField(null=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'fact_meta_cumplimiento'
+        indexes = [
+            models.Index(fields=['contrato', 'año', 'mes']),
+            models.Index(fields=['maquina', 'año', 'mes']),
+            models.Index(fields=['fecha_inicio_periodo', 'fecha_fin_periodo']),
+        ]
+
+
+class IngestaTurno(models.Model):
+    """
+    Registro de idempotencia de la API de ingesta por lotes (api/turnos/lote/).
+    
+    Cada turno enviado desde una tablet trae una clave generada en el cliente
+    (ej: UUID). Si la tablet reintenta el envío tras perder la conexión, la
+    clave ya registrada devuelve el turno creado la primera vez en lugar de
+    duplicarlo.
+    """
+    clave = models.CharField(max_length=100, unique=True, verbose_name='Clave de idempotencia')
+    turno = models.ForeignKey(Turno, on_delete=models.CASCADE, related_name='ingestas')
+    hash_payload = models.CharField(
+        max_length=64,
+        help_text='SHA-256 del turno enviado; detecta claves reutilizadas con otros datos'
+    )
+    usuario = models.ForeignKey(CustomUser, on_delete=models.PROTECT, related_name='ingestas_turno')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'ingesta_turno'
+        verbose_name = 'Ingesta de Turno'
+        verbose_name_plural = 'Ingestas de Turnos'
+
+    def __str__(self):
+        return f"{self.clave} → Turno {self.turno_id}"
+
+
+class ArchivoContrato(models.Model):
+    """
+    Contrato finalizado cuyos turnos se movieron a archivos Parquet (archive_contract).
+
+    El manifiesto guarda, por tabla y mes, el archivo, la cantidad de filas, la
+    suma de ids y el SHA-256 del archivo; con eso se verifica la exportación
+    antes de borrar y se puede volver a verificar en cualquier momento.
+    """
+    ESTADO_CHOICES = [
+        ('EXPORTADO', 'Exportado (filas aún en la base de datos)'),
+        ('ARCHIVADO', 'Archivado (filas eliminadas de la base de datos)'),
+    ]
+
+    contrato = models.OneToOneField(Contrato, on_delete=models.PROTECT, related_name='archivo')
+    ruta = models.CharField(max_length=500, help_text='Directorio con los archivos Parquet del contrato')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='EXPORTADO')
+    manifiesto = models.JSONField(default=dict)
+    total_turnos = models.IntegerField(default=0)
+    fecha_desde = models.DateField(null=True, blank=True)
+    fecha_hasta = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'archivo_contrato'
+        verbose_name = 'Contrato Archivado'
+        verbose_name_plural = 'Contratos Archivados'
+
+    def __str__(self):
+        return f"{self.contrato.nombre_contrato} ({self.get_estado_display()})"
+
+
+class CalendarioOperativo(models.Model):
+    """
+    Dimensión de calendario: un registro por día con mes calendario, mes
+    operativo (26-25), semana ISO y semana operativa. Se llena con
+    drilling.utils.calendario.fila_calendario (ver CalendarioOperativo.poblar).
+
+    Para filtrar turnos por período no se une con esta tabla: usar
+    filtro_periodo, que genera un rango sobre la fecha del turno.
+    """
+    fecha = models.DateField(primary_key=True)
+    año = models.IntegerField()
+    mes = models.IntegerField()
+    dia_semana = models.IntegerField(help_text='1 = lunes ... 7 = domingo (ISO)')
+    año_operativo = models.IntegerField()
+    mes_operativo = models.IntegerField()
+    inicio_mes_operativo = models.DateField()
+    fin_mes_operativo = models.DateField()
+    semana_operativa = models.IntegerField(help_text='Semana dentro del mes operativo (1 = desde el día 26)')
+    año_iso = models.IntegerField()
+    semana_iso = models.IntegerField()
+
+    class Meta:
+        db_table = 'calendario_operativo'
+        verbose_name = 'Día del Calendario Operativo'
+        verbose_name_plural = 'Calendario Operativo'
+        indexes = [
+            models.Index(fields=['año', 'mes']),
+            models.Index(fields=['año_operativo', 'mes_operativo']),
+            models.Index(fields=['año_iso', 'semana_iso']),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} (mes operativo {self.año_operativo}-{self.mes_operativo:02d})"
+
+    @classmethod
+    def poblar(cls, desde, hasta):
+        """Crea los días faltantes entre desde y hasta (inclusive). Devuelve la cantidad creada."""
+        from datetime import timedelta
+        from drilling.utils.calendario import fila_calendario
+
+        existentes = set(cls.objects.filter(fecha__gte=desde, fecha__lte=hasta).values_list('fecha', flat=True))
+        dias = []
+        fecha = desde
+        while fecha <= hasta:
+            if fecha not in existentes:
+                dias.append(cls(**fila_calendario(fecha)))
+            fecha += timedelta(days=1)
+        cls.objects.bulk_create(dias, batch_size=1000)
+        return len(dias)
+
+
+class ValorizacionTurno(models.Model):
+    """
+    Libro de valorización: una fila por turno y servicio cobrable, con la
+    cantidad, el precio unitario vigente en la fecha del turno y el monto.
+    Se mantiene con drilling.utils.valorizacion_turnos (al guardar turnos y
+    precios, o con `python manage.py valorizar_turnos`). Solo turnos
+    COMPLETADOS/APROBADOS; las filas sin precio vigente quedan con monto nulo.
+    """
+    UNIDAD_CHOICES = [
+        ('METRO', 'Metro perforado'),
+        ('HORA', 'Hora'),
+    ]
+
+    turno = _fk_hecho(Turno)
+    fecha = models.DateField()
+    contrato = _fk_hecho(Contrato)
+    maquina = _fk_hecho(Maquina)
+    servicio = _fk_hecho(TipoActividad)
+    unidad = models.CharField(max_length=10, choices=UNIDAD_CHOICES)
+    cantidad = models.DecimalField(max_digits=10, decimal_places=2)
+    precio = _fk_hecho(PrecioUnitarioServicio, null=True)
+    precio_unitario = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    moneda = models.CharField(max_length=3, blank=True)
+    monto = models.DecimalField(max_digits=14, decimal_places=2, null=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'valorizacion_turno'
+        verbose_name = 'Valorización de Turno'
+        verbose_name_plural = 'Valorización de Turnos'
+        unique_together = [('turno', 'servicio')]
+        indexes = [
+            models.Index(fields=['contrato', 'fecha']),
+            models.Index(fields=['contrato', 'servicio', 'fecha']),
+        ]
+
+    def __str__(self):
+        monto = f"{self.moneda} {self.monto}" if self.monto is not None else 'sin precio'
+        return f"Turno {self.turno_id} - servicio {self.servicio_id}: {self.cantidad} {self.unidad} = {monto}"
+
+
+class CostoConsumoFIFO(models.Model):
+    """
+    Costeo FIFO de los consumos de stock: cada consumo (ConsumoStock) se
+    reparte entre los lotes (Abastecimiento) del mismo contrato y código de
+    producto en orden de ingreso, sin importar el lote que se eligió al
+    registrarlo. Una fila por consumo y lote; la parte del consumo que excede
+    el stock ingresado queda sin lote y sin costo. Se mantiene con
+    drilling.utils.costeo_fifo (al guardar lotes, consumos y turnos, o con
+    `python manage.py costear_consumos`).
+    """
+    consumo = _fk_hecho(ConsumoStock)
+    turno = _fk_hecho(Turno)
+    fecha = models.DateField()
+    contrato = _fk_hecho(Contrato)
+    codigo_producto = models.CharField(max_length=50, blank=True)
+    familia = models.CharField(max_length=30, choices=Abastecimiento.FAMILIA_CHOICES)
+    lote = _fk_hecho(Abastecimiento, null=True)
+    fecha_lote = models.DateField(null=True)
+    cantidad = models.DecimalField(max_digits=10, decimal_places=2)
+    precio_unitario = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    costo = models.DecimalField(max_digits=14, decimal_places=2, null=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'costo_consumo_fifo'
+        verbose_name = 'Costo FIFO de Consumo'
+        verbose_name_plural = 'Costos FIFO de Consumos'
+        indexes = [
+            models.Index(fields=['contrato', 'codigo_producto', 'fecha']),
+            models.Index(fields=['contrato', 'fecha']),
+            models.Index(fields=['turno']),
+        ]
+
+    def __str__(self):
+        lote = f"lote {self.lote_id}" if self.lote_id else 'sin lote'
+        return f"Consumo {self.consumo_id} - {self.codigo_producto}: {self.cantidad} de {lote}"
+
+
+class MovimientoStock(models.Model):
+    """
+    Libro de movimientos de stock: un ingreso por Abastecimiento y una salida
+    por ConsumoStock, con el saldo acumulado del lote y del producto
+    (contrato, codigo_producto) después de cada movimiento. El saldo a una
+    fecha es el del último movimiento hasta esa fecha (ver
+    drilling.utils.movimientos_stock). Los lotes sin código de producto son su
+    propio producto: su saldo_producto es el del lote.
+    """
+    TIPO_CHOICES = [
+        ('INGRESO', 'Ingreso'),
+        ('CONSUMO', 'Consumo'),
+    ]
+
+    contrato = _fk_hecho(Contrato)
+    codigo_producto = models.CharField(max_length=50, blank=True)
+    familia = models.CharField(max_length=30, choices=Abastecimiento.FAMILIA_CHOICES)
+    lote = _fk_hecho(Abastecimiento)
+    consumo = _fk_hecho(ConsumoStock, null=True)
+    fecha = models.DateField()
+    # Orden dentro del producto: por fecha, ingresos antes que consumos y por id
+    secuencia = models.PositiveIntegerField()
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    cantidad = models.DecimalField(max_digits=12, decimal_places=2, help_text='Positiva en ingresos, negativa en consumos')
+    saldo_lote = models.DecimalField(max_digits=12, decimal_places=2)
+    saldo_producto = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        db_table = 'movimiento_stock'
+        verbose_name = 'Movimiento de Stock'
+        verbose_name_plural = 'Movimientos de Stock'
+        indexes = [
+            models.Index(fields=['contrato', 'codigo_producto', 'fecha', 'secuencia']),
+            models.Index(fields=['contrato', 'fecha']),
+            models.Index(fields=['lote', 'fecha']),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.get_tipo_display()} lote {self.lote_id}: {self.cantidad} (saldo {self.saldo_lote})"
+
+
+FAMILIA_ALMACEN_CHOICES = [
+    ('PDD', 'Productos Diamantados'),
+    ('ADIT', 'Aditivos'),
+]
+
+
+class FotoStockAlmacen(models.Model):
+    """
+    Foto del stock del almacén (API de Vilbragroup, obtener_articulos_almacen)
+    de un contrato y familia en un momento dado. Los artículos quedan en
+    ArticuloStockAlmacen. Solo se guarda una foto nueva cuando cambia el
+    contenido (hash_contenido); si no, se actualiza verificada_en (ver
+    drilling.utils.fotos_almacen).
+    """
+    contrato = models.ForeignKey(Contrato, on_delete=models.CASCADE, related_name='fotos_stock_almacen')
+    centro_costo = models.CharField(max_length=20)
+    familia = models.CharField(max_length=4, choices=FAMILIA_ALMACEN_CHOICES)
+    tomada_en = models.DateTimeField(default=timezone.now)
+    verificada_en = models.DateTimeField(null=True, blank=True, help_text='Última sincronización con el mismo contenido')
+    total_articulos = models.PositiveIntegerField(default=0)
+    hash_contenido = models.CharField(max_length=64, blank=True)
+
+    class Meta:
+        db_table = 'foto_stock_almacen'
+        verbose_name = 'Foto de Stock de Almacén'
+        verbose_name_plural = 'Fotos de Stock de Almacén'
+        indexes = [
+            models.Index(fields=['contrato', 'familia', '-tomada_en']),
+            models.Index(fields=['centro_costo', 'familia', '-tomada_en']),
+        ]
+
+    def __str__(self):
+        return f"{self.contrato.nombre_contrato} - {self.familia} ({self.tomada_en:%Y-%m-%d %H:%M})"
+
+
+class ArticuloStockAlmacen(models.Model):
+    foto = models.ForeignKey(FotoStockAlmacen, on_delete=models.CASCADE, related_name='articulos')
+    codigo = models.CharField(max_length=50, blank=True)
+    serie = models.CharField(max_length=50, blank=True)
+    descripcion = models.CharField(max_length=255, blank=True)
+    unidad = models.CharField(max_length=20, blank=True)
+    stock = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        db_table = 'foto_stock_almacen_articulo'
+        verbose_name = 'Artículo de Foto de Stock'
+        verbose_name_plural = 'Artículos de Foto de Stock'
+        indexes = [
+            models.Index(fields=['foto', 'codigo']),
+        ]
+
+    def __str__(self):
+        return f"{self.codigo} {self.serie}: {self.stock}".strip()
+
+
+class CambioStockAlmacen(models.Model):
+    """Diferencia de stock de un artículo entre una foto del almacén y la anterior."""
+    TIPO_CHOICES = [
+        ('ALTA', 'Nuevo en almacén'),
+        ('BAJA', 'Ya no está en almacén'),
+        ('CAMBIO', 'Cambio de stock'),
+    ]
+
+    foto = models.ForeignKey(FotoStockAlmacen, on_delete=models.CASCADE, related_name='cambios')
+    foto_anterior = models.ForeignKey(FotoStockAlmacen, on_delete=models.SET_NULL, null=True, related_name='+')
+    codigo = models.CharField(max_length=50, blank=True)
+    serie = models.CharField(max_length=50, blank=True)
+    descripcion = models.CharField(max_length=255, blank=True)
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    stock_anterior = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    stock_nuevo = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'foto_stock_almacen_cambio'
+        verbose_name = 'Cambio de Stock de Almacén'
+        verbose_name_plural = 'Cambios de Stock de Almacén'
+        indexes = [
+            models.Index(fields=['foto', 'tipo']),
+        ]
+
+    def __str__(self):
+        return f"{self.codigo} {self.serie}: {self.stock_anterior} -> {self.stock_nuevo}"
+
+
+class DiscrepanciaStock(models.Model):
+    """
+    Diferencia entre el stock del almacén (última foto conciliada) y el saldo
+    local de abastecimientos y consumos (movimiento_stock). Cada conciliación
+    reemplaza las discrepancias del contrato y familia (ver
+    drilling.utils.conciliacion_stock).
+    """
+    TIPO_CHOICES = [
+        ('SOLO_ALMACEN', 'Solo en almacén'),
+        ('SOLO_LOCAL', 'Solo en registro local'),
+        ('DIFERENCIA', 'Cantidad distinta'),
+    ]
+
+    contrato = models.ForeignKey(Contrato, on_delete=models.CASCADE, related_name='discrepancias_stock')
+    foto = models.ForeignKey(FotoStockAlmacen, on_delete=models.CASCADE, related_name='discrepancias')
+    familia = models.CharField(max_length=4, choices=FAMILIA_ALMACEN_CHOICES)
+    codigo = models.CharField(max_length=50, blank=True)
+    serie = models.CharField(max_length=50, blank=True)
+    descripcion = models.CharField(max_length=255, blank=True)
+    tipo = models.CharField(max_length=15, choices=TIPO_CHOICES)
+    stock_almacen = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    stock_local = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    diferencia = models.DecimalField(max_digits=12, decimal_places=2, help_text='Almacén menos local')
+
+    class Meta:
+        db_table = 'discrepancia_stock'
+        verbose_name = 'Discrepancia de Stock'
+        verbose_name_plural = 'Discrepancias de Stock'
+        ordering = ['contrato', 'familia', 'codigo', 'serie']
+        indexes = [
+            models.Index(fields=['contrato', 'familia']),
+        ]
+
+    def __str__(self):
+        return f"{self.familia} {self.codigo} {self.serie}: {self.get_tipo_display()} ({self.diferencia})"
@@ -3,12 +3,26 @@ from django.urls import reverse
 from django.utils import timezone
 from .models import *
 import json
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client
 from django.urls import reverse
 from django.utils import timezone
 from .models import *
+import importlib.util
+import io
 import json
+import os
+import tempfile
+import time
+import unittest
 from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
 
 
 class TurnoStateTests(TestCase):
@@ -150,3 +164,1887 @@ class TurnoStateTests(TestCase):
             msgs = [str(m) for m in response.context['messages']]
         self.assertTrue(any('Faltan horas al turno' in m for m in msgs), f"Messages did not contain expected text. Got: {msgs}")
 
+
+
+class DatosBenchmarkTestCase(TestCase):
+    """
+    Base de los tests que trabajan sobre un dataset de seed_benchmark_data.
+    Las subclases solo declaran en TAMANO lo que cambian respecto de
+    TAMANO_BASE; la caché se limpia antes de cada test.
+    """
+    TAMANO_BASE = {'contratos': 1, 'maquinas': 1, 'trabajadores': 4, 'sondajes': 1, 'brocas': 2, 'dias': 10}
+    TAMANO = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_benchmark_data', allow_remote=True, stdout=io.StringIO(), **{**cls.TAMANO_BASE, **cls.TAMANO}
+        )
+
+    def setUp(self):
+        cache.clear()
+
+
+class BenchmarkCommandsTests(TestCase):
+    """Smoke test of seed_benchmark_data + run_benchmarks on a minimal dataset."""
+
+    def setUp(self):
+        call_command(
+            'seed_benchmark_data', contratos=1, maquinas=1, trabajadores=4, sondajes=1,
+            brocas=2, dias=10, allow_remote=True, stdout=io.StringIO(),
+        )
+
+    def test_seed_creates_dataset_and_refuses_duplicates(self):
+        from django.core.management.base import CommandError
+        self.assertEqual(Turno.objects.filter(contrato__nombre_contrato__startswith='BENCH').count(), 20)
+        self.assertTrue(TurnoCorrida.objects.exists())
+        with self.assertRaises(CommandError):
+            call_command('seed_benchmark_data', dias=10, allow_remote=True, stdout=io.StringIO())
+
+    def test_run_benchmarks_writes_results(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            salida = os.path.join(tmp, 'bench.json')
+            call_command(
+                'run_benchmarks', only='dashboard_gerencia,listar_turnos,recalcular_horas_extras',
+                iterations=1, warmup=0, output=salida, allow_remote=True, stdout=io.StringIO(),
+            )
+            with open(salida, encoding='utf-8') as f:
+                reporte = json.load(f)
+        resultados = {r['nombre']: r for r in reporte['results']}
+        self.assertEqual(set(resultados), {'dashboard_gerencia', 'listar_turnos', 'recalcular_horas_extras'})
+        for resultado in resultados.values():
+            self.assertIsNone(resultado['error'])
+            self.assertGreater(resultado['queries'], 0)
+        # Las corridas se revierten: no quedan turnos nuevos ni datos alterados
+        self.assertEqual(Turno.objects.count(), 20)
+
+
+class BiFactsTests(DatosBenchmarkTestCase):
+    """refresh_bi_facts: reconstrucción completa y refresco incremental por marca de agua."""
+
+    def _refrescar(self, **opciones):
+        from .utils.bi_facts import refrescar_hechos
+        # Sin margen de solape para que el test distinga lo nuevo de lo ya procesado
+        with mock.patch('drilling.utils.bi_facts.SOLAPE', timedelta(0)):
+            return refrescar_hechos(**opciones)
+
+    def test_refresco_completo_e_incremental(self):
+        call_command('refresh_bi_facts', stdout=io.StringIO())
+        self.assertEqual(FactTurno.objects.count(), Turno.objects.count())
+        self.assertEqual(FactComplemento.objects.count(), TurnoComplemento.objects.count())
+        self.assertEqual(FactHorasExtras.objects.count(), TurnoHoraExtra.objects.count())
+        metas = list(MetaMaquina.objects.all())
+        self.assertTrue(metas)
+        reales = MetaMaquina.calcular_metros_reales(metas)
+        for hecho in FactMetaCumplimiento.objects.all():
+            self.assertEqual(hecho.metros_reales, reales[hecho.meta_id]['metros'])
+
+        # Sin cambios no se reprocesa nada
+        self.assertEqual(self._refrescar()['turnos'], 0)
+
+        turno, eliminado = Turno.objects.filter(avance__isnull=False).order_by('fecha')[:2]
+        turno.estado = 'APROBADO'
+        turno.save(update_fields=['estado', 'updated_at'])
+        eliminado.delete()
+
+        resumen = self._refrescar()
+        self.assertEqual((resumen['modo'], resumen['turnos'], resumen['turnos_eliminados']), ('incremental', 1, 1))
+        self.assertEqual(FactTurno.objects.get(turno=turno).estado, 'APROBADO')
+        self.assertFalse(FactTurno.objects.filter(turno_id=eliminado.pk).exists())
+        self.assertFalse(FactHorasExtras.objects.filter(turno_id=eliminado.pk).exists())
+        reales = MetaMaquina.calcular_metros_reales(MetaMaquina.objects.all())
+        for hecho in FactMetaCumplimiento.objects.all():
+            self.assertEqual(hecho.metros_reales, reales[hecho.meta_id]['metros'])
+
+    def test_cambios_en_tablas_hijas(self):
+        self._refrescar(completo=True)
+        self.assertEqual(self._refrescar()['turnos'], 0)
+
+        estado_maquina = TurnoMaquina.objects.exclude(horometro_fin=None).order_by('turno__fecha').first()
+        estado_maquina.horometro_fin += 3
+        estado_maquina.save()
+        complemento = TurnoComplemento.objects.exclude(turno=estado_maquina.turno).first()
+        TurnoComplemento.objects.filter(pk=complemento.pk).update(codigo_serie='EDITADO')
+        hora_extra = TurnoHoraExtra.objects.exclude(
+            turno__in=[estado_maquina.turno_id, complemento.turno_id]
+        ).first()
+        TurnoHoraExtra.objects.filter(pk=hora_extra.pk).delete()
+
+        resumen = self._refrescar()
+        self.assertEqual(resumen['turnos'], 3)
+        self.assertEqual(
+            FactTurno.objects.get(turno=estado_maquina.turno_id).horometro_fin, estado_maquina.horometro_fin
+        )
+        self.assertEqual(FactComplemento.objects.get(complemento=complemento.pk).codigo_serie, 'EDITADO')
+        self.assertFalse(FactHorasExtras.objects.filter(hora_extra=hora_extra.pk).exists())
+        self.assertEqual(FactHorasExtras.objects.count(), TurnoHoraExtra.objects.count())
+
+
+class BootProfileTests(TestCase):
+    def test_arranque_no_carga_librerias_de_excel(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            salida = os.path.join(tmp, 'boot.json')
+            call_command('boot_profile', top=5, output=salida, stdout=io.StringIO())
+            with open(salida, encoding='utf-8') as f:
+                perfil = json.load(f)
+        self.assertEqual(perfil['librerias_cargadas'], [])
+        self.assertIn('drilling.views', {m['modulo'] for m in perfil['modulos']})
+        self.assertGreater(perfil['setup_ms'], 0)
+
+
+class IngestaTurnosLoteTests(DatosBenchmarkTestCase):
+    """api/turnos/lote/: creación por lotes, reintentos idempotentes y errores por turno."""
+    TAMANO = {'maquinas': 2, 'dias': 2}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.usuario = CustomUser.objects.get(username__startswith='bench_residente')
+        cls.contrato = cls.usuario.contrato
+        cls.maquinas = list(Maquina.objects.filter(contrato=cls.contrato).order_by('pk'))
+        cls.sondaje = Sondaje.objects.filter(contrato=cls.contrato).first()
+        cls.tipo_turno = TipoTurno.objects.first()
+        cls.dnis = list(Trabajador.objects.filter(contrato=cls.contrato).values_list('dni', flat=True)[:2])
+        cls.tipo_complemento = TipoComplemento.objects.first()
+        cls.actividad = TipoActividad.objects.first()
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.usuario)
+
+    def _turno(self, clave, maquina, **extra):
+        turno = {
+            'clave': clave,
+            'fecha': '2031-01-15',
+            'maquina_id': maquina.pk,
+            'tipo_turno_id': self.tipo_turno.pk,
+            'sondajes': [{'sondaje_id': self.sondaje.pk, 'metros': 40}],
+            'maquina': {'horometro_inicio': 100, 'horometro_fin': 110},
+            'trabajadores': [
+                {'dni': self.dnis[0], 'funcion': 'PERFORISTA'},
+                {'dni': self.dnis[1], 'funcion': 'AYUDANTE'},
+            ],
+            'complementos': [{
+                'tipo_complemento_id': self.tipo_complemento.pk, 'codigo_serie': f'LOTE-{clave}',
+                'metros_inicio': 0, 'metros_fin': 40, 'sondaje_id': self.sondaje.pk,
+            }],
+            'actividades': [{'actividad_id': self.actividad.pk, 'hora_inicio': '07:00', 'hora_fin': '19:00'}],
+            'corridas': [{
+                'corrida_numero': 1, 'desde': 0, 'hasta': 3, 'longitud_testigo': 2.9,
+                'pct_recuperacion': 96.7, 'pct_retorno_agua': 80, 'litologia': 'Andesita',
+            }],
+        }
+        turno.update(extra)
+        return turno
+
+    def _enviar(self, turnos):
+        respuesta = self.client.post(
+            reverse('api-turnos-lote'), data=json.dumps({'turnos': turnos}), content_type='application/json'
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_crea_valida_y_reintento_es_idempotente(self):
+        horometro_inicial = Maquina.objects.get(pk=self.maquinas[0].pk).horometro
+        lote = [
+            self._turno('tab-1', self.maquinas[0]),
+            self._turno('tab-2', self.maquinas[1]),
+            self._turno('tab-3', self.maquinas[0], maquina_id=999999),
+            # Mismo turno que tab-1 con otra clave: choca con unique_together
+            self._turno('tab-4', self.maquinas[0]),
+        ]
+        resultado = self._enviar(lote)
+        self.assertEqual((resultado['creados'], resultado['duplicados'], resultado['errores']), (2, 0, 2))
+        estados = [r['estado'] for r in resultado['resultados']]
+        self.assertEqual(estados, ['CREADO', 'CREADO', 'ERROR', 'ERROR'])
+
+        turno = Turno.objects.get(pk=resultado['resultados'][0]['turno_id'])
+        self.assertEqual(turno.estado, 'COMPLETADO')
+        self.assertEqual(turno.trabajadores_turno.count(), 2)
+        self.assertEqual(turno.avance.metros_perforados, Decimal('40'))
+        self.assertEqual(turno.maquina_estado.horas_trabajadas_calc, Decimal('10'))
+        self.assertEqual(turno.corridas.get().total_calc, Decimal('3'))
+        self.assertEqual(HistorialBroca.objects.get(serie='LOTE-tab-1').numero_usos, 1)
+        self.assertEqual(Maquina.objects.get(pk=self.maquinas[0].pk).horometro, horometro_inicial + 10)
+
+        # Reintento tras un corte de conexión: nada se duplica
+        total_turnos = Turno.objects.count()
+        reintento = self._enviar(lote[:2])
+        self.assertEqual(reintento['duplicados'], 2)
+        self.assertEqual(
+            [r['turno_id'] for r in reintento['resultados']],
+            [r['turno_id'] for r in resultado['resultados'][:2]],
+        )
+        self.assertEqual(Turno.objects.count(), total_turnos)
+
+        # La misma clave con otros datos se rechaza
+        conflicto = self._enviar([self._turno('tab-1', self.maquinas[0], fecha='2031-01-16')])
+        self.assertEqual(conflicto['resultados'][0]['estado'], 'ERROR')
+
+    def test_valida_horas_y_formato(self):
+        resultado = self._enviar([
+            self._turno('corto', self.maquinas[0], actividades=[
+                {'actividad_id': self.actividad.pk, 'hora_inicio': '07:00', 'hora_fin': '09:00'}
+            ]),
+            self._turno('', self.maquinas[1]),
+        ])
+        self.assertEqual(resultado['creados'], 0)
+        self.assertIn('Faltan horas', resultado['resultados'][0]['errores'][0])
+        self.assertIn('clave', resultado['resultados'][1]['errores'][0])
+        respuesta = self.client.post(reverse('api-turnos-lote'), data='no-json', content_type='application/json')
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class AprobacionTurnosLoteTests(DatosBenchmarkTestCase):
+    """turnos/aprobar-lote/: un UPDATE condicional, alcance por contrato y refresco de hechos."""
+    TAMANO = {'contratos': 2, 'maquinas': 2}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        call_command('refresh_bi_facts', stdout=io.StringIO())
+        cls.residente = CustomUser.objects.filter(username__startswith='bench_residente').order_by('username').first()
+        cls.contrato = cls.residente.contrato
+        cls.otro_contrato = Contrato.objects.exclude(pk=cls.contrato.pk).filter(nombre_contrato__contains='Contrato').first()
+        fechas = Turno.objects.filter(contrato=cls.contrato).order_by('fecha').values_list('fecha', flat=True)
+        cls.desde, cls.hasta = fechas.first(), fechas.last()
+
+    def _estados(self, contrato):
+        return dict(Turno.objects.filter(contrato=contrato).values_list('estado').annotate(n=Count('id')).order_by())
+
+    def test_aprueba_completados_del_contrato_con_un_update(self):
+        self.client.force_login(self.residente)
+        antes = self._estados(self.contrato)
+        otro_antes = self._estados(self.otro_contrato)
+        self.assertTrue(antes.get('COMPLETADO'))
+        filtros = {'fecha_desde': self.desde.isoformat(), 'fecha_hasta': self.hasta.isoformat()}
+        preview = self.client.get(reverse('turnos-aprobar-lote'), filtros)
+        self.assertEqual(preview.context['a_aprobar'], antes['COMPLETADO'])
+
+        with CaptureQueriesContext(connections['default']) as ctx:
+            respuesta = self.client.post(reverse('turnos-aprobar-lote'), filtros)
+        self.assertRedirects(respuesta, reverse('listar-turnos'), fetch_redirect_response=False)
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "turnos"')]
+        self.assertEqual(len(updates), 1)
+
+        despues = self._estados(self.contrato)
+        self.assertNotIn('COMPLETADO', despues)
+        self.assertEqual(despues.get('BORRADOR'), antes.get('BORRADOR'))
+        self.assertEqual(despues['APROBADO'], antes.get('APROBADO', 0) + antes['COMPLETADO'])
+        self.assertEqual(self._estados(self.otro_contrato), otro_antes)
+        self.assertEqual(
+            set(FactTurno.objects.filter(contrato=self.contrato).values_list('estado', flat=True)),
+            set(despues),
+        )
+
+    def test_residente_no_puede_aprobar_otro_contrato(self):
+        self.client.force_login(self.residente)
+        otro_antes = self._estados(self.otro_contrato)
+        respuesta = self.client.post(
+            reverse('api-turnos-aprobar-lote'),
+            data=json.dumps({
+                'contrato_id': self.otro_contrato.pk,
+                'fecha_desde': self.desde.isoformat(), 'fecha_hasta': self.hasta.isoformat(),
+            }),
+            content_type='application/json',
+        )
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(self._estados(self.otro_contrato), otro_antes)
+
+    def test_api_filtra_por_maquina(self):
+        gerencia = CustomUser.objects.get(username__startswith='bench_gerencia')
+        self.client.force_login(gerencia)
+        maquina = Maquina.objects.filter(contrato=self.contrato).order_by('pk').first()
+        completados = set(Turno.objects.filter(maquina=maquina, estado='COMPLETADO').values_list('pk', flat=True))
+        respuesta = self.client.post(
+            reverse('api-turnos-aprobar-lote'),
+            data=json.dumps({
+                'contrato_id': self.contrato.pk, 'maquina_ids': [maquina.pk],
+                'fecha_desde': self.desde.isoformat(), 'fecha_hasta': self.hasta.isoformat(),
+            }),
+            content_type='application/json',
+        )
+        data = respuesta.json()
+        self.assertTrue(data['success'])
+        self.assertEqual(set(data['turno_ids']), completados)
+        self.assertTrue(Turno.objects.filter(contrato=self.contrato, estado='COMPLETADO').exclude(maquina=maquina).exists())
+
+
+class ExportacionStreamingTests(DatosBenchmarkTestCase):
+    """?exportar=csv|xlsx: resultado completo con los filtros del listado, sin el límite de 100."""
+    TAMANO = {'maquinas': 3, 'dias': 40}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.gerencia = CustomUser.objects.get(username__startswith='bench_gerencia')
+        cls.residente = CustomUser.objects.filter(username__startswith='bench_residente').first()
+
+    def _contenido(self, respuesta):
+        self.assertTrue(respuesta.streaming)
+        return b''.join(respuesta.streaming_content)
+
+    def test_csv_de_turnos_respeta_filtros_y_no_limita(self):
+        import csv
+        self.client.force_login(self.residente)
+        turnos = Turno.objects.filter(contrato=self.residente.contrato)
+        self.assertGreater(turnos.count(), 100)
+        desde = turnos.order_by('fecha').values_list('fecha', flat=True)[5]
+
+        respuesta = self.client.get(reverse('listar-turnos'), {'exportar': 'csv', 'fecha_desde': desde.isoformat()})
+        self.assertEqual(respuesta['Content-Type'], 'text/csv; charset=utf-8')
+        filas = list(csv.reader(io.StringIO(self._contenido(respuesta).decode('utf-8-sig'))))
+        self.assertEqual(filas[0][:2], ['ID', 'Fecha'])
+        self.assertEqual(len(filas) - 1, turnos.filter(fecha__gte=desde).count())
+
+    def test_xlsx_de_horas_extras_completo(self):
+        from openpyxl import load_workbook
+        self.client.force_login(self.gerencia)
+        total = TurnoHoraExtra.objects.count()
+        self.assertGreater(total, 0)
+
+        respuesta = self.client.get(reverse('reporte-horas-extras'), {'exportar': 'xlsx'})
+        libro = load_workbook(io.BytesIO(self._contenido(respuesta)), read_only=True)
+        filas = list(libro.active.iter_rows(values_only=True))
+        self.assertEqual(filas[0][0], 'Fecha')
+        self.assertEqual(len(filas) - 1, total)
+
+    def test_gestion_proyectos_exporta_contrato_seleccionado(self):
+        self.client.force_login(self.gerencia)
+        contrato = self.residente.contrato
+        respuesta = self.client.get(
+            reverse('gestion-proyectos-stock-turnos'), {'contrato': contrato.pk, 'exportar': 'csv'}
+        )
+        lineas = self._contenido(respuesta).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lineas) - 1, Turno.objects.filter(contrato=contrato).count())
+
+
+class ParticionesTurnosTests(DatosBenchmarkTestCase):
+    """fecha_turno desnormalizada en las tablas hijas (clave de partición) y partition_turnos."""
+    TAMANO = {'dias': 3}
+
+    def test_bulk_create_y_save_completan_fecha_turno(self):
+        for modelo in (TurnoAvance, TurnoTrabajador, TurnoActividad, TurnoComplemento, TurnoHoraExtra):
+            self.assertFalse(modelo.objects.filter(fecha_turno__isnull=True).exists(), modelo.__name__)
+            self.assertFalse(modelo.objects.exclude(fecha_turno=models.F('turno__fecha')).exists(), modelo.__name__)
+
+        avance = TurnoAvance.objects.first()
+        avance.fecha_turno = None
+        avance.save(update_fields=['metros_perforados'])
+        avance.refresh_from_db()
+        self.assertEqual(avance.fecha_turno, avance.turno.fecha)
+
+    def test_cambio_de_fecha_del_turno_se_propaga(self):
+        turno = Turno.objects.filter(avance__isnull=False).first()
+        nueva = turno.fecha + timedelta(days=400)
+        turno.fecha = nueva
+        turno.save()
+        self.assertEqual(TurnoAvance.objects.get(turno=turno).fecha_turno, nueva)
+        self.assertEqual(set(turno.trabajadores_turno.values_list('fecha_turno', flat=True)), {nueva})
+
+    def test_meses_entre(self):
+        from datetime import date
+        from .utils.particiones import meses_entre, sumar_meses
+        self.assertEqual(
+            list(meses_entre(date(2024, 11, 20), date(2025, 2, 1))),
+            [date(2024, 11, 1), date(2024, 12, 1), date(2025, 1, 1), date(2025, 2, 1)],
+        )
+        self.assertEqual(sumar_meses(date(2024, 12, 15), 1), date(2025, 1, 1))
+
+    @unittest.skipUnless(connections['default'].vendor == 'postgresql', 'Requiere PostgreSQL 15+')
+    def test_convertir_turnos_en_postgres(self):
+        from .utils.particiones import (
+            VERSION_MINIMA, convertir_tabla, esta_particionada, nombre_default, particiones,
+        )
+        conexion = connections['default']
+        if conexion.pg_version < VERSION_MINIMA:
+            self.skipTest('Requiere PostgreSQL 15+')
+        turnos, avances = Turno.objects.count(), TurnoAvance.objects.count()
+        max_id = Turno.objects.aggregate(maximo=models.Max('id'))['maximo']
+
+        with conexion.cursor() as cursor:
+            # Vistas como las de Power BI: una sobre turnos y otra sobre esa vista
+            cursor.execute('CREATE VIEW vw_prueba_turnos AS SELECT id, fecha FROM turnos')
+            cursor.execute(
+                "CREATE VIEW vw_prueba_meses AS SELECT date_trunc('month', fecha) AS mes, COUNT(*) AS n "
+                'FROM vw_prueba_turnos GROUP BY 1'
+            )
+            cursor.execute('GRANT SELECT ON vw_prueba_meses TO PUBLIC')
+            resumen = convertir_tabla(cursor, 'turnos', 1)
+            self.assertEqual(resumen['vistas_recreadas'], ['vw_prueba_turnos', 'vw_prueba_meses'])
+            self.assertEqual(resumen['filas'], turnos)
+            convertir_tabla(cursor, 'turno_avance', 1)
+            self.assertTrue(esta_particionada(cursor, 'turnos') and esta_particionada(cursor, 'turno_avance'))
+            self.assertTrue(particiones(cursor, 'turnos'))
+
+            cursor.execute('SELECT SUM(n) FROM vw_prueba_meses')
+            self.assertEqual(cursor.fetchone()[0], turnos)
+            cursor.execute("SELECT has_table_privilege('public', 'vw_prueba_meses', 'SELECT')")
+            self.assertTrue(cursor.fetchone()[0])
+
+            # PK con la clave de partición y la secuencia sigue después del último id
+            cursor.execute("SELECT pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = 'turnos'::regclass AND contype = 'p'")
+            self.assertEqual(cursor.fetchone()[0], 'PRIMARY KEY (id, fecha)')
+            cursor.execute("SELECT nextval(pg_get_serial_sequence('turnos', 'id'))")
+            self.assertGreater(cursor.fetchone()[0], max_id)
+
+            # FK compuesta de la hija hacia turnos
+            cursor.execute(
+                "SELECT pg_get_constraintdef(oid) FROM pg_constraint WHERE conname = 'turno_avance_turno_fecha_fk'"
+            )
+            definicion = cursor.fetchone()[0]
+            self.assertIn('FOREIGN KEY (turno_id, fecha_turno) REFERENCES turnos(id, fecha)', definicion)
+            self.assertIn('ON UPDATE CASCADE', definicion)
+
+        self.assertEqual((Turno.objects.count(), TurnoAvance.objects.count()), (turnos, avances))
+
+        # Cambiar la fecha del turno mueve al hijo de partición
+        turno = Turno.objects.filter(avance__isnull=False).first()
+        nueva = turno.fecha - timedelta(days=400)
+        Turno.objects.filter(pk=turno.pk).update(fecha=nueva)
+        with conexion.cursor() as cursor:
+            cursor.execute('SELECT tableoid::regclass::text, fecha_turno FROM turno_avance WHERE turno_id = %s', [turno.pk])
+            self.assertEqual(cursor.fetchone(), (nombre_default('turno_avance'), nueva))
+
+    @unittest.skipIf(connections['default'].vendor == 'postgresql', 'Solo aplica fuera de PostgreSQL')
+    def test_comando_rechaza_motores_sin_particiones(self):
+        from django.core.management.base import CommandError
+        with self.assertRaisesMessage(CommandError, 'PostgreSQL'):
+            call_command('partition_turnos', stdout=io.StringIO())
+
+
+class ArchivoContratoTests(DatosBenchmarkTestCase):
+    """archive_contract: exporta a Parquet, verifica, borra y el reporte se lee de los archivos."""
+    TAMANO = {'maquinas': 2, 'dias': 40}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.gerencia = CustomUser.objects.get(username__startswith='bench_gerencia')
+        cls.contrato = Contrato.objects.get(nombre_contrato__startswith='BENCH')
+        Contrato.objects.filter(pk=cls.contrato.pk).update(estado='FINALIZADO')
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        override = self.settings(ARCHIVO_PARQUET_DIR=directorio.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _archivar(self, *args):
+        salida = io.StringIO()
+        call_command('archive_contract', self.contrato.pk, *args, stdout=salida)
+        return salida.getvalue()
+
+    def test_archiva_verifica_y_reporta(self):
+        from django.db.models import Sum
+        turnos = Turno.objects.filter(contrato=self.contrato)
+        total_turnos = turnos.count()
+        metros = TurnoAvance.objects.filter(turno__contrato=self.contrato).aggregate(t=Sum('metros_perforados'))['t']
+        self.assertGreater(total_turnos, 0)
+
+        costeo = CostoConsumoFIFO.objects.filter(contrato=self.contrato).count()
+        movimientos = MovimientoStock.objects.filter(contrato=self.contrato).count()
+        self.assertGreater(costeo, 0)
+        self.assertGreater(movimientos, 0)
+
+        self._archivar()
+        archivo = ArchivoContrato.objects.get(contrato=self.contrato)
+        self.assertEqual(archivo.estado, 'ARCHIVADO')
+        self.assertEqual(archivo.total_turnos, total_turnos)
+        self.assertFalse(turnos.exists())
+        # El costeo FIFO se archiva y no queda huérfano; reconstruir no lo revive
+        self.assertEqual(sum(i['filas'] for i in archivo.manifiesto['costo_consumo_fifo'].values()), costeo)
+        self.assertFalse(CostoConsumoFIFO.objects.filter(contrato=self.contrato).exists())
+        self.assertEqual(sum(i['filas'] for i in archivo.manifiesto['movimiento_stock'].values()), movimientos)
+        self.assertFalse(MovimientoStock.objects.filter(contrato=self.contrato).exists())
+        from .utils.costeo_fifo import recalcular_costeo
+        recalcular_costeo()
+        self.assertFalse(CostoConsumoFIFO.objects.filter(contrato=self.contrato).exists())
+        self.assertFalse(MovimientoStock.objects.filter(contrato=self.contrato).exists())
+        self.assertIn('Archivos íntegros', self._archivar('--verificar'))
+
+        self.client.force_login(self.gerencia)
+        respuesta = self.client.get(reverse('reporte-contrato-archivado', args=[self.contrato.pk]))
+        self.assertEqual(respuesta.status_code, 200)
+        totales = respuesta.context['resumen']['totales']
+        self.assertEqual(totales['turnos'], total_turnos)
+        self.assertAlmostEqual(totales['metros'], float(metros), places=2)
+
+    def test_archivo_alterado_falla_la_verificacion(self):
+        from django.core.management.base import CommandError
+        from .utils.archivo_contrato import directorio_contrato
+        self._archivar('--solo-exportar')
+        self.assertTrue(Turno.objects.filter(contrato=self.contrato).exists())
+
+        archivo = next((directorio_contrato(self.contrato.pk) / 'turnos').glob('*.parquet'))
+        with open(archivo, 'ab') as f:
+            f.write(b'x')
+        with self.assertRaisesMessage(CommandError, 'checksum'):
+            self._archivar('--verificar')
+        # Con la exportación inválida no se borra nada
+        with self.assertRaisesMessage(CommandError, 'Verificación fallida'):
+            self._archivar()
+        self.assertTrue(Turno.objects.filter(contrato=self.contrato).exists())
+
+    def test_solo_contratos_finalizados(self):
+        from django.core.management.base import CommandError
+        Contrato.objects.filter(pk=self.contrato.pk).update(estado='ACTIVO')
+        with self.assertRaisesMessage(CommandError, 'FINALIZADOS'):
+            self._archivar()
+
+
+class ExportFactsTests(DatosBenchmarkTestCase):
+    """export_facts: datasets Parquet por contrato y mes, iguales a la base de datos."""
+    TAMANO = {'contratos': 2, 'dias': 40}
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.destino = directorio.name
+
+    def _exportar(self, *args):
+        call_command('export_facts', '--format', 'parquet', '--destino', self.destino, *args, stdout=io.StringIO())
+
+    def test_datasets_coinciden_con_la_base_de_datos(self):
+        from django.db.models import Sum
+        from .utils.hechos_parquet import leer_dataset
+        self._exportar()
+
+        turnos = leer_dataset(self.destino, 'turnos')
+        self.assertEqual(turnos.num_rows, Turno.objects.count())
+        por_contrato = dict(Turno.objects.values('contrato_id').annotate(n=Count('id')).values_list('contrato_id', 'n'))
+        contratos = turnos.column('contrato_id').to_pylist()
+        self.assertEqual({c: contratos.count(c) for c in por_contrato}, por_contrato)
+        meses = {f'{f:%Y-%m}' for f in Turno.objects.values_list('fecha', flat=True)}
+        self.assertEqual(set(turnos.column('mes').to_pylist()), meses)
+
+        metros = sum(v for v in turnos.column('metros_perforados').to_pylist() if v is not None)
+        self.assertEqual(metros, TurnoAvance.objects.aggregate(t=Sum('metros_perforados'))['t'])
+
+        actividades = leer_dataset(self.destino, 'actividades', columnas=['es_cobrable'])
+        self.assertEqual(actividades.num_rows, TurnoActividad.objects.count())
+        self.assertEqual(
+            actividades.column('es_cobrable').to_pylist().count(True),
+            TurnoActividad.objects.filter(actividad__es_cobrable=True).count(),
+        )
+        self.assertEqual(leer_dataset(self.destino, 'metas').num_rows, MetaMaquina.objects.count())
+
+    def test_reexportar_un_mes_reemplaza_sus_particiones(self):
+        import pyarrow.dataset as ds
+        from .utils.hechos_parquet import leer_dataset
+        self._exportar('--datasets', 'turnos')
+        ultimo = Turno.objects.order_by('-fecha').first()
+        mes = f'{ultimo.fecha:%Y-%m}'
+        del_mes = Turno.objects.filter(contrato=ultimo.contrato, fecha__year=ultimo.fecha.year, fecha__month=ultimo.fecha.month)
+        otros = Turno.objects.count() - del_mes.count()
+        del_mes.delete()
+
+        self._exportar('--datasets', 'turnos', '--desde', mes, '--contratos', str(ultimo.contrato_id))
+        filtro = (ds.field('mes') == mes) & (ds.field('contrato_id') == ultimo.contrato_id)
+        self.assertEqual(leer_dataset(self.destino, 'turnos', filtro=filtro).num_rows, 0)
+        self.assertEqual(leer_dataset(self.destino, 'turnos').num_rows, otros)
+
+    def test_mes_invalido(self):
+        from django.core.management.base import CommandError
+        with self.assertRaisesMessage(CommandError, 'YYYY-MM'):
+            self._exportar('--desde', '2025/01')
+
+
+class AnaliticaDuckDBTests(DatosBenchmarkTestCase):
+    """Reportes DuckDB sobre los datasets de export_facts, iguales al ORM."""
+    TAMANO = {'contratos': 2, 'maquinas': 2, 'dias': 40}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.gerencia = CustomUser.objects.get(username__startswith='bench_gerencia')
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        override = self.settings(HECHOS_PARQUET_DIR=directorio.name, ANALITICA_FUENTE='parquet')
+        override.enable()
+        self.addCleanup(override.disable)
+        call_command('export_facts', stdout=io.StringIO())
+
+    def test_metros_por_maquina_mes(self):
+        from django.db.models import Sum
+        from .utils.analitica import conectar, metros_por_maquina_mes
+        contrato = Contrato.objects.filter(turnos__isnull=False).first()
+        with conectar() as con:
+            todas = metros_por_maquina_mes(con)
+            filtradas = metros_por_maquina_mes(con, contratos=[contrato.pk])
+
+        self.assertEqual(sum(f['turnos'] for f in todas), Turno.objects.count())
+        esperado = TurnoAvance.objects.filter(turno__contrato=contrato).aggregate(t=Sum('metros_perforados'))['t']
+        self.assertAlmostEqual(sum(f['metros'] for f in filtradas), float(esperado), places=2)
+        self.assertEqual({f['contrato'] for f in filtradas}, {contrato.nombre_contrato})
+
+    def test_aditivos_y_brocas(self):
+        from django.db.models import Sum
+        from .utils.analitica import conectar, consumo_aditivos_por_metro, rendimiento_brocas
+        with conectar() as con:
+            aditivos = consumo_aditivos_por_metro(con)
+            brocas = rendimiento_brocas(con)
+        cantidad = TurnoAditivo.objects.aggregate(t=Sum('cantidad_usada'))['t'] or 0
+        self.assertAlmostEqual(sum(f['cantidad'] for f in aditivos), float(cantidad), places=2)
+        metros = TurnoComplemento.objects.aggregate(t=Sum('metros_turno_calc'))['t'] or 0
+        self.assertAlmostEqual(sum(f['metros'] for f in brocas), float(metros), places=2)
+
+    def test_vista_y_error_sin_exportacion(self):
+        self.client.force_login(self.gerencia)
+        respuesta = self.client.get(reverse('reporte-analitica'), {'reporte': 'metros', 'desde': '2000-01'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.context['filas'])
+
+        with tempfile.TemporaryDirectory() as vacio, self.settings(HECHOS_PARQUET_DIR=vacio):
+            respuesta = self.client.get(reverse('reporte-analitica'))
+        self.assertEqual(respuesta.context['filas'], [])
+        self.assertIn('export_facts', [str(m) for m in respuesta.context['messages']][0])
+
+    def test_sql_postgres_usa_las_columnas_del_dataset(self):
+        from .utils.analitica import sql_dataset
+        sql = sql_dataset('actividades')
+        self.assertIn('AS t(contrato_id, _mes1, id, turno_id, fecha', sql)
+        self.assertIn('es_cobrable', sql)
+
+    def test_sql_postgres_filtra_en_la_base(self):
+        from django.db import connection
+        from .utils.analitica import _sql_filtrado, sql_dataset
+        turno = Turno.objects.order_by('fecha').first()
+        mes = f'{turno.fecha:%Y-%m}'
+        esperados = {
+            'turnos': Turno.objects.filter(contrato=turno.contrato, fecha__year=turno.fecha.year,
+                                           fecha__month=turno.fecha.month).count(),
+            'metas': MetaMaquina.objects.filter(contrato=turno.contrato, año=turno.fecha.year,
+                                                mes=turno.fecha.month).count(),
+        }
+        for nombre, esperado in esperados.items():
+            filtros = {'contratos': [turno.contrato_id], 'desde': mes, 'hasta': mes}
+            self.assertNotIn('%s', sql_dataset(nombre, **filtros))
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT COUNT(*) FROM ({_sql_filtrado(nombre, **filtros)}) AS x')
+                self.assertEqual(cursor.fetchone()[0], esperado, nombre)
+            self.assertGreater(esperado, 0, nombre)
+
+    def test_error_de_duckdb_es_error_de_analitica(self):
+        from .utils.analitica import AnaliticaError, conectar
+        with self.assertRaisesMessage(AnaliticaError, 'Error en la consulta'):
+            with conectar() as con:
+                con.execute('SELECT * FROM tabla_inexistente')
+
+
+class CalendarioOperativoTests(TestCase):
+    """Mes operativo 26-25, semanas y filtros de período como rangos de fecha."""
+
+    def test_mes_y_semana_operativos(self):
+        from datetime import date
+        from .utils.calendario import fila_calendario, mes_operativo, rango_mes_operativo, rango_semana_operativa
+        self.assertEqual(rango_mes_operativo(2025, 1), (date(2024, 12, 26), date(2025, 1, 25)))
+        self.assertEqual(mes_operativo(date(2024, 12, 26)), (2025, 1))
+        self.assertEqual(mes_operativo(date(2025, 1, 25)), (2025, 1))
+        self.assertEqual(rango_semana_operativa(2025, 4, 5), (date(2025, 4, 23), date(2025, 4, 25)))
+        with self.assertRaises(ValueError):
+            rango_semana_operativa(2025, 3, 5)
+
+        fila = fila_calendario(date(2025, 2, 26))
+        self.assertEqual((fila['año_operativo'], fila['mes_operativo'], fila['semana_operativa']), (2025, 3, 1))
+        self.assertEqual((fila['año_iso'], fila['semana_iso'], fila['dia_semana']), (2025, 9, 3))
+
+    def test_filtro_periodo_es_un_rango(self):
+        from datetime import date
+        from .utils.calendario import filtro_periodo
+        sql = str(Turno.objects.filter(filtro_periodo('fecha', 2025, mes_operativo=3)).query)
+        self.assertIn('"turnos"."fecha" >= 2025-02-26', sql)
+        self.assertIn('"turnos"."fecha" <= 2025-03-25', sql)
+        self.assertNotIn('django_date_extract', sql)
+        self.assertEqual(
+            filtro_periodo('fecha', 2024, mes=2),
+            models.Q(fecha__gte=date(2024, 2, 1), fecha__lte=date(2024, 2, 29)),
+        )
+
+    def test_poblar_calendario_y_metas(self):
+        from datetime import date
+        creados = CalendarioOperativo.poblar(date(2024, 1, 1), date(2024, 12, 31))
+        self.assertEqual(creados, 366)
+        self.assertEqual(CalendarioOperativo.poblar(date(2024, 12, 1), date(2025, 1, 31)), 31)
+        dias = CalendarioOperativo.objects.filter(año_operativo=2024, mes_operativo=12)
+        self.assertEqual(dias.count(), 30)
+        self.assertEqual(dias.order_by('fecha').first().fecha, date(2024, 11, 26))
+
+        meta = MetaMaquina(año=2025, mes=1)
+        self.assertEqual((meta.get_fecha_inicio_periodo(), meta.get_fecha_fin_periodo()), (date(2024, 12, 26), date(2025, 1, 25)))
+
+
+class PronosticoMetasTests(DatosBenchmarkTestCase):
+    """Series diarias en caché por meta y pronóstico vectorizado."""
+    TAMANO = {'maquinas': 2, 'dias': 40}
+
+    def test_calculo_run_rate(self):
+        from datetime import date
+        from .utils.pronostico_metas import calcular_pronosticos
+        serie = {'inicio': date(2025, 1, 1), 'diario': [10.0] * 10 + [0.0] * 20}
+        baja, alta = calcular_pronosticos([serie, serie], [250, 400], hoy=date(2025, 1, 10))
+        self.assertEqual((baja['metros'], baja['proyectado'], baja['ritmo_actual']), (100.0, 300.0, 10.0))
+        self.assertEqual((baja['banda_p10'], baja['banda_p90']), (300.0, 300.0))
+        self.assertEqual((baja['probabilidad'], alta['probabilidad']), (1.0, 0.0))
+        self.assertEqual(alta['ritmo_requerido'], 15.0)
+        self.assertEqual(alta['dias_restantes'], 20)
+
+        variable = {'inicio': date(2025, 1, 1), 'diario': [0.0, 20.0] * 5 + [0.0] * 20}
+        (resultado,) = calcular_pronosticos([variable], [300], hoy=date(2025, 1, 10))
+        self.assertLess(resultado['banda_p10'], resultado['proyectado'])
+        self.assertGreater(resultado['banda_p90'], resultado['proyectado'])
+        self.assertAlmostEqual(resultado['probabilidad'], 0.5, places=2)
+
+    def test_series_en_cache_e_invalidacion(self):
+        from .utils.pronostico_metas import pronosticar_metas
+        metas = list(MetaMaquina.objects.all())
+        self.assertTrue(metas)
+        meta = metas[0]
+        fin = meta.get_fecha_fin_periodo()
+        reales = MetaMaquina.calcular_metros_reales(metas)
+
+        with self.assertNumQueries(1):
+            pronosticos = pronosticar_metas(metas, hoy=fin)
+        for m in metas:
+            self.assertAlmostEqual(pronosticos[m.pk]['metros'], float(reales[m.pk]['metros']), places=2)
+        with self.assertNumQueries(0):
+            pronosticar_metas(metas, hoy=fin)
+
+        avance = TurnoAvance.objects.filter(
+            turno__contrato=meta.contrato, turno__maquina=meta.maquina, turno__estado__in=['COMPLETADO', 'APROBADO'],
+            turno__fecha__gte=meta.get_fecha_inicio_periodo(), turno__fecha__lte=fin,
+        ).select_related('turno').first()
+        avance.metros_perforados += 7
+        avance.save()
+        with self.assertNumQueries(1):
+            nuevos = pronosticar_metas(metas, hoy=fin)
+        self.assertAlmostEqual(nuevos[meta.pk]['metros'], pronosticos[meta.pk]['metros'] + 7, places=2)
+
+    def test_serie_se_lee_del_primario(self):
+        from .db_router import ReplicaRouter
+        from .utils.pronostico_metas import series_diarias
+        metas = list(MetaMaquina.objects.all())
+        # Aunque la vista lea de la réplica, la serie que se guarda en caché sale del primario
+        with mock.patch.object(ReplicaRouter, 'db_for_read', return_value='replica'):
+            series = series_diarias(metas)
+        self.assertEqual(set(series), {meta.pk for meta in metas})
+
+    def test_cambio_de_maquina_invalida_ambas_series(self):
+        from .utils.pronostico_metas import pronosticar_metas
+        metas = list(MetaMaquina.objects.all())
+        meta = metas[0]
+        fin = meta.get_fecha_fin_periodo()
+        antes = pronosticar_metas(metas, hoy=fin)
+
+        turno = Turno.objects.filter(
+            contrato=meta.contrato, maquina=meta.maquina, estado__in=['COMPLETADO', 'APROBADO'],
+            fecha__gte=meta.get_fecha_inicio_periodo(), fecha__lte=fin, avance__metros_perforados__gt=0,
+        ).order_by('fecha').first()
+        otra = Maquina.objects.filter(contrato=meta.contrato).exclude(pk=meta.maquina_id).first()
+        # Libera el lugar en la otra máquina (unique_together); no toca la serie de la meta
+        Turno.objects.filter(maquina=otra, fecha=turno.fecha, tipo_turno=turno.tipo_turno).delete()
+        turno.maquina = otra
+        turno.save()
+
+        despues = pronosticar_metas(metas, hoy=fin)
+        self.assertAlmostEqual(
+            despues[meta.pk]['metros'],
+            antes[meta.pk]['metros'] - float(turno.avance.metros_perforados), places=2,
+        )
+
+
+class ResolutorPreciosTests(DatosBenchmarkTestCase):
+    """Precios unitarios vigentes resueltos en memoria por intervalos."""
+    TAMANO = {'maquinas': 2, 'dias': 20}
+
+    @classmethod
+    def setUpClass(cls):
+        # contratos_actividades es legacy (managed=False) y la base de tests no la crea;
+        # hace falta para borrar un contrato
+        with connections['default'].schema_editor() as editor:
+            editor.create_model(ContratoActividad)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connections['default'].schema_editor() as editor:
+            editor.delete_model(ContratoActividad)
+
+    def _referencia(self, contrato, servicio, fecha):
+        # Query original de MetaMaquina.obtener_precio_unitario
+        from django.db.models import Q
+        return PrecioUnitarioServicio.objects.filter(
+            contrato=contrato, servicio=servicio, activo=True, fecha_inicio_vigencia__lte=fecha,
+        ).filter(Q(fecha_fin_vigencia__isnull=True) | Q(fecha_fin_vigencia__gte=fecha)).order_by(
+            '-fecha_inicio_vigencia'
+        ).first()
+
+    def test_mismo_criterio_que_la_query(self):
+        from datetime import date, timedelta
+        from .utils.precios import precio_vigente, precios_vigentes
+        base = PrecioUnitarioServicio.objects.first()
+        contrato, servicio = base.contrato, base.servicio
+        usuario = base.created_by
+        base.fecha_inicio_vigencia = date(2024, 1, 1)
+        base.save()
+        # Precio temporal que vence y deja vigente otra vez el abierto; uno inactivo
+        for inicio, fin, activo in [(date(2024, 3, 1), date(2024, 3, 31), True),
+                                    (date(2024, 6, 1), None, False)]:
+            PrecioUnitarioServicio.objects.create(
+                contrato=contrato, servicio=servicio, precio_unitario=Decimal('150.00'),
+                fecha_inicio_vigencia=inicio, fecha_fin_vigencia=fin, activo=activo, created_by=usuario,
+            )
+        fechas = [date(2023, 12, 31) + timedelta(days=d) for d in range(0, 240, 7)]
+        esperados = [self._referencia(contrato, servicio, f) for f in fechas]
+        self.assertEqual([precio_vigente(contrato.pk, servicio.pk, f) for f in fechas], esperados)
+        self.assertEqual(precios_vigentes(contrato.pk, servicio.pk, fechas), esperados)
+        self.assertIsNone(precio_vigente(contrato.pk, servicio.pk, date(2023, 12, 31)))
+        self.assertEqual(precio_vigente(contrato.pk, servicio.pk, date(2024, 3, 15)).precio_unitario, Decimal('150.00'))
+        self.assertEqual(precio_vigente(contrato.pk, servicio.pk, date(2024, 4, 1)), base)
+
+    def test_una_query_e_invalidacion(self):
+        from .utils.precios import invalidar_precios
+        metas = list(MetaMaquina.objects.filter(servicio__isnull=False))
+        self.assertTrue(metas)
+        invalidar_precios()
+        # Versión en la base + carga de intervalos
+        with self.assertNumQueries(2):
+            valores = [meta.calcular_valor_meta() for meta in metas]
+        self.assertTrue(all(monto is not None for monto, _, _ in valores))
+        with self.assertNumQueries(0):
+            for meta in metas:
+                meta.calcular_valorizacion_completa(Decimal('10'))
+
+        precio = metas[0].obtener_precio_unitario()
+        precio.precio_unitario = Decimal('999.00')
+        precio.save()
+        with self.assertNumQueries(2):
+            self.assertEqual(metas[0].obtener_precio_unitario().precio_unitario, Decimal('999.00'))
+
+    def test_cambio_en_otro_worker(self):
+        from django.core.signals import request_started
+        from django.utils import timezone
+        from .utils.precios import intervalos
+        meta = MetaMaquina.objects.filter(servicio__isnull=False).first()
+        precio = meta.obtener_precio_unitario()
+        # Otro proceso: escribe en la base sin pasar por save() ni por esta caché
+        PrecioUnitarioServicio.objects.filter(pk=precio.pk).update(
+            precio_unitario=Decimal('777.00'), updated_at=timezone.now(),
+        )
+        cache.clear()
+        self.assertEqual(meta.obtener_precio_unitario().precio_unitario, precio.precio_unitario)
+        request_started.send(sender=self.__class__)
+        self.assertEqual(meta.obtener_precio_unitario().precio_unitario, Decimal('777.00'))
+        PrecioUnitarioServicio.objects.filter(pk=precio.pk).update(
+            precio_unitario=Decimal('778.00'), updated_at=timezone.now(),
+        )
+        rango = intervalos(verificar=True)[(precio.contrato_id, precio.servicio_id)]
+        self.assertEqual(rango.vigente(precio.fecha_inicio_vigencia).precio_unitario, Decimal('778.00'))
+
+    def test_carga_diferida_y_borrado_de_contrato(self):
+        from datetime import date
+        diferido = PrecioUnitarioServicio.objects.only('id').first()
+        self.assertIsNone(diferido._vigencia_cargada)
+        # Sin copia de lo cargado, guardar revaloriza la vigencia actual
+        with mock.patch('drilling.utils.valorizacion_turnos.programar_revalorizacion') as programar:
+            diferido.save()
+        programar.assert_called_once_with({diferido._vigencia()})
+
+        base = PrecioUnitarioServicio.objects.first()
+        contrato = Contrato.objects.create(
+            nombre_contrato='CT-BORRAR', cliente=Cliente.objects.create(nombre='C2'), duracion_turno=8,
+        )
+        PrecioUnitarioServicio.objects.create(
+            contrato=contrato, servicio=base.servicio, precio_unitario=Decimal('10.00'),
+            fecha_inicio_vigencia=date(2024, 1, 1), created_by=base.created_by,
+        )
+        contrato.delete()
+        self.assertFalse(PrecioUnitarioServicio.objects.filter(contrato_id=contrato.pk).exists())
+
+
+class ValorizacionTurnoTests(DatosBenchmarkTestCase):
+    """Libro de valorización por turno y servicio cobrable."""
+    TAMANO = {'maquinas': 2, 'dias': 40}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.precio = PrecioUnitarioServicio.objects.get()
+
+    def test_libro_inicial_y_suma_mensual(self):
+        from .utils.calendario import mes_operativo, rango_mes_operativo
+        from .utils.valorizacion_turnos import valorizacion_mensual
+        valorizables = Turno.objects.filter(estado__in=['COMPLETADO', 'APROBADO'])
+        filas = ValorizacionTurno.objects.all()
+        self.assertEqual(filas.count(), valorizables.count())
+        self.assertFalse(filas.filter(turno__estado='BORRADOR').exists())
+        fila = filas.select_related('turno__avance').first()
+        self.assertEqual((fila.unidad, fila.servicio_id), ('METRO', self.precio.servicio_id))
+        self.assertEqual(fila.cantidad, fila.turno.avance.metros_perforados)
+        self.assertEqual(fila.monto, (fila.cantidad * self.precio.precio_unitario).quantize(Decimal('0.01')))
+
+        año, mes = mes_operativo(fila.fecha)
+        with self.assertNumQueries(1):
+            (resumen,) = valorizacion_mensual(self.precio.contrato_id, año, mes)
+        inicio, fin = rango_mes_operativo(año, mes)
+        del_mes = filas.filter(fecha__gte=inicio, fecha__lte=fin)
+        self.assertEqual(resumen['monto'], sum(f.monto for f in del_mes))
+        self.assertEqual(resumen['turnos'], del_mes.count())
+
+    def test_servicio_por_hora_sin_precio(self):
+        from .utils.valorizacion_turnos import recalcular_valorizacion
+        stand_by = TipoActividad.objects.get(tipo_actividad='STAND_BY_CLIENTE', nombre__startswith='BENCH')
+        stand_by.es_cobrable = True
+        stand_by.save()
+        recalcular_valorizacion()
+        filas = ValorizacionTurno.objects.filter(servicio=stand_by)
+        self.assertTrue(filas.exists())
+        self.assertEqual(set(filas.values_list('unidad', flat=True)), {'HORA'})
+        self.assertFalse(filas.filter(monto__isnull=False).exists())
+
+    def test_cambio_de_turno_incremental(self):
+        turno = Turno.objects.filter(estado='COMPLETADO', avance__isnull=False).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            avance = turno.avance
+            avance.metros_perforados = Decimal('12.50')
+            avance.save()
+        fila = ValorizacionTurno.objects.get(turno=turno)
+        self.assertEqual(fila.cantidad, Decimal('12.50'))
+        self.assertEqual(fila.monto, (Decimal('12.50') * self.precio.precio_unitario).quantize(Decimal('0.01')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            turno.estado = 'BORRADOR'
+            turno.save()
+        self.assertFalse(ValorizacionTurno.objects.filter(turno=turno).exists())
+
+    def test_edicion_de_vigencia_revaloriza(self):
+        from datetime import timedelta
+        fechas = sorted(set(ValorizacionTurno.objects.values_list('fecha', flat=True)))
+        corte = fechas[len(fechas) // 2]
+        with self.captureOnCommitCallbacks(execute=True):
+            precio = PrecioUnitarioServicio.objects.get(pk=self.precio.pk)
+            precio.fecha_inicio_vigencia = corte
+            precio.precio_unitario = Decimal('200.00')
+            precio.save()
+        self.assertFalse(ValorizacionTurno.objects.filter(fecha__lt=corte, monto__isnull=False).exists())
+        posteriores = ValorizacionTurno.objects.filter(fecha__gte=corte)
+        self.assertTrue(posteriores.exists())
+        self.assertEqual(set(posteriores.values_list('precio_unitario', flat=True)), {Decimal('200.00')})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            precio.fecha_inicio_vigencia = fechas[0] - timedelta(days=1)
+            precio.save()
+        self.assertFalse(ValorizacionTurno.objects.filter(monto__isnull=True).exists())
+
+    def test_precio_cambiado_en_otro_worker(self):
+        from django.utils import timezone
+        from .utils.precios import precio_vigente
+        turno = Turno.objects.filter(estado='COMPLETADO', avance__isnull=False).first()
+        # Este proceso tiene el precio anterior en su caché local
+        precio_vigente(self.precio.contrato_id, self.precio.servicio_id, turno.fecha)
+        PrecioUnitarioServicio.objects.filter(pk=self.precio.pk).update(
+            precio_unitario=Decimal('321.00'), updated_at=timezone.now(),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            avance = turno.avance
+            avance.metros_perforados = Decimal('10.00')
+            avance.save()
+        fila = ValorizacionTurno.objects.get(turno=turno)
+        self.assertEqual(fila.precio_unitario, Decimal('321.00'))
+        self.assertEqual(fila.monto, Decimal('3210.00'))
+
+
+class TipoCambioTests(DatosBenchmarkTestCase):
+    """Tipos de cambio diarios y reportes normalizados a una moneda."""
+    TAMANO = {'contratos': 2, 'dias': 40}
+
+    def test_conversion_vectorizada(self):
+        import math
+        from datetime import date, timedelta
+        from .utils.tipo_cambio import TablaTiposCambio
+        d1 = date(2025, 3, 3)
+        TipoCambio.objects.bulk_create([
+            TipoCambio(fecha=d1, moneda='BOB', unidades_por_usd=Decimal('6.96')),
+            TipoCambio(fecha=d1 + timedelta(days=2), moneda='BOB', unidades_por_usd=Decimal('7.00')),
+            TipoCambio(fecha=d1, moneda='PEN', unidades_por_usd=Decimal('3.75')),
+        ])
+        tabla = TablaTiposCambio.cargar({'BOB', 'PEN'}, d1, d1 + timedelta(days=30))
+        convertidos = tabla.convertir(
+            [Decimal('69.60'), Decimal('100'), Decimal('37.50'), Decimal('70'), Decimal('10'), None],
+            ['BOB', 'USD', 'PEN', 'BOB', 'BOB', 'USD'],
+            [d1, d1, d1 + timedelta(days=1), d1 + timedelta(days=3), d1 + timedelta(days=20), d1],
+            'USD',
+        )
+        self.assertEqual([round(x, 2) for x in convertidos[:4]], [10.0, 100.0, 10.0, 10.0])
+        # Último tipo con más de DIAS_VIGENCIA días de antigüedad y monto nulo
+        self.assertTrue(math.isnan(convertidos[4]) and math.isnan(convertidos[5]))
+        (bob,) = tabla.convertir([Decimal('10')], ['USD'], d1 + timedelta(days=2), 'BOB')
+        self.assertAlmostEqual(bob, 70.0)
+
+    def test_carga_csv_con_upsert(self):
+        import os
+        import tempfile
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as f:
+            f.write('fecha,moneda,unidades_por_usd\n2025-03-03,BOB,6.96\n2025-03-03,PEN,3.75\n')
+        self.addCleanup(os.remove, f.name)
+        call_command('cargar_tipos_cambio', f.name, fuente='BCB', stdout=io.StringIO())
+        with open(f.name, 'w', encoding='utf-8') as archivo:
+            archivo.write('fecha,moneda,unidades_por_usd\n2025-03-03,BOB,6.97\n')
+        call_command('cargar_tipos_cambio', f.name, stdout=io.StringIO())
+        self.assertEqual(TipoCambio.objects.count(), 2)
+        self.assertEqual(TipoCambio.objects.get(moneda='BOB').unidades_por_usd, Decimal('6.97'))
+
+    def test_reporte_en_moneda_de_reporte(self):
+        from datetime import timedelta
+        from .utils.calendario import rango_mes_operativo
+        hoy = timezone.now().date()
+        inicio, fin = rango_mes_operativo(hoy.year, hoy.month)
+        contrato_bob, contrato_usd = Contrato.objects.filter(nombre_contrato__startswith='BENCH').order_by('pk')
+        with self.captureOnCommitCallbacks(execute=True):
+            precio = PrecioUnitarioServicio.objects.get(contrato=contrato_bob)
+            precio.moneda = 'BOB'
+            precio.save()
+        TipoCambio.objects.bulk_create([
+            TipoCambio(fecha=inicio + timedelta(days=i), moneda='BOB', unidades_por_usd=Decimal('8.00'))
+            for i in range((fin - inicio).days + 1)
+        ])
+
+        c = Client()
+        c.force_login(CustomUser.objects.get(username='bench_gerencia'))
+        response = c.get(reverse('metas-valorizacion-reporte'), {
+            'contrato': contrato_bob.pk, 'año': hoy.year, 'mes': hoy.month, 'moneda': 'USD',
+        })
+        self.assertEqual(response.status_code, 200)
+        resumen = response.context['resumen']
+        data = response.context['valorizacion_data']
+        self.assertTrue(data)
+        self.assertEqual(resumen['moneda'], 'USD')
+        real_bob = sum(item['valorizacion']['real_monto'] for item in data)
+        self.assertAlmostEqual(float(resumen['total_real_monto']), float(real_bob) / 8, places=1)
+
+        libro = ValorizacionTurno.objects.filter(fecha__gte=inicio, fecha__lte=fin)
+        monto_bob = sum(f.monto for f in libro.filter(contrato=contrato_bob))
+        monto_usd = sum(f.monto for f in libro.filter(contrato=contrato_usd))
+        self.assertAlmostEqual(float(response.context['valorizacion_turnos_total']), float(monto_bob) / 8, places=1)
+        consolidado = {fila['contrato'].pk: fila['monto'] for fila in response.context['consolidado']}
+        self.assertEqual(consolidado[contrato_usd.pk], monto_usd)
+        self.assertAlmostEqual(
+            float(resumen['total_consolidado']), float(monto_usd) + float(monto_bob) / 8, places=1
+        )
+
+
+class CostoFIFOTests(DatosBenchmarkTestCase):
+    """Costeo FIFO de consumos por lote y costo por metro."""
+    TAMANO = {'maquinas': 2, 'sondajes': 2, 'dias': 70}
+
+    def _libro(self):
+        return set(CostoConsumoFIFO.objects.values_list('consumo_id', 'lote_id', 'cantidad', 'costo'))
+
+    def test_reparto_vectorizado(self):
+        from .utils.costeo_fifo import repartir_fifo
+        consumo, lote, cantidad, faltante = repartir_fifo([100, 50, 200], [30, 90, 40, 250])
+        self.assertEqual(
+            list(zip(consumo.tolist(), lote.tolist(), cantidad.tolist())),
+            [(0, 0, 30), (1, 0, 70), (1, 1, 20), (2, 1, 30), (2, 2, 10), (3, 2, 190)],
+        )
+        self.assertEqual(faltante.tolist(), [0, 0, 0, 60])
+
+    def test_costeo_cubre_cada_consumo_en_orden_de_ingreso(self):
+        consumos = dict(ConsumoStock.objects.values_list('pk', 'cantidad_consumida'))
+        asignado = dict(CostoConsumoFIFO.objects.values('consumo_id').annotate(
+            total=models.Sum('cantidad'),
+        ).values_list('consumo_id', 'total'))
+        self.assertTrue(consumos)
+        self.assertEqual(asignado, consumos)
+        # Un lote solo se toma cuando los anteriores del mismo producto están agotados
+        usados = dict(CostoConsumoFIFO.objects.filter(lote__isnull=False).values('lote_id').annotate(
+            total=models.Sum('cantidad'),
+        ).values_list('lote_id', 'total'))
+        por_producto = {}
+        for lote in Abastecimiento.objects.filter(pk__in=usados).order_by('fecha', 'id'):
+            por_producto.setdefault(lote.codigo_producto, []).append(lote)
+        for lotes in por_producto.values():
+            for anterior in lotes[:-1]:
+                self.assertEqual(usados[anterior.pk], anterior.cantidad)
+
+    def test_incremental_igual_a_reconstruccion(self):
+        from .utils.costeo_fifo import recalcular_costeo
+        consumo = ConsumoStock.objects.order_by('turno__fecha', 'pk')[ConsumoStock.objects.count() // 2]
+        lote = consumo.abastecimiento
+        with self.captureOnCommitCallbacks(execute=True):
+            consumo.cantidad_consumida += Decimal('150.00')
+            consumo.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo = Abastecimiento.objects.get(pk=lote.pk)
+            nuevo.pk = None
+            nuevo.fecha = lote.fecha - timedelta(days=3)
+            nuevo.cantidad = Decimal('40.00')
+            nuevo.precio_unitario = Decimal('1.00')
+            nuevo.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            # El último turno con consumos pasa al principio de la cola
+            primera = Turno.objects.aggregate(fecha=models.Min('fecha'))['fecha']
+            turno = Turno.objects.filter(consumos__isnull=False).order_by('-fecha').first()
+            turno.fecha = primera - timedelta(days=1)
+            turno.save()
+        incremental = self._libro()
+        recalcular_costeo()
+        self.assertEqual(incremental, self._libro())
+        self.assertTrue(CostoConsumoFIFO.objects.filter(lote=nuevo, precio_unitario=Decimal('1.00')).exists())
+
+    def test_carga_diferida_no_recursa(self):
+        lote = Abastecimiento.objects.only('id', 'descripcion').first()
+        consumo = ConsumoStock.objects.only('id').first()
+        self.assertIsNone(lote._costeo_cargado)
+        self.assertIsNone(consumo._costeo_cargado)
+        # Sin copia de lo cargado, guardar reprograma el costeo igual que un cambio
+        with mock.patch('drilling.utils.costeo_fifo.programar_costeo_lote') as programar_lote, \
+                mock.patch('drilling.utils.costeo_fifo.programar_costeo_consumos') as programar_consumos:
+            lote.save()
+            consumo.save()
+        programar_lote.assert_called_once_with(lote.pk, lote._costeo()[:3], None)
+        programar_consumos.assert_called_once_with([consumo._costeo()[:2]])
+        # La cascada de Turno.delete carga los consumos con campos diferidos
+        with self.captureOnCommitCallbacks(execute=True):
+            consumo.turno.delete()
+        self.assertFalse(ConsumoStock.objects.filter(pk=consumo.pk).exists())
+
+    def test_costo_por_metro_y_sondaje(self):
+        from .utils.costeo_fifo import costo_por_metro, costo_por_sondaje
+        contrato = Contrato.objects.get(nombre_contrato__startswith='BENCH')
+        desde, hasta = Turno.objects.aggregate(desde=models.Min('fecha'), hasta=models.Max('fecha')).values()
+        with self.assertNumQueries(2):
+            resumen = costo_por_metro(contrato.pk, desde, hasta)
+        total = CostoConsumoFIFO.objects.aggregate(total=models.Sum('costo'))['total']
+        self.assertEqual(resumen['costo'], total)
+        self.assertEqual(resumen['costo_por_metro'], (total / resumen['metros']).quantize(Decimal('0.01')))
+
+        with self.assertNumQueries(2):
+            sondajes = costo_por_sondaje(contrato.pk, desde, hasta)
+        con_sondaje = CostoConsumoFIFO.objects.filter(
+            turno_id__in=TurnoSondaje.objects.values('turno_id'),
+        ).aggregate(total=models.Sum('costo'))['total']
+        self.assertAlmostEqual(float(sum(s['costo'] for s in sondajes)), float(con_sondaje), places=1)
+
+
+class MovimientosStockTests(DatosBenchmarkTestCase):
+    """Libro de movimientos de stock y saldos a una fecha."""
+    TAMANO = {'maquinas': 2, 'dias': 70}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.contrato = Contrato.objects.get(nombre_contrato__startswith='BENCH')
+
+    def _saldos_esperados(self, fecha):
+        saldos = {
+            lote.pk: lote.cantidad
+            for lote in Abastecimiento.objects.filter(contrato=self.contrato, fecha__lte=fecha)
+        }
+        for consumo in ConsumoStock.objects.filter(turno__fecha__lte=fecha):
+            saldos[consumo.abastecimiento_id] = saldos.get(consumo.abastecimiento_id, 0) - consumo.cantidad_consumida
+        return saldos
+
+    def test_saldo_al_cierre_en_una_query(self):
+        from .utils.calendario import rango_mes_operativo
+        from .utils.movimientos_stock import saldos_al
+        fecha = Turno.objects.aggregate(fecha=models.Min('fecha'))['fecha'] + timedelta(days=35)
+        _, cierre = rango_mes_operativo(fecha.year, fecha.month)
+        with self.assertNumQueries(1):
+            lotes = saldos_al(self.contrato.pk, cierre)
+        self.assertEqual({l['lote_id']: l['saldo'] for l in lotes}, self._saldos_esperados(cierre))
+
+        productos = saldos_al(self.contrato.pk, cierre, por='producto')
+        por_codigo = {}
+        for lote in lotes:
+            por_codigo[lote['codigo_producto']] = por_codigo.get(lote['codigo_producto'], 0) + lote['saldo']
+        self.assertEqual({p['codigo_producto']: p['saldo'] for p in productos}, por_codigo)
+
+    def test_incremental_igual_a_reconstruccion(self):
+        from .utils.costeo_fifo import recalcular_costeo
+
+        def libro():
+            return set(MovimientoStock.objects.values_list(
+                'lote_id', 'consumo_id', 'fecha', 'secuencia', 'cantidad', 'saldo_lote', 'saldo_producto',
+            ))
+
+        consumo = ConsumoStock.objects.order_by('turno__fecha', 'pk')[ConsumoStock.objects.count() // 2]
+        with self.captureOnCommitCallbacks(execute=True):
+            consumo.cantidad_consumida = Decimal('3.25')
+            consumo.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            lote = Abastecimiento.objects.filter(contrato=self.contrato).order_by('-fecha').first()
+            lote.fecha -= timedelta(days=10)
+            lote.cantidad += Decimal('5.00')
+            lote.save()
+        incremental = libro()
+        recalcular_costeo()
+        self.assertEqual(incremental, libro())
+        self.assertEqual(
+            MovimientoStock.objects.get(consumo=consumo).cantidad, Decimal('-3.25'),
+        )
+
+    def test_libro_vacio_migracion_y_reconstruccion(self):
+        import importlib
+        from django.apps import apps
+        from .utils.costeo_fifo import recalcular_costeo
+        migracion = importlib.import_module('drilling.migrations.0065_poblar_movimiento_stock')
+
+        def libro(**filtro):
+            return set(MovimientoStock.objects.filter(**filtro).values_list(
+                'lote_id', 'consumo_id', 'fecha', 'secuencia', 'cantidad', 'saldo_lote', 'saldo_producto',
+            ))
+
+        recalcular_costeo()
+        completo = libro()
+        MovimientoStock.objects.all().delete()
+        migracion.poblar_movimientos(apps, None)
+        self.assertEqual(libro(), completo)
+
+        # Libro vacío (bulk o antes de migrar): un cambio reciente no deja
+        # los lotes anteriores con saldo inicial 0
+        MovimientoStock.objects.all().delete()
+        consumo = ConsumoStock.objects.order_by('-turno__fecha', '-pk').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            consumo.cantidad_consumida = Decimal('1.50')
+            consumo.save()
+        producto = {'codigo_producto': consumo.abastecimiento.codigo_producto}
+        incremental = libro(**producto)
+        self.assertTrue(any(fecha < consumo.turno.fecha for _, _, fecha, *_ in incremental))
+        recalcular_costeo()
+        self.assertEqual(incremental, libro(**producto))
+
+    def test_pagina_de_stock_usa_el_libro(self):
+        from django.test import RequestFactory
+        from .views import StockDisponibleView
+        usuario = CustomUser.objects.filter(role='ADMINISTRADOR', contrato=self.contrato).first()
+        fecha = Turno.objects.aggregate(fecha=models.Min('fecha'))['fecha'] + timedelta(days=20)
+        request = RequestFactory().get(reverse('stock-disponible'), {'fecha': fecha.isoformat()})
+        request.user = usuario
+        vista = StockDisponibleView()
+        vista.setup(request)
+        context = vista.get_context_data()
+        self.assertEqual(context['fecha_corte'], fecha)
+        disponibles = {
+            item['id']: item['disponible'] for items in context['stock_por_familia'].values() for item in items
+        }
+        esperados = {pk: saldo for pk, saldo in self._saldos_esperados(fecha).items() if saldo > 0}
+        self.assertEqual(disponibles, esperados)
+
+
+class ConciliacionStockTests(DatosBenchmarkTestCase):
+    """Conciliación del stock de la API de almacén con el saldo local."""
+    TAMANO = {'brocas': 3, 'dias': 40}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.contrato = Contrato.objects.get(nombre_contrato__startswith='BENCH')
+
+    def _api(self):
+        from .utils.movimientos_stock import saldos_al
+        aditivos = [
+            {'codigo': p['codigo_producto'], 'descripcion': p['descripcion'], 'stock': str(p['saldo'])}
+            for p in saldos_al(self.contrato.pk, por='producto') if p['familia'] == 'ADITIVOS_PERFORACION'
+        ]
+        series = [
+            {'codigo': l['codigo_producto'], 'serie': l['serie'], 'descripcion': l['descripcion']}
+            for l in saldos_al(self.contrato.pk) if l['familia'] == 'PRODUCTOS_DIAMANTADOS' and l['saldo'] > 0
+        ]
+        return aditivos, series
+
+    def _conciliar(self, aditivos, series):
+        from .utils.conciliacion_stock import conciliar_contrato
+
+        class ClienteAlmacen:
+            def obtener_articulos_almacen(self, familia, centro_costo=None):
+                return series if familia == 'PDD' else aditivos
+
+        return conciliar_contrato(self.contrato, ClienteAlmacen())
+
+    def test_sin_diferencias(self):
+        aditivos, series = self._api()
+        self.assertTrue(aditivos and series)
+        resumen = self._conciliar(aditivos, series)
+        self.assertEqual(resumen['ADIT']['discrepancias'], 0)
+        self.assertEqual(resumen['PDD']['discrepancias'], 0)
+        self.assertFalse(DiscrepanciaStock.objects.exists())
+        self.assertEqual(ArticuloStockAlmacen.objects.filter(foto__familia='PDD').count(), len(series))
+
+    def test_discrepancias_y_reporte(self):
+        aditivos, series = self._api()
+        aditivos[0]['stock'] = str(Decimal(aditivos[0]['stock']) + 7)
+        faltante = aditivos.pop()
+        series.append({'codigo': 'PDD-X', 'serie': 'SERIE-NUEVA', 'descripcion': 'Broca no registrada'})
+        self._conciliar(aditivos, series)
+
+        tipos = {(d.familia, d.tipo): d for d in DiscrepanciaStock.objects.all()}
+        self.assertEqual(set(tipos), {('ADIT', 'DIFERENCIA'), ('ADIT', 'SOLO_LOCAL'), ('PDD', 'SOLO_ALMACEN')})
+        self.assertEqual(tipos[('ADIT', 'DIFERENCIA')].diferencia, Decimal('7.00'))
+        self.assertEqual(tipos[('ADIT', 'SOLO_LOCAL')].codigo, faltante['codigo'])
+        self.assertEqual(tipos[('PDD', 'SOLO_ALMACEN')].serie, 'SERIE-NUEVA')
+
+        # Una nueva conciliación reemplaza las discrepancias anteriores
+        self._conciliar(*self._api())
+        self.assertFalse(DiscrepanciaStock.objects.exists())
+
+        self._conciliar(aditivos, series)
+        c = Client()
+        c.force_login(CustomUser.objects.filter(role='ADMINISTRADOR', contrato=self.contrato).first())
+        with mock.patch('drilling.api_client.VilbragroupAPIClient._make_request') as api:
+            response = c.get(reverse('almacen-discrepancias'), {'familia': 'ADIT'})
+        api.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['discrepancias']), 2)
+        self.assertEqual(len(response.context['fotos']), 2)
+
+
+class FotosAlmacenTests(TestCase):
+    """Fotos diarias del stock del almacén con detección de cambios."""
+
+    def setUp(self):
+        self.contrato = Contrato.objects.create(
+            nombre_contrato='CT-ALMACEN', cliente=Cliente.objects.create(nombre='C1'), duracion_turno=8,
+            codigo_centro_costo='000003',
+        )
+        self.aditivos = [
+            {'codigo': 'AD-1', 'descripcion': 'Bentonita', 'stock': 40, 'unidad': 'KG'},
+            {'codigo': 'AD-2', 'descripcion': 'Polímero', 'stock': '12.5', 'unidad': 'LT'},
+            {'codigo': 'AD-3', 'descripcion': 'Grasa', 'stock': 3, 'unidad': 'KG'},
+        ]
+
+    def test_mismo_contenido_no_guarda_foto(self):
+        from .utils.fotos_almacen import tomar_foto
+        primera, nueva = tomar_foto(self.contrato, 'ADIT', self.aditivos)
+        self.assertTrue(nueva)
+        self.assertFalse(primera.cambios.exists())
+
+        # Mismo contenido en otro orden y con otro formato de stock
+        repetidos = [dict(a, stock=str(a['stock'])) for a in reversed(self.aditivos)]
+        foto, nueva = tomar_foto(self.contrato, 'ADIT', repetidos)
+        self.assertFalse(nueva)
+        self.assertEqual(foto.pk, primera.pk)
+        self.assertEqual(FotoStockAlmacen.objects.count(), 1)
+        self.assertEqual(ArticuloStockAlmacen.objects.count(), 3)
+        self.assertGreaterEqual(FotoStockAlmacen.objects.get().verificada_en, primera.tomada_en)
+
+    def test_cambios_entre_fotos(self):
+        from .utils.fotos_almacen import tomar_foto
+        anterior, _ = tomar_foto(self.contrato, 'ADIT', self.aditivos)
+        self.aditivos[0]['stock'] = 35
+        self.aditivos.pop()
+        self.aditivos.append({'codigo': 'AD-4', 'descripcion': 'Soda ash', 'stock': 8, 'unidad': 'KG'})
+        foto, nueva = tomar_foto(self.contrato, 'ADIT', self.aditivos)
+        self.assertTrue(nueva)
+
+        cambios = {c.codigo: c for c in foto.cambios.all()}
+        self.assertEqual(set(cambios), {'AD-1', 'AD-3', 'AD-4'})
+        self.assertEqual(cambios['AD-1'].tipo, 'CAMBIO')
+        self.assertEqual((cambios['AD-1'].stock_anterior, cambios['AD-1'].stock_nuevo), (Decimal('40'), Decimal('35')))
+        self.assertEqual(cambios['AD-3'].tipo, 'BAJA')
+        self.assertEqual(cambios['AD-4'].tipo, 'ALTA')
+        self.assertEqual(cambios['AD-4'].foto_anterior, anterior)
+
+    def test_foto_por_lotes_igual_a_foto_completa(self):
+        from .utils.fotos_almacen import tomar_foto, tomar_foto_por_lotes
+        foto, _ = tomar_foto(self.contrato, 'ADIT', self.aditivos)
+        repetida, nueva = tomar_foto_por_lotes(self.contrato, 'ADIT', [self.aditivos[2:], self.aditivos[:2]])
+        self.assertFalse(nueva)
+        self.assertEqual(repetida.pk, foto.pk)
+        self.assertEqual(tomar_foto_por_lotes(self.contrato, 'ADIT', [[], []]), (None, False))
+
+    def test_vista_lee_la_ultima_foto(self):
+        from .utils.fotos_almacen import tomar_foto
+        usuario = CustomUser.objects.create_user(
+            username='admin_almacen', password='pass', role='ADMINISTRADOR', contrato=self.contrato,
+        )
+        c = Client()
+        c.force_login(usuario)
+        with mock.patch('drilling.api_client.VilbragroupAPIClient._make_request') as api:
+            sin_foto = c.get(reverse('api-stock-aditivos')).json()
+            tomar_foto(self.contrato, 'ADIT', self.aditivos)
+            self.aditivos[1]['stock'] = 0
+            tomar_foto(self.contrato, 'ADIT', self.aditivos)
+            datos = c.get(reverse('api-stock-aditivos')).json()
+        api.assert_not_called()
+
+        self.assertFalse(sin_foto['success'])
+        self.assertTrue(datos['success'])
+        self.assertEqual(datos['count'], 3)
+        self.assertEqual(datos['centro_costo_usado'], '000003')
+        self.assertEqual({a['codigo']: Decimal(a['stock']) for a in datos['data']}['AD-2'], Decimal('0'))
+        self.assertIn('tomada_en', datos)
+
+
+class APIClientTests(TestCase):
+    """Cliente de la API de Vilbragroup contra un servidor HTTP local."""
+
+    def setUp(self):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from . import api_client
+
+        cache.clear()
+        api_client._circuitos.clear()
+        self.llamadas = 0
+        self.estado = 200
+        self.demora = 0
+        self.cuerpo = None
+        # Máximo de peticiones atendidas a la vez
+        self.en_curso = self.simultaneas = 0
+        contador = threading.Lock()
+        prueba = self
+
+        class Stub(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with contador:
+                    prueba.llamadas += 1
+                    prueba.en_curso += 1
+                    prueba.simultaneas = max(prueba.simultaneas, prueba.en_curso)
+                time.sleep(prueba.demora)
+                with contador:
+                    prueba.en_curso -= 1
+                cuerpo = prueba.cuerpo or json.dumps(
+                    {'articulos': [{'codigo': 'AD-1', 'stock': prueba.llamadas}]}
+                ).encode()
+                try:
+                    self.send_response(prueba.estado)
+                    self.send_header('Content-Type', 'application/json')
+                    self.end_headers()
+                    self.wfile.write(cuerpo)
+                except (BrokenPipeError, ConnectionResetError):
+                    # El cliente canceló la petición
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', 0), Stub)
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.addCleanup(self.servidor.server_close)
+        self.addCleanup(self.servidor.shutdown)
+        self.url = f'http://127.0.0.1:{self.servidor.server_port}'
+
+    def _cliente(self):
+        from .api_client import VilbragroupAPIClient
+        return VilbragroupAPIClient(token='t', centro_costo='000003', base_url=self.url)
+
+    def _esperar_llamadas(self, n):
+        limite = time.monotonic() + 5
+        while self.llamadas < n and time.monotonic() < limite:
+            time.sleep(0.01)
+
+    def test_peticiones_concurrentes_comparten_una_llamada(self):
+        from concurrent.futures import ThreadPoolExecutor
+        self.demora = 0.3
+        with ThreadPoolExecutor(5) as pool:
+            resultados = list(pool.map(lambda _: self._cliente().obtener_aditivos(), range(5)))
+        self.assertEqual(self.llamadas, 1)
+        self.assertTrue(all(r == [{'codigo': 'AD-1', 'stock': 1}] for r in resultados))
+
+        # Dentro del TTL se responde desde la caché
+        self.assertEqual(self._cliente().obtener_aditivos()[0]['stock'], 1)
+        self.assertEqual(self.llamadas, 1)
+
+    def test_dato_vencido_se_refresca_en_segundo_plano(self):
+        with self.settings(VILBRAGROUP_API_CACHE_TTL=0):
+            self.assertEqual(self._cliente().obtener_aditivos()[0]['stock'], 1)
+            self.demora = 0.2
+            # Responde al instante con el dato viejo mientras se refresca
+            self.assertEqual(self._cliente().obtener_aditivos()[0]['stock'], 1)
+            self._esperar_llamadas(2)
+            time.sleep(0.3)
+            self.demora = 0
+            self.assertEqual(self._cliente().obtener_aditivos()[0]['stock'], 2)
+            # Ese último pedido también vence y refresca; que termine antes de cerrar el servidor
+            self._esperar_llamadas(3)
+
+    def test_circuito_abierto_no_llama_a_la_api(self):
+        self.estado = 500
+        with self.settings(VILBRAGROUP_API_FALLOS_CIRCUITO=2, VILBRAGROUP_API_CIRCUITO_ABIERTO=0.2):
+            for _ in range(4):
+                self.assertEqual(self._cliente().obtener_aditivos(), [])
+            self.assertEqual(self.llamadas, 2)
+
+            # Pasado el tiempo abierto se deja pasar una prueba
+            time.sleep(0.25)
+            self.estado = 200
+            self.assertEqual(self._cliente().obtener_aditivos()[0]['stock'], 3)
+            self.assertEqual(self.llamadas, 3)
+
+    def test_prueba_sin_respuesta_no_deja_el_circuito_semiabierto(self):
+        from .api_client import CircuitBreaker
+        circuito = CircuitBreaker(fallos_max=1, segundos_abierto=0.1)
+        circuito.fallo()
+        self.assertFalse(circuito.permitir())
+        time.sleep(0.12)
+        # La prueba se pierde: nunca llama a exito() ni a fallo()
+        self.assertTrue(circuito.permitir())
+        self.assertFalse(circuito.permitir())
+        time.sleep(0.12)
+        self.assertTrue(circuito.permitir())
+        circuito.exito()
+        self.assertEqual(circuito.estado, CircuitBreaker.CERRADO)
+
+    def _catalogo(self, n, nombre='Aditivo'):
+        return [{'codigo': f'AD-{i}', 'descripcion': f'{nombre} {i}', 'stock': i} for i in range(n)]
+
+    def _lotes(self):
+        lotes = list(self._cliente().iterar_articulos_almacen('ADIT', tamano_lote=2))
+        self.assertEqual([len(l) for l in lotes], [2, 2, 1])
+        self.assertEqual([a['codigo'] for l in lotes for a in l], [f'AD-{i}' for i in range(5)])
+
+    @unittest.skipUnless(importlib.util.find_spec('ijson'), 'Requiere ijson')
+    def test_streaming_por_lotes(self):
+        for formato in ({'articulos': self._catalogo(5)}, {'data': self._catalogo(5)}, self._catalogo(5)):
+            self.cuerpo = json.dumps(formato).encode()
+            self._lotes()
+
+    def test_streaming_sin_ijson_lee_la_respuesta_completa(self):
+        self.cuerpo = json.dumps({'articulos': self._catalogo(5)}).encode()
+        with mock.patch.dict('sys.modules', {'ijson': None}):
+            self._lotes()
+
+    def test_streaming_respuesta_cortada_lanza_error(self):
+        from .api_client import ErrorAPI
+        self.cuerpo = json.dumps({'articulos': self._catalogo(5)}).encode()[:-40]
+        with self.assertRaises(ErrorAPI):
+            for _ in self._cliente().iterar_articulos_almacen('ADIT', tamano_lote=2):
+                pass
+
+    def test_sync_aditivos_por_lotes(self):
+        contrato = Contrato.objects.create(
+            nombre_contrato='CT-SYNC', cliente=Cliente.objects.create(nombre='C1'), duracion_turno=8,
+            codigo_centro_costo='000003',
+        )
+        self.cuerpo = json.dumps({'articulos': self._catalogo(5)}).encode()
+        with self.settings(VILBRAGROUP_API_URL=self.url, VILBRAGROUP_API_TOKEN='t'):
+            call_command('sync_aditivos', contrato_id=contrato.pk, tamano_lote=2, stdout=io.StringIO())
+            self.assertEqual(TipoAditivo.objects.filter(contrato=contrato).count(), 5)
+
+            catalogo = self._catalogo(6)
+            catalogo[0]['descripcion'] = 'Bentonita'
+            self.cuerpo = json.dumps({'articulos': catalogo}).encode()
+            salida = io.StringIO()
+            call_command('sync_aditivos', contrato_id=contrato.pk, tamano_lote=2, stdout=salida)
+        self.assertEqual(TipoAditivo.objects.filter(contrato=contrato).count(), 6)
+        self.assertEqual(TipoAditivo.objects.get(contrato=contrato, codigo='AD-0').nombre, 'Bentonita')
+        self.assertIn('Actualizados: 1', salida.getvalue())
+        self.assertIn('Sin cambios: 4', salida.getvalue())
+
+    async def test_stock_async_en_paralelo(self):
+        self.demora = 0.3
+        stock = await self._cliente().aobtener_stock_almacen()
+        self.assertEqual(self.llamadas, 2)
+        self.assertEqual(self.simultaneas, 2)
+        self.assertEqual(set(stock), {'PDD', 'ADIT'})
+        self.assertEqual(len(stock['PDD']), 1)
+
+        # Segunda vez desde la caché compartida con el cliente sync
+        self.assertEqual(self._cliente().obtener_aditivos(), stock['ADIT'])
+        self.assertEqual(self.llamadas, 2)
+
+    def test_stock_async_vencido_bajo_async_to_sync(self):
+        from asgiref.sync import async_to_sync
+        from .api_client import CircuitBreaker, _circuito
+        with self.settings(VILBRAGROUP_API_CACHE_TTL=0):
+            self.assertEqual(async_to_sync(self._cliente().aobtener_articulos_almacen)('ADIT')[0]['stock'], 1)
+            self.demora = 0.1
+            # Cada llamada corre en un loop que se cierra al volver: el refresco no se cancela
+            self.assertEqual(async_to_sync(self._cliente().aobtener_articulos_almacen)('ADIT')[0]['stock'], 1)
+            self._esperar_llamadas(2)
+            time.sleep(0.2)
+            self.assertEqual(_circuito(self.url).estado, CircuitBreaker.CERRADO)
+            self.demora = 0
+            self.assertEqual(self._cliente().obtener_aditivos()[0]['stock'], 2)
+            self._esperar_llamadas(3)
+
+    async def test_prueba_cancelada_cuenta_como_fallo(self):
+        import asyncio
+        from .api_client import CircuitBreaker, _circuito, _vuelos_async
+        self.demora = 0.5
+        with self.settings(VILBRAGROUP_API_FALLOS_CIRCUITO=1):
+            tarea = asyncio.ensure_future(self._cliente().aobtener_articulos_almacen('ADIT'))
+            limite = time.monotonic() + 5
+            while self.llamadas < 1 and time.monotonic() < limite:
+                await asyncio.sleep(0.01)
+            # Como al cerrarse el loop de la petición: se cancela la tarea compartida
+            (prueba,) = _vuelos_async[asyncio.get_running_loop()].values()
+            prueba.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await tarea
+        self.assertEqual(_circuito(self.url).estado, CircuitBreaker.ABIERTO)
+
+    async def test_stock_async_sin_httpx(self):
+        with mock.patch.dict('sys.modules', {'httpx': None}):
+            stock = await self._cliente().aobtener_stock_almacen()
+        self.assertEqual(len(stock['ADIT']), 1)
+        self.assertEqual(self.llamadas, 2)
+
+    def _usuario_almacen(self):
+        contrato = Contrato.objects.create(
+            nombre_contrato='CT-VIVO', cliente=Cliente.objects.create(nombre='C1'), duracion_turno=8,
+            codigo_centro_costo='000003',
+        )
+        return CustomUser.objects.create_user(
+            username='admin_vivo', password='pass', role='ADMINISTRADOR', contrato=contrato,
+        )
+
+    def test_vista_en_vivo_wsgi(self):
+        c = Client()
+        c.force_login(self._usuario_almacen())
+        with self.settings(VILBRAGROUP_API_URL=self.url, VILBRAGROUP_API_TOKEN='t'):
+            datos = c.get(reverse('api-stock-en-vivo')).json()
+        self.assertTrue(datos['success'])
+        self.assertEqual((datos['pdd']['count'], datos['aditivos']['count']), (1, 1))
+        # La respuesta actualiza las fotos del contrato
+        self.assertEqual(
+            set(FotoStockAlmacen.objects.values_list('familia', flat=True)), {'PDD', 'ADIT'},
+        )
+
+    async def test_vista_en_vivo_asgi(self):
+        from asgiref.sync import sync_to_async
+        respuesta = await self.async_client.get(reverse('api-stock-en-vivo'))
+        self.assertEqual(respuesta.status_code, 302)
+
+        await self.async_client.aforce_login(await sync_to_async(self._usuario_almacen)())
+        self.demora = 0.2
+        with self.settings(VILBRAGROUP_API_URL=self.url, VILBRAGROUP_API_TOKEN='t'):
+            datos = (await self.async_client.get(reverse('api-stock-en-vivo'))).json()
+        self.assertEqual(self.simultaneas, 2)
+        self.assertEqual((datos['pdd']['count'], datos['aditivos']['count']), (1, 1))
+
+    @unittest.skipUnless(importlib.util.find_spec('httpx'), 'Requiere httpx')
+    def test_cliente_async_se_cierra_con_el_loop(self):
+        from asgiref.sync import async_to_sync
+        from .api_client import _cliente_http_async
+
+        async def usar():
+            cliente = _cliente_http_async(5)
+            self.assertIs(_cliente_http_async(5), cliente)
+            await cliente.get(f'{self.url}/articulos')
+            return cliente
+
+        # Bajo WSGI cada async_to_sync corre en un loop nuevo que se cierra al volver
+        primero = async_to_sync(usar)()
+        segundo = async_to_sync(usar)()
+        self.assertIsNot(primero, segundo)
+        self.assertTrue(primero.is_closed and segundo.is_closed)
+
+
+class BatchCountsTests(TestCase):
+    def setUp(self):
+        self.contrato = Contrato.objects.create(
+            nombre_contrato='CT-LOTE', cliente=Cliente.objects.create(nombre='C1'), duracion_turno=8,
+        )
+        for i, estado in enumerate(['DISPONIBLE', 'DISPONIBLE', 'ASIGNADO']):
+            Equipo.objects.create(contrato=self.contrato, tipo='RADIO', codigo_interno=f'EQ-{i}', estado=estado)
+
+    def test_resultados_iguales_al_orm_en_una_query(self):
+        from django.db.models import Max
+        from .utils.db_batch import batch_counts
+        equipos = Equipo.objects.filter(contrato=self.contrato)
+        with self.assertNumQueries(1):
+            resultado = batch_counts({
+                'total': equipos,
+                'disponibles': equipos.filter(estado='DISPONIBLE'),
+                'tipos': equipos.values('tipo').distinct(),
+                'ultimo': (equipos, Max('codigo_interno')),
+                'sin_filas': (equipos.filter(estado='BAJA'), Max('codigo_interno')),
+            })
+        self.assertEqual(resultado, {
+            'total': 3, 'disponibles': 2, 'tipos': 1, 'ultimo': 'EQ-2', 'sin_filas': None,
+        })
+
+    def test_queryset_vacio_no_consulta(self):
+        from .utils.db_batch import batch_counts
+        with self.assertNumQueries(0):
+            self.assertEqual(batch_counts({'nada': Equipo.objects.none()}), {'nada': 0})
+
+
+class ReplicaRouterTests(TransactionTestCase):
+    # Dentro de una transacción el router lee del primario; TestCase abre una por test
+    def setUp(self):
+        from .db_router import ReplicaRouter
+        self.router = ReplicaRouter()
+        self.contrato = Contrato.objects.create(
+            nombre_contrato='CT-REPLICA', cliente=Cliente.objects.create(nombre='C1'), duracion_turno=8,
+        )
+        self.usuario = CustomUser.objects.create_user(
+            username='residente_replica', password='pass', role='RESIDENTE', contrato=self.contrato
+        )
+
+    def _con_replica(self, disponible=True):
+        return mock.patch.multiple(
+            'drilling.db_router',
+            alias_replica=mock.Mock(return_value='replica'),
+            replica_disponible=mock.Mock(return_value=disponible),
+        )
+
+    def test_lecturas_marcadas_van_a_la_replica(self):
+        from django.contrib.sessions.models import Session
+        from .db_router import lectura_en_replica
+        self.assertIsNone(self.router.db_for_read(Turno))
+        with self._con_replica(), lectura_en_replica():
+            self.assertEqual(self.router.db_for_read(Turno), 'replica')
+            # Sesiones y escrituras siempre en el primario
+            self.assertIsNone(self.router.db_for_read(Session))
+            self.assertEqual(self.router.db_for_write(Turno), 'default')
+            with transaction.atomic():
+                self.assertIsNone(self.router.db_for_read(Turno))
+        self.assertIsNone(self.router.db_for_read(Turno))
+
+    def test_replica_caida_usa_primario(self):
+        from .db_router import lectura_en_replica
+        with self._con_replica(disponible=False), lectura_en_replica():
+            self.assertIsNone(self.router.db_for_read(Turno))
+
+    def test_usuario_lee_del_primario_despues_de_escribir(self):
+        from .db_router import SESION_ULTIMA_ESCRITURA, lectura_en_replica
+        c = Client()
+        c.force_login(self.usuario)
+        c.post(reverse('dashboard'))
+        self.assertIn(SESION_ULTIMA_ESCRITURA, c.session)
+
+        request = mock.Mock(session=c.session)
+        with self._con_replica(), lectura_en_replica(request):
+            self.assertIsNone(self.router.db_for_read(Turno))
+        with self.settings(REPLICA_STICKY_SECONDS=0), self._con_replica(), lectura_en_replica(request):
+            self.assertEqual(self.router.db_for_read(Turno), 'replica')
+
+
+@unittest.skipUnless('replica' in settings.DATABASES, 'Requiere un alias "replica" (DB_REPLICA_HOST)')
+class ReplicaIntegrationTests(TransactionTestCase):
+    # TransactionTestCase: la réplica usa otra conexión y solo ve datos confirmados.
+    # El runner prepara las BDs de todas las clases, incluso las omitidas
+    databases = {'default', 'replica'} if 'replica' in settings.DATABASES else {'default'}
+
+    def test_reporte_lee_de_la_replica(self):
+        contrato = Contrato.objects.create(
+            nombre_contrato='CT-REPLICA', cliente=Cliente.objects.create(nombre='C1'), duracion_turno=8,
+        )
+        usuario = CustomUser.objects.create_user(
+            username='residente_replica', password='pass', role='RESIDENTE', contrato=contrato
+        )
+        c = Client()
+        c.force_login(usuario)
+        with CaptureQueriesContext(connections['replica']) as consultas:
+            response = c.get(reverse('listar-turnos'))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(consultas), 0)
+
+
+# Cantidad exacta de queries por vista. Ambos tamaños de fixture deben coincidir:
+# si una vista empieza a hacer queries por fila, falla el test del fixture grande.
+CONSULTAS_POR_VISTA = {
+    ('gerencia', 'dashboard'): 10,
+    ('administrador', 'dashboard'): 9,
+    ('residente', 'dashboard'): 9,
+    ('gerencia', 'listar-turnos'): 12,
+    ('administrador', 'listar-turnos'): 13,
+    ('gerencia', 'gestion-proyectos-stock-turnos'): 16,
+    ('gerencia', 'reporte-metraje-complementos'): 8,
+    ('administrador', 'reporte-metraje-complementos'): 8,
+    ('gerencia', 'reporte-horas-extras'): 8,
+    ('gerencia', 'metas-maquina-list'): 8,
+    ('administrador', 'metas-maquina-list'): 9,
+    ('gerencia', 'metas-valorizacion-reporte'): 11,
+    ('administrador', 'metas-valorizacion-reporte'): 12,
+    ('gerencia', 'organigrama'): 14,
+    ('administrador', 'organigrama'): 13,
+    ('gerencia', 'tareo-mensual'): 8,
+    ('administrador', 'tareo-mensual'): 7,
+    ('gerencia', 'tareo-exportar-excel'): 10,
+    ('administrador', 'tareo-exportar-excel'): 10,
+    ('gerencia', 'equipos-dashboard'): 6,
+    ('administrador', 'equipos-dashboard'): 7,
+}
+
+
+class QueryCountMixin:
+    """
+    Fija la cantidad de queries de las vistas más usadas sobre un dataset
+    generado con seed_benchmark_data. Las subclases solo cambian el tamaño.
+    """
+    TAMANO = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        from .views_organigrama import obtener_semana_actual
+        call_command(
+            'seed_benchmark_data', contratos=2, allow_remote=True, stdout=io.StringIO(), **cls.TAMANO
+        )
+        cls.usuarios = {
+            'gerencia': CustomUser.objects.get(username='bench_gerencia'),
+            'administrador': CustomUser.objects.get(username='bench_admin_01'),
+            'residente': CustomUser.objects.get(username='bench_residente_01'),
+        }
+        cls.contrato = cls.usuarios['administrador'].contrato
+        cls.hoy = timezone.now().date()
+
+        # Organigrama de la semana actual con todo el personal asignado
+        inicio, fin = obtener_semana_actual()
+        organigrama = OrganigramaSemanal.objects.create(
+            contrato=cls.contrato, fecha_inicio=inicio, fecha_fin=fin,
+            semana_numero=inicio.isocalendar()[1], anio=inicio.year,
+        )
+        maquinas = list(Maquina.objects.filter(contrato=cls.contrato))
+        trabajadores = Trabajador.objects.filter(contrato=cls.contrato, estado='ACTIVO')
+        AsignacionOrganigrama.objects.bulk_create([
+            AsignacionOrganigrama(
+                organigrama_semanal=organigrama, trabajador=trabajador,
+                maquina=maquinas[i % len(maquinas)], guardia='ABC'[i % 3], estado='OPERATIVO',
+            )
+            for i, trabajador in enumerate(trabajadores)
+        ])
+
+        # Un equipo por trabajador: más tipos distintos en el fixture grande
+        tipos = [tipo for tipo, _ in Equipo.TIPO_CHOICES]
+        Equipo.objects.bulk_create([
+            Equipo(
+                contrato=cls.contrato, tipo=tipos[i % len(tipos)], codigo_interno=f'BENCH-EQ-{i:04d}',
+                estado=['DISPONIBLE', 'ASIGNADO', 'MANTENIMIENTO'][i % 3],
+            )
+            for i in range(trabajadores.count())
+        ])
+
+    def _params(self, vista):
+        inicio_mes = self.hoy.replace(day=1)
+        return {
+            'gestion-proyectos-stock-turnos': {'contrato': self.contrato.pk},
+            'reporte-horas-extras': {'fecha_inicio': inicio_mes.isoformat(), 'fecha_fin': self.hoy.isoformat()},
+            'metas-valorizacion-reporte': {'contrato': self.contrato.pk, 'año': self.hoy.year, 'mes': self.hoy.month},
+            'organigrama': {'contrato': self.contrato.pk},
+            'tareo-mensual': {'contrato': self.contrato.pk, 'modo': 'mes', 'fecha_inicio': inicio_mes.isoformat()},
+            'tareo-exportar-excel': {'contrato': self.contrato.pk, 'modo': 'mes', 'fecha_inicio': inicio_mes.isoformat()},
+        }.get(vista, {})
+
+    def test_cantidad_de_queries_constante(self):
+        for (rol, vista), esperado in CONSULTAS_POR_VISTA.items():
+            with self.subTest(rol=rol, vista=vista):
+                c = Client()
+                c.force_login(self.usuarios[rol])
+                url = reverse(vista)
+                params = self._params(vista)
+                # Primer request: middleware de última actividad, get_or_create del organigrama, etc.
+                c.get(url, params)
+                with self.assertNumQueries(esperado):
+                    response = c.get(url, params)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                self.assertEqual(response.status_code, 200)
+
+
+class QueryCountSmallDatasetTests(QueryCountMixin, TestCase):
+    TAMANO = {'maquinas': 1, 'trabajadores': 4, 'sondajes': 1, 'brocas': 2, 'dias': 6}
+
+
+class QueryCountLargeDatasetTests(QueryCountMixin, TestCase):
+    TAMANO = {'maquinas': 3, 'trabajadores': 12, 'sondajes': 3, 'brocas': 6, 'dias': 45}
@@ -1,8 +1,11 @@
 from django.urls import path
 from . import views
 from . import api_views
+from . import api_turnos
 from . import auth_views
 from . import views_gestion_proyectos
+from . import views_archivo
+from . import views_analitica
 from .views_organigrama import organigrama_view
 from .api_organigrama import (
     guardar_asignaciones_masivas, marcar_stand_by, 
@@ -121,6 +124,7 @@ urlpatterns = [
     path('turnos/<int:pk>/editar/', views.crear_turno_completo, name='turno-update'),
     path('turnos/<int:pk>/eliminar/', views.TurnoDeleteView.as_view(), name='turno-delete'),
     path('turnos/<int:pk>/aprobar/', views.aprobar_turno, name='turno-approve'),
+    path('turnos/aprobar-lote/', views.aprobar_turnos_lote, name='turnos-aprobar-lote'),
 
     # API endpoints
     path('api/actividades/nuevo/', views.api_create_actividad, name='api-actividad-create'),
@@ -128,11 +132,17 @@ urlpatterns = [
     # APIs Vilbragroup - Stock
     path('api/stock/productos-diamantados/', api_views.api_stock_productos_diamantados, name='api-stock-pdd'),
     path('api/stock/aditivos/', api_views.api_stock_aditivos, name='api-stock-aditivos'),
+    path('api/stock/en-vivo/', api_views.api_stock_en_vivo, name='api-stock-en-vivo'),
     path('almacen/stock/', api_views.vista_stock_almacen, name='vista-stock-almacen'),
+    path('almacen/discrepancias/', api_views.reporte_discrepancias_stock, name='almacen-discrepancias'),
     
     # APIs Sondajes
     path('api/sondaje/<int:sondaje_id>/estado/', api_views.api_sondaje_estado, name='api-sondaje-estado'),
     
+    # API Turnos - ingesta por lotes desde tablets (sincronización offline)
+    path('api/turnos/lote/', api_turnos.api_ingesta_turnos_lote, name='api-turnos-lote'),
+    path('api/turnos/aprobar-lote/', views.api_aprobar_turnos_lote, name='api-turnos-aprobar-lote'),
+    
     # Abastecimiento CRUD Completo
     path('abastecimiento/', views.AbastecimientoListView.as_view(), name='abastecimiento-list'),
     path('abastecimiento/nuevo/', views.AbastecimientoCreateView.as_view(), name='abastecimiento-create'),
@@ -168,6 +178,13 @@ urlpatterns = [
     # Gestión de Proyectos - Stock y Turnos
     path('gestion-proyectos/stock-turnos/', views_gestion_proyectos.gestion_proyectos_stock_turnos, name='gestion-proyectos-stock-turnos'),
     
+    # Contratos archivados (Parquet, solo lectura)
+    path('contratos/archivados/', views_archivo.contratos_archivados, name='contratos-archivados'),
+    path('contratos/archivados/<int:pk>/', views_archivo.reporte_contrato_archivado, name='reporte-contrato-archivado'),
+    
+    # Análisis entre contratos (DuckDB)
+    path('analitica/', views_analitica.reporte_analitica, name='reporte-analitica'),
+    
     # APIs
     path('api/abastecimiento/<int:pk>/', views.api_abastecimiento_detalle, name='api-abastecimiento-detalle'),
 ]
\ No newline at end of file
@@ -0,0 +1,320 @@
+"""
+Motor de análisis embebido (DuckDB) para reportes pesados entre contratos.
+
+Los análisis entre contratos (metros por máquina y mes, rendimiento de brocas
+por tipo de producto, consumo de aditivos por metro) se hacían con scripts
+sueltos o bucles del ORM sobre la base de datos transaccional. Este módulo abre
+una conexión DuckDB en memoria con las mismas vistas que los datasets de
+export_facts (ver drilling/utils/hechos_parquet.py), desde una de dos fuentes:
+
+- 'parquet': lee los archivos de HECHOS_PARQUET_DIR. DuckDB solo abre las
+  particiones contrato_id=/mes= que piden los filtros; no toca PostgreSQL.
+- 'postgres': adjunta la base de datos (la réplica si existe) en modo solo
+  lectura con la extensión postgres de DuckDB. Cada vista ejecuta la misma
+  consulta que usa export_facts, así ambas fuentes tienen las mismas columnas.
+  postgres_query no recibe los filtros de DuckDB: los contratos y meses se
+  pasan a conectar() y van dentro del SQL que ejecuta PostgreSQL (mismo
+  filtro que export_facts, sobre los índices de contrato y fecha).
+
+Los errores de DuckDB (consultas, conexión a PostgreSQL) se convierten en
+AnaliticaError.
+
+Las dimensiones pequeñas (contratos, máquinas, tipos de complemento y aditivo)
+se cargan desde el ORM como tablas Arrow. Los reportes son consultas SQL
+parametrizadas que devuelven listas de dicts listas para las plantillas.
+
+Requiere duckdb (y pyarrow para las dimensiones).
+
+Uso:
+    from drilling.utils.analitica import conectar, metros_por_maquina_mes
+
+    with conectar(contratos=[3, 5], desde='2024-01') as con:
+        filas = metros_por_maquina_mes(con, contratos=[3, 5], desde='2024-01')
+"""
+
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+
+from drilling.models import Contrato, Maquina, TipoAditivo, TipoComplemento
+from drilling.utils.hechos_parquet import DATASETS, _queryset, esquema_dataset
+
+FUENTES = ('parquet', 'postgres')
+
+# Dimensiones: (tabla en DuckDB, modelo, columnas)
+DIMENSIONES = [
+    ('dim_contrato', Contrato, ['id', 'nombre_contrato']),
+    ('dim_maquina', Maquina, ['id', 'nombre']),
+    ('dim_complemento', TipoComplemento, ['id', 'nombre', 'categoria']),
+    ('dim_aditivo', TipoAditivo, ['id', 'nombre', 'categoria']),
+]
+
+
+class AnaliticaError(Exception):
+    """La fuente de datos no está disponible (sin exportación, sin duckdb, etc.)."""
+
+
+def _literal(texto):
+    return "'" + str(texto).replace("'", "''") + "'"
+
+
+def _alias_bd():
+    alias = getattr(settings, 'REPLICA_DB_ALIAS', 'replica')
+    return alias if alias in settings.DATABASES else 'default'
+
+
+def _valor_libpq(valor):
+    return "'" + str(valor).replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+
+def _dsn(config):
+    """Cadena de conexión libpq a partir de settings.DATABASES."""
+    partes = {
+        'host': config.get('HOST'),
+        'port': config.get('PORT'),
+        'dbname': config.get('NAME'),
+        'user': config.get('USER'),
+        'password': config.get('PASSWORD'),
+    }
+    return ' '.join(f'{clave}={_valor_libpq(valor)}' for clave, valor in partes.items() if valor)
+
+
+def _expresion_mes(columnas_mes):
+    if len(columnas_mes) == 1:
+        return f"strftime({columnas_mes[0]}, '%Y-%m')"
+    return f"printf('%04d-%02d', {columnas_mes[0]}, {columnas_mes[1]})"
+
+
+def _literal_sql(valor):
+    # Solo los tipos que generan los filtros de contrato y mes (la fecha puede
+    # venir ya adaptada como texto ISO según el motor)
+    if isinstance(valor, str):
+        try:
+            valor = date.fromisoformat(valor)
+        except ValueError:
+            pass
+    if isinstance(valor, date):
+        return f"'{valor.isoformat()}'"
+    if isinstance(valor, int) and not isinstance(valor, bool):
+        return str(valor)
+    raise AnaliticaError(f'Parámetro no soportado en la consulta: {valor!r}')
+
+
+def _sql_filtrado(nombre, using='default', contratos=None, desde=None, hasta=None):
+    """SQL del queryset de export_facts filtrado, con los valores como literales."""
+    definicion = DATASETS[nombre]
+    rutas = [definicion['contrato'], *definicion['mes']] + [ruta for _, ruta in definicion['columnas']]
+    queryset = _queryset(definicion, contratos, desde, hasta).using(using).order_by().values_list(*rutas)
+    sql, params = queryset.query.get_compiler(using=using).as_sql()
+    if params:
+        # postgres_query recibe solo texto
+        sql = sql % tuple(_literal_sql(valor) for valor in params)
+    return sql
+
+
+def sql_dataset(nombre, using='default', contratos=None, desde=None, hasta=None):
+    """
+    SQL de PostgreSQL con las columnas del dataset (mismo queryset que
+    export_facts) más contrato_id y las columnas del mes (_mes1, _mes2),
+    filtrado por contratos y meses ('YYYY-MM') dentro de la consulta.
+    """
+    definicion = DATASETS[nombre]
+    sql = _sql_filtrado(nombre, using, contratos, desde, hasta)
+    alias = ['contrato_id'] + [f'_mes{i + 1}' for i in range(len(definicion['mes']))]
+    alias += [columna for columna, _ in definicion['columnas']]
+    return f'SELECT * FROM ({sql}) AS t({", ".join(alias)})'
+
+
+def _vistas_parquet(con, directorio):
+    import pyarrow as pa
+
+    base = Path(directorio)
+    if not any(base.glob('*/contrato_id=*/mes=*/*.parquet')):
+        raise AnaliticaError(f'No hay datos exportados en {base}. Ejecute: python manage.py export_facts')
+    for nombre in DATASETS:
+        carpeta = base / nombre
+        if not any(carpeta.glob('contrato_id=*/mes=*/*.parquet')):
+            # Dataset sin filas: vista vacía con las mismas columnas
+            esquema = esquema_dataset(nombre).append(pa.field('contrato_id', pa.int64())).append(
+                pa.field('mes', pa.string())
+            )
+            con.register(f'_{nombre}', esquema.empty_table())
+            con.execute(f'CREATE TABLE {nombre} AS SELECT * FROM _{nombre}')
+            con.unregister(f'_{nombre}')
+            continue
+        patron = _literal(carpeta / 'contrato_id=*' / 'mes=*' / '*.parquet')
+        con.execute(
+            f"CREATE VIEW {nombre} AS SELECT * FROM read_parquet({patron}, hive_partitioning = true, "
+            f"hive_types = {{'contrato_id': BIGINT, 'mes': VARCHAR}})"
+        )
+
+
+def _vistas_postgres(con, contratos=None, desde=None, hasta=None):
+    using = _alias_bd()
+    try:
+        con.execute('INSTALL postgres')
+        con.execute('LOAD postgres')
+        con.execute(f'ATTACH {_literal(_dsn(settings.DATABASES[using]))} AS pg (TYPE postgres, READ_ONLY)')
+    except Exception as e:
+        raise AnaliticaError(f'No se pudo adjuntar PostgreSQL: {e}')
+    for nombre, definicion in DATASETS.items():
+        columnas = ', '.join(columna for columna, _ in definicion['columnas'])
+        mes = _expresion_mes([f'_mes{i + 1}' for i in range(len(definicion['mes']))])
+        con.execute(
+            f"CREATE VIEW {nombre} AS SELECT {columnas}, contrato_id, {mes} AS mes "
+            f"FROM postgres_query('pg', {_literal(sql_dataset(nombre, using, contratos, desde, hasta))})"
+        )
+
+
+def _cargar_dimensiones(con):
+    import pyarrow as pa
+
+    for tabla, modelo, columnas in DIMENSIONES:
+        filas = list(modelo.objects.using(_alias_bd()).values_list(*columnas))
+        datos = pa.table({
+            columna: [fila[i] for fila in filas] for i, columna in enumerate(columnas)
+        })
+        con.register(f'_{tabla}', datos)
+        con.execute(f'CREATE TABLE {tabla} AS SELECT * FROM _{tabla}')
+        con.unregister(f'_{tabla}')
+
+
+@contextmanager
+def conectar(fuente=None, directorio=None, contratos=None, desde=None, hasta=None):
+    """
+    Conexión DuckDB en memoria con las vistas de hechos y las dimensiones.
+
+    Args:
+        fuente: 'parquet' o 'postgres' (default: settings.ANALITICA_FUENTE)
+        directorio: raíz de los datasets Parquet (default: settings.HECHOS_PARQUET_DIR)
+        contratos, desde, hasta: alcance de las vistas en 'postgres' (lo lee
+            PostgreSQL); en 'parquet' los filtros de cada reporte ya eligen
+            las particiones
+    """
+    fuente = fuente or settings.ANALITICA_FUENTE
+    if fuente not in FUENTES:
+        raise AnaliticaError(f'Fuente desconocida: {fuente}')
+    try:
+        import duckdb
+    except ImportError:
+        raise AnaliticaError('duckdb no está instalado')
+
+    con = duckdb.connect(':memory:')
+    try:
+        if fuente == 'parquet':
+            _vistas_parquet(con, directorio or settings.HECHOS_PARQUET_DIR)
+        else:
+            _vistas_postgres(con, contratos, desde, hasta)
+        _cargar_dimensiones(con)
+        yield con
+    except duckdb.Error as e:
+        raise AnaliticaError(f'Error en la consulta: {e}') from e
+    finally:
+        con.close()
+
+
+def _filtros(contratos=None, desde=None, hasta=None, alias=''):
+    """Condiciones WHERE sobre contrato_id y mes (ambos columnas de partición) y sus parámetros."""
+    condiciones, params = [], []
+    if contratos:
+        condiciones.append(f'{alias}contrato_id IN ({", ".join("?" for _ in contratos)})')
+        params.extend(int(c) for c in contratos)
+    if desde:
+        condiciones.append(f'{alias}mes >= ?')
+        params.append(desde)
+    if hasta:
+        condiciones.append(f'{alias}mes <= ?')
+        params.append(hasta)
+    return ' AND '.join(condiciones) or 'TRUE', params
+
+
+def _consultar(con, sql, params):
+    cursor = con.execute(sql, params)
+    columnas = [d[0] for d in cursor.description]
+    return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+
+
+def metros_por_maquina_mes(con, contratos=None, desde=None, hasta=None):
+    """Turnos, metros perforados y horas de máquina por contrato, máquina y mes."""
+    where, params = _filtros(contratos, desde, hasta, alias='t.')
+    return _consultar(con, f"""
+        SELECT t.contrato_id, c.nombre_contrato AS contrato, t.maquina_id, m.nombre AS maquina, t.mes,
+               COUNT(*) AS turnos,
+               COALESCE(SUM(t.metros_perforados), 0)::DOUBLE AS metros,
+               COALESCE(SUM(t.horas_trabajadas), 0)::DOUBLE AS horas,
+               COALESCE(SUM(t.metros_perforados) / NULLIF(SUM(t.horas_trabajadas), 0), 0)::DOUBLE AS metros_por_hora
+        FROM turnos t
+        LEFT JOIN dim_contrato c ON c.id = t.contrato_id
+        LEFT JOIN dim_maquina m ON m.id = t.maquina_id
+        WHERE {where}
+        GROUP BY ALL
+        ORDER BY t.mes, contrato, maquina
+    """, params)
+
+
+def rendimiento_brocas(con, contratos=None, desde=None, hasta=None, categoria=None):
+    """
+    Rendimiento de productos diamantados por tipo de producto: series usadas,
+    metros totales y metros promedio por serie.
+    """
+    where, params = _filtros(contratos, desde, hasta, alias='x.')
+    if categoria:
+        where += ' AND d.categoria = ?'
+        params.append(categoria)
+    return _consultar(con, f"""
+        WITH por_serie AS (
+            SELECT x.tipo_complemento_id, x.codigo_serie,
+                   SUM(x.metros_turno) AS metros, COUNT(DISTINCT x.turno_id) AS turnos
+            FROM complementos x
+            LEFT JOIN dim_complemento d ON d.id = x.tipo_complemento_id
+            WHERE {where}
+            GROUP BY ALL
+        )
+        SELECT COALESCE(d.categoria, 'SIN_CATEGORIA') AS categoria, d.nombre AS producto,
+               COUNT(DISTINCT s.codigo_serie) AS series,
+               SUM(s.turnos) AS turnos,
+               COALESCE(SUM(s.metros), 0)::DOUBLE AS metros,
+               COALESCE(AVG(s.metros), 0)::DOUBLE AS metros_por_serie,
+               COALESCE(MAX(s.metros), 0)::DOUBLE AS metros_max_serie
+        FROM por_serie s
+        LEFT JOIN dim_complemento d ON d.id = s.tipo_complemento_id
+        GROUP BY ALL
+        ORDER BY metros DESC
+    """, params)
+
+
+def consumo_aditivos_por_metro(con, contratos=None, desde=None, hasta=None):
+    """Cantidad de cada aditivo por contrato y mes, y su consumo por metro perforado."""
+    where_a, params_a = _filtros(contratos, desde, hasta, alias='a.')
+    where_t, params_t = _filtros(contratos, desde, hasta, alias='t.')
+    return _consultar(con, f"""
+        WITH metros AS (
+            SELECT t.contrato_id, t.mes, SUM(t.metros_perforados) AS metros
+            FROM turnos t
+            WHERE {where_t}
+            GROUP BY ALL
+        ), consumo AS (
+            SELECT a.contrato_id, a.mes, a.tipo_aditivo_id, SUM(a.cantidad_usada) AS cantidad
+            FROM aditivos a
+            WHERE {where_a}
+            GROUP BY ALL
+        )
+        SELECT k.contrato_id, c.nombre_contrato AS contrato, k.mes, d.nombre AS aditivo, d.categoria,
+               k.cantidad::DOUBLE AS cantidad,
+               COALESCE(m.metros, 0)::DOUBLE AS metros,
+               (k.cantidad / NULLIF(m.metros, 0))::DOUBLE AS cantidad_por_metro
+        FROM consumo k
+        LEFT JOIN metros m ON m.contrato_id = k.contrato_id AND m.mes = k.mes
+        LEFT JOIN dim_contrato c ON c.id = k.contrato_id
+        LEFT JOIN dim_aditivo d ON d.id = k.tipo_aditivo_id
+        ORDER BY k.mes, contrato, aditivo
+    """, params_t + params_a)
+
+
+REPORTES = {
+    'metros': ('Metros por máquina y mes', metros_por_maquina_mes),
+    'brocas': ('Rendimiento de brocas por producto', rendimiento_brocas),
+    'aditivos': ('Consumo de aditivos por metro', consumo_aditivos_por_metro),
+}
@@ -0,0 +1,314 @@
+"""
+Archivo en frío de contratos finalizados: turnos y tablas hijas a Parquet.
+
+Los contratos FINALIZADOS conservan todos sus turnos en las tablas principales,
+lo que hace más lentas las consultas globales (administradores) y los índices.
+El archivo:
+1. Exporta cada tabla del grafo del turno a Parquet comprimido (zstd), un
+   archivo por tabla y mes: <ARCHIVO_PARQUET_DIR>/contrato_<id>/<tabla>/<YYYY-MM>.parquet
+2. Verifica cada archivo contra la base de datos: cantidad de filas, suma de
+   ids y SHA-256 del archivo (guardado en el manifiesto).
+3. Borra los turnos del contrato por lotes (Django elimina los hijos en cascada)
+   y las tablas derivadas que apuntan a ellos sin FK (hechos de BI, libro de
+   valorización, costeo FIFO, movimientos de stock).
+
+El costeo FIFO de los consumos (costo_consumo_fifo) y el libro de movimientos
+de stock (movimiento_stock) se archivan junto con el turno. Los lotes
+(Abastecimiento) quedan en la base, pero sus consumos ya no: el libro del
+contrato se borra completo (los ingresos solos darían saldos falsos) y
+costear_consumos no reconstruye los contratos ARCHIVADOS (ver
+drilling.utils.costeo_fifo), porque sin consumos los lotes volverían a tener
+su saldo completo.
+
+Los datos archivados se leen bajo demanda con pyarrow/pandas (leer_tabla).
+
+Uso:
+    from drilling.utils.archivo_contrato import exportar_contrato, verificar_contra_bd, borrar_turnos
+
+    manifiesto = exportar_contrato(contrato)
+    verificar_contra_bd(contrato, manifiesto)
+    borrar_turnos(contrato)
+"""
+
+import hashlib
+from itertools import groupby
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from drilling.models import (
+    ConsumoStock, CostoConsumoFIFO, IngestaTurno, MovimientoStock, Turno, TurnoActividad,
+    TurnoAditivo, TurnoAvance, TurnoComplemento, TurnoCorrida, TurnoHoraExtra, TurnoMaquina,
+    TurnoSondaje, TurnoTrabajador, ValorizacionTurno,
+)
+from drilling.utils.arrow import columnas_modelo, esquema_arrow, lotes_arrow
+
+# (tabla, modelo, prefijo hasta el turno)
+TABLAS_ARCHIVO = [
+    ('turnos', Turno, ''),
+    ('turno_sondaje', TurnoSondaje, 'turno__'),
+    ('turno_maquina', TurnoMaquina, 'turno__'),
+    ('turno_avance', TurnoAvance, 'turno__'),
+    ('turno_complemento', TurnoComplemento, 'turno__'),
+    ('turno_aditivo', TurnoAditivo, 'turno__'),
+    ('turno_corrida', TurnoCorrida, 'turno__'),
+    ('turno_actividad', TurnoActividad, 'turno__'),
+    ('turno_trabajador', TurnoTrabajador, 'turno__'),
+    ('turno_hora_extra', TurnoHoraExtra, 'turno__'),
+    ('consumo_stock', ConsumoStock, 'turno__'),
+    ('ingesta_turno', IngestaTurno, 'turno__'),
+    ('costo_consumo_fifo', CostoConsumoFIFO, ''),
+    ('movimiento_stock', MovimientoStock, ''),
+]
+
+# Filas por bloque al escribir Parquet
+TAMANO_LOTE = 10000
+
+# Turnos por transacción al borrar
+TAMANO_LOTE_BORRADO = 500
+
+COMPRESION = 'zstd'
+
+
+class ArchivoError(Exception):
+    """La exportación no coincide con la base de datos o los archivos fueron alterados."""
+
+
+def directorio_contrato(contrato_id):
+    return Path(settings.ARCHIVO_PARQUET_DIR) / f'contrato_{contrato_id}'
+
+
+def _queryset(modelo, prefijo, contrato_id):
+    return modelo.objects.filter(**{f'{prefijo}contrato_id': contrato_id})
+
+
+def sha256_archivo(ruta):
+    digest = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def exportar_tabla(modelo, prefijo, contrato_id, destino):
+    """
+    Escribe la tabla del contrato en un Parquet por mes (según la fecha del turno).
+
+    Returns:
+        dict: {'YYYY-MM': {'archivo', 'filas', 'suma_ids', 'sha256'}}
+    """
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    columnas = columnas_modelo(modelo)
+    campo_fecha = f'{prefijo}fecha'
+    esquema = esquema_arrow(modelo, columnas)
+    pk = modelo._meta.pk.attname
+    destino.mkdir(parents=True, exist_ok=True)
+
+    # Ordenado por fecha: cada mes se escribe completo antes de pasar al siguiente
+    filas = (
+        _queryset(modelo, prefijo, contrato_id)
+        .order_by(campo_fecha, 'pk')
+        .values_list(campo_fecha, *columnas)
+        .iterator(chunk_size=TAMANO_LOTE)
+    )
+    meses = {}
+    for mes, grupo in groupby(filas, key=lambda fila: f'{fila[0]:%Y-%m}'):
+        archivo = destino / f'{mes}.parquet'
+        info = {'archivo': archivo.name, 'filas': 0, 'suma_ids': 0}
+        with pq.ParquetWriter(archivo, esquema, compression=COMPRESION) as escritor:
+            for tabla in lotes_arrow((fila[1:] for fila in grupo), esquema, TAMANO_LOTE):
+                escritor.write_table(tabla)
+                info['filas'] += tabla.num_rows
+                info['suma_ids'] += pc.sum(tabla.column(pk)).as_py() or 0
+        info['sha256'] = sha256_archivo(archivo)
+        meses[mes] = info
+    return meses
+
+
+def exportar_contrato(contrato):
+    """
+    Exporta todas las tablas del contrato. Si el directorio ya existía se
+    reemplazan los archivos (la exportación se repite completa).
+
+    Returns:
+        dict: manifiesto {tabla: {mes: info}}
+    """
+    base = directorio_contrato(contrato.pk)
+    manifiesto = {}
+    for nombre, modelo, prefijo in TABLAS_ARCHIVO:
+        destino = base / nombre
+        if destino.exists():
+            for viejo in destino.glob('*.parquet'):
+                viejo.unlink()
+        manifiesto[nombre] = exportar_tabla(modelo, prefijo, contrato.pk, destino)
+    return manifiesto
+
+
+def conteos_bd(contrato_id):
+    """Filas y suma de ids por tabla y mes en la base de datos."""
+    conteos = {}
+    for nombre, modelo, prefijo in TABLAS_ARCHIVO:
+        filas = (
+            _queryset(modelo, prefijo, contrato_id)
+            .annotate(mes=TruncMonth(f'{prefijo}fecha'))
+            .values('mes')
+            .annotate(filas=Count('pk'), suma_ids=Sum('pk'))
+            .order_by()
+        )
+        conteos[nombre] = {
+            f"{fila['mes']:%Y-%m}": {'filas': fila['filas'], 'suma_ids': fila['suma_ids']}
+            for fila in filas
+        }
+    return conteos
+
+
+def verificar_archivos(contrato_id, manifiesto):
+    """
+    Relee cada archivo: SHA-256, filas y suma de ids deben coincidir con el manifiesto.
+
+    Raises:
+        ArchivoError: con la lista de diferencias
+    """
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    base = directorio_contrato(contrato_id)
+    errores = []
+    for nombre, modelo, _ in TABLAS_ARCHIVO:
+        pk = modelo._meta.pk.attname
+        for mes, info in manifiesto.get(nombre, {}).items():
+            ruta = base / nombre / info['archivo']
+            if not ruta.exists():
+                errores.append(f'{nombre}/{mes}: falta el archivo')
+                continue
+            if sha256_archivo(ruta) != info['sha256']:
+                errores.append(f'{nombre}/{mes}: el checksum no coincide')
+                continue
+            ids = pq.read_table(ruta, columns=[pk]).column(pk)
+            if len(ids) != info['filas'] or (pc.sum(ids).as_py() or 0) != info['suma_ids']:
+                errores.append(f'{nombre}/{mes}: el contenido no coincide con el manifiesto')
+    if errores:
+        raise ArchivoError('; '.join(errores))
+
+
+def verificar_contra_bd(contrato, manifiesto):
+    """
+    Verifica los archivos y que cada tabla/mes tenga las mismas filas y suma de
+    ids que la base de datos. Debe pasar antes de borrar.
+    """
+    verificar_archivos(contrato.pk, manifiesto)
+    errores = []
+    for nombre, meses in conteos_bd(contrato.pk).items():
+        exportado = {
+            mes: {'filas': info['filas'], 'suma_ids': info['suma_ids']}
+            for mes, info in manifiesto.get(nombre, {}).items()
+        }
+        if exportado != meses:
+            errores.append(f'{nombre}: la exportación no coincide con la base de datos')
+    if errores:
+        raise ArchivoError('; '.join(errores))
+
+
+def turnos_sin_archivar(contrato):
+    """Ids de turnos del contrato en la BD que no están en el archivo (creados después de exportar)."""
+    archivados = set(leer_tabla(contrato.pk, 'turnos', columnas=['id'])['id'])
+    return [
+        pk for pk in Turno.objects.filter(contrato=contrato).values_list('pk', flat=True).iterator()
+        if pk not in archivados
+    ]
+
+
+def borrar_turnos(contrato, tamano_lote=TAMANO_LOTE_BORRADO):
+    """
+    Borra los turnos del contrato por lotes, cada lote en su propia transacción
+    (los hijos se eliminan en cascada). Devuelve la cantidad de turnos borrados.
+    """
+    from drilling.utils.bi_facts import purgar_turnos_eliminados
+
+    borrados = 0
+    while True:
+        ids = list(Turno.objects.filter(contrato=contrato).values_list('pk', flat=True)[:tamano_lote])
+        if not ids:
+            break
+        with transaction.atomic():
+            Turno.objects.filter(pk__in=ids).delete()
+        borrados += len(ids)
+    # Los hechos de BI, el libro de valorización, el costeo FIFO y los
+    # movimientos de stock de esos turnos ya no tienen origen (el borrado por
+    # queryset no pasa por delete())
+    purgar_turnos_eliminados()
+    ValorizacionTurno.objects.filter(contrato=contrato).delete()
+    CostoConsumoFIFO.objects.filter(contrato=contrato).delete()
+    MovimientoStock.objects.filter(contrato=contrato).delete()
+    return borrados
+
+
+def resumen_manifiesto(manifiesto):
+    """Filas totales por tabla."""
+    return {
+        nombre: sum(info['filas'] for info in meses.values())
+        for nombre, meses in manifiesto.items()
+    }
+
+
+def leer_tabla(contrato_id, tabla, columnas=None, meses=None):
+    """
+    DataFrame de pandas con una tabla archivada del contrato.
+
+    Args:
+        columnas: columnas a leer (default: todas)
+        meses: lista de 'YYYY-MM' a leer (default: todos)
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    directorio = directorio_contrato(contrato_id) / tabla
+    archivos = sorted(directorio.glob('*.parquet')) if directorio.exists() else []
+    if meses is not None:
+        archivos = [a for a in archivos if a.stem in set(meses)]
+    if not archivos:
+        return pd.DataFrame(columns=columnas or [])
+    tablas = [pq.read_table(archivo, columns=columnas) for archivo in archivos]
+    return pa.concat_tables(tablas).to_pandas()
+
+
+def resumen_archivado(contrato_id, meses=None):
+    """
+    Resumen del contrato archivado calculado sobre los Parquet (pandas):
+    turnos, metros y horas extra por mes y por máquina.
+
+    Returns:
+        dict: {'por_mes': [...], 'por_maquina': [...], 'totales': {...}}
+    """
+    import pandas as pd
+
+    turnos = leer_tabla(contrato_id, 'turnos', ['id', 'fecha', 'maquina_id', 'estado'], meses=meses)
+    if turnos.empty:
+        return {'por_mes': [], 'por_maquina': [], 'totales': {'turnos': 0, 'metros': 0, 'horas_extra': 0}}
+    avance = leer_tabla(contrato_id, 'turno_avance', ['turno_id', 'metros_perforados'], meses=meses)
+    horas = leer_tabla(contrato_id, 'turno_hora_extra', ['turno_id', 'horas_extra'], meses=meses)
+
+    turnos['mes'] = pd.to_datetime(turnos['fecha']).dt.strftime('%Y-%m')
+    metros = avance.groupby('turno_id')['metros_perforados'].sum().astype(float)
+    extra = horas.groupby('turno_id')['horas_extra'].sum().astype(float)
+    turnos['metros'] = turnos['id'].map(metros).fillna(0.0)
+    turnos['horas_extra'] = turnos['id'].map(extra).fillna(0.0)
+
+    agregados = {'turnos': ('id', 'count'), 'metros': ('metros', 'sum'), 'horas_extra': ('horas_extra', 'sum')}
+    por_mes = turnos.groupby('mes').agg(**agregados).reset_index().sort_values('mes')
+    por_maquina = turnos.groupby('maquina_id').agg(**agregados).reset_index().sort_values('metros', ascending=False)
+    return {
+        'por_mes': por_mes.to_dict('records'),
+        'por_maquina': por_maquina.to_dict('records'),
+        'totales': {
+            'turnos': int(len(turnos)),
+            'metros': float(turnos['metros'].sum()),
+            'horas_extra': float(turnos['horas_extra'].sum()),
+        },
+    }
@@ -0,0 +1,105 @@
+"""
+Conversión de querysets a tablas Arrow / archivos Parquet.
+
+El esquema Arrow se deriva de los campos del modelo (Decimal con su precisión,
+fechas como date32, etc.), así los archivos conservan los tipos aunque un
+bloque venga con todos los valores nulos. Las filas se leen como tuplas
+(values_list) y se pasan a columnas por bloques: nunca se instancian modelos.
+
+pyarrow es una dependencia opcional: se importa al usar estas funciones.
+"""
+
+import json
+
+from django.db import models
+
+
+def tipo_arrow(campo):
+    """Tipo pyarrow equivalente a un campo de modelo Django."""
+    import pyarrow as pa
+
+    if isinstance(campo, models.ForeignKey):
+        campo = campo.target_field
+    if isinstance(campo, (models.AutoField, models.BigAutoField, models.IntegerField)):
+        return pa.int64()
+    if isinstance(campo, models.DecimalField):
+        return pa.decimal128(campo.max_digits, campo.decimal_places)
+    if isinstance(campo, models.FloatField):
+        return pa.float64()
+    if isinstance(campo, models.BooleanField):
+        return pa.bool_()
+    if isinstance(campo, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(campo, models.DateField):
+        return pa.date32()
+    if isinstance(campo, models.TimeField):
+        return pa.time64('us')
+    return pa.string()
+
+
+def columnas_modelo(modelo):
+    """Columnas concretas del modelo (attname: 'turno_id', no 'turno')."""
+    return [campo.attname for campo in modelo._meta.concrete_fields]
+
+
+def esquema_arrow(modelo, columnas, extras=None):
+    """
+    Esquema pyarrow para columnas del modelo. Acepta rutas con '__'
+    ('turno__fecha'); extras permite fijar el tipo de columnas calculadas.
+    """
+    import pyarrow as pa
+
+    extras = extras or {}
+    campos = []
+    for columna in columnas:
+        if columna in extras:
+            campos.append(pa.field(columna, extras[columna]))
+            continue
+        actual = modelo
+        partes = columna.split('__')
+        for parte in partes[:-1]:
+            actual = actual._meta.get_field(parte).related_model
+        campo = _campo_por_columna(actual, partes[-1])
+        campos.append(pa.field(columna, tipo_arrow(campo), nullable=campo.null or len(partes) > 1))
+    return pa.schema(campos)
+
+
+def _campo_por_columna(modelo, nombre):
+    for campo in modelo._meta.concrete_fields:
+        if nombre in (campo.name, campo.attname):
+            return campo
+    return modelo._meta.get_field(nombre)
+
+
+def _normalizar(valor):
+    # JSONField y similares: se guardan como texto JSON
+    if isinstance(valor, (dict, list)):
+        return json.dumps(valor, ensure_ascii=False, default=str)
+    return valor
+
+
+def tabla_desde_filas(filas, esquema):
+    """Tabla Arrow a partir de una lista de tuplas en el orden del esquema."""
+    import pyarrow as pa
+
+    if not filas:
+        return esquema.empty_table()
+    columnas = list(zip(*filas))
+    arrays = []
+    for campo, valores in zip(esquema, columnas):
+        if pa.types.is_string(campo.type):
+            valores = [None if v is None else str(_normalizar(v)) for v in valores]
+        arrays.append(pa.array(valores, type=campo.type))
+    return pa.Table.from_arrays(arrays, schema=esquema)
+
+
+def lotes_arrow(filas, esquema, tamano_lote):
+    """Agrupa un iterador de tuplas en tablas Arrow de hasta tamano_lote filas."""
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano_lote:
+            yield tabla_desde_filas(lote, esquema)
+            lote = []
+    if lote:
+        yield tabla_desde_filas(lote, esquema)
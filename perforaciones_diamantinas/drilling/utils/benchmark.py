@@ -0,0 +1,35 @@
+"""
+Utilidades compartidas por los comandos de benchmark
+(seed_benchmark_data y run_benchmarks).
+"""
+
+from django.db import connections
+
+# Prefijo por defecto para identificar (y poder eliminar) los datos sintéticos
+PREFIJO_BENCHMARK = 'BENCH'
+
+HOSTS_LOCALES = {'', 'localhost', '127.0.0.1', '::1'}
+
+
+def es_base_datos_local(alias='default'):
+    """
+    Indica si la conexión apunta a una base de datos local (SQLite o Postgres en
+    localhost). Los benchmarks nunca deben correr contra el servidor remoto de
+    producción porque generan datos sintéticos y carga artificial.
+    """
+    conexion = connections[alias]
+    if conexion.vendor == 'sqlite':
+        return True
+    host = (conexion.settings_dict.get('HOST') or '').strip()
+    return host in HOSTS_LOCALES
+
+
+def descripcion_base_datos(alias='default'):
+    """Retorna un diccionario con la identificación de la BD usada en el benchmark."""
+    conexion = connections[alias]
+    return {
+        'alias': alias,
+        'vendor': conexion.vendor,
+        'name': str(conexion.settings_dict.get('NAME') or ''),
+        'host': conexion.settings_dict.get('HOST') or '',
+    }
@@ -0,0 +1,418 @@
+"""
+Refresco incremental de las tablas de hechos de Power BI.
+
+Las vistas de sql_views/ (vw_turnos_fact, vw_cumplimiento_metas, vw_horas_extras)
+recalculan todo el histórico en cada refresco de Power BI: subconsultas
+correlacionadas por turno y un range-join de cada meta contra todos los turnos.
+Este módulo mantiene tablas reales (fact_turno, fact_complemento,
+fact_horas_extras, fact_meta_cumplimiento) y solo reprocesa lo que cambió desde
+la última marca de agua guardada en bi_watermark:
+
+1. Turnos cambiados: turnos con updated_at posterior a la marca. Guardar,
+   actualizar o borrar filas hijas (máquina, avance, sondajes, complementos,
+   trabajadores, horas extras) mueve el updated_at del turno
+   (ver drilling.models.HijoTurno).
+2. Por cada lote de turnos se hace upsert en fact_turno y se reemplazan sus filas
+   de fact_complemento y fact_horas_extras.
+3. Turnos y metas eliminados se quitan de las tablas de hechos (NOT EXISTS por pk).
+4. Metas afectadas: las modificadas desde la marca y las cuyo período contiene
+   la fecha (actual o anterior) de algún turno cambiado o eliminado.
+
+El costo de cada refresco es proporcional a los cambios del día, no al histórico.
+
+Uso:
+    from drilling.utils.bi_facts import refrescar_hechos
+
+    resumen = refrescar_hechos()                # incremental desde la marca
+    resumen = refrescar_hechos(completo=True)   # reconstruye todo
+"""
+
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Sum
+from django.utils import timezone
+
+from drilling.models import (
+    BiWatermark, FactComplemento, FactHorasExtras, FactMetaCumplimiento, FactTurno,
+    MetaMaquina, Turno, TurnoComplemento, TurnoHoraExtra, TurnoSondaje,
+    TurnoTrabajador,
+)
+
+NOMBRE_WATERMARK = 'refresh_bi_facts'
+
+# Se relee un margen antes de la marca para cubrir relojes desfasados entre
+# servidores y transacciones que confirmaron después de leer la marca. El
+# upsert es idempotente, así que reprocesar filas no tiene efecto.
+SOLAPE = timedelta(minutes=5)
+
+TAMANO_LOTE = 500
+
+CAMPOS_FACT_TURNO = [
+    'fecha', 'año', 'mes', 'contrato', 'maquina', 'tipo_turno', 'estado',
+    'horometro_inicio', 'horometro_fin', 'horas_trabajadas', 'metros_perforados',
+    'metros_sondajes_total', 'metros_complementos', 'horas_extra_total',
+    'total_trabajadores', 'turno_created_at', 'turno_updated_at', 'actualizado_en',
+]
+
+CAMPOS_FACT_META = [
+    'contrato', 'maquina', 'año', 'mes', 'fecha_inicio_periodo', 'fecha_fin_periodo',
+    'es_periodo_personalizado', 'meta_metros', 'activo', 'total_turnos',
+    'metros_reales', 'brecha_metros', 'porcentaje_cumplimiento',
+    'estado_cumplimiento', 'fecha_primer_turno', 'fecha_ultimo_turno', 'actualizado_en',
+]
+
+
+def _lotes(ids, tamano=TAMANO_LOTE):
+    ids = sorted(ids)
+    for i in range(0, len(ids), tamano):
+        yield ids[i:i + tamano]
+
+
+def turnos_modificados_desde(marca):
+    """
+    IDs de turnos con cambios propios o en sus tablas hijas desde la marca (una
+    query). Las tablas hijas mueven Turno.updated_at al escribir (HijoTurno).
+    """
+    return set(Turno.objects.filter(updated_at__gte=marca).values_list('pk', flat=True).order_by())
+
+
+def refrescar_turnos(turno_ids):
+    """
+    Upsert de fact_turno y reemplazo de fact_complemento/fact_horas_extras para
+    los turnos indicados. Los IDs que ya no existen se eliminan de los hechos.
+
+    Returns:
+        tuple: (filas escritas, set de (contrato_id, maquina_id, fecha) tocados,
+        incluyendo los valores previos de turnos movidos o eliminados)
+    """
+    filas = 0
+    claves = set()
+    for lote in _lotes(turno_ids):
+        turnos = list(Turno.objects.filter(pk__in=lote).values(
+            'id', 'fecha', 'contrato_id', 'maquina_id', 'tipo_turno_id', 'estado',
+            'created_at', 'updated_at',
+            'maquina_estado__horometro_inicio', 'maquina_estado__horometro_fin',
+            'maquina_estado__horas_trabajadas_calc', 'avance__metros_perforados',
+        ))
+        metros_sondajes = dict(
+            TurnoSondaje.objects.filter(turno_id__in=lote).values('turno_id').annotate(
+                total=Sum('metros_turno')
+            ).order_by().values_list('turno_id', 'total')
+        )
+        complementos = list(TurnoComplemento.objects.filter(turno_id__in=lote).values(
+            'id', 'turno_id', 'sondaje_id', 'tipo_complemento_id', 'codigo_serie',
+            'metros_inicio', 'metros_fin', 'metros_turno_calc',
+        ))
+        horas_extras = list(TurnoHoraExtra.objects.filter(turno_id__in=lote).values(
+            'id', 'turno_id', 'trabajador_id', 'trabajador__cargo_id', 'horas_extra',
+            'metros_turno', 'configuracion_aplicada_id',
+        ))
+        funciones = {
+            (turno_id, trabajador_id): funcion
+            for turno_id, trabajador_id, funcion in TurnoTrabajador.objects.filter(
+                turno_id__in=lote
+            ).values_list('turno_id', 'trabajador_id', 'funcion')
+        }
+        # Valores anteriores: si el turno cambió de fecha/máquina o se eliminó,
+        # la meta del período anterior también debe recalcularse
+        claves.update(FactTurno.objects.filter(turno_id__in=lote).values_list(
+            'contrato_id', 'maquina_id', 'fecha'
+        ))
+
+        por_turno = {t['id']: t for t in turnos}
+        metros_complementos = {}
+        for c in complementos:
+            metros_complementos[c['turno_id']] = (
+                metros_complementos.get(c['turno_id'], Decimal('0')) + (c['metros_turno_calc'] or 0)
+            )
+        horas_por_turno = {}
+        for he in horas_extras:
+            horas_por_turno[he['turno_id']] = horas_por_turno.get(he['turno_id'], Decimal('0')) + he['horas_extra']
+        trabajadores_por_turno = {}
+        for turno_id, _ in funciones:
+            trabajadores_por_turno[turno_id] = trabajadores_por_turno.get(turno_id, 0) + 1
+
+        hechos_turno = [
+            FactTurno(
+                turno_id=t['id'],
+                fecha=t['fecha'],
+                año=t['fecha'].year,
+                mes=t['fecha'].month,
+                contrato_id=t['contrato_id'],
+                maquina_id=t['maquina_id'],
+                tipo_turno_id=t['tipo_turno_id'],
+                estado=t['estado'],
+                horometro_inicio=t['maquina_estado__horometro_inicio'],
+                horometro_fin=t['maquina_estado__horometro_fin'],
+                horas_trabajadas=t['maquina_estado__horas_trabajadas_calc'] or 0,
+                metros_perforados=t['avance__metros_perforados'] or 0,
+                metros_sondajes_total=metros_sondajes.get(t['id']) or 0,
+                metros_complementos=metros_complementos.get(t['id'], 0),
+                horas_extra_total=horas_por_turno.get(t['id'], 0),
+                total_trabajadores=trabajadores_por_turno.get(t['id'], 0),
+                turno_created_at=t['created_at'],
+                turno_updated_at=t['updated_at'],
+            )
+            for t in turnos
+        ]
+        hechos_complemento = [
+            FactComplemento(
+                complemento_id=c['id'],
+                turno_id=c['turno_id'],
+                fecha=por_turno[c['turno_id']]['fecha'],
+                contrato_id=por_turno[c['turno_id']]['contrato_id'],
+                maquina_id=por_turno[c['turno_id']]['maquina_id'],
+                sondaje_id=c['sondaje_id'],
+                tipo_complemento_id=c['tipo_complemento_id'],
+                codigo_serie=c['codigo_serie'],
+                metros_inicio=c['metros_inicio'],
+                metros_fin=c['metros_fin'],
+                metros_turno=c['metros_turno_calc'] or 0,
+            )
+            for c in complementos
+        ]
+        hechos_horas = [
+            FactHorasExtras(
+                hora_extra_id=he['id'],
+                turno_id=he['turno_id'],
+                fecha=por_turno[he['turno_id']]['fecha'],
+                año=por_turno[he['turno_id']]['fecha'].year,
+                mes=por_turno[he['turno_id']]['fecha'].month,
+                contrato_id=por_turno[he['turno_id']]['contrato_id'],
+                maquina_id=por_turno[he['turno_id']]['maquina_id'],
+                tipo_turno_id=por_turno[he['turno_id']]['tipo_turno_id'],
+                trabajador_id=he['trabajador_id'],
+                cargo_id=he['trabajador__cargo_id'],
+                funcion=funciones.get((he['turno_id'], he['trabajador_id']), ''),
+                horas_extra=he['horas_extra'],
+                metros_turno=he['metros_turno'],
+                configuracion_aplicada_id=he['configuracion_aplicada_id'],
+            )
+            for he in horas_extras
+        ]
+
+        with transaction.atomic():
+            eliminados = set(lote) - set(por_turno)
+            if eliminados:
+                FactTurno.objects.filter(turno_id__in=eliminados).delete()
+            FactTurno.objects.bulk_create(
+                hechos_turno,
+                update_conflicts=True,
+                unique_fields=['turno'],
+                update_fields=CAMPOS_FACT_TURNO,
+            )
+            # Los complementos y horas extras se regeneran al editar el turno
+            # (se borran y recrean), así que se reemplazan completos por turno
+            FactComplemento.objects.filter(turno_id__in=lote).delete()
+            FactComplemento.objects.bulk_create(hechos_complemento)
+            FactHorasExtras.objects.filter(turno_id__in=lote).delete()
+            FactHorasExtras.objects.bulk_create(hechos_horas)
+
+        claves.update((t['contrato_id'], t['maquina_id'], t['fecha']) for t in turnos)
+        filas += len(hechos_turno) + len(hechos_complemento) + len(hechos_horas)
+    return filas, claves
+
+
+def purgar_turnos_eliminados():
+    """
+    Quita de los hechos los turnos que ya no existen.
+
+    Returns:
+        set: (contrato_id, maquina_id, fecha) de los turnos eliminados
+    """
+    huerfanos = list(FactTurno.objects.filter(
+        ~Exists(Turno.objects.filter(pk=OuterRef('turno_id')))
+    ).values_list('turno_id', 'contrato_id', 'maquina_id', 'fecha'))
+    if not huerfanos:
+        return set()
+    ids = [turno_id for turno_id, _, _, _ in huerfanos]
+    with transaction.atomic():
+        FactComplemento.objects.filter(turno_id__in=ids).delete()
+        FactHorasExtras.objects.filter(turno_id__in=ids).delete()
+        FactTurno.objects.filter(turno_id__in=ids).delete()
+    return {(contrato_id, maquina_id, fecha) for _, contrato_id, maquina_id, fecha in huerfanos}
+
+
+def metas_afectadas(marca, claves):
+    """
+    Metas a recalcular: modificadas desde la marca (si se indica) o cuyo
+    período contiene alguna de las claves (contrato_id, maquina_id, fecha) tocadas.
+    """
+    if marca is None and not claves:
+        return []
+    filtro = Q(updated_at__gte=marca) if marca is not None else Q(pk__in=[])
+    if claves:
+        fechas = [fecha for _, _, fecha in claves]
+        # El mes operativo 26-25 puede caer en el año siguiente (26-dic -> enero)
+        años = {fecha.year for fecha in fechas} | {fecha.year + 1 for fecha in fechas}
+        filtro |= Q(
+            contrato_id__in={contrato_id for contrato_id, _, _ in claves},
+            maquina_id__in={maquina_id for _, maquina_id, _ in claves},
+        ) & (
+            Q(año__in=años) | Q(fecha_inicio__lte=max(fechas), fecha_fin__gte=min(fechas))
+        )
+
+    fechas_por_maquina = {}
+    for contrato_id, maquina_id, fecha in claves:
+        fechas_por_maquina.setdefault((contrato_id, maquina_id), []).append(fecha)
+
+    afectadas = []
+    for meta in MetaMaquina.objects.filter(filtro):
+        if marca is not None and meta.updated_at >= marca:
+            afectadas.append(meta)
+            continue
+        inicio, fin = meta.get_fecha_inicio_periodo(), meta.get_fecha_fin_periodo()
+        if any(inicio <= fecha <= fin for fecha in fechas_por_maquina.get((meta.contrato_id, meta.maquina_id), [])):
+            afectadas.append(meta)
+    return afectadas
+
+
+def estado_cumplimiento(meta_metros, metros_reales):
+    """Categoría de cumplimiento con los mismos umbrales que vw_cumplimiento_metas."""
+    if not meta_metros:
+        return 'SIN META'
+    if not metros_reales:
+        return 'SIN AVANCE'
+    porcentaje = metros_reales / meta_metros * 100
+    if porcentaje >= 100:
+        return 'CUMPLIDO'
+    if porcentaje >= 90:
+        return 'CERCA'
+    if porcentaje >= 70:
+        return 'REGULAR'
+    if porcentaje >= 50:
+        return 'BAJO'
+    return 'CRÍTICO'
+
+
+def refrescar_metas(metas):
+    """Upsert de fact_meta_cumplimiento para las metas indicadas. Retorna filas escritas."""
+    metas = list(metas)
+    if not metas:
+        return 0
+    reales = MetaMaquina.calcular_metros_reales(metas)
+    hechos = []
+    for meta in metas:
+        real = reales[meta.pk]
+        porcentaje = (
+            (real['metros'] / meta.meta_metros * 100).quantize(Decimal('0.01'))
+            if meta.meta_metros else Decimal('0')
+        )
+        hechos.append(FactMetaCumplimiento(
+            meta_id=meta.pk,
+            contrato_id=meta.contrato_id,
+            maquina_id=meta.maquina_id,
+            año=meta.año,
+            mes=meta.mes,
+            fecha_inicio_periodo=meta.get_fecha_inicio_periodo(),
+            fecha_fin_periodo=meta.get_fecha_fin_periodo(),
+            es_periodo_personalizado=bool(meta.fecha_inicio and meta.fecha_fin),
+            meta_metros=meta.meta_metros,
+            activo=meta.activo,
+            total_turnos=real['turnos'],
+            metros_reales=real['metros'],
+            brecha_metros=meta.meta_metros - real['metros'],
+            porcentaje_cumplimiento=porcentaje,
+            estado_cumplimiento=estado_cumplimiento(meta.meta_metros, real['metros']),
+            fecha_primer_turno=real['primer_turno'],
+            fecha_ultimo_turno=real['ultimo_turno'],
+        ))
+    FactMetaCumplimiento.objects.bulk_create(
+        hechos,
+        batch_size=TAMANO_LOTE,
+        update_conflicts=True,
+        unique_fields=['meta'],
+        update_fields=CAMPOS_FACT_META,
+    )
+    return len(hechos)
+
+
+def refrescar_por_turnos(turno_ids):
+    """
+    Refresca los hechos de un conjunto de turnos y de las metas que los contienen,
+    sin mover la marca de agua. Para operaciones masivas (ej: aprobación por
+    lotes) que quieren dejar el BI al día sin esperar al próximo refresco.
+
+    Returns:
+        int: filas escritas
+    """
+    if not turno_ids:
+        return 0
+    filas, claves = refrescar_turnos(turno_ids)
+    return filas + refrescar_metas(metas_afectadas(None, claves))
+
+
+def refrescar_hechos(desde=None, completo=False, dry_run=False):
+    """
+    Refresca las tablas de hechos y avanza la marca de agua.
+
+    Args:
+        desde (datetime): reprocesar desde esta fecha en lugar de la marca guardada
+        completo (bool): reconstruir todos los turnos y metas
+        dry_run (bool): solo calcular qué se reprocesaría, sin escribir
+
+    Returns:
+        dict: resumen con 'modo', 'marca_anterior', 'marca_nueva', 'turnos',
+        'metas', 'turnos_eliminados', 'filas' y 'segundos'
+    """
+    t0 = time.perf_counter()
+    # La nueva marca se toma antes de leer: lo que cambie durante el refresco
+    # queda para la siguiente ejecución
+    marca_nueva = timezone.now()
+    watermark = BiWatermark.objects.filter(nombre=NOMBRE_WATERMARK).first()
+
+    if completo or (desde is None and watermark is None):
+        modo = 'completo'
+        marca = None
+        turno_ids = set(Turno.objects.values_list('pk', flat=True))
+    else:
+        modo = 'incremental'
+        marca = desde if desde is not None else watermark.marca - SOLAPE
+        turno_ids = turnos_modificados_desde(marca)
+
+    resumen = {
+        'modo': modo,
+        'marca_anterior': marca,
+        'marca_nueva': marca_nueva,
+        'turnos': len(turno_ids),
+        'metas': 0,
+        'turnos_eliminados': 0,
+        'filas': 0,
+        'segundos': 0,
+    }
+    if dry_run:
+        resumen['segundos'] = round(time.perf_counter() - t0, 3)
+        return resumen
+
+    filas, claves = refrescar_turnos(turno_ids)
+    eliminados = purgar_turnos_eliminados()
+    claves |= eliminados
+
+    if modo == 'completo':
+        metas = list(MetaMaquina.objects.all())
+    else:
+        metas = metas_afectadas(marca, claves)
+    filas += refrescar_metas(metas)
+    FactMetaCumplimiento.objects.filter(
+        ~Exists(MetaMaquina.objects.filter(pk=OuterRef('meta_id')))
+    ).delete()
+
+    segundos = round(time.perf_counter() - t0, 3)
+    BiWatermark.objects.update_or_create(
+        nombre=NOMBRE_WATERMARK,
+        defaults={
+            'marca': marca_nueva,
+            'filas_actualizadas': filas,
+            'duracion_segundos': Decimal(str(segundos)),
+        },
+    )
+    resumen.update({
+        'metas': len(metas),
+        'turnos_eliminados': len(eliminados),
+        'filas': filas,
+        'segundos': segundos,
+    })
+    return resumen
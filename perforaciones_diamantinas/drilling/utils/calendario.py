@@ -0,0 +1,117 @@
+"""
+Calendario operativo y filtros de período aptos para índices.
+
+El mes operativo va del 26 del mes anterior al 25 del mes (la meta de
+noviembre 2024 cubre del 26-oct al 25-nov). La semana operativa es la semana
+dentro del mes operativo: la semana 1 empieza el día 26 y la última puede
+tener menos de 7 días.
+
+Filtrar con fecha__month / fecha__year envuelve la columna en EXTRACT y la
+base de datos no puede usar el índice (contrato, fecha). filtro_periodo
+convierte mes calendario, mes operativo y semana ISO u operativa en un rango
+fecha >= inicio AND fecha <= fin sobre la columna indicada.
+
+La tabla calendario_operativo (modelo CalendarioOperativo) guarda las mismas
+columnas por día para Power BI y las vistas SQL; se llena con fila_calendario.
+
+Uso:
+    from drilling.utils.calendario import filtro_periodo, rango_mes_operativo
+
+    Turno.objects.filter(filtro_periodo('fecha', año=2025, mes=3))
+    TurnoAvance.objects.filter(filtro_periodo('fecha_turno', año=2025, mes_operativo=3))
+    fecha_inicio, fecha_fin = rango_mes_operativo(2025, 3)
+"""
+
+import calendar
+from datetime import date, timedelta
+
+from django.db.models import Q
+
+# Último día del mes operativo; el siguiente empieza el día DIA_CORTE + 1
+DIA_CORTE = 25
+
+
+def rango_mes(año, mes):
+    """(primer día, último día) del mes calendario."""
+    return date(año, mes, 1), date(año, mes, calendar.monthrange(año, mes)[1])
+
+
+def rango_mes_operativo(año, mes):
+    """(26 del mes anterior, 25 del mes) del mes operativo."""
+    if mes == 1:
+        inicio = date(año - 1, 12, DIA_CORTE + 1)
+    else:
+        inicio = date(año, mes - 1, DIA_CORTE + 1)
+    return inicio, date(año, mes, DIA_CORTE)
+
+
+def mes_operativo(fecha):
+    """(año, mes) operativo al que pertenece la fecha."""
+    if fecha.day <= DIA_CORTE:
+        return fecha.year, fecha.month
+    if fecha.month == 12:
+        return fecha.year + 1, 1
+    return fecha.year, fecha.month + 1
+
+
+def rango_semana_iso(año, semana):
+    """(lunes, domingo) de la semana ISO."""
+    inicio = date.fromisocalendar(año, semana, 1)
+    return inicio, inicio + timedelta(days=6)
+
+
+def rango_semana_operativa(año, mes, semana):
+    """(inicio, fin) de la semana dentro del mes operativo (1 = desde el día 26)."""
+    inicio_mes, fin_mes = rango_mes_operativo(año, mes)
+    inicio = inicio_mes + timedelta(days=7 * (semana - 1))
+    if semana < 1 or inicio > fin_mes:
+        raise ValueError(f'El mes operativo {año}-{mes:02d} no tiene semana {semana}')
+    return inicio, min(inicio + timedelta(days=6), fin_mes)
+
+
+def fila_calendario(fecha):
+    """Columnas de la tabla calendario_operativo para una fecha."""
+    año_op, mes_op = mes_operativo(fecha)
+    inicio_op, fin_op = rango_mes_operativo(año_op, mes_op)
+    año_iso, semana_iso, dia_semana = fecha.isocalendar()
+    return {
+        'fecha': fecha,
+        'año': fecha.year,
+        'mes': fecha.month,
+        'dia_semana': dia_semana,
+        'año_operativo': año_op,
+        'mes_operativo': mes_op,
+        'inicio_mes_operativo': inicio_op,
+        'fin_mes_operativo': fin_op,
+        'semana_operativa': (fecha - inicio_op).days // 7 + 1,
+        'año_iso': año_iso,
+        'semana_iso': semana_iso,
+    }
+
+
+def rango_periodo(año, mes=None, mes_operativo=None, semana=None, semana_operativa=None):
+    """
+    (inicio, fin) del período indicado. Combinaciones válidas:
+    año + mes, año + mes_operativo, año + mes_operativo + semana_operativa,
+    año + semana (ISO).
+    """
+    if semana_operativa is not None:
+        if mes_operativo is None:
+            raise ValueError('semana_operativa requiere mes_operativo')
+        return rango_semana_operativa(año, mes_operativo, semana_operativa)
+    if mes_operativo is not None:
+        return rango_mes_operativo(año, mes_operativo)
+    if mes is not None:
+        return rango_mes(año, mes)
+    if semana is not None:
+        return rango_semana_iso(año, semana)
+    return date(año, 1, 1), date(año, 12, 31)
+
+
+def filtro_periodo(campo, año, mes=None, mes_operativo=None, semana=None, semana_operativa=None):
+    """
+    Q con el rango de fechas del período sobre campo (p. ej. 'fecha',
+    'turno__fecha', 'fecha_turno'), en lugar de campo__month / campo__year.
+    """
+    inicio, fin = rango_periodo(año, mes, mes_operativo, semana, semana_operativa)
+    return Q(**{f'{campo}__gte': inicio, f'{campo}__lte': fin})
@@ -0,0 +1,135 @@
+"""
+Conciliación del stock del almacén (API de Vilbragroup) con el saldo local.
+
+El stock del almacén por centro de costo (obtener_articulos_almacen) y los
+saldos locales de abastecimientos y consumos se llevan por separado, y
+compararlos era mirar dos páginas lentas. Aquí, por contrato y familia:
+
+1. Se toma una foto del stock de la API (drilling.utils.fotos_almacen; si no
+   cambió desde la última se reutiliza esa).
+2. Se cruzan en conjunto con los saldos locales actuales del libro de
+   movimientos (drilling.utils.movimientos_stock.saldos_al):
+   - PDD (productos diamantados): por serie; los lotes y artículos sin serie
+     se cruzan por código.
+   - ADIT (aditivos): por código de producto.
+3. Las diferencias reemplazan a las de la conciliación anterior en la tabla
+   discrepancia_stock, que es la que lee el reporte de discrepancias.
+
+`python manage.py conciliar_stock_almacen` corre la conciliación de los
+contratos activos con centro de costo.
+
+Uso:
+    from drilling.utils.conciliacion_stock import conciliar_contrato
+
+    resumen = conciliar_contrato(contrato)   # {'PDD': {...}, 'ADIT': {...}}
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+
+from drilling.models import DiscrepanciaStock
+from drilling.utils.fotos_almacen import CAMPOS_ARTICULO, _texto, _totales, clave, tomar_foto
+from drilling.utils.movimientos_stock import saldos_al
+
+# Familia del almacén -> familia de Abastecimiento
+FAMILIAS_LOCALES = {
+    'PDD': 'PRODUCTOS_DIAMANTADOS',
+    'ADIT': 'ADITIVOS_PERFORACION',
+}
+
+# Diferencias menores se consideran redondeo
+TOLERANCIA = Decimal('0.01')
+
+TAMANO_LOTE = 1000
+
+
+def _stock_local(contrato_id, familia):
+    totales = {}
+    por = 'lote' if familia == 'PDD' else 'producto'
+    for lote in saldos_al(contrato_id, por=por):
+        if lote['familia'] != FAMILIAS_LOCALES[familia]:
+            continue
+        serie = (lote['serie'] or '') if familia == 'PDD' else ''
+        fila = totales.setdefault(clave(familia, lote['codigo_producto'], serie), {
+            'codigo': lote['codigo_producto'], 'serie': serie, 'descripcion': lote['descripcion'],
+            'stock': Decimal('0'),
+        })
+        fila['stock'] += lote['saldo']
+    return totales
+
+
+def conciliar(foto):
+    """
+    Cruza la foto con los saldos locales actuales y reemplaza las
+    discrepancias del contrato y familia.
+
+    Returns:
+        dict: {'articulos', 'coinciden', 'discrepancias'}
+    """
+    almacen = _totales(foto.familia, foto.articulos.values_list(*CAMPOS_ARTICULO))
+    local = _stock_local(foto.contrato_id, foto.familia)
+
+    discrepancias = []
+    for llave in almacen.keys() | local.keys():
+        en_almacen = almacen.get(llave)
+        en_local = local.get(llave)
+        stock_almacen = en_almacen['stock'] if en_almacen else Decimal('0')
+        stock_local = en_local['stock'] if en_local else Decimal('0')
+        diferencia = stock_almacen - stock_local
+        if abs(diferencia) < TOLERANCIA:
+            continue
+        if en_almacen and en_local:
+            tipo = 'DIFERENCIA'
+        elif en_almacen:
+            tipo = 'SOLO_ALMACEN'
+        elif stock_local > 0:
+            tipo = 'SOLO_LOCAL'
+        else:
+            # Lote local agotado que el almacén ya no lista: no es discrepancia
+            continue
+        datos = en_almacen or en_local
+        discrepancias.append(DiscrepanciaStock(
+            contrato_id=foto.contrato_id,
+            foto=foto,
+            familia=foto.familia,
+            codigo=datos['codigo'],
+            serie=datos['serie'],
+            descripcion=_texto(datos['descripcion'], 255),
+            tipo=tipo,
+            stock_almacen=stock_almacen,
+            stock_local=stock_local,
+            diferencia=diferencia,
+        ))
+
+    with transaction.atomic():
+        DiscrepanciaStock.objects.filter(contrato_id=foto.contrato_id, familia=foto.familia).delete()
+        DiscrepanciaStock.objects.bulk_create(discrepancias, batch_size=TAMANO_LOTE)
+    return {
+        'articulos': len(almacen),
+        'coinciden': len(almacen.keys() | local.keys()) - len(discrepancias),
+        'discrepancias': len(discrepancias),
+    }
+
+
+def conciliar_contrato(contrato, client=None):
+    """
+    Toma la foto de PDD y ADIT del centro de costo del contrato y concilia.
+    Si la API no devuelve artículos (error o centro de costo vacío) la
+    familia no se concilia y se conservan las discrepancias anteriores.
+
+    Returns:
+        dict: {familia: resumen de conciliar o None si no hubo datos}
+    """
+    from drilling.api_client import get_api_client
+
+    client = client or get_api_client()
+    resumen = {}
+    for familia in FAMILIAS_LOCALES:
+        articulos = client.obtener_articulos_almacen(familia, contrato.codigo_centro_costo)
+        if not articulos:
+            resumen[familia] = None
+            continue
+        foto, _ = tomar_foto(contrato, familia, articulos)
+        resumen[familia] = conciliar(foto)
+    return resumen
@@ -0,0 +1,385 @@
+"""
+Costeo FIFO de consumos de stock por lote (tabla costo_consumo_fifo).
+
+Cada Abastecimiento es un lote con cantidad y precio_unitario; ConsumoStock
+apunta a un lote, pero en la práctica se registra por producto y el lote
+elegido no dice qué se consumió primero. Aquí el consumo se reparte entre los
+lotes del mismo (contrato, codigo_producto) en orden de ingreso (fecha, id),
+con los consumos en orden de turno (fecha, turno, id). Los lotes sin código de
+producto son su propio stock: sus consumos solo salen de ese lote.
+
+El reparto es vectorizado: con las sumas acumuladas de lotes y consumos, cada
+consumo ocupa el tramo [inicio, fin) de la cola y se cruza con los lotes cuyo
+tramo se superpone (numpy.searchsorted); lo que excede el stock ingresado
+queda como fila sin lote ni costo. Las cantidades se manejan en centésimas
+enteras para que los cortes sean exactos.
+
+Recálculo incremental: un cambio en la fecha d de un lote o consumo solo
+mueve los consumos desde d y los que habían tomado lotes ingresados desde d
+(o quedaron sin lote). Las filas anteriores a ese punto se conservan y el
+saldo de cada lote se descuenta con ellas; el resto se recalcula.
+- Abastecimiento/ConsumoStock save/delete y el cambio de fecha o borrado de
+  un turno llaman a programar_costeo; los productos se recalculan una vez al
+  confirmar la transacción, junto con su libro de movimientos de stock
+  (drilling.utils.movimientos_stock).
+- `python manage.py costear_consumos` reconstruye un contrato o todo.
+- Los contratos ARCHIVADOS (archive_contract) no se recalculan: sus consumos
+  y su costeo están en Parquet y, sin consumos en la base, los lotes
+  volverían a tener su saldo completo.
+
+El costo por metro es un SUM sobre el índice (contrato, fecha) contra los
+metros del período: ver costo_por_metro y costo_por_sondaje.
+
+Uso:
+    from drilling.utils.costeo_fifo import costo_por_metro
+
+    resumen = costo_por_metro(contrato_id=3, desde=date(2025, 2, 26), hasta=date(2025, 3, 25))
+"""
+
+import threading
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Min, Q, Sum
+
+from drilling.models import (
+    Abastecimiento, ArchivoContrato, ConsumoStock, CostoConsumoFIFO, MovimientoStock, Turno, TurnoAvance, TurnoSondaje,
+)
+from drilling.utils.movimientos_stock import registrar_movimientos
+
+TAMANO_LOTE = 1000
+
+CENTAVOS = Decimal('0.01')
+
+_local = threading.local()
+
+
+def _centesimas(cantidades):
+    import numpy as np
+
+    return np.array([int((c * 100).to_integral_value()) for c in cantidades], dtype=np.int64)
+
+
+def repartir_fifo(lotes, consumos):
+    """
+    Reparto FIFO de cantidades (enteros, ya ordenados) entre lotes.
+
+    Args:
+        lotes: cantidad disponible de cada lote, en orden de salida
+        consumos: cantidad de cada consumo, en orden de consumo
+
+    Returns:
+        (consumo, lote, cantidad, faltante): los tres primeros son arreglos
+        paralelos con cada tramo de consumo asignado a un lote; faltante es la
+        cantidad de cada consumo que no cubren los lotes
+    """
+    import numpy as np
+
+    lotes = np.asarray(lotes, dtype=np.int64)
+    consumos = np.asarray(consumos, dtype=np.int64)
+    fin_lote = np.cumsum(lotes)
+    inicio_lote = fin_lote - lotes
+    fin_consumo = np.cumsum(consumos)
+    inicio_consumo = fin_consumo - consumos
+
+    # Lotes cuyo tramo se superpone con el del consumo: [primero, ultimo)
+    primero = np.searchsorted(fin_lote, inicio_consumo, side='right')
+    ultimo = np.searchsorted(inicio_lote, fin_consumo, side='left')
+    cuantos = np.maximum(ultimo - primero, 0)
+    consumo = np.repeat(np.arange(len(consumos)), cuantos)
+    desplazamiento = np.arange(cuantos.sum()) - np.repeat(np.cumsum(cuantos) - cuantos, cuantos)
+    lote = np.repeat(primero, cuantos) + desplazamiento
+    cantidad = (np.minimum(fin_consumo[consumo], fin_lote[lote])
+                - np.maximum(inicio_consumo[consumo], inicio_lote[lote]))
+    positivos = cantidad > 0
+
+    total = fin_lote[-1] if len(lotes) else 0
+    faltante = np.clip(fin_consumo - np.maximum(inicio_consumo, total), 0, None)
+    return consumo[positivos], lote[positivos], cantidad[positivos], faltante
+
+
+def _reinicio(filas, desde):
+    """
+    Primera fecha de consumo a recalcular: desde, o antes si algún consumo
+    anterior tomó un lote ingresado desde esa fecha o quedó sin lote.
+    """
+    afectada = filas.filter(
+        Q(fecha_lote__gte=desde) | Q(lote__isnull=True)
+    ).aggregate(fecha=Min('fecha'))['fecha']
+    return min(desde, afectada) if afectada else desde
+
+
+def _filas_pool(lotes, consumos):
+    """Filas (sin guardar) de un stock: lotes y consumos como dicts ya ordenados."""
+    consumo_idx, lote_idx, cantidades, faltantes = repartir_fifo(
+        [lote['saldo'] for lote in lotes], _centesimas([c['cantidad_consumida'] for c in consumos]),
+    )
+    filas = []
+    for i, j, cantidad in zip(consumo_idx.tolist(), lote_idx.tolist(), cantidades.tolist()):
+        lote = lotes[j]
+        cantidad = Decimal(cantidad).scaleb(-2)
+        filas.append(_fila(consumos[i], lote, cantidad))
+    for consumo, faltante in zip(consumos, faltantes.tolist()):
+        if faltante:
+            filas.append(_fila(consumo, None, Decimal(faltante).scaleb(-2)))
+    return filas
+
+
+def _fila(consumo, lote, cantidad):
+    return CostoConsumoFIFO(
+        consumo_id=consumo['id'],
+        turno_id=consumo['turno_id'],
+        fecha=consumo['turno__fecha'],
+        contrato_id=consumo['abastecimiento__contrato_id'],
+        codigo_producto=consumo['abastecimiento__codigo_producto'],
+        familia=consumo['abastecimiento__familia'],
+        lote_id=lote['id'] if lote else None,
+        fecha_lote=lote['fecha'] if lote else None,
+        cantidad=cantidad,
+        precio_unitario=lote['precio_unitario'] if lote else None,
+        costo=(cantidad * lote['precio_unitario']).quantize(CENTAVOS) if lote else None,
+    )
+
+
+def costear_producto(contrato_id, codigo_producto, desde=None):
+    """
+    Recalcula el costeo FIFO de un producto del contrato a partir de desde
+    (None = todo el historial).
+
+    Returns:
+        int: filas escritas
+    """
+    filas = CostoConsumoFIFO.objects.filter(contrato_id=contrato_id, codigo_producto=codigo_producto)
+    consumos = ConsumoStock.objects.filter(
+        abastecimiento__contrato_id=contrato_id, abastecimiento__codigo_producto=codigo_producto,
+    )
+    usado = {}
+    if desde is not None:
+        desde = _reinicio(filas, desde)
+        filas = filas.filter(fecha__gte=desde)
+        consumos = consumos.filter(turno__fecha__gte=desde)
+        usado = dict(CostoConsumoFIFO.objects.filter(
+            contrato_id=contrato_id, codigo_producto=codigo_producto, fecha__lt=desde, lote__isnull=False,
+        ).values('lote_id').annotate(total=Sum('cantidad')).order_by().values_list('lote_id', 'total'))
+
+    lotes = list(Abastecimiento.objects.filter(
+        contrato_id=contrato_id, codigo_producto=codigo_producto,
+    ).values('id', 'fecha', 'cantidad', 'precio_unitario').order_by('fecha', 'id'))
+    saldos = _centesimas([lote['cantidad'] - usado.get(lote['id'], 0) for lote in lotes])
+    for lote, saldo in zip(lotes, saldos.tolist()):
+        lote['saldo'] = saldo
+    lotes = [lote for lote in lotes if lote['saldo'] > 0]
+    consumos = list(consumos.values(
+        'id', 'turno_id', 'turno__fecha', 'cantidad_consumida', 'abastecimiento_id',
+        'abastecimiento__contrato_id', 'abastecimiento__codigo_producto', 'abastecimiento__familia',
+    ).order_by('turno__fecha', 'turno_id', 'id'))
+
+    if codigo_producto:
+        nuevas = _filas_pool(lotes, consumos)
+    else:
+        # Sin código: cada lote es su propio stock
+        nuevas = []
+        por_lote = {}
+        for consumo in consumos:
+            por_lote.setdefault(consumo['abastecimiento_id'], []).append(consumo)
+        lotes_por_id = {lote['id']: lote for lote in lotes}
+        for lote_id, grupo in por_lote.items():
+            lote = lotes_por_id.get(lote_id)
+            nuevas.extend(_filas_pool([lote] if lote else [], grupo))
+
+    with transaction.atomic():
+        filas.delete()
+        CostoConsumoFIFO.objects.bulk_create(nuevas, batch_size=TAMANO_LOTE)
+    return len(nuevas)
+
+
+def _archivados(contrato_ids):
+    """Contratos ARCHIVADOS entre los indicados (sus consumos ya no están en la base)."""
+    return set(ArchivoContrato.objects.filter(
+        contrato_id__in=contrato_ids, estado='ARCHIVADO',
+    ).values_list('contrato_id', flat=True))
+
+
+def _procesar_pendientes():
+    pendientes = getattr(_local, 'pendientes', None)
+    if not pendientes:
+        return
+    _local.pendientes = {}
+    archivados = _archivados({contrato_id for contrato_id, _ in pendientes})
+    for (contrato_id, codigo_producto), desde in pendientes.items():
+        if contrato_id in archivados:
+            continue
+        registrar_movimientos(contrato_id, codigo_producto, desde)
+        costear_producto(contrato_id, codigo_producto, desde)
+
+
+def programar_costeo(claves):
+    """
+    Recalcula al confirmar la transacción (de inmediato si no hay una abierta)
+    el costeo y los movimientos de cada producto (contrato_id,
+    codigo_producto, fecha) desde la fecha del cambio. Varias llamadas en la
+    misma transacción se procesan juntas desde la fecha más antigua de cada
+    producto.
+    """
+    if not hasattr(_local, 'pendientes'):
+        _local.pendientes = {}
+    nuevas = False
+    for contrato_id, codigo_producto, fecha in claves:
+        if contrato_id is None or fecha is None:
+            continue
+        clave = (contrato_id, codigo_producto or '')
+        actual = _local.pendientes.get(clave)
+        _local.pendientes[clave] = fecha if actual is None else min(actual, fecha)
+        nuevas = True
+    if nuevas:
+        transaction.on_commit(_procesar_pendientes)
+
+
+def programar_costeo_consumos(pares):
+    """programar_costeo para consumos dados como (turno_id, abastecimiento_id)."""
+    pares = [(turno_id, lote_id) for turno_id, lote_id in pares if turno_id and lote_id]
+    if not pares:
+        return
+    fechas = dict(Turno.objects.filter(pk__in={t for t, _ in pares}).values_list('pk', 'fecha'))
+    lotes = {
+        pk: (contrato_id, codigo) for pk, contrato_id, codigo in Abastecimiento.objects.filter(
+            pk__in={a for _, a in pares},
+        ).values_list('pk', 'contrato_id', 'codigo_producto')
+    }
+    programar_costeo([
+        (*lotes[lote_id], fechas[turno_id])
+        for turno_id, lote_id in pares if lote_id in lotes and turno_id in fechas
+    ])
+
+
+def programar_costeo_lote(lote_id, actual, cargado):
+    """
+    programar_costeo para un lote guardado: actual y cargado son
+    (contrato_id, codigo_producto, fecha) después y antes del cambio. Si el
+    lote cambió de producto, sus consumos anteriores a la fecha del lote
+    también cambian de producto.
+    """
+    claves = [clave for clave in (actual, cargado) if clave]
+    if cargado and cargado[:2] != actual[:2]:
+        primera = ConsumoStock.objects.filter(abastecimiento_id=lote_id).aggregate(
+            fecha=Min('turno__fecha'),
+        )['fecha']
+        if primera:
+            claves += [(*clave[:2], primera) for clave in claves]
+    programar_costeo(claves)
+
+
+def programar_costeo_turno(turno_id, desde):
+    """programar_costeo para los productos consumidos en el turno (antes de borrarlo)."""
+    productos = ConsumoStock.objects.filter(turno_id=turno_id).values_list(
+        'abastecimiento__contrato_id', 'abastecimiento__codigo_producto',
+    ).distinct()
+    programar_costeo([(contrato_id, codigo, desde) for contrato_id, codigo in productos])
+
+
+def recalcular_costeo(contratos=None):
+    """
+    Reconstruye el costeo y los movimientos de todos los productos del
+    alcance y elimina las filas de productos que ya no tienen lotes. Omite
+    los contratos ARCHIVADOS.
+
+    Returns:
+        dict: {'productos', 'filas', 'movimientos'}
+    """
+    productos = set()
+    for modelo in (Abastecimiento, CostoConsumoFIFO, MovimientoStock):
+        filas = modelo.objects.all()
+        if contratos:
+            filas = filas.filter(contrato_id__in=contratos)
+        productos |= set(filas.values_list('contrato_id', 'codigo_producto').distinct())
+    archivados = _archivados({contrato_id for contrato_id, _ in productos})
+    productos = {producto for producto in productos if producto[0] not in archivados}
+    filas = movimientos = 0
+    for contrato_id, codigo_producto in sorted(productos):
+        movimientos += registrar_movimientos(contrato_id, codigo_producto)
+        filas += costear_producto(contrato_id, codigo_producto)
+    return {'productos': len(productos), 'filas': filas, 'movimientos': movimientos}
+
+
+def costo_por_metro(contrato_id, desde, hasta):
+    """
+    Costo de los consumos del período por familia y por metro perforado, con
+    un SUM sobre el índice (contrato, fecha) y otro sobre los metros del período.
+
+    Returns:
+        dict: {'metros', 'costo', 'costo_por_metro', 'sin_costo',
+        'familias': [{'familia', 'costo', 'costo_por_metro', 'sin_costo'}]}
+        donde sin_costo es la cantidad consumida que no cubrieron los lotes
+    """
+    metros = TurnoAvance.objects.filter(
+        turno__contrato_id=contrato_id, fecha_turno__gte=desde, fecha_turno__lte=hasta,
+    ).aggregate(total=Sum('metros_perforados'))['total'] or Decimal('0')
+    familias = CostoConsumoFIFO.objects.filter(
+        contrato_id=contrato_id, fecha__gte=desde, fecha__lte=hasta,
+    ).values('familia').annotate(
+        costo=Sum('costo'), sin_costo=Sum('cantidad', filter=Q(lote__isnull=True)),
+    ).order_by('familia')
+
+    def por_metro(costo):
+        return (costo / metros).quantize(CENTAVOS) if metros else None
+
+    resumen = {'metros': metros, 'costo': Decimal('0'), 'sin_costo': Decimal('0'), 'familias': []}
+    for fila in familias:
+        costo = fila['costo'] or Decimal('0')
+        resumen['costo'] += costo
+        resumen['sin_costo'] += fila['sin_costo'] or Decimal('0')
+        resumen['familias'].append({
+            'familia': fila['familia'],
+            'costo': costo,
+            'costo_por_metro': por_metro(costo),
+            'sin_costo': fila['sin_costo'] or Decimal('0'),
+        })
+    resumen['costo_por_metro'] = por_metro(resumen['costo'])
+    return resumen
+
+
+def costo_por_sondaje(contrato_id, desde, hasta):
+    """
+    Costo de consumos y costo por metro de cada sondaje del período. El costo
+    de un turno se reparte entre sus sondajes según metros_turno (en partes
+    iguales si el turno no registró metros por sondaje).
+
+    Returns:
+        list de dicts con sondaje_id, metros, costo y costo_por_metro
+    """
+    import numpy as np
+
+    costos = dict(CostoConsumoFIFO.objects.filter(
+        contrato_id=contrato_id, fecha__gte=desde, fecha__lte=hasta, costo__isnull=False,
+    ).values('turno_id').annotate(total=Sum('costo')).order_by().values_list('turno_id', 'total'))
+    tramos = list(TurnoSondaje.objects.filter(
+        turno__contrato_id=contrato_id, turno__fecha__gte=desde, turno__fecha__lte=hasta,
+    ).values_list('turno_id', 'sondaje_id', 'metros_turno'))
+    if not tramos:
+        return []
+
+    turnos, sondajes, metros = zip(*tramos)
+    metros = np.array([float(m) for m in metros])
+    turno_ids, por_turno = np.unique(np.array(turnos), return_inverse=True)
+    metros_turno = np.bincount(por_turno, weights=metros)
+    tramos_turno = np.bincount(por_turno)
+    participacion = np.where(
+        metros_turno[por_turno] > 0,
+        metros / np.where(metros_turno[por_turno] > 0, metros_turno[por_turno], 1.0),
+        1.0 / tramos_turno[por_turno],
+    )
+    costo_turno = np.array([float(costos.get(int(t), 0)) for t in turno_ids])
+    costo = costo_turno[por_turno] * participacion
+
+    sondaje_ids, por_sondaje = np.unique(np.array(sondajes), return_inverse=True)
+    metros_sondaje = np.bincount(por_sondaje, weights=metros, minlength=len(sondaje_ids))
+    costo_sondaje = np.bincount(por_sondaje, weights=costo, minlength=len(sondaje_ids))
+    return [
+        {
+            'sondaje_id': int(sondaje_id),
+            'metros': Decimal(f'{m:.2f}'),
+            'costo': Decimal(f'{c:.2f}'),
+            'costo_por_metro': Decimal(f'{c / m:.2f}') if m > 0 else None,
+        }
+        for sondaje_id, m, c in zip(sondaje_ids.tolist(), metros_sondaje, costo_sondaje)
+    ]
@@ -0,0 +1,109 @@
+"""
+Agrupa consultas escalares independientes (contadores, sumas) en un solo
+round-trip a la base de datos.
+
+Con la BD remota cada query cuesta ~160ms de latencia de red (ver
+GUIA_REDUCIR_LATENCIA_BD.md), así que un dashboard con 5 contadores paga 5
+viajes aunque cada COUNT tarde 1ms en el servidor. batch_counts compila cada
+queryset y los ejecuta juntos como subconsultas escalares de un único SELECT:
+
+    SELECT (SELECT COUNT(*) FROM (...) AS b0) AS "c0",
+           (SELECT SUM(...) FROM ...) AS "c1", ...
+
+Funciona igual en PostgreSQL y SQLite.
+
+Uso:
+    from drilling.utils.db_batch import batch_counts
+
+    stats = batch_counts({
+        'sondajes_activos': Sondaje.objects.filter(contrato=contrato, estado='ACTIVO'),
+        'turnos_hoy': Turno.objects.filter(contrato=contrato, fecha=hoy),
+        'metros_mes': (TurnoAvance.objects.filter(turno__contrato=contrato), Sum('metros_perforados')),
+    })
+    stats['sondajes_activos']  # -> int
+    stats['metros_mes']        # -> Decimal o None
+"""
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import IntegerField, Value
+
+
+def _compilar_conteo(queryset, alias):
+    """SQL que cuenta las filas del queryset (respeta distinct/values)."""
+    if queryset._fields is None:
+        # Queryset de instancias: contar por pk evita columnas y joins de select_related
+        queryset = queryset.values('pk')
+    sql, params = queryset.order_by().query.get_compiler(using=alias).as_sql()
+    return f'SELECT COUNT(*) FROM ({sql}) AS _lote', params, None
+
+
+def _compilar_agregado(queryset, agregado, alias):
+    """SQL de un agregado escalar (Sum, Max, Count...) sobre el queryset completo."""
+    # El valor constante evita el GROUP BY al anotar el agregado
+    consulta = queryset.order_by().annotate(
+        _lote=Value(1, output_field=IntegerField())
+    ).values('_lote').annotate(_valor=agregado).values('_valor')
+    sql, params = consulta.query.get_compiler(using=alias).as_sql()
+    return sql, params, consulta.query.annotations['_valor']
+
+
+def _convertir(valor, expresion, conexion):
+    """Aplica los mismos conversores que usa el ORM al leer el agregado."""
+    if expresion is None:
+        return valor or 0
+    conversores = conexion.ops.get_db_converters(expresion) + expresion.get_db_converters(conexion)
+    for conversor in conversores:
+        valor = conversor(valor, expresion, conexion)
+    return valor
+
+
+def batch_counts(consultas, using=None):
+    """
+    Ejecuta varios contadores/agregados en una sola query.
+
+    Args:
+        consultas (dict): {clave: queryset} para contar filas, o
+            {clave: (queryset, agregado)} para un agregado escalar,
+            p. ej. (TurnoAvance.objects.filter(...), Sum('metros_perforados'))
+        using (str): alias de BD (por defecto, el del primer queryset)
+
+    Returns:
+        dict: {clave: valor}. Los conteos son int; los agregados se convierten
+        igual que con queryset.aggregate() (None si no hay filas).
+    """
+    if not consultas:
+        return {}
+
+    alias = using
+    partes = []
+    resultados = {}
+    for indice, (clave, consulta) in enumerate(consultas.items()):
+        queryset, agregado = consulta if isinstance(consulta, tuple) else (consulta, None)
+        alias = alias or queryset.db
+        try:
+            if agregado is None:
+                sql, params, expresion = _compilar_conteo(queryset, alias)
+            else:
+                sql, params, expresion = _compilar_agregado(queryset, agregado, alias)
+        except EmptyResultSet:
+            # queryset.none() o filtros imposibles (pk__in=[]): no hace falta consultar
+            resultados[clave] = 0 if agregado is None else None
+            continue
+        partes.append((clave, f'({sql}) AS "c{indice}"', params, expresion))
+
+    if not partes:
+        return resultados
+
+    conexion = connections[alias]
+    sql = 'SELECT ' + ', '.join(fragmento for _, fragmento, _, _ in partes)
+    params = [param for _, _, parametros, _ in partes for param in parametros]
+    with conexion.cursor() as cursor:
+        cursor.execute(sql, params)
+        fila = cursor.fetchone()
+
+    for (clave, _, _, expresion), valor in zip(partes, fila):
+        resultados[clave] = _convertir(valor, expresion, conexion)
+
+    # Mantener el orden de las claves recibidas
+    return {clave: resultados[clave] for clave in consultas}
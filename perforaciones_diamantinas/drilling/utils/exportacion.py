@@ -0,0 +1,172 @@
+"""
+Exportación en streaming a CSV y XLSX para listados y reportes.
+
+Las vistas de listado limitan lo que renderizan (turnos[:100]) porque armar
+HTML de todo el resultado es lento. Para exportar el resultado completo:
+- Se proyecta el queryset a tuplas planas con values_list() (sin instanciar
+  modelos ni hacer select_related de objetos completos).
+- Se recorre con .iterator(chunk_size=...): en PostgreSQL usa un cursor del
+  lado del servidor, así que la memoria no depende de la cantidad de filas.
+- CSV: cada fila se escribe directamente a la respuesta (StreamingHttpResponse).
+- XLSX: openpyxl en modo write_only escribe fila por fila a un archivo temporal,
+  que después se envía por bloques. El libro nunca está entero en memoria.
+
+Las vistas aceptan ?exportar=csv|xlsx con los mismos filtros del listado.
+
+Uso:
+    from drilling.utils.exportacion import exportar_queryset
+
+    columnas = [('Fecha', 'fecha'), ('Máquina', 'maquina__nombre')]
+    return exportar_queryset(turnos, columnas, 'turnos', request.GET.get('exportar'))
+"""
+
+import csv
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+FORMATOS = {'csv', 'xlsx'}
+
+# Filas por ida y vuelta al cursor del servidor
+TAMANO_BLOQUE = 2000
+
+# Bytes por bloque al enviar el archivo XLSX
+TAMANO_BLOQUE_ARCHIVO = 64 * 1024
+
+# Columnas de los exports de turnos (listar_turnos, gestión de proyectos)
+COLUMNAS_TURNOS = [
+    ('ID', 'id'),
+    ('Fecha', 'fecha'),
+    ('Contrato', 'contrato__nombre_contrato'),
+    ('Máquina', 'maquina__nombre'),
+    ('Tipo Turno', 'tipo_turno__nombre'),
+    ('Estado', 'estado'),
+    ('Metros Perforados', 'avance__metros_perforados'),
+    ('Horas Máquina', 'maquina_estado__horas_trabajadas_calc'),
+    ('Creado', 'created_at'),
+]
+
+# Columnas del detalle de horas extras (reporte_horas_extras)
+COLUMNAS_HORAS_EXTRAS = [
+    ('Fecha', 'turno__fecha'),
+    ('Turno', 'turno_id'),
+    ('Contrato', 'turno__contrato__nombre_contrato'),
+    ('Máquina', 'turno__maquina__nombre'),
+    ('DNI', 'trabajador__dni'),
+    ('Nombres', 'trabajador__nombres'),
+    ('Apellidos', 'trabajador__apellidos'),
+    ('Cargo', 'trabajador__cargo__nombre'),
+    ('Horas Extra', 'horas_extra'),
+    ('Metros Turno', 'metros_turno'),
+    ('Observaciones', 'observaciones'),
+]
+
+
+class _Eco:
+    """Pseudo-buffer: csv.writer escribe aquí y la fila vuelve como string."""
+
+    def write(self, valor):
+        return valor
+
+
+def iterar_filas(queryset, campos, chunk_size=TAMANO_BLOQUE):
+    """
+    Tuplas de valores del queryset, leídas por bloques con un cursor del servidor.
+    Fija la base de datos ahora: el cuerpo se genera fuera de la vista, cuando
+    el contexto de usar_replica ya terminó.
+    """
+    queryset = queryset.using(queryset.db)
+    return queryset.values_list(*campos).iterator(chunk_size=chunk_size)
+
+
+def _valor_celda(valor):
+    # openpyxl no admite datetimes con zona horaria
+    if isinstance(valor, datetime) and timezone.is_aware(valor):
+        return timezone.localtime(valor).replace(tzinfo=None)
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return valor
+
+
+def _valor_csv(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        valor = timezone.localtime(valor) if timezone.is_aware(valor) else valor
+        return valor.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return valor
+
+
+def generar_csv(encabezados, filas):
+    """Genera el CSV línea por línea. Empieza con BOM para que Excel lea las tildes."""
+    escritor = csv.writer(_Eco())
+    yield '\ufeff' + escritor.writerow(encabezados)
+    for fila in filas:
+        yield escritor.writerow([_valor_csv(v) for v in fila])
+
+
+def escribir_xlsx(encabezados, filas, destino, titulo='Datos'):
+    """Escribe un libro write_only (memoria constante) en el archivo destino."""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(title=titulo[:31])
+    fila_encabezado = []
+    for texto in encabezados:
+        celda = WriteOnlyCell(hoja, value=texto)
+        celda.font = Font(bold=True)
+        fila_encabezado.append(celda)
+    hoja.append(fila_encabezado)
+    for fila in filas:
+        hoja.append([_valor_celda(v) for v in fila])
+    libro.save(destino)
+
+
+def _leer_por_bloques(archivo):
+    try:
+        archivo.seek(0)
+        while True:
+            bloque = archivo.read(TAMANO_BLOQUE_ARCHIVO)
+            if not bloque:
+                break
+            yield bloque
+    finally:
+        archivo.close()
+
+
+def exportar_queryset(queryset, columnas, nombre, formato='csv'):
+    """
+    StreamingHttpResponse con el queryset completo en CSV o XLSX.
+
+    Args:
+        queryset: queryset ya filtrado (mismos filtros que el listado)
+        columnas: lista de (encabezado, campo para values_list)
+        nombre: base del nombre de archivo; se agrega la fecha
+        formato: 'csv' o 'xlsx'
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f'Formato de exportación no soportado: {formato}')
+
+    encabezados = [encabezado for encabezado, _ in columnas]
+    filas = iterar_filas(queryset, [campo for _, campo in columnas])
+    archivo = f'{nombre}_{timezone.localdate():%Y%m%d}.{formato}'
+
+    if formato == 'csv':
+        respuesta = StreamingHttpResponse(generar_csv(encabezados, filas), content_type='text/csv; charset=utf-8')
+    else:
+        # El archivo temporal vive en disco (se desborda de memoria a partir de 1 MB)
+        temporal = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        escribir_xlsx(encabezados, filas, temporal, titulo=nombre)
+        respuesta = StreamingHttpResponse(
+            _leer_por_bloques(temporal),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+    respuesta['Content-Disposition'] = f'attachment; filename="{archivo}"'
+    return respuesta
@@ -0,0 +1,270 @@
+"""
+Fotos diarias del stock del almacén (API de Vilbragroup) con detección de cambios.
+
+Las páginas de stock llamaban a la API en cada visita (hasta 30 s de timeout
+por llamada, bloqueando un worker). La sincronización diaria
+(sync_stock_diario.py) guarda aquí una foto por centro de costo y familia, y
+las vistas leen la última foto de la base de datos.
+
+Para no guardar lo mismo todos los días, cada foto lleva un hash del
+contenido normalizado (stock con 2 decimales): la suma módulo 2^256 del
+SHA-256 de cada artículo, que no depende del orden de la API y se calcula
+lote a lote. Si la respuesta tiene el mismo hash que la última foto, solo se
+actualiza verificada_en. Si cambió, se guarda la foto nueva y las diferencias
+por artículo contra la anterior (CambioStockAlmacen: altas, bajas y cambios
+de stock), agrupando PDD por serie y ADIT por código.
+
+tomar_foto_por_lotes recibe los artículos por lotes (ver
+VilbragroupAPIClient.iterar_articulos_almacen): los lotes normalizados pasan
+por un archivo temporal mientras se calcula el hash, se insertan en bloques y
+las diferencias se calculan en la base de datos por bloques, así la memoria
+no crece con el tamaño del catálogo.
+
+Uso:
+    from drilling.utils.fotos_almacen import tomar_foto, tomar_foto_por_lotes, ultimas_fotos
+
+    foto, nueva = tomar_foto(contrato, 'ADIT', articulos)
+    foto, nueva = tomar_foto_por_lotes(contrato, 'ADIT', client.iterar_articulos_almacen('ADIT'))
+    fotos = ultimas_fotos('ADIT', centro_costo='000003')
+    articulos = articulos_de_fotos(fotos)
+"""
+
+import hashlib
+import json
+import tempfile
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Case, CharField, F, Min, Sum, Value, When, Window
+from django.db.models.functions import Concat, RowNumber
+from django.utils import timezone
+
+from drilling.models import ArticuloStockAlmacen, CambioStockAlmacen, FotoStockAlmacen
+
+CENTESIMAS = Decimal('0.01')
+
+TAMANO_LOTE = 1000
+
+CAMPOS_ARTICULO = ['codigo', 'serie', 'descripcion', 'unidad', 'stock']
+
+MODULO_HASH = 2 ** 256
+
+
+def _texto(valor, largo):
+    return str(valor or '').strip()[:largo]
+
+
+def _stock(articulo, familia):
+    """Stock del artículo; en PDD cada fila es una serie y sin campo stock vale 1."""
+    valor = articulo.get('stock')
+    if valor in (None, ''):
+        return Decimal('1') if familia == 'PDD' else Decimal('0')
+    try:
+        return Decimal(str(valor)).quantize(CENTESIMAS)
+    except InvalidOperation:
+        return Decimal('0')
+
+
+def clave(familia, codigo, serie):
+    """Clave de un artículo: serie en PDD (código si no tiene), código en ADIT."""
+    if familia == 'PDD' and serie:
+        return ('serie', serie)
+    return ('codigo', codigo)
+
+
+def normalizar(familia, articulos):
+    """Artículos de la API como tuplas (codigo, serie, descripcion, unidad, stock)."""
+    return [
+        (
+            _texto(a.get('codigo'), 50),
+            _texto(a.get('serie'), 50),
+            _texto(a.get('descripcion'), 255),
+            _texto(a.get('unidad'), 20),
+            _stock(a, familia),
+        ) for a in articulos
+    ]
+
+
+def _serializar(fila):
+    return json.dumps([*fila[:4], str(fila[4])], ensure_ascii=False, separators=(',', ':'))
+
+
+def _hash_filas(filas):
+    return sum(int.from_bytes(hashlib.sha256(_serializar(f).encode('utf-8')).digest(), 'big') for f in filas)
+
+
+def hash_contenido(filas):
+    """Hash de las filas normalizadas (independiente del orden de la API)."""
+    return f'{_hash_filas(filas) % MODULO_HASH:064x}'
+
+
+def _totales(familia, filas):
+    totales = {}
+    for codigo, serie, descripcion, _, stock in filas:
+        fila = totales.setdefault(clave(familia, codigo, serie), {
+            'codigo': codigo, 'serie': serie if familia == 'PDD' else '', 'descripcion': descripcion,
+            'stock': Decimal('0'),
+        })
+        fila['stock'] += stock
+    return totales
+
+
+def _llave(familia):
+    """Clave de agrupación en SQL, equivalente a clave()."""
+    if familia == 'PDD':
+        return Case(
+            When(serie='', then=Concat(Value('codigo|'), F('codigo'))),
+            default=Concat(Value('serie|'), F('serie')),
+            output_field=CharField(),
+        )
+    return F('codigo')
+
+
+def _totales_foto(foto, familia):
+    return ArticuloStockAlmacen.objects.filter(foto=foto).annotate(llave=_llave(familia))
+
+
+def _agrupar(articulos):
+    return articulos.values('llave').annotate(
+        codigo_min=Min('codigo'), serie_min=Min('serie'), descripcion_min=Min('descripcion'), total=Sum('stock'),
+    ).order_by('llave')
+
+
+def _bloques(iterable, tamano=TAMANO_LOTE):
+    iterador = iter(iterable)
+    while bloque := list(islice(iterador, tamano)):
+        yield bloque
+
+
+def _registrar_cambios(foto, anterior):
+    """
+    Guarda las diferencias por artículo entre la foto y la anterior, por
+    bloques de claves de la foto nueva más las bajas.
+
+    Returns:
+        int: cambios guardados
+    """
+    familia = foto.familia
+    nuevas = _totales_foto(foto, familia)
+
+    def cambio(previo, nuevo):
+        datos = nuevo or previo
+        return CambioStockAlmacen(
+            foto=foto,
+            foto_anterior=anterior,
+            codigo=datos['codigo_min'],
+            serie=datos['serie_min'] if familia == 'PDD' else '',
+            descripcion=datos['descripcion_min'],
+            tipo='CAMBIO' if previo and nuevo else ('ALTA' if nuevo else 'BAJA'),
+            stock_anterior=previo['total'] if previo else Decimal('0'),
+            stock_nuevo=nuevo['total'] if nuevo else Decimal('0'),
+        )
+
+    total = 0
+    for bloque in _bloques(_agrupar(nuevas).iterator(chunk_size=TAMANO_LOTE)):
+        previos = {
+            p['llave']: p
+            for p in _agrupar(_totales_foto(anterior, familia).filter(llave__in=[n['llave'] for n in bloque]))
+        }
+        cambios = [
+            cambio(previos.get(n['llave']), n) for n in bloque
+            if n['llave'] not in previos or previos[n['llave']]['total'] != n['total']
+        ]
+        CambioStockAlmacen.objects.bulk_create(cambios)
+        total += len(cambios)
+
+    bajas = _agrupar(_totales_foto(anterior, familia).exclude(llave__in=nuevas.values('llave')))
+    for bloque in _bloques(bajas.iterator(chunk_size=TAMANO_LOTE)):
+        CambioStockAlmacen.objects.bulk_create([cambio(previo, None) for previo in bloque])
+        total += len(bloque)
+    return total
+
+
+def ultima_foto(familia, contrato=None, centro_costo=None):
+    """Última foto de la familia para el contrato o centro de costo (None si no hay)."""
+    fotos = FotoStockAlmacen.objects.filter(familia=familia)
+    if contrato is not None:
+        fotos = fotos.filter(contrato=contrato)
+    if centro_costo:
+        fotos = fotos.filter(centro_costo=centro_costo)
+    return fotos.order_by('-tomada_en', '-pk').first()
+
+
+def ultimas_fotos(familia, centro_costo=None):
+    """Última foto de la familia de cada centro de costo (o solo del indicado)."""
+    fotos = FotoStockAlmacen.objects.filter(familia=familia)
+    if centro_costo:
+        fotos = fotos.filter(centro_costo=centro_costo)
+    return list(fotos.annotate(
+        orden=Window(RowNumber(), partition_by=[F('centro_costo')], order_by=[F('tomada_en').desc(), F('pk').desc()]),
+    ).filter(orden=1).order_by('centro_costo'))
+
+
+def tomar_foto(contrato, familia, articulos, centro_costo=None):
+    """
+    Guarda la respuesta de la API como foto del stock del contrato y familia,
+    salvo que el contenido sea igual al de la última foto.
+
+    Returns:
+        (foto, nueva): la foto vigente y si se guardó una nueva
+    """
+    return tomar_foto_por_lotes(contrato, familia, [articulos], centro_costo)
+
+
+def tomar_foto_por_lotes(contrato, familia, lotes, centro_costo=None):
+    """
+    Como tomar_foto, con los artículos en un iterable de lotes. Sin artículos
+    no se guarda foto (la API también devuelve vacío cuando falla) y se
+    devuelve (None, False).
+
+    Returns:
+        (foto, nueva): la foto vigente y si se guardó una nueva
+    """
+    centro_costo = centro_costo or contrato.codigo_centro_costo or ''
+    suma = 0
+    cantidad = 0
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as archivo:
+        for lote in lotes:
+            filas = normalizar(familia, lote)
+            suma = (suma + _hash_filas(filas)) % MODULO_HASH
+            cantidad += len(filas)
+            archivo.writelines(_serializar(fila) + '\n' for fila in filas)
+        if not cantidad:
+            return None, False
+
+        digest = f'{suma:064x}'
+        anterior = ultima_foto(familia, contrato=contrato, centro_costo=centro_costo)
+        ahora = timezone.now()
+        if anterior and anterior.hash_contenido == digest:
+            FotoStockAlmacen.objects.filter(pk=anterior.pk).update(verificada_en=ahora)
+            anterior.verificada_en = ahora
+            return anterior, False
+
+        archivo.seek(0)
+        with transaction.atomic():
+            foto = FotoStockAlmacen.objects.create(
+                contrato=contrato,
+                centro_costo=centro_costo,
+                familia=familia,
+                tomada_en=ahora,
+                verificada_en=ahora,
+                total_articulos=cantidad,
+                hash_contenido=digest,
+            )
+            for bloque in _bloques(archivo):
+                ArticuloStockAlmacen.objects.bulk_create([
+                    ArticuloStockAlmacen(foto=foto, **dict(zip(CAMPOS_ARTICULO, json.loads(linea))))
+                    for linea in bloque
+                ])
+            # La primera foto no tiene contra qué compararse
+            if anterior:
+                _registrar_cambios(foto, anterior)
+    return foto, True
+
+
+def articulos_de_fotos(fotos):
+    """Artículos de las fotos con los campos que devuelve la API."""
+    return list(ArticuloStockAlmacen.objects.filter(foto__in=fotos).order_by(
+        'foto__centro_costo', 'codigo', 'serie',
+    ).values(*CAMPOS_ARTICULO, centro_costo=F('foto__centro_costo')))
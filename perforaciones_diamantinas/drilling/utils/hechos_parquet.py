@@ -0,0 +1,305 @@
+"""
+Exportación del modelo de hechos de perforación a datasets Parquet.
+
+Power BI y los análisis en Excel leen las vistas de sql_views/ en vivo sobre la
+red. Este módulo escribe cada dataset en columnas (Parquet, zstd) particionado
+estilo Hive por contrato y mes:
+
+    <HECHOS_PARQUET_DIR>/<dataset>/contrato_id=<id>/mes=<YYYY-MM>/part-0.parquet
+
+Así pyarrow.dataset, DuckDB (hive_partitioning) o la carpeta de Power BI leen
+solo las particiones que necesitan, sin consultar la base de datos.
+
+Cada dataset se lee con un único queryset ordenado por (contrato, fecha) con
+values_list().iterator(): en PostgreSQL es un cursor del lado del servidor que
+trae bloques de TAMANO_LOTE filas como tuplas (no se instancian modelos) y cada
+bloque pasa a un record batch de Arrow (ver drilling/utils/arrow.py). Cada
+partición se escribe en un archivo temporal y se reemplaza al terminar, así un
+lector nunca ve un archivo a medias.
+
+Uso:
+    from drilling.utils.hechos_parquet import exportar_hechos
+
+    resumen = exportar_hechos('/datos/hechos', contratos=[3], desde='2025-01')
+"""
+
+import os
+import shutil
+from datetime import date
+from itertools import groupby
+from pathlib import Path
+
+from django.db.models import Q
+
+from drilling.models import (
+    MetaMaquina, Turno, TurnoActividad, TurnoAditivo, TurnoComplemento,
+    TurnoHoraExtra, TurnoSondaje,
+)
+from drilling.utils.arrow import esquema_arrow, lotes_arrow
+
+TAMANO_LOTE = 10000
+
+COMPRESION = 'zstd'
+
+# dataset: modelo, ruta al contrato, rutas del mes (una fecha, o año y mes) y
+# columnas (nombre en el archivo, ruta en el ORM). Las tablas hijas usan
+# fecha_turno (desnormalizada, con índice) en lugar de turno__fecha. El año y
+# mes de las metas no van en el archivo: son la partición mes=YYYY-MM.
+DATASETS = {
+    'turnos': {
+        'modelo': Turno,
+        'contrato': 'contrato_id',
+        'mes': ('fecha',),
+        'columnas': [
+            ('turno_id', 'id'),
+            ('fecha', 'fecha'),
+            ('maquina_id', 'maquina_id'),
+            ('tipo_turno_id', 'tipo_turno_id'),
+            ('estado', 'estado'),
+            ('horometro_inicio', 'maquina_estado__horometro_inicio'),
+            ('horometro_fin', 'maquina_estado__horometro_fin'),
+            ('horas_trabajadas', 'maquina_estado__horas_trabajadas_calc'),
+            ('metros_perforados', 'avance__metros_perforados'),
+            ('created_at', 'created_at'),
+            ('updated_at', 'updated_at'),
+        ],
+    },
+    'sondajes': {
+        'modelo': TurnoSondaje,
+        'contrato': 'turno__contrato_id',
+        'mes': ('turno__fecha',),
+        'columnas': [
+            ('id', 'id'),
+            ('turno_id', 'turno_id'),
+            ('fecha', 'turno__fecha'),
+            ('maquina_id', 'turno__maquina_id'),
+            ('sondaje_id', 'sondaje_id'),
+            ('sondaje', 'sondaje__nombre_sondaje'),
+            ('metros_turno', 'metros_turno'),
+        ],
+    },
+    'complementos': {
+        'modelo': TurnoComplemento,
+        'contrato': 'turno__contrato_id',
+        'mes': ('fecha_turno',),
+        'columnas': [
+            ('id', 'id'),
+            ('turno_id', 'turno_id'),
+            ('fecha', 'fecha_turno'),
+            ('maquina_id', 'turno__maquina_id'),
+            ('sondaje_id', 'sondaje_id'),
+            ('tipo_complemento_id', 'tipo_complemento_id'),
+            ('codigo_serie', 'codigo_serie'),
+            ('metros_inicio', 'metros_inicio'),
+            ('metros_fin', 'metros_fin'),
+            ('metros_turno', 'metros_turno_calc'),
+        ],
+    },
+    'aditivos': {
+        'modelo': TurnoAditivo,
+        'contrato': 'turno__contrato_id',
+        'mes': ('fecha_turno',),
+        'columnas': [
+            ('id', 'id'),
+            ('turno_id', 'turno_id'),
+            ('fecha', 'fecha_turno'),
+            ('maquina_id', 'turno__maquina_id'),
+            ('sondaje_id', 'sondaje_id'),
+            ('tipo_aditivo_id', 'tipo_aditivo_id'),
+            ('cantidad_usada', 'cantidad_usada'),
+            ('unidad_medida_id', 'unidad_medida_id'),
+        ],
+    },
+    'actividades': {
+        'modelo': TurnoActividad,
+        'contrato': 'turno__contrato_id',
+        'mes': ('fecha_turno',),
+        'columnas': [
+            ('id', 'id'),
+            ('turno_id', 'turno_id'),
+            ('fecha', 'fecha_turno'),
+            ('maquina_id', 'turno__maquina_id'),
+            ('actividad_id', 'actividad_id'),
+            ('actividad', 'actividad__nombre'),
+            ('tipo_actividad', 'actividad__tipo_actividad'),
+            ('es_cobrable', 'actividad__es_cobrable'),
+            ('hora_inicio', 'hora_inicio'),
+            ('hora_fin', 'hora_fin'),
+            ('horas', 'tiempo_calc'),
+        ],
+    },
+    'horas_extras': {
+        'modelo': TurnoHoraExtra,
+        'contrato': 'turno__contrato_id',
+        'mes': ('fecha_turno',),
+        'columnas': [
+            ('id', 'id'),
+            ('turno_id', 'turno_id'),
+            ('fecha', 'fecha_turno'),
+            ('maquina_id', 'turno__maquina_id'),
+            ('tipo_turno_id', 'turno__tipo_turno_id'),
+            ('trabajador_id', 'trabajador_id'),
+            ('cargo_id', 'trabajador__cargo_id'),
+            ('horas_extra', 'horas_extra'),
+            ('metros_turno', 'metros_turno'),
+        ],
+    },
+    'metas': {
+        'modelo': MetaMaquina,
+        'contrato': 'contrato_id',
+        'mes': ('año', 'mes'),
+        'columnas': [
+            ('id', 'id'),
+            ('maquina_id', 'maquina_id'),
+            ('servicio_id', 'servicio_id'),
+            ('fecha_inicio', 'fecha_inicio'),
+            ('fecha_fin', 'fecha_fin'),
+            ('meta_metros', 'meta_metros'),
+            ('activo', 'activo'),
+        ],
+    },
+}
+
+
+def esquema_dataset(nombre):
+    """Esquema Arrow con los nombres de salida del dataset (sin las columnas de partición)."""
+    import pyarrow as pa
+
+    definicion = DATASETS[nombre]
+    rutas = [ruta for _, ruta in definicion['columnas']]
+    esquema = esquema_arrow(definicion['modelo'], rutas)
+    return pa.schema([
+        campo.with_name(nombre) for campo, (nombre, _) in zip(esquema, definicion['columnas'])
+    ])
+
+
+def _clave_mes(valores):
+    # (fecha,) o (año, mes)
+    if len(valores) == 1:
+        return f'{valores[0]:%Y-%m}'
+    año, mes = valores
+    return f'{año:04d}-{mes:02d}'
+
+
+def _queryset(definicion, contratos=None, desde=None, hasta=None):
+    """Queryset del dataset filtrado por contratos y rango de meses ('YYYY-MM')."""
+    queryset = definicion['modelo'].objects.all()
+    contrato = definicion['contrato']
+    rutas_mes = definicion['mes']
+    if contratos:
+        queryset = queryset.filter(**{f'{contrato}__in': contratos})
+    for limite, es_desde in ((desde, True), (hasta, False)):
+        if not limite:
+            continue
+        año, mes = (int(parte) for parte in limite.split('-'))
+        if len(rutas_mes) == 1:
+            # Rango sobre la columna de fecha (usa el índice)
+            if es_desde:
+                queryset = queryset.filter(**{f'{rutas_mes[0]}__gte': date(año, mes, 1)})
+            else:
+                queryset = queryset.filter(**{f'{rutas_mes[0]}__lt': date(año + mes // 12, mes % 12 + 1, 1)})
+        else:
+            ruta_año, ruta_mes = rutas_mes
+            estricto, inclusivo = ('gt', 'gte') if es_desde else ('lt', 'lte')
+            queryset = queryset.filter(
+                Q(**{f'{ruta_año}__{estricto}': año}) | Q(**{ruta_año: año, f'{ruta_mes}__{inclusivo}': mes})
+            )
+    return queryset.order_by(contrato, *rutas_mes, 'pk')
+
+
+def _escribir_particion(ruta, esquema, filas):
+    """Escribe una partición en un temporal y lo reemplaza al terminar. Devuelve las filas escritas."""
+    import pyarrow.parquet as pq
+
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_suffix('.parquet.tmp')
+    total = 0
+    with pq.ParquetWriter(temporal, esquema, compression=COMPRESION) as escritor:
+        for lote in lotes_arrow(filas, esquema, TAMANO_LOTE):
+            escritor.write_table(lote)
+            total += lote.num_rows
+    os.replace(temporal, ruta)
+    return total
+
+
+def _en_alcance(contrato_id, mes, contratos, desde, hasta):
+    return (
+        (not contratos or contrato_id in contratos)
+        and (not desde or mes >= desde)
+        and (not hasta or mes <= hasta)
+    )
+
+
+def _particiones_existentes(base):
+    """{(contrato_id, mes): directorio} de las particiones ya escritas del dataset."""
+    existentes = {}
+    for directorio in base.glob('contrato_id=*/mes=*'):
+        contrato_id = int(directorio.parent.name.split('=', 1)[1])
+        existentes[(contrato_id, directorio.name.split('=', 1)[1])] = directorio
+    return existentes
+
+
+def exportar_dataset(nombre, destino, contratos=None, desde=None, hasta=None):
+    """
+    Exporta un dataset completo (o el alcance indicado) a destino/<nombre>/.
+
+    Las particiones del alcance que ya no tienen filas (turnos eliminados o
+    movidos de mes) se borran, así el dataset queda igual a la base de datos.
+
+    Returns:
+        dict: {'filas', 'particiones', 'eliminadas'}
+    """
+    definicion = DATASETS[nombre]
+    esquema = esquema_dataset(nombre)
+    base = Path(destino) / nombre
+    n_mes = len(definicion['mes'])
+    rutas = [definicion['contrato'], *definicion['mes']] + [ruta for _, ruta in definicion['columnas']]
+
+    filas = _queryset(definicion, contratos, desde, hasta).values_list(*rutas).iterator(chunk_size=TAMANO_LOTE)
+    escritas = set()
+    total = 0
+    for (contrato_id, mes), grupo in groupby(filas, key=lambda f: (f[0], _clave_mes(f[1:1 + n_mes]))):
+        ruta = base / f'contrato_id={contrato_id}' / f'mes={mes}' / 'part-0.parquet'
+        total += _escribir_particion(ruta, esquema, (fila[1 + n_mes:] for fila in grupo))
+        escritas.add((contrato_id, mes))
+
+    eliminadas = 0
+    for clave, directorio in _particiones_existentes(base).items():
+        if clave not in escritas and _en_alcance(*clave, contratos, desde, hasta):
+            shutil.rmtree(directorio)
+            eliminadas += 1
+    return {'filas': total, 'particiones': len(escritas), 'eliminadas': eliminadas}
+
+
+def exportar_hechos(destino, datasets=None, contratos=None, desde=None, hasta=None):
+    """
+    Exporta los datasets indicados (default: todos).
+
+    Args:
+        destino: directorio raíz de los datasets
+        contratos: lista de ids de contrato (default: todos)
+        desde, hasta: meses 'YYYY-MM' inclusive (default: todo el histórico)
+
+    Returns:
+        dict: {dataset: {'filas', 'particiones', 'eliminadas'}}
+    """
+    return {
+        nombre: exportar_dataset(nombre, destino, contratos, desde, hasta)
+        for nombre in (datasets or DATASETS)
+    }
+
+
+def leer_dataset(destino, nombre, columnas=None, filtro=None):
+    """
+    Tabla Arrow de un dataset exportado; contrato_id y mes se recuperan de las
+    carpetas. filtro es una expresión de pyarrow.dataset (p. ej.
+    ds.field('mes') == '2025-03') y solo se leen las particiones que coinciden.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    particionado = ds.partitioning(
+        pa.schema([('contrato_id', pa.int64()), ('mes', pa.string())]), flavor='hive'
+    )
+    dataset = ds.dataset(Path(destino) / nombre, format='parquet', partitioning=particionado)
+    return dataset.to_table(columns=columnas, filter=filtro)
@@ -0,0 +1,150 @@
+"""
+Libro de movimientos de stock con saldos acumulados (tabla movimiento_stock).
+
+La página de stock calculaba los saldos sumando todo el historial de
+abastecimientos y consumos en cada visita, y no podía mostrar el saldo a una
+fecha pasada (cierre del mes operativo 26-25). Aquí cada ingreso
+(Abastecimiento) y cada consumo (ConsumoStock, en la fecha de su turno) es un
+movimiento con el saldo del lote y del producto después de él. El orden dentro
+de un producto es (fecha, ingresos antes que consumos, id) y queda guardado en
+secuencia.
+
+El saldo a la fecha D de todos los lotes o productos de un contrato es el del
+último movimiento de cada uno con fecha <= D: una sola query con ROW_NUMBER()
+sobre el índice (contrato, codigo_producto, fecha, secuencia). Ver saldos_al.
+
+Mantenimiento: un cambio en la fecha d solo mueve los saldos desde d; los
+movimientos anteriores se conservan y dan el saldo inicial de cada lote. Si el
+producto tiene historial antes de d pero ningún movimiento, se reconstruye
+completo. Se recalcula junto con el costeo FIFO del producto
+(drilling.utils.costeo_fifo: programar_costeo y `python manage.py
+costear_consumos`). La migración 0065 llena el libro con el historial
+existente; costear_consumos lo reconstruye después de cargas masivas que no
+pasan por save().
+
+Uso:
+    from drilling.utils.movimientos_stock import saldos_al
+
+    lotes = saldos_al(contrato_id=3, fecha=date(2025, 3, 25))
+    productos = saldos_al(contrato_id=3, fecha=date(2025, 3, 25), por='producto')
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Sum, Value, When, Window
+from django.db.models.functions import RowNumber
+
+from drilling.models import Abastecimiento, ConsumoStock, MovimientoStock
+
+TAMANO_LOTE = 1000
+
+
+def registrar_movimientos(contrato_id, codigo_producto, desde=None):
+    """
+    Reescribe los movimientos del producto del contrato desde la fecha
+    indicada (None = todo el historial).
+
+    Returns:
+        int: movimientos escritos
+    """
+    filas = MovimientoStock.objects.filter(contrato_id=contrato_id, codigo_producto=codigo_producto)
+    lotes = Abastecimiento.objects.filter(contrato_id=contrato_id, codigo_producto=codigo_producto)
+    consumos = ConsumoStock.objects.filter(
+        abastecimiento__contrato_id=contrato_id, abastecimiento__codigo_producto=codigo_producto,
+    )
+    saldos = {}
+    secuencia = 0
+    if desde is not None and not filas.filter(fecha__lt=desde).exists() and (
+            lotes.filter(fecha__lt=desde).exists() or consumos.filter(turno__fecha__lt=desde).exists()):
+        # Historial sin movimientos previos (libro vacío): sin saldo inicial
+        # confiable, se reconstruye el producto completo
+        desde = None
+    if desde is not None:
+        anteriores = filas.filter(fecha__lt=desde).values('lote_id').annotate(
+            saldo=Sum('cantidad'), ultima=Max('secuencia'),
+        ).order_by()
+        for fila in anteriores:
+            saldos[fila['lote_id']] = fila['saldo']
+            secuencia = max(secuencia, fila['ultima'])
+        filas = filas.filter(fecha__gte=desde)
+        lotes = lotes.filter(fecha__gte=desde)
+        consumos = consumos.filter(turno__fecha__gte=desde)
+
+    eventos = [
+        ((lote['fecha'], 0, lote['id']), lote['id'], None, lote['cantidad'], lote['familia'])
+        for lote in lotes.values('id', 'fecha', 'cantidad', 'familia').order_by()
+    ]
+    eventos += [
+        ((c['turno__fecha'], 1, c['id']), c['abastecimiento_id'], c['id'], -c['cantidad_consumida'],
+         c['abastecimiento__familia'])
+        for c in consumos.values(
+            'id', 'turno__fecha', 'abastecimiento_id', 'cantidad_consumida', 'abastecimiento__familia',
+        ).order_by()
+    ]
+    eventos.sort(key=lambda e: e[0])
+
+    saldo_producto = sum(saldos.values(), Decimal('0'))
+    nuevas = []
+    for (fecha, _, _), lote_id, consumo_id, cantidad, familia in eventos:
+        secuencia += 1
+        saldos[lote_id] = saldos.get(lote_id, Decimal('0')) + cantidad
+        saldo_producto += cantidad
+        nuevas.append(MovimientoStock(
+            contrato_id=contrato_id,
+            codigo_producto=codigo_producto,
+            familia=familia,
+            lote_id=lote_id,
+            consumo_id=consumo_id,
+            fecha=fecha,
+            secuencia=secuencia,
+            tipo='CONSUMO' if consumo_id else 'INGRESO',
+            cantidad=cantidad,
+            saldo_lote=saldos[lote_id],
+            # Sin código cada lote es su propio producto
+            saldo_producto=saldo_producto if codigo_producto else saldos[lote_id],
+        ))
+
+    with transaction.atomic():
+        filas.delete()
+        MovimientoStock.objects.bulk_create(nuevas, batch_size=TAMANO_LOTE)
+    return len(nuevas)
+
+
+def saldos_al(contrato_id, fecha=None, por='lote'):
+    """
+    Saldo de cada lote (por='lote') o producto (por='producto') del contrato
+    al cierre de la fecha (None = saldo actual), en una sola query.
+
+    Returns:
+        list de dicts con lote_id, codigo_producto, familia, saldo y los datos
+        del lote (descripcion, serie, cantidad_lote, precio_unitario, unidad); en
+        por='producto' los datos son los del último lote con movimiento
+    """
+    if por == 'lote':
+        particion = [F('lote_id')]
+        columna_saldo = 'saldo_lote'
+    elif por == 'producto':
+        # Los lotes sin código se agrupan solos
+        particion = [F('codigo_producto'), Case(
+            When(codigo_producto='', then=F('lote_id')), default=Value(0), output_field=IntegerField(),
+        )]
+        columna_saldo = 'saldo_producto'
+    else:
+        raise ValueError(f"por debe ser 'lote' o 'producto', no {por!r}")
+
+    movimientos = MovimientoStock.objects.filter(contrato_id=contrato_id)
+    if fecha is not None:
+        movimientos = movimientos.filter(fecha__lte=fecha)
+    ultimos = movimientos.annotate(
+        orden=Window(RowNumber(), partition_by=particion, order_by=[F('fecha').desc(), F('secuencia').desc()]),
+    ).filter(orden=1).values(
+        'lote_id', 'codigo_producto', 'familia', 'fecha',
+        descripcion=F('lote__descripcion'),
+        serie=F('lote__serie'),
+        cantidad_lote=F('lote__cantidad'),
+        precio_unitario=F('lote__precio_unitario'),
+        unidad=F('lote__unidad_medida__simbolo'),
+        saldo=F(columna_saldo),
+    ).order_by('familia', 'descripcion')
+    return list(ultimos)
@@ -0,0 +1,446 @@
+"""
+Particionamiento mensual (PostgreSQL, declarativo por rango) de turnos y sus tablas hijas.
+
+Casi todas las consultas de turnos filtran por rango de fechas o por mes de
+operación. Con las tablas particionadas por mes, un reporte acotado por fecha
+solo lee las particiones de esos meses, y los meses viejos se pueden
+desprender (DETACH) sin borrar fila por fila.
+
+Clave de partición:
+- turnos, asistencia_trabajador: fecha
+- tablas hijas de turno: fecha_turno (copia de turnos.fecha, ver DatosTurno).
+  La FK a turnos pasa a ser compuesta (turno_id, fecha_turno) -> turnos(id, fecha)
+  con ON UPDATE CASCADE: si cambia la fecha de un turno, sus hijos se mueven
+  de partición junto con él.
+
+Restricciones de PostgreSQL que esto implica:
+- La PK y los UNIQUE deben incluir la clave de partición: id pasa a (id, fecha).
+- Una FK solo puede apuntar a turnos por (id, fecha). Las tablas que apuntan a
+  turnos solo por id y no se particionan (turno_sondaje, turno_maquina,
+  turno_corrida, consumo_stock, ingesta_turno) pierden la FK en la base de datos;
+  los borrados en cascada los sigue haciendo Django.
+- Se requiere PostgreSQL 15+ (UPDATE que mueve filas entre particiones de una
+  tabla referenciada por FKs).
+- Las vistas que dependen de la tabla (las de Power BI en sql_views/:
+  vw_turnos_fact, vw_horas_extras, vw_cumplimiento_metas, ... y las que se
+  apoyan en ellas) se leen de pg_depend, se eliminan antes de renombrar la
+  tabla y se recrean sobre la particionada con su definición, opciones,
+  comentario y permisos (GRANT). El dueño pasa a ser quien corre la conversión.
+
+La conversión es opcional y se hace con el comando partition_turnos.
+"""
+
+import re
+from datetime import date
+
+from django.utils import timezone
+
+VERSION_MINIMA = 150000
+
+# (tabla, columna de partición) en orden de conversión: turnos primero, porque
+# las hijas referencian turnos(id, fecha)
+TABLAS = [
+    ('turnos', 'fecha'),
+    ('turno_avance', 'fecha_turno'),
+    ('turno_complemento', 'fecha_turno'),
+    ('turno_aditivo', 'fecha_turno'),
+    ('turno_actividad', 'fecha_turno'),
+    ('turno_trabajador', 'fecha_turno'),
+    ('turno_hora_extra', 'fecha_turno'),
+    ('asistencia_trabajador', 'fecha'),
+]
+COLUMNA_PARTICION = dict(TABLAS)
+TABLAS_HIJAS = {tabla for tabla, columna in TABLAS if columna == 'fecha_turno'}
+
+_LIMITES = re.compile(r"FROM \('([\d-]+)'\) TO \('([\d-]+)'\)")
+
+
+class ParticionError(Exception):
+    """El servidor o el estado de las tablas no permite la operación."""
+
+
+def inicio_mes(fecha):
+    return fecha.replace(day=1)
+
+
+def sumar_meses(fecha, meses):
+    total = fecha.year * 12 + fecha.month - 1 + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def meses_entre(desde, hasta):
+    """Primer día de cada mes desde el mes de `desde` hasta el de `hasta`, inclusive."""
+    mes = inicio_mes(desde)
+    while mes <= hasta:
+        yield mes
+        mes = sumar_meses(mes, 1)
+
+
+def nombre_particion(tabla, mes):
+    return f'{tabla}_p{mes:%Y%m}'
+
+
+def nombre_default(tabla):
+    return f'{tabla}_pdefault'
+
+
+def _q(nombre):
+    return '"' + nombre.replace('"', '""') + '"'
+
+
+def verificar_servidor(conexion):
+    if conexion.vendor != 'postgresql':
+        raise ParticionError('El particionamiento solo está disponible en PostgreSQL')
+    if conexion.pg_version < VERSION_MINIMA:
+        raise ParticionError(
+            f'Se requiere PostgreSQL 15 o superior (servidor: {conexion.pg_version})'
+        )
+
+
+def esta_particionada(cursor, tabla):
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [tabla])
+    fila = cursor.fetchone()
+    if fila is None:
+        raise ParticionError(f'La tabla {tabla} no existe')
+    return fila[0] == 'p'
+
+
+def particiones(cursor, tabla):
+    """
+    Particiones de la tabla: lista de (nombre, desde, hasta) ordenada por fecha.
+    La partición DEFAULT se devuelve con desde=hasta=None.
+    """
+    cursor.execute(
+        """
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        """,
+        [tabla],
+    )
+    resultado = []
+    for nombre, limites in cursor.fetchall():
+        encontrado = _LIMITES.search(limites or '')
+        if encontrado:
+            resultado.append((nombre, date.fromisoformat(encontrado[1]), date.fromisoformat(encontrado[2])))
+        else:
+            resultado.append((nombre, None, None))
+    return sorted(resultado, key=lambda p: (p[1] is None, p[1] or date.min))
+
+
+def rango_datos(cursor, tabla, columna):
+    cursor.execute(f'SELECT MIN({_q(columna)}), MAX({_q(columna)}), COUNT(*) FROM {_q(tabla)}')
+    return cursor.fetchone()
+
+
+def _restricciones(cursor, tabla):
+    """PK/UNIQUE (nombre, tipo, columnas), FKs salientes (nombre, definición, tabla destino)."""
+    cursor.execute(
+        """
+        SELECT con.conname, con.contype, pg_get_constraintdef(con.oid),
+               con.confrelid::regclass::text,
+               ARRAY(SELECT a.attname FROM unnest(con.conkey) WITH ORDINALITY k(attnum, orden)
+                     JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+                     ORDER BY k.orden)
+        FROM pg_constraint con
+        WHERE con.conrelid = to_regclass(%s) AND con.contype IN ('p', 'u', 'f')
+        """,
+        [tabla],
+    )
+    unicas, fks = [], []
+    for nombre, tipo, definicion, destino, columnas in cursor.fetchall():
+        if tipo == 'f':
+            fks.append((nombre, definicion, destino))
+        else:
+            unicas.append((nombre, tipo, list(columnas)))
+    return unicas, fks
+
+
+def _indices(cursor, tabla):
+    """Índices que no respaldan una restricción: (nombre, definición, es_unico)."""
+    cursor.execute(
+        """
+        SELECT ci.relname, pg_get_indexdef(i.indexrelid), i.indisunique
+        FROM pg_index i JOIN pg_class ci ON ci.oid = i.indexrelid
+        WHERE i.indrelid = to_regclass(%s)
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint con WHERE con.conindid = i.indexrelid)
+        """,
+        [tabla],
+    )
+    return cursor.fetchall()
+
+
+def _fks_entrantes(cursor, tabla):
+    cursor.execute(
+        """
+        SELECT con.conrelid::regclass::text, con.conname
+        FROM pg_constraint con
+        WHERE con.confrelid = to_regclass(%s) AND con.contype = 'f'
+          AND con.conrelid <> con.confrelid AND con.conparentid = 0
+        """,
+        [tabla],
+    )
+    return cursor.fetchall()
+
+
+def _vistas_dependientes(cursor, tabla):
+    """
+    Vistas y vistas materializadas que dependen de la tabla, directa o
+    indirectamente (pg_depend de sus reglas), en orden de creación: cada una
+    después de las vistas de las que depende.
+
+    Returns:
+        list de dicts: nombre, materializada, definicion, opciones, comentario,
+        permisos [(rol, privilegio)], indices [definición]
+    """
+    cursor.execute(
+        """
+        WITH RECURSIVE dependientes(oid, nivel) AS (
+            SELECT r.ev_class, 1
+            FROM pg_depend d JOIN pg_rewrite r ON r.oid = d.objid
+            WHERE d.classid = 'pg_rewrite'::regclass AND d.refclassid = 'pg_class'::regclass
+              AND d.refobjid = to_regclass(%s) AND r.ev_class <> d.refobjid
+            UNION
+            SELECT r.ev_class, dep.nivel + 1
+            FROM dependientes dep
+            JOIN pg_depend d ON d.refobjid = dep.oid AND d.refclassid = 'pg_class'::regclass
+                            AND d.classid = 'pg_rewrite'::regclass
+            JOIN pg_rewrite r ON r.oid = d.objid
+            WHERE r.ev_class <> dep.oid
+        )
+        SELECT c.oid, c.oid::regclass::text, c.relkind = 'm', pg_get_viewdef(c.oid),
+               c.reloptions, obj_description(c.oid, 'pg_class')
+        FROM (SELECT oid, MAX(nivel) AS nivel FROM dependientes GROUP BY oid) dep
+        JOIN pg_class c ON c.oid = dep.oid
+        WHERE c.relkind IN ('v', 'm')
+        ORDER BY dep.nivel, c.oid
+        """,
+        [tabla],
+    )
+    vistas = []
+    for oid, nombre, materializada, definicion, opciones, comentario in cursor.fetchall():
+        cursor.execute(
+            """
+            SELECT CASE WHEN a.grantee = 0 THEN 'PUBLIC' ELSE quote_ident(pg_get_userbyid(a.grantee)) END,
+                   a.privilege_type
+            FROM pg_class c, aclexplode(c.relacl) a
+            WHERE c.oid = %s AND a.grantee <> c.relowner
+            """,
+            [oid],
+        )
+        permisos = cursor.fetchall()
+        cursor.execute('SELECT pg_get_indexdef(indexrelid) FROM pg_index WHERE indrelid = %s', [oid])
+        indices = [fila[0] for fila in cursor.fetchall()]
+        vistas.append({
+            'nombre': nombre,
+            'materializada': materializada,
+            'definicion': definicion.rstrip().rstrip(';'),
+            'opciones': opciones or [],
+            'comentario': comentario,
+            'permisos': permisos,
+            'indices': indices,
+        })
+    return vistas
+
+
+def _eliminar_vistas(cursor, vistas):
+    # Las que dependen de otras primero (sin CASCADE: si aparece algo no
+    # previsto, la conversión falla en vez de borrarlo)
+    for vista in reversed(vistas):
+        tipo = 'MATERIALIZED VIEW' if vista['materializada'] else 'VIEW'
+        cursor.execute(f"DROP {tipo} {vista['nombre']}")
+
+
+def _recrear_vistas(cursor, vistas):
+    for vista in vistas:
+        tipo = 'MATERIALIZED VIEW' if vista['materializada'] else 'VIEW'
+        opciones = f" WITH ({', '.join(vista['opciones'])})" if vista['opciones'] else ''
+        cursor.execute(f"CREATE {tipo} {vista['nombre']}{opciones} AS {vista['definicion']}")
+        for indice in vista['indices']:
+            cursor.execute(indice)
+        if vista['comentario'] is not None:
+            cursor.execute(f"COMMENT ON {tipo} {vista['nombre']} IS %s", [vista['comentario']])
+        for rol, privilegio in vista['permisos']:
+            cursor.execute(f"GRANT {privilegio} ON {vista['nombre']} TO {rol}")
+
+
+def _fk_turno(tabla):
+    return (
+        f'ALTER TABLE {_q(tabla)} ADD CONSTRAINT {_q(tabla + "_turno_fecha_fk")} '
+        'FOREIGN KEY (turno_id, fecha_turno) REFERENCES turnos (id, fecha) '
+        'ON UPDATE CASCADE DEFERRABLE INITIALLY DEFERRED'
+    )
+
+
+def _crear_particion(cursor, tabla, columna, mes):
+    """
+    Crea la partición del mes. Si la DEFAULT ya tiene filas de ese mes, las
+    mueve a la nueva partición antes de adjuntarla.
+    """
+    nombre = nombre_particion(tabla, mes)
+    desde, hasta = mes, sumar_meses(mes, 1)
+    default = nombre_default(tabla)
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [default])
+    filas_en_default = 0
+    if cursor.fetchone()[0]:
+        cursor.execute(
+            f'SELECT COUNT(*) FROM {_q(default)} WHERE {_q(columna)} >= %s AND {_q(columna)} < %s',
+            [desde, hasta],
+        )
+        filas_en_default = cursor.fetchone()[0]
+
+    if not filas_en_default:
+        cursor.execute(
+            f'CREATE TABLE {_q(nombre)} PARTITION OF {_q(tabla)} FOR VALUES FROM (%s) TO (%s)',
+            [desde, hasta],
+        )
+        return 0
+
+    cursor.execute(f'CREATE TABLE {_q(nombre)} (LIKE {_q(tabla)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    cursor.execute(
+        f'WITH movidas AS (DELETE FROM {_q(default)} WHERE {_q(columna)} >= %s AND {_q(columna)} < %s '
+        f'RETURNING *) INSERT INTO {_q(nombre)} SELECT * FROM movidas',
+        [desde, hasta],
+    )
+    cursor.execute(
+        f'ALTER TABLE {_q(tabla)} ATTACH PARTITION {_q(nombre)} FOR VALUES FROM (%s) TO (%s)',
+        [desde, hasta],
+    )
+    return filas_en_default
+
+
+def crear_particiones_futuras(cursor, tabla, meses_futuros, hoy=None):
+    """Crea las particiones que falten desde el mes actual hasta meses_futuros adelante."""
+    columna = COLUMNA_PARTICION[tabla]
+    hoy = hoy or timezone.localdate()
+    existentes = {p[1] for p in particiones(cursor, tabla) if p[1] is not None}
+    creadas = []
+    for mes in meses_entre(hoy, sumar_meses(hoy, meses_futuros)):
+        if mes not in existentes:
+            _crear_particion(cursor, tabla, columna, mes)
+            creadas.append(nombre_particion(tabla, mes))
+    return creadas
+
+
+def convertir_tabla(cursor, tabla, meses_futuros, hoy=None):
+    """
+    Convierte una tabla normal en particionada por mes, con sus datos.
+    Debe ejecutarse dentro de una transacción: si algo falla, no queda nada a medias.
+
+    Returns:
+        dict: filas, particiones creadas, FKs entrantes eliminadas, índices
+        omitidos, vistas recreadas
+    """
+    columna = COLUMNA_PARTICION[tabla]
+    hoy = hoy or timezone.localdate()
+    antigua = f'{tabla}_sin_particionar'
+
+    if tabla in TABLAS_HIJAS:
+        if not esta_particionada(cursor, 'turnos'):
+            raise ParticionError(f'Debe particionarse turnos antes que {tabla}')
+        cursor.execute(
+            f'UPDATE {_q(tabla)} h SET fecha_turno = t.fecha FROM turnos t '
+            'WHERE t.id = h.turno_id AND h.fecha_turno IS DISTINCT FROM t.fecha'
+        )
+
+    cursor.execute(f'LOCK TABLE {_q(tabla)} IN ACCESS EXCLUSIVE MODE')
+    unicas, fks = _restricciones(cursor, tabla)
+    indices = _indices(cursor, tabla)
+    entrantes = _fks_entrantes(cursor, tabla)
+    cursor.execute(
+        "SELECT attidentity FROM pg_attribute WHERE attrelid = to_regclass(%s) AND attname = 'id'",
+        [tabla],
+    )
+    es_identity = bool(cursor.fetchone()[0])
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [tabla])
+    secuencia = cursor.fetchone()[0]
+    minimo, _, filas = rango_datos(cursor, tabla, columna)
+    # RENAME arrastraría las vistas a la tabla antigua y DROP TABLE fallaría
+    vistas = _vistas_dependientes(cursor, tabla)
+    _eliminar_vistas(cursor, vistas)
+
+    # Las FKs que apuntan a esta tabla solo por id ya no son posibles
+    for origen, nombre in entrantes:
+        cursor.execute(f'ALTER TABLE {origen} DROP CONSTRAINT {_q(nombre)}')
+
+    cursor.execute(f'ALTER TABLE {_q(tabla)} RENAME TO {_q(antigua)}')
+    cursor.execute(
+        f'CREATE TABLE {_q(tabla)} (LIKE {_q(antigua)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS '
+        f'INCLUDING GENERATED INCLUDING STORAGE) PARTITION BY RANGE ({_q(columna)})'
+    )
+    if tabla in TABLAS_HIJAS:
+        cursor.execute(f'ALTER TABLE {_q(tabla)} ALTER COLUMN fecha_turno SET NOT NULL')
+
+    creadas = []
+    for mes in meses_entre(minimo or hoy, sumar_meses(hoy, meses_futuros)):
+        _crear_particion(cursor, tabla, columna, mes)
+        creadas.append(nombre_particion(tabla, mes))
+    cursor.execute(f'CREATE TABLE {_q(nombre_default(tabla))} PARTITION OF {_q(tabla)} DEFAULT')
+
+    cursor.execute(f'INSERT INTO {_q(tabla)} SELECT * FROM {_q(antigua)}')
+    if secuencia and not es_identity:
+        # La secuencia del serial se queda con la tabla nueva (si no, se borra con la antigua)
+        cursor.execute(f'ALTER SEQUENCE {secuencia} OWNED BY {_q(tabla)}.id')
+    cursor.execute(f'DROP TABLE {_q(antigua)}')
+    if es_identity:
+        # La identidad no se copia a tablas particionadas en todas las versiones:
+        # se reemplaza por una secuencia propia con el mismo comportamiento
+        secuencia = _q(f'{tabla}_id_seq')
+        cursor.execute(f'CREATE SEQUENCE {secuencia} OWNED BY {_q(tabla)}.id')
+        cursor.execute(f"ALTER TABLE {_q(tabla)} ALTER COLUMN id SET DEFAULT nextval('{secuencia}')")
+        cursor.execute(f'SELECT setval(%s, COALESCE(MAX(id), 0) + 1, false) FROM {_q(tabla)}', [secuencia])
+
+    for nombre, tipo, columnas in unicas:
+        if columna not in columnas:
+            columnas = columnas + [columna]
+        restriccion = 'PRIMARY KEY' if tipo == 'p' else 'UNIQUE'
+        cursor.execute(
+            f'ALTER TABLE {_q(tabla)} ADD CONSTRAINT {_q(nombre)} {restriccion} ({", ".join(map(_q, columnas))})'
+        )
+    omitidos = []
+    for nombre, definicion, es_unico in indices:
+        if es_unico:
+            # Un índice único sin la clave de partición no se puede recrear
+            omitidos.append(nombre)
+            continue
+        cursor.execute(definicion)
+    for nombre, definicion, destino in fks:
+        if tabla in TABLAS_HIJAS and destino == 'turnos':
+            continue
+        cursor.execute(f'ALTER TABLE {_q(tabla)} ADD CONSTRAINT {_q(nombre)} {definicion}')
+    if tabla in TABLAS_HIJAS:
+        cursor.execute(_fk_turno(tabla))
+    _recrear_vistas(cursor, vistas)
+
+    cursor.execute(f'ANALYZE {_q(tabla)}')
+    return {
+        'filas': filas,
+        'particiones': creadas,
+        'fks_eliminadas': [f'{origen}.{nombre}' for origen, nombre in entrantes],
+        'indices_omitidos': omitidos,
+        'vistas_recreadas': [vista['nombre'] for vista in vistas],
+    }
+
+
+def desprender_particiones(cursor, tabla, antes):
+    """
+    Desprende (DETACH) las particiones cuyo mes termina antes de `antes`. Quedan
+    como tablas independientes para archivarlas o borrarlas con DROP TABLE.
+    Las hijas deben desprenderse antes que turnos (la FK compuesta se elimina
+    de la tabla desprendida).
+    """
+    desprendidas = []
+    for nombre, desde, hasta in particiones(cursor, tabla):
+        if hasta is None or hasta > antes:
+            continue
+        cursor.execute(f'ALTER TABLE {_q(tabla)} DETACH PARTITION {_q(nombre)}')
+        if tabla in TABLAS_HIJAS:
+            cursor.execute(
+                "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'f' "
+                "AND confrelid = to_regclass('turnos')",
+                [nombre],
+            )
+            for (fk,) in cursor.fetchall():
+                cursor.execute(f'ALTER TABLE {_q(nombre)} DROP CONSTRAINT {_q(fk)}')
+        desprendidas.append(nombre)
+    return desprendidas
@@ -0,0 +1,194 @@
+"""
+Resolución de precios unitarios vigentes por intervalos de fecha.
+
+MetaMaquina.obtener_precio_unitario hacía una query filtrada y ordenada por
+cada llamada, y la valorización de una meta la repetía varias veces (valor de
+meta, valor real, changelist del admin). Aquí todos los PrecioUnitarioServicio
+activos se cargan con una sola query y se agrupan por (contrato, servicio) en
+listas ordenadas por fecha_inicio_vigencia; el precio vigente en una fecha se
+resuelve con bisect y muchas fechas a la vez con numpy.searchsorted.
+
+Mismo criterio que la query original: entre los precios activos con
+fecha_inicio_vigencia <= fecha y (sin fecha fin o fecha_fin_vigencia >= fecha),
+el de inicio más reciente.
+
+Invalidación: la versión sale de la base de datos (cantidad de filas y
+MAX(updated_at) de PrecioUnitarioServicio), no de la caché, así que un cambio
+guardado en un worker lo ven todos aunque la caché sea por proceso (LocMem con
+varios workers de gunicorn). Cada hilo guarda los intervalos junto con su
+versión y la vuelve a consultar al inicio de cada petición y, fuera de
+peticiones (comandos, hilos de fondo), cada SEGUNDOS_VERIFICACION segundos.
+La caché de Django solo evita recargar los intervalos de una versión ya vista.
+PrecioUnitarioServicio.save/delete llaman además a invalidar_precios para que
+el propio hilo no espere al siguiente chequeo. Las operaciones masivas con
+queryset.update deben fijar updated_at=timezone.now() para mover la versión.
+
+Uso:
+    from drilling.utils.precios import precio_vigente, precios_vigentes
+
+    precio = precio_vigente(contrato_id, servicio_id, fecha)
+    precios = precios_vigentes(contrato_id, servicio_id, [fecha1, fecha2, ...])
+"""
+
+import threading
+import time
+from bisect import bisect_right
+from datetime import date
+
+from django.core.cache import cache
+from django.core.signals import request_started
+from django.db import transaction
+
+TTL_INTERVALOS = 60 * 60 * 24
+
+SEGUNDOS_VERIFICACION = 5
+
+_local = threading.local()
+
+
+class IntervalosPrecio:
+    """Precios de un (contrato, servicio) ordenados por fecha de inicio."""
+
+    __slots__ = ('inicios', 'fines', 'precios')
+
+    def __init__(self, precios):
+        precios = sorted(precios, key=lambda p: p.fecha_inicio_vigencia)
+        self.inicios = [p.fecha_inicio_vigencia for p in precios]
+        self.fines = [p.fecha_fin_vigencia for p in precios]
+        self.precios = precios
+
+    def _vigente_desde(self, indice, fecha):
+        # Retrocede sobre los intervalos que empezaron antes pero ya vencieron
+        while indice >= 0:
+            fin = self.fines[indice]
+            if fin is None or fin >= fecha:
+                return self.precios[indice]
+            indice -= 1
+        return None
+
+    def vigente(self, fecha):
+        """Precio vigente en la fecha o None."""
+        return self._vigente_desde(bisect_right(self.inicios, fecha) - 1, fecha)
+
+    def vigentes(self, fechas):
+        """Precio vigente (o None) de cada fecha, en el mismo orden."""
+        import numpy as np
+
+        fechas = list(fechas)
+        if not fechas or not self.precios:
+            return [None] * len(fechas)
+        inicios = np.array(self.inicios, dtype='datetime64[D]')
+        # Sin fecha fin = abierto hacia adelante
+        fines = np.array([f or date.max for f in self.fines], dtype='datetime64[D]')
+        objetivo = np.array(fechas, dtype='datetime64[D]')
+        indices = np.searchsorted(inicios, objetivo, side='right') - 1
+        directos = (indices >= 0) & (fines[np.maximum(indices, 0)] >= objetivo)
+
+        resultado = []
+        for fecha, indice, directo in zip(fechas, indices.tolist(), directos.tolist()):
+            if directo:
+                resultado.append(self.precios[indice])
+            else:
+                resultado.append(self._vigente_desde(indice, fecha))
+        return resultado
+
+
+def _version():
+    """Versión de los precios en la base de datos, igual en todos los procesos."""
+    from django.db.models import Count, Max
+    from drilling.models import PrecioUnitarioServicio
+
+    datos = PrecioUnitarioServicio.objects.order_by().aggregate(
+        cantidad=Count('pk'), ultimo=Max('updated_at'),
+    )
+    ultimo = datos['ultimo'].isoformat() if datos['ultimo'] else '-'
+    return f"{datos['cantidad']}:{ultimo}"
+
+
+def _agrupar(precios):
+    por_clave = {}
+    for precio in precios:
+        por_clave.setdefault((precio.contrato_id, precio.servicio_id), []).append(precio)
+    return {clave: IntervalosPrecio(grupo) for clave, grupo in por_clave.items()}
+
+
+def _cargar():
+    from drilling.models import PrecioUnitarioServicio
+
+    return _agrupar(PrecioUnitarioServicio.objects.filter(activo=True).order_by())
+
+
+def intervalos_desde_bd(claves):
+    """
+    {(contrato_id, servicio_id): IntervalosPrecio} leídos de la base en una
+    query, sin pasar por la caché. Para quien persiste precios (libro de
+    valorización): no depende de que este proceso haya visto la invalidación.
+    """
+    from drilling.models import PrecioUnitarioServicio
+
+    claves = set(claves)
+    if not claves:
+        return {}
+    precios = PrecioUnitarioServicio.objects.filter(
+        activo=True,
+        contrato_id__in={contrato_id for contrato_id, _ in claves},
+        servicio_id__in={servicio_id for _, servicio_id in claves},
+    ).order_by()
+    return {clave: rango for clave, rango in _agrupar(precios).items() if clave in claves}
+
+
+def intervalos(verificar=False):
+    """
+    {(contrato_id, servicio_id): IntervalosPrecio} de la versión vigente.
+
+    Con verificar=True consulta la versión aunque el hilo la haya revisado
+    hace poco (lo usa el libro de valorización antes de persistir precios).
+    """
+    ahora = time.monotonic()
+    verificada_en = getattr(_local, 'verificada_en', None)
+    if (not verificar and verificada_en is not None
+            and ahora - verificada_en < SEGUNDOS_VERIFICACION):
+        return _local.intervalos
+    version = _version()
+    if getattr(_local, 'version', None) != version:
+        clave = f'precios:intervalos:{version}'
+        datos = cache.get(clave)
+        if datos is None:
+            datos = _cargar()
+            cache.set(clave, datos, TTL_INTERVALOS)
+        _local.version, _local.intervalos = version, datos
+    _local.verificada_en = ahora
+    return _local.intervalos
+
+
+def _nueva_peticion(**kwargs):
+    # Una petición nueva vuelve a consultar la versión (una query agregada)
+    _local.verificada_en = None
+
+
+request_started.connect(_nueva_peticion, dispatch_uid='precios_nueva_peticion')
+
+
+def invalidar_precios():
+    """
+    Descarta los intervalos cargados en este hilo. Se descarta ahora y al
+    confirmar la transacción, para que una carga hecha antes del commit no
+    quede vigente. Los demás procesos lo notan por la versión en la base.
+    """
+    _local.__dict__.clear()
+    transaction.on_commit(_local.__dict__.clear)
+
+
+def precio_vigente(contrato_id, servicio_id, fecha):
+    """PrecioUnitarioServicio vigente en la fecha o None."""
+    rango = intervalos().get((contrato_id, servicio_id))
+    return rango.vigente(fecha) if rango else None
+
+
+def precios_vigentes(contrato_id, servicio_id, fechas):
+    """Precio vigente (o None) de cada fecha, en el mismo orden."""
+    fechas = list(fechas)
+    rango = intervalos().get((contrato_id, servicio_id))
+    if not rango:
+        return [None] * len(fechas)
+    return rango.vigentes(fechas)
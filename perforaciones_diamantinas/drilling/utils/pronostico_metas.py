@@ -0,0 +1,271 @@
+"""
+Pronóstico de cumplimiento de metas (run-rate) por máquina y período.
+
+Para cada meta se guarda en caché la serie diaria de metros del período
+(TurnoAvance de turnos COMPLETADOS/APROBADOS, un valor por día calendario).
+Con esas series, el pronóstico de todas las metas se calcula de una vez con
+NumPy (una matriz metas x días):
+
+- metros a la fecha (acumulado hasta hoy) y ritmo actual (metros/día)
+- metros proyectados al cierre: acumulado + ritmo x días restantes
+- ritmo requerido para alcanzar la meta en los días restantes
+- banda P10-P90 y probabilidad de cumplir, suponiendo días independientes
+  con la media y desviación de los días transcurridos
+
+Invalidación: cada serie guarda la versión de los meses operativos que cubre
+(clave por contrato, máquina y mes operativo). Turno.save/delete,
+TurnoAvance.save/delete y la ingesta por lotes llaman a invalidar_pronosticos,
+que cambia la versión; solo las metas de ese período se recalculan (una query
+para todas las que falten). Las versiones viven en la caché de Django: con
+varios procesos se necesita una caché compartida (Redis/Memcached) para que la
+invalidación llegue a todos; TTL_SERIE limita cuánto puede quedar desfasada.
+La serie se lee siempre del primario, aunque la vista use la réplica
+(@usar_replica), para no guardar datos anteriores al commit con la versión nueva.
+
+Uso:
+    from drilling.utils.pronostico_metas import pronosticar_metas
+
+    pronosticos = pronosticar_metas(metas)   # {meta.pk: {...}}
+"""
+
+import math
+import time
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, Sum
+
+from drilling.utils.calendario import mes_operativo
+
+TTL_SERIE = 60 * 60 * 6
+
+# z de los percentiles 10 y 90 de la normal
+Z_P90 = 1.2816
+
+ESTADOS_CONTABLES = ['COMPLETADO', 'APROBADO']
+
+
+def _clave_version(contrato_id, maquina_id, año, mes):
+    return f'pronostico:v:{contrato_id}:{maquina_id}:{año}-{mes:02d}'
+
+
+def _clave_serie(meta_pk):
+    return f'pronostico:serie:{meta_pk}'
+
+
+def _meses_periodo(inicio, fin):
+    """Meses operativos (año, mes) que toca el período."""
+    meses = []
+    actual = mes_operativo(inicio)
+    ultimo = mes_operativo(fin)
+    while actual <= ultimo:
+        meses.append(actual)
+        año, mes = actual
+        actual = (año + 1, 1) if mes == 12 else (año, mes + 1)
+    return meses
+
+
+def _marcar(claves):
+    token = time.time_ns()
+    cache.set_many({clave: token for clave in claves}, None)
+
+
+def invalidar_pronosticos(contrato_id, maquina_id, fechas):
+    """
+    Marca como desactualizadas las series de las metas que contienen alguna de
+    las fechas. Se marca ahora y otra vez al confirmar la transacción, para que
+    una serie recalculada antes del commit (con datos viejos) no quede vigente.
+    """
+    claves = {
+        _clave_version(contrato_id, maquina_id, *mes_operativo(fecha))
+        for fecha in fechas if fecha is not None
+    }
+    if claves:
+        _marcar(claves)
+        transaction.on_commit(lambda: _marcar(claves))
+
+
+def invalidar_por_turnos(turnos):
+    """invalidar_pronosticos para varios turnos (ingesta por lotes, sin save())."""
+    por_maquina = {}
+    for turno in turnos:
+        por_maquina.setdefault((turno.contrato_id, turno.maquina_id), set()).add(turno.fecha)
+    for (contrato_id, maquina_id), fechas in por_maquina.items():
+        invalidar_pronosticos(contrato_id, maquina_id, fechas)
+
+
+def _periodo(meta):
+    return meta.get_fecha_inicio_periodo(), meta.get_fecha_fin_periodo()
+
+
+def _versiones(metas):
+    """{meta.pk: tupla de versiones de sus meses operativos} con una lectura de caché."""
+    claves_por_meta = {
+        meta.pk: [
+            _clave_version(meta.contrato_id, meta.maquina_id, año, mes)
+            for año, mes in _meses_periodo(*_periodo(meta))
+        ]
+        for meta in metas
+    }
+    actuales = cache.get_many({c for claves in claves_por_meta.values() for c in claves})
+    return {pk: tuple(actuales.get(c, 0) for c in claves) for pk, claves in claves_por_meta.items()}
+
+
+def _firma(meta, version):
+    inicio, fin = _periodo(meta)
+    return (version, inicio, fin, meta.contrato_id, meta.maquina_id)
+
+
+def series_diarias(metas):
+    """
+    Metros por día del período de cada meta, desde la caché o con una sola
+    query para las metas cuya serie falta o está desactualizada.
+
+    Returns:
+        dict: {meta.pk: {'inicio': date, 'diario': [float, ...], 'turnos': int}}
+    """
+    from drilling.models import TurnoAvance
+
+    metas = list(metas)
+    if not metas:
+        return {}
+    # Las versiones se leen antes de la query: si un turno cambia mientras
+    # tanto, la serie queda con la versión vieja y se recalcula la próxima vez
+    versiones = _versiones(metas)
+    guardadas = cache.get_many([_clave_serie(meta.pk) for meta in metas])
+
+    series = {}
+    faltantes = []
+    for meta in metas:
+        entrada = guardadas.get(_clave_serie(meta.pk))
+        if entrada and entrada['firma'] == _firma(meta, versiones[meta.pk]):
+            series[meta.pk] = entrada
+        else:
+            faltantes.append(meta)
+    if not faltantes:
+        return series
+
+    periodos = {meta.pk: _periodo(meta) for meta in faltantes}
+    # Siempre del primario: la versión se mueve al confirmar en el primario y una
+    # serie leída de una réplica atrasada quedaría guardada con la versión nueva
+    filas = TurnoAvance.objects.using(DEFAULT_DB_ALIAS).filter(
+        turno__contrato_id__in={meta.contrato_id for meta in faltantes},
+        turno__maquina_id__in={meta.maquina_id for meta in faltantes},
+        turno__fecha__gte=min(inicio for inicio, _ in periodos.values()),
+        turno__fecha__lte=max(fin for _, fin in periodos.values()),
+        turno__estado__in=ESTADOS_CONTABLES,
+    ).values('turno__contrato_id', 'turno__maquina_id', 'turno__fecha').annotate(
+        total=Sum('metros_perforados'), turnos=Count('id'),
+    ).order_by()
+
+    por_maquina = {}
+    for fila in filas:
+        clave = (fila['turno__contrato_id'], fila['turno__maquina_id'])
+        por_maquina.setdefault(clave, {})[fila['turno__fecha']] = (float(fila['total'] or 0), fila['turnos'])
+
+    nuevas = {}
+    for meta in faltantes:
+        inicio, fin = periodos[meta.pk]
+        dias = por_maquina.get((meta.contrato_id, meta.maquina_id), {})
+        diario = []
+        turnos = 0
+        for i in range((fin - inicio).days + 1):
+            metros, n = dias.get(inicio + timedelta(days=i), (0.0, 0))
+            diario.append(metros)
+            turnos += n
+        entrada = {
+            'firma': _firma(meta, versiones[meta.pk]),
+            'inicio': inicio,
+            'diario': diario,
+            'turnos': turnos,
+        }
+        series[meta.pk] = entrada
+        nuevas[_clave_serie(meta.pk)] = entrada
+    cache.set_many(nuevas, TTL_SERIE)
+    return series
+
+
+def calcular_pronosticos(series, metas_metros, hoy):
+    """
+    Pronóstico vectorizado de varias metas.
+
+    Args:
+        series: lista de {'inicio': date, 'diario': [float]} (una por meta)
+        metas_metros: lista de metros objetivo, en el mismo orden
+        hoy: fecha de corte; los días hasta hoy inclusive cuentan como transcurridos
+
+    Returns:
+        list de dicts con metros, acumulado, proyectado, banda_p10, banda_p90,
+        ritmo_actual, ritmo_requerido, probabilidad, dias_transcurridos y dias_restantes
+    """
+    import numpy as np
+
+    n = len(series)
+    if not n:
+        return []
+    largo = max(len(s['diario']) for s in series)
+    diario = np.zeros((n, largo))
+    for i, s in enumerate(series):
+        diario[i, :len(s['diario'])] = s['diario']
+    dias_totales = np.array([len(s['diario']) for s in series])
+    transcurridos = np.clip(
+        np.array([(hoy - s['inicio']).days + 1 for s in series]), 0, dias_totales
+    )
+    meta = np.array([float(m) for m in metas_metros])
+
+    acumulado = np.cumsum(diario, axis=1)
+    en_curso = np.arange(largo)[None, :] < transcurridos[:, None]
+    metros = np.where(transcurridos > 0, acumulado[np.arange(n), np.maximum(transcurridos - 1, 0)], 0.0)
+    dias = np.maximum(transcurridos, 1)
+    ritmo = metros / dias
+    varianza = ((diario - ritmo[:, None]) ** 2 * en_curso).sum(axis=1) / np.maximum(dias - 1, 1)
+    desviacion = np.sqrt(varianza)
+
+    restantes = dias_totales - transcurridos
+    proyectado = metros + ritmo * restantes
+    sigma = desviacion * np.sqrt(restantes)
+    banda_p10 = np.maximum(metros, proyectado - Z_P90 * sigma)
+    banda_p90 = proyectado + Z_P90 * sigma
+    faltante = np.maximum(meta - metros, 0.0)
+    ritmo_requerido = np.where(restantes > 0, faltante / np.maximum(restantes, 1), np.nan)
+
+    erf = np.vectorize(math.erf)
+    z = np.where(sigma > 0, (meta - proyectado) / np.where(sigma > 0, sigma, 1.0), 0.0)
+    probabilidad = np.where(sigma > 0, 0.5 * (1 - erf(z / math.sqrt(2))), (proyectado >= meta).astype(float))
+    # Sin días transcurridos no hay ritmo: no se proyecta
+    sin_datos = transcurridos == 0
+
+    resultados = []
+    for i, s in enumerate(series):
+        resultados.append({
+            'metros': float(metros[i]),
+            'acumulado': acumulado[i, :transcurridos[i]].round(2).tolist(),
+            'proyectado': None if sin_datos[i] else round(float(proyectado[i]), 2),
+            'banda_p10': None if sin_datos[i] else round(float(banda_p10[i]), 2),
+            'banda_p90': None if sin_datos[i] else round(float(banda_p90[i]), 2),
+            'ritmo_actual': round(float(ritmo[i]), 2),
+            'ritmo_requerido': None if np.isnan(ritmo_requerido[i]) else round(float(ritmo_requerido[i]), 2),
+            'probabilidad': None if sin_datos[i] else round(float(probabilidad[i]), 3),
+            'dias_transcurridos': int(transcurridos[i]),
+            'dias_restantes': int(restantes[i]),
+        })
+    return resultados
+
+
+def pronosticar_metas(metas, hoy=None):
+    """
+    Pronóstico de cada meta (ver calcular_pronosticos).
+
+    Returns:
+        dict: {meta.pk: pronóstico}
+    """
+    metas = list(metas)
+    if not metas:
+        return {}
+    hoy = hoy or date.today()
+    series = series_diarias(metas)
+    resultados = calcular_pronosticos(
+        [series[meta.pk] for meta in metas], [meta.meta_metros for meta in metas], hoy
+    )
+    return {meta.pk: resultado for meta, resultado in zip(metas, resultados)}
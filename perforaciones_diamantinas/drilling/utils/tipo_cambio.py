@@ -0,0 +1,114 @@
+"""
+Conversión de montos entre monedas con tipos de cambio diarios.
+
+Los precios unitarios pueden estar en USD, BOB o PEN; sumar montos de metas o
+turnos en monedas distintas da un total sin sentido. Este módulo carga los
+tipos de cambio del rango necesario con una sola query (TipoCambio, unidades
+por 1 USD) y convierte arreglos completos de montos con NumPy:
+
+    monto_destino = monto / unidades_por_usd[origen] * unidades_por_usd[destino]
+
+Para cada fecha se usa el último tipo publicado en esa fecha o antes (fines
+de semana y feriados no tienen fila), con una antigüedad máxima de
+DIAS_VIGENCIA días. Sin tipo vigente el monto convertido es NaN y el
+llamador decide si lo excluye o avisa.
+
+Uso:
+    from drilling.utils.tipo_cambio import TablaTiposCambio
+
+    tabla = TablaTiposCambio.cargar({'BOB', 'PEN'}, desde, hasta)
+    convertidos = tabla.convertir(montos, monedas, fechas, 'USD')   # np.ndarray
+"""
+
+import math
+from datetime import timedelta
+from decimal import Decimal
+
+from drilling.models import TipoCambio
+
+MONEDA_PIVOTE = 'USD'
+
+# Antigüedad máxima del último tipo publicado para seguir usándolo
+DIAS_VIGENCIA = 7
+
+
+class TablaTiposCambio:
+    """Tipos de cambio por moneda como arreglos ordenados por fecha."""
+
+    def __init__(self, filas=()):
+        import numpy as np
+
+        por_moneda = {}
+        for moneda, fecha, tasa in filas:
+            por_moneda.setdefault(moneda, []).append((fecha, float(tasa)))
+        self.series = {}
+        for moneda, valores in por_moneda.items():
+            valores.sort()
+            self.series[moneda] = (
+                np.array([fecha for fecha, _ in valores], dtype='datetime64[D]'),
+                np.array([tasa for _, tasa in valores]),
+            )
+
+    @classmethod
+    def cargar(cls, monedas, desde, hasta):
+        """Tipos de las monedas (sin USD) vigentes entre desde y hasta, en una query."""
+        monedas = set(monedas) - {MONEDA_PIVOTE, None, ''}
+        if not monedas:
+            return cls()
+        filas = TipoCambio.objects.filter(
+            moneda__in=monedas,
+            fecha__gte=desde - timedelta(days=DIAS_VIGENCIA),
+            fecha__lte=hasta,
+        ).values_list('moneda', 'fecha', 'unidades_por_usd').order_by()
+        return cls(filas)
+
+    def unidades_por_usd(self, moneda, fechas):
+        """Unidades de la moneda por 1 USD en cada fecha (NaN si no hay tipo vigente)."""
+        import numpy as np
+
+        fechas = np.asarray(fechas, dtype='datetime64[D]')
+        if moneda == MONEDA_PIVOTE:
+            return np.ones(len(fechas))
+        if moneda not in self.series:
+            return np.full(len(fechas), np.nan)
+        dias, tasas = self.series[moneda]
+        indices = np.searchsorted(dias, fechas, side='right') - 1
+        validos = indices >= 0
+        indices = np.maximum(indices, 0)
+        vigente = validos & ((fechas - dias[indices]) <= np.timedelta64(DIAS_VIGENCIA, 'D'))
+        return np.where(vigente, tasas[indices], np.nan)
+
+    def convertir(self, montos, monedas, fechas, destino):
+        """
+        Convierte cada monto de su moneda a destino con el tipo de su fecha.
+
+        Args:
+            montos: montos (None = sin monto)
+            monedas: moneda de cada monto
+            fechas: fecha de cada monto, o una sola fecha para todos
+            destino: moneda de reporte
+
+        Returns:
+            np.ndarray de floats; NaN donde el monto es None o falta el tipo de cambio
+        """
+        import numpy as np
+
+        montos = np.array([np.nan if m is None else float(m) for m in montos])
+        monedas = np.array(list(monedas), dtype=object)
+        fechas = np.broadcast_to(np.asarray(fechas, dtype='datetime64[D]'), montos.shape)
+        factor = np.full(len(montos), np.nan)
+        destino_tasas = self.unidades_por_usd(destino, fechas)
+        for moneda in set(monedas.tolist()):
+            mascara = monedas == moneda
+            if moneda == destino:
+                factor[mascara] = 1.0
+            else:
+                factor[mascara] = destino_tasas[mascara] / self.unidades_por_usd(moneda, fechas[mascara])
+        return montos * factor
+
+
+def a_decimal(valor):
+    """Monto convertido (float) a Decimal con 2 decimales; None si es NaN."""
+    if valor is None or math.isnan(valor):
+        return None
+    return Decimal(f'{valor:.2f}')
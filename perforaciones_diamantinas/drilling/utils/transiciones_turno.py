@@ -0,0 +1,110 @@
+"""
+Transiciones de estado de turnos por lotes.
+
+Aprobar turno por turno (aprobar_turno) cuesta una página de confirmación, un
+full_clean y un UPDATE por turno. Aquí el conjunto se define con filtros
+(contrato, rango de fechas, máquinas), los permisos se aplican al queryset
+completo y el cambio de estado se hace con un único UPDATE condicional:
+
+    UPDATE turnos SET estado = 'APROBADO', updated_at = ...
+    WHERE contrato_id = ... AND fecha BETWEEN ... AND estado = 'COMPLETADO'
+
+Después se refrescan una sola vez los hechos de BI del conjunto afectado
+(fact_turno y el cumplimiento de las metas que contienen esos turnos).
+
+Uso:
+    from drilling.utils.transiciones_turno import turnos_en_alcance, transicionar_turnos
+
+    turnos = turnos_en_alcance(request.user, contrato_id=3, fecha_desde=d1, fecha_hasta=d2)
+    resultado = transicionar_turnos(turnos, 'COMPLETADO', 'APROBADO')
+"""
+
+import logging
+from datetime import date
+
+from django.db import transaction
+from django.utils import timezone
+
+from drilling.models import Turno
+
+logger = logging.getLogger(__name__)
+
+# (estado_origen, estado_destino) permitidos por lotes
+TRANSICIONES_PERMITIDAS = {
+    ('COMPLETADO', 'APROBADO'),
+}
+
+
+class TransicionInvalida(Exception):
+    """Transición no permitida o filtros fuera del alcance del usuario."""
+
+
+def puede_aprobar(usuario):
+    """Misma regla que aprobar_turno: admin del sistema o RESIDENTE."""
+    return usuario.is_system_admin or usuario.role == 'RESIDENTE'
+
+
+def _fecha(valor):
+    if isinstance(valor, date) or not valor:
+        return valor
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise TransicionInvalida(f'Fecha inválida: {valor}')
+
+
+def turnos_en_alcance(usuario, contrato_id=None, fecha_desde=None, fecha_hasta=None, maquina_ids=None):
+    """
+    Queryset de turnos que el usuario puede transicionar según los filtros.
+    El permiso de contrato se aplica al conjunto, no turno por turno.
+
+    Raises:
+        TransicionInvalida: si faltan filtros o el contrato no es del usuario
+    """
+    fecha_desde, fecha_hasta = _fecha(fecha_desde), _fecha(fecha_hasta)
+    if not fecha_desde or not fecha_hasta:
+        raise TransicionInvalida('Debe indicar fecha desde y fecha hasta')
+    if fecha_desde > fecha_hasta:
+        raise TransicionInvalida('La fecha desde no puede ser posterior a la fecha hasta')
+
+    if usuario.is_system_admin or usuario.can_manage_all_contracts():
+        if not contrato_id:
+            raise TransicionInvalida('Debe seleccionar un contrato')
+    else:
+        if contrato_id and int(contrato_id) != usuario.contrato_id:
+            raise TransicionInvalida('No tiene acceso a este contrato')
+        contrato_id = usuario.contrato_id
+
+    turnos = Turno.objects.filter(contrato_id=contrato_id, fecha__gte=fecha_desde, fecha__lte=fecha_hasta)
+    if maquina_ids:
+        turnos = turnos.filter(maquina_id__in=maquina_ids)
+    return turnos
+
+
+def transicionar_turnos(turnos, estado_origen, estado_destino, refrescar_bi=True):
+    """
+    Mueve a estado_destino los turnos del queryset que están en estado_origen.
+
+    Returns:
+        dict: {'actualizados': int, 'turno_ids': [int]}
+    """
+    if (estado_origen, estado_destino) not in TRANSICIONES_PERMITIDAS:
+        raise TransicionInvalida(f'Transición no permitida: {estado_origen} → {estado_destino}')
+
+    # update() no aplica auto_now: se fija updated_at explícitamente para que
+    # la marca de agua de refresh_bi_facts vea el cambio y para identificar
+    # las filas afectadas por este UPDATE
+    ahora = timezone.now()
+    with transaction.atomic():
+        actualizados = turnos.filter(estado=estado_origen).update(estado=estado_destino, updated_at=ahora)
+        turno_ids = list(turnos.filter(estado=estado_destino, updated_at=ahora).values_list('pk', flat=True))
+
+    if refrescar_bi and turno_ids:
+        from drilling.utils.bi_facts import refrescar_por_turnos
+        try:
+            refrescar_por_turnos(turno_ids)
+        except Exception as e:
+            # El refresco nocturno lo recupera; no revertir la aprobación por esto
+            logger.warning(f'No se pudieron refrescar los hechos de BI tras la transición: {e}')
+
+    return {'actualizados': actualizados, 'turno_ids': turno_ids}
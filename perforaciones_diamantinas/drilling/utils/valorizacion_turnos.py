@@ -0,0 +1,306 @@
+"""
+Libro de valorización por turno (tabla valorizacion_turno).
+
+La facturación solo existía a nivel de meta (metas_valorizacion_reporte). Aquí
+cada turno COMPLETADO/APROBADO se valoriza por servicio cobrable
+(TipoActividad.es_cobrable) con el precio unitario vigente en su fecha:
+
+- Servicios OPERATIVO: se cobran por metro; la cantidad son los metros del
+  turno (TurnoAvance). Si el turno tiene varios servicios OPERATIVO cobrables,
+  los metros se reparten en proporción a sus horas.
+- Demás servicios cobrables (stand by, etc.): se cobran por hora; la cantidad
+  es la suma de tiempo_calc de sus actividades.
+
+Mantenimiento:
+- Turno/TurnoActividad/TurnoAvance save/delete y la ingesta por lotes llaman a
+  programar_valorizacion; los turnos se recalculan una vez al confirmar la
+  transacción (el formulario de turnos borra y recrea los hijos).
+- Al editar la vigencia o el precio de un PrecioUnitarioServicio se
+  revalorizan en conjunto las filas del contrato y servicio en el rango
+  afectado (revalorizar_precios), sin recalcular cantidades.
+- Los precios que se escriben en el libro se leen de la base
+  (intervalos_desde_bd), no de la caché de precios del proceso: con varios
+  workers, uno que aún no vio un cambio de precio no deja el anterior grabado.
+- `python manage.py valorizar_turnos` reconstruye un contrato o rango.
+
+La valorización mensual de un contrato es un SUM sobre el índice
+(contrato, fecha): ver valorizacion_mensual. Los totales entre contratos o
+monedas se convierten a una moneda de reporte con el tipo de cambio de cada
+día: ver valorizacion_consolidada.
+
+Uso:
+    from drilling.utils.valorizacion_turnos import valorizacion_mensual
+
+    filas = valorizacion_mensual(contrato_id=3, año=2025, mes=3)
+"""
+
+import threading
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from drilling.models import Turno, TurnoActividad, ValorizacionTurno
+from drilling.utils.calendario import filtro_periodo
+from drilling.utils.precios import intervalos_desde_bd
+from drilling.utils.pronostico_metas import ESTADOS_CONTABLES
+from drilling.utils.tipo_cambio import TablaTiposCambio, a_decimal
+
+TAMANO_LOTE = 500
+
+CENTAVOS = Decimal('0.01')
+
+CAMPOS_PRECIO = ['precio', 'precio_unitario', 'moneda', 'monto', 'actualizado_en']
+
+_local = threading.local()
+
+
+def _lotes(ids, tamano=TAMANO_LOTE):
+    ids = sorted(ids)
+    for i in range(0, len(ids), tamano):
+        yield ids[i:i + tamano]
+
+
+def _repartir(metros, horas_por_servicio):
+    """Reparte los metros entre servicios según sus horas; el último absorbe el redondeo."""
+    total_horas = sum(horas_por_servicio.values())
+    servicios = sorted(horas_por_servicio)
+    reparto = {}
+    asignado = Decimal('0')
+    for i, servicio_id in enumerate(servicios):
+        if i == len(servicios) - 1:
+            reparto[servicio_id] = metros - asignado
+        else:
+            proporcion = (horas_por_servicio[servicio_id] / total_horas) if total_horas else Decimal(1) / len(servicios)
+            reparto[servicio_id] = (metros * proporcion).quantize(CENTAVOS)
+            asignado += reparto[servicio_id]
+    return reparto
+
+
+def _aplicar_precio(fila, precio):
+    fila.precio = precio
+    fila.precio_unitario = precio.precio_unitario if precio else None
+    fila.moneda = precio.moneda if precio else ''
+    fila.monto = (fila.cantidad * precio.precio_unitario).quantize(CENTAVOS) if precio else None
+
+
+def _asignar_precios(filas):
+    """Resuelve el precio de cada fila agrupando las fechas por (contrato, servicio)."""
+    por_clave = {}
+    for fila in filas:
+        por_clave.setdefault((fila.contrato_id, fila.servicio_id), []).append(fila)
+    rangos = intervalos_desde_bd(por_clave)
+    for clave, grupo in por_clave.items():
+        rango = rangos.get(clave)
+        precios = rango.vigentes([fila.fecha for fila in grupo]) if rango else [None] * len(grupo)
+        for fila, precio in zip(grupo, precios):
+            _aplicar_precio(fila, precio)
+
+
+def calcular_filas(turno_ids):
+    """Filas (sin guardar) de valorizacion_turno para los turnos valorizables indicados."""
+    turnos = {
+        t['id']: t for t in Turno.objects.filter(pk__in=turno_ids, estado__in=ESTADOS_CONTABLES).values(
+            'id', 'fecha', 'contrato_id', 'maquina_id', 'avance__metros_perforados',
+        )
+    }
+    if not turnos:
+        return []
+    actividades = TurnoActividad.objects.filter(
+        turno_id__in=turnos, actividad__es_cobrable=True,
+    ).values('turno_id', 'actividad_id', 'actividad__tipo_actividad').annotate(
+        horas=Sum('tiempo_calc'),
+    ).order_by()
+
+    por_metro = {}
+    por_hora = {}
+    for a in actividades:
+        destino = por_metro if a['actividad__tipo_actividad'] == 'OPERATIVO' else por_hora
+        destino.setdefault(a['turno_id'], {})[a['actividad_id']] = a['horas'] or Decimal('0')
+
+    filas = []
+    for turno_id, t in turnos.items():
+        base = {
+            'turno_id': turno_id,
+            'fecha': t['fecha'],
+            'contrato_id': t['contrato_id'],
+            'maquina_id': t['maquina_id'],
+        }
+        metros = t['avance__metros_perforados'] or Decimal('0')
+        for servicio_id, cantidad in _repartir(metros, por_metro.get(turno_id, {})).items():
+            filas.append(ValorizacionTurno(**base, servicio_id=servicio_id, unidad='METRO', cantidad=cantidad))
+        for servicio_id, horas in por_hora.get(turno_id, {}).items():
+            filas.append(ValorizacionTurno(
+                **base, servicio_id=servicio_id, unidad='HORA', cantidad=horas.quantize(CENTAVOS),
+            ))
+    _asignar_precios(filas)
+    return filas
+
+
+def valorizar_turnos(turno_ids):
+    """
+    Reemplaza las filas de los turnos indicados. Los turnos eliminados o que
+    dejaron de ser valorizables (BORRADOR) quedan sin filas.
+
+    Returns:
+        int: filas escritas
+    """
+    escritas = 0
+    for lote in _lotes(set(turno_ids)):
+        filas = calcular_filas(lote)
+        with transaction.atomic():
+            ValorizacionTurno.objects.filter(turno_id__in=lote).delete()
+            ValorizacionTurno.objects.bulk_create(filas)
+        escritas += len(filas)
+    return escritas
+
+
+def _procesar_pendientes():
+    pendientes = getattr(_local, 'pendientes', None)
+    if not pendientes:
+        return
+    _local.pendientes = set()
+    valorizar_turnos(pendientes)
+
+
+def programar_valorizacion(turno_ids):
+    """
+    Recalcula los turnos al confirmar la transacción actual (de inmediato si no
+    hay una abierta). Varias llamadas en la misma transacción se procesan juntas.
+    Si la transacción se revierte, los turnos se recalculan en el próximo commit
+    (recalcular es idempotente).
+    """
+    ids = {turno_id for turno_id in turno_ids if turno_id is not None}
+    if not ids:
+        return
+    if not hasattr(_local, 'pendientes'):
+        _local.pendientes = set()
+    _local.pendientes |= ids
+    transaction.on_commit(_procesar_pendientes)
+
+
+def revalorizar_precios(contrato_id, servicio_id, desde=None, hasta=None):
+    """
+    Vuelve a asignar precio a las filas del contrato y servicio con fecha en
+    [desde, hasta] (None = sin límite). Las cantidades no cambian.
+
+    Returns:
+        int: filas actualizadas
+    """
+    filas = ValorizacionTurno.objects.filter(contrato_id=contrato_id, servicio_id=servicio_id)
+    if desde:
+        filas = filas.filter(fecha__gte=desde)
+    if hasta:
+        filas = filas.filter(fecha__lte=hasta)
+    filas = list(filas.only('id', 'fecha', 'contrato', 'servicio', 'cantidad', 'precio', 'moneda', 'monto'))
+    if not filas:
+        return 0
+
+    rango = intervalos_desde_bd([(contrato_id, servicio_id)]).get((contrato_id, servicio_id))
+    precios = rango.vigentes([fila.fecha for fila in filas]) if rango else [None] * len(filas)
+    ahora = timezone.now()
+    cambiadas = []
+    for fila, precio in zip(filas, precios):
+        anterior = (fila.precio_id, fila.moneda, fila.monto)
+        _aplicar_precio(fila, precio)
+        if (fila.precio_id, fila.moneda, fila.monto) != anterior:
+            fila.actualizado_en = ahora
+            cambiadas.append(fila)
+    ValorizacionTurno.objects.bulk_update(cambiadas, CAMPOS_PRECIO, batch_size=TAMANO_LOTE)
+    return len(cambiadas)
+
+
+def programar_revalorizacion(vigencias):
+    """
+    revalorizar_precios al confirmar la transacción para cada vigencia
+    (contrato_id, servicio_id, desde, hasta) anterior y nueva de un precio.
+    """
+    por_clave = {}
+    for contrato_id, servicio_id, desde, hasta in vigencias:
+        por_clave.setdefault((contrato_id, servicio_id), []).append((desde, hasta))
+
+    def revalorizar():
+        for (contrato_id, servicio_id), rangos in por_clave.items():
+            desde = min(inicio for inicio, _ in rangos)
+            hasta = None if any(fin is None for _, fin in rangos) else max(fin for _, fin in rangos)
+            revalorizar_precios(contrato_id, servicio_id, desde, hasta)
+
+    transaction.on_commit(revalorizar)
+
+
+def recalcular_valorizacion(contratos=None, desde=None, hasta=None):
+    """
+    Reconstruye el libro para los turnos del alcance (todos por defecto) y
+    elimina las filas de turnos que ya no existen.
+
+    Returns:
+        dict: {'turnos', 'filas', 'huerfanas'}
+    """
+    turnos = Turno.objects.all()
+    libro = ValorizacionTurno.objects.all()
+    if contratos:
+        turnos = turnos.filter(contrato_id__in=contratos)
+        libro = libro.filter(contrato_id__in=contratos)
+    if desde:
+        turnos = turnos.filter(fecha__gte=desde)
+        libro = libro.filter(fecha__gte=desde)
+    if hasta:
+        turnos = turnos.filter(fecha__lte=hasta)
+        libro = libro.filter(fecha__lte=hasta)
+
+    turno_ids = set(turnos.values_list('pk', flat=True))
+    # Turnos eliminados o movidos fuera del alcance: valorizar_turnos los limpia
+    huerfanos = set(libro.values_list('turno_id', flat=True)) - turno_ids
+    filas = valorizar_turnos(turno_ids | huerfanos)
+    return {'turnos': len(turno_ids), 'filas': filas, 'huerfanas': len(huerfanos)}
+
+
+def valorizacion_mensual(contrato_id, año, mes):
+    """
+    Valorización del mes operativo (26-25) por servicio, unidad y moneda, en
+    una sola query sobre el índice (contrato, fecha).
+
+    Returns:
+        list de dicts con servicio_id, servicio__nombre, unidad, moneda,
+        cantidad, monto (None si no hay precio) y turnos
+    """
+    return list(ValorizacionTurno.objects.filter(
+        filtro_periodo('fecha', año, mes_operativo=mes), contrato_id=contrato_id,
+    ).values('servicio_id', 'servicio__nombre', 'unidad', 'moneda').annotate(
+        cantidad=Sum('cantidad'), monto=Sum('monto'), turnos=Count('turno_id', distinct=True),
+    ).order_by('servicio__nombre', 'moneda'))
+
+
+def valorizacion_consolidada(desde, hasta, moneda, contratos=None):
+    """
+    Monto del libro por contrato entre desde y hasta, convertido a moneda con
+    el tipo de cambio de la fecha de cada turno. La base de datos suma por
+    (contrato, moneda, fecha) y la conversión y el total se hacen con NumPy.
+
+    Returns:
+        dict: {'por_contrato': {contrato_id: Decimal}, 'total': Decimal,
+        'monedas_sin_tipo': [monedas con montos sin tipo de cambio vigente]}
+    """
+    import numpy as np
+
+    filas = ValorizacionTurno.objects.filter(fecha__gte=desde, fecha__lte=hasta, monto__isnull=False)
+    if contratos is not None:
+        filas = filas.filter(contrato_id__in=contratos)
+    filas = list(filas.values('contrato_id', 'moneda', 'fecha').annotate(
+        total=Sum('monto'),
+    ).order_by().values_list('contrato_id', 'moneda', 'fecha', 'total'))
+    if not filas:
+        return {'por_contrato': {}, 'total': Decimal('0'), 'monedas_sin_tipo': []}
+
+    contrato_ids, monedas, fechas, montos = zip(*filas)
+    tabla = TablaTiposCambio.cargar(set(monedas), desde, hasta)
+    convertidos = tabla.convertir(montos, monedas, fechas, moneda)
+    faltantes = np.isnan(convertidos)
+    ids, posiciones = np.unique(np.array(contrato_ids), return_inverse=True)
+    sumas = np.bincount(posiciones, weights=np.where(faltantes, 0.0, convertidos), minlength=len(ids))
+    return {
+        'por_contrato': {int(i): a_decimal(suma) for i, suma in zip(ids, sumas)},
+        'total': a_decimal(sumas.sum()),
+        'monedas_sin_tipo': sorted({m for m, falta in zip(monedas, faltantes.tolist()) if falta}),
+    }
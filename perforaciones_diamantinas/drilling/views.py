@@ -14,9 +14,17 @@ from django.views.decorators.http import require_http_methods
 from django.utils import timezone
 from django.core.paginator import Paginator
 from .models import *
-from .mixins import AdminOrContractFilterMixin, SystemAdminRequiredMixin
+from .mixins import AdminOrContractFilterMixin, SystemAdminRequiredMixin, ReplicaReadMixin
 from .forms import *
-from .utils.excel_importer import AbastecimientoExcelImporter
+from .utils.db_batch import batch_counts
+from .utils.calendario import filtro_periodo, rango_mes_operativo
+from .utils.pronostico_metas import pronosticar_metas
+from .utils.tipo_cambio import TablaTiposCambio, a_decimal
+from .utils.valorizacion_turnos import valorizacion_consolidada, valorizacion_mensual
+from .utils.exportacion import (
+    COLUMNAS_HORAS_EXTRAS, COLUMNAS_TURNOS, FORMATOS as FORMATOS_EXPORTACION, exportar_queryset,
+)
+from .db_router import usar_replica
 
 from datetime import datetime, time, timedelta
 import json
@@ -80,18 +88,22 @@ def dashboard(request):
     
     # DASHBOARD PARA ADMINISTRADOR DEL SISTEMA
     if is_admin:
-        # MÃ©tricas consolidadas de todos los contratos
-        contratos_activos = Contrato.objects.filter(estado='ACTIVO').count()
-        usuarios_activos = CustomUser.objects.filter(is_active=True, is_account_active=True).count()
-        
-        # Metros perforados del mes (todos los contratos)
-        metros_perforados_mes = TurnoAvance.objects.filter(
-            turno__fecha__month=hoy.month,
-            turno__fecha__year=hoy.year
-        ).aggregate(total=models.Sum('metros_perforados'))['total'] or 0
-        
-        # Turnos hoy (todos los contratos)
-        turnos_hoy_total = Turno.objects.filter(fecha=hoy).count()
+        # MÃ©tricas consolidadas de todos los contratos (un solo round-trip)
+        contadores = batch_counts({
+            'contratos_activos': Contrato.objects.filter(estado='ACTIVO'),
+            'usuarios_activos': CustomUser.objects.filter(is_active=True, is_account_active=True),
+            # Metros perforados del mes (todos los contratos)
+            'metros_perforados_mes': (
+                TurnoAvance.objects.filter(filtro_periodo('fecha_turno', hoy.year, mes=hoy.month)),
+                models.Sum('metros_perforados')
+            ),
+            # Turnos hoy (todos los contratos)
+            'turnos_hoy_total': Turno.objects.filter(fecha=hoy),
+        })
+        contratos_activos = contadores['contratos_activos']
+        usuarios_activos = contadores['usuarios_activos']
+        metros_perforados_mes = contadores['metros_perforados_mes'] or 0
+        turnos_hoy_total = contadores['turnos_hoy_total']
         
         # MÃ©tricas por contrato - OPTIMIZADO con annotate para evitar N+1 queries
         from django.db.models import Q, Count, Sum, F
@@ -99,9 +111,8 @@ def dashboard(request):
         # Calcular metros usando subconsulta para evitar duplicación por ManyToMany
         # Subconsulta para metros perforados del mes actual
         metros_subquery = TurnoAvance.objects.filter(
+            filtro_periodo('fecha_turno', hoy.year, mes=hoy.month),
             turno__contrato=OuterRef('pk'),
-            turno__fecha__month=hoy.month,
-            turno__fecha__year=hoy.year
         ).values('turno__contrato').annotate(
             total=Sum('metros_perforados')
         ).values('total')
@@ -113,7 +124,7 @@ def dashboard(request):
             trabajadores_activos_count=Count('trabajadores', filter=Q(trabajadores__estado='ACTIVO'), distinct=True),
             turnos_mes_count=Count(
                 'turnos',
-                filter=Q(turnos__fecha__month=hoy.month, turnos__fecha__year=hoy.year),
+                filter=filtro_periodo('turnos__fecha', hoy.year, mes=hoy.month),
                 distinct=True
             ),
             metros_mes_total=Subquery(metros_subquery)
@@ -139,8 +150,8 @@ def dashboard(request):
         
         ultimos_turnos = []
         for turno in ultimos_turnos_raw:
-            # Obtener el nombre del contrato del primer sondaje
-            primer_sondaje = turno.sondajes.first()
+            # Obtener el nombre del contrato del primer sondaje (usa el prefetch, sin query extra)
+            primer_sondaje = next(iter(turno.sondajes.all()), None)
             contrato_nombre = primer_sondaje.contrato.nombre_contrato if primer_sondaje else 'N/A'
             turno.contrato_nombre = contrato_nombre
             ultimos_turnos.append(turno)
@@ -194,19 +205,23 @@ def dashboard(request):
             messages.warning(request, 'No tienes un contrato asignado. Contacta al administrador.')
             return redirect('logout')
         
-        # MÃ©tricas del contrato del manager - OPTIMIZADO
-        trabajadores_activos = Trabajador.objects.filter(contrato=contract, estado='ACTIVO').count()
-        
-        # Trabajadores presentes hoy (basado en turnos del contrato)
-        trabajadores_presentes_hoy = TurnoTrabajador.objects.filter(
-            turno__contrato=contract,
-            turno__fecha=hoy
-        ).values('trabajador').distinct().count()
-        
-        sondajes_activos = Sondaje.objects.filter(contrato=contract, estado='ACTIVO').count()
-        turnos_hoy = Turno.objects.filter(contrato=contract, fecha=hoy).count()
-        
-        maquinas_operativas = Maquina.objects.filter(contrato=contract, estado='OPERATIVO').count()
+        # MÃ©tricas del contrato del manager - OPTIMIZADO (un solo round-trip)
+        contadores = batch_counts({
+            'trabajadores_activos': Trabajador.objects.filter(contrato=contract, estado='ACTIVO'),
+            # Trabajadores presentes hoy (basado en turnos del contrato)
+            'trabajadores_presentes_hoy': TurnoTrabajador.objects.filter(
+                turno__contrato=contract,
+                turno__fecha=hoy
+            ).values('trabajador').distinct(),
+            'sondajes_activos': Sondaje.objects.filter(contrato=contract, estado='ACTIVO'),
+            'turnos_hoy': Turno.objects.filter(contrato=contract, fecha=hoy),
+            'maquinas_operativas': Maquina.objects.filter(contrato=contract, estado='OPERATIVO'),
+        })
+        trabajadores_activos = contadores['trabajadores_activos']
+        trabajadores_presentes_hoy = contadores['trabajadores_presentes_hoy']
+        sondajes_activos = contadores['sondajes_activos']
+        turnos_hoy = contadores['turnos_hoy']
+        maquinas_operativas = contadores['maquinas_operativas']
         
         # Ãšltimos turnos del contrato - OPTIMIZADO
         ultimos_turnos = Turno.objects.filter(
@@ -243,41 +258,56 @@ def dashboard(request):
             user.save()
             contract = contrato_obj
         
-        # MÃ©tricas bÃ¡sicas - OPTIMIZADO
-        sondajes_activos = Sondaje.objects.filter(contrato=contract, estado='ACTIVO').count()
-        turnos_hoy = Turno.objects.filter(contrato=contract, fecha=hoy).count()
-        
-        metros_perforados_mes = TurnoAvance.objects.filter(
-            turno__contrato=contract,
-            turno__fecha__month=hoy.month,
-            turno__fecha__year=hoy.year
-        ).aggregate(total=models.Sum('metros_perforados'))['total'] or 0
-        
-        maquinas_operativas = Maquina.objects.filter(contrato=contract, estado='OPERATIVO').count()
+        # MÃ©tricas bÃ¡sicas - OPTIMIZADO (un solo round-trip)
+        contadores = batch_counts({
+            'sondajes_activos': Sondaje.objects.filter(contrato=contract, estado='ACTIVO'),
+            'turnos_hoy': Turno.objects.filter(contrato=contract, fecha=hoy),
+            'metros_perforados_mes': (
+                TurnoAvance.objects.filter(
+                    filtro_periodo('fecha_turno', hoy.year, mes=hoy.month),
+                    turno__contrato=contract,
+                ),
+                models.Sum('metros_perforados')
+            ),
+            'maquinas_operativas': Maquina.objects.filter(contrato=contract, estado='OPERATIVO'),
+        })
+        sondajes_activos = contadores['sondajes_activos']
+        turnos_hoy = contadores['turnos_hoy']
+        metros_perforados_mes = contadores['metros_perforados_mes'] or 0
+        maquinas_operativas = contadores['maquinas_operativas']
         
         ultimos_turnos = Turno.objects.filter(
             contrato=contract
         ).select_related('tipo_turno').prefetch_related('sondajes').order_by('-fecha').distinct()[:5]
         
         try:
-            stock_critico = []
-            abastecimientos = Abastecimiento.objects.filter(contrato=contract)
-            
-            for abastecimiento in abastecimientos[:10]:
-                total_consumido = ConsumoStock.objects.filter(
-                    abastecimiento=abastecimiento
-                ).aggregate(total=models.Sum('cantidad_consumida'))['total'] or 0
-                
-                disponible = abastecimiento.cantidad - total_consumido
-                
-                if disponible <= 5:
-                    stock_critico.append({
-                        'descripcion': abastecimiento.descripcion,
-                        'disponible': disponible,
-                        'unidad_medida': abastecimiento.unidad_medida,
-                    })
-            
-            stock_critico = sorted(stock_critico, key=lambda x: x['disponible'])[:10]
+            from django.db.models import F, Sum, DecimalField, ExpressionWrapper, Value
+            from django.db.models.functions import Coalesce
+
+            # Consumo total anotado en una sola query (antes: una query por abastecimiento)
+            abastecimientos = Abastecimiento.objects.filter(
+                contrato=contract
+            ).select_related('unidad_medida').annotate(
+                disponible=ExpressionWrapper(
+                    F('cantidad') - Coalesce(
+                        Sum('consumostock__cantidad_consumida'),
+                        Value(0),
+                        output_field=DecimalField(max_digits=10, decimal_places=2)
+                    ),
+                    output_field=DecimalField(max_digits=10, decimal_places=2)
+                )
+            ).filter(
+                disponible__lte=5
+            ).order_by('disponible')[:10]
+
+            stock_critico = [
+                {
+                    'descripcion': abastecimiento.descripcion,
+                    'disponible': abastecimiento.disponible,
+                    'unidad_medida': abastecimiento.unidad_medida,
+                }
+                for abastecimiento in abastecimientos
+            ]
         except Exception as e:
             print(f"Error en stock crÃ­tico: {e}")
             stock_critico = []
@@ -299,7 +329,7 @@ def dashboard(request):
 # TRABAJADOR VIEWS - CRUD COMPLETO
 # ===============================
 
-class TrabajadorListView(AdminOrContractFilterMixin, ListView):
+class TrabajadorListView(ReplicaReadMixin, AdminOrContractFilterMixin, ListView):
     model = Trabajador
     template_name = 'drilling/trabajadores/list.html'
     context_object_name = 'trabajadores'
@@ -394,7 +424,7 @@ class TrabajadorDeleteView(AdminOrContractFilterMixin, DeleteView):
 # MAQUINA VIEWS - CRUD COMPLETO
 # ===============================
 
-class MaquinaListView(AdminOrContractFilterMixin, ListView):
+class MaquinaListView(ReplicaReadMixin, AdminOrContractFilterMixin, ListView):
     model = Maquina
     template_name = 'drilling/maquinas/list.html'
     context_object_name = 'maquinas'
@@ -488,6 +518,7 @@ def gestionar_actividades(request):
 
 
 @login_required
+@usar_replica
 def reporte_horas_extras(request):
     """
     Reporte de horas extras por trabajador en un rango de fechas
@@ -508,10 +539,11 @@ def reporte_horas_extras(request):
     ).order_by('-turno__fecha', 'trabajador__apellidos')
     
     # Aplicar filtros
+    # fecha_turno (copia de turno.fecha) permite descartar particiones por mes
     if fecha_inicio:
-        horas_extras_qs = horas_extras_qs.filter(turno__fecha__gte=fecha_inicio)
+        horas_extras_qs = horas_extras_qs.filter(fecha_turno__gte=fecha_inicio)
     if fecha_fin:
-        horas_extras_qs = horas_extras_qs.filter(turno__fecha__lte=fecha_fin)
+        horas_extras_qs = horas_extras_qs.filter(fecha_turno__lte=fecha_fin)
     if contrato_id:
         horas_extras_qs = horas_extras_qs.filter(turno__maquina__contrato_id=contrato_id)
     if trabajador_dni:
@@ -521,6 +553,11 @@ def reporte_horas_extras(request):
     if not request.user.can_manage_all_contracts():
         horas_extras_qs = horas_extras_qs.filter(turno__maquina__contrato=request.user.contrato)
     
+    # ExportaciÃ³n del detalle completo (la tabla solo muestra 100 registros)
+    formato = request.GET.get('exportar')
+    if formato in FORMATOS_EXPORTACION:
+        return exportar_queryset(horas_extras_qs, COLUMNAS_HORAS_EXTRAS, 'horas_extras', formato)
+    
     # Calcular totales
     from django.db.models import Sum, Count
     totales = horas_extras_qs.aggregate(
@@ -812,7 +849,7 @@ def transferir_maquina(request):
 # SONDAJE VIEWS - CRUD COMPLETO
 # ===============================
 
-class SondajeListView(AdminOrContractFilterMixin, ListView):
+class SondajeListView(ReplicaReadMixin, AdminOrContractFilterMixin, ListView):
     model = Sondaje
     template_name = 'drilling/sondajes/list.html'
     context_object_name = 'sondajes'
@@ -1600,6 +1637,7 @@ def crear_turno_completo(request, pk=None):
                             corrida_numero=cr['corrida_numero'],
                             desde=cr['desde'],
                             hasta=cr['hasta'],
+                            total_calc=Decimal(str(cr['hasta'])) - Decimal(str(cr['desde'])),
                             longitud_testigo=cr['longitud_testigo'],
                             pct_recuperacion=cr['pct_recuperacion'],
                             pct_retorno_agua=cr['pct_retorno_agua'],
@@ -1675,7 +1713,7 @@ def crear_turno_completo(request, pk=None):
                     duracion_esperada = float(getattr(request.user.contrato, 'duracion_turno', 0) or 0)
                 if total_horas >= duracion_esperada and duracion_esperada > 0:
                     turno.estado = 'COMPLETADO'
-                    turno.save(update_fields=['estado'])
+                    turno.save(update_fields=['estado', 'updated_at'])
             except Exception:
                 # No bloquear el flujo si falla esta comprobaciÃ³n
                 pass
@@ -1941,6 +1979,7 @@ def api_create_actividad(request):
         return JsonResponse({'ok': False, 'error': str(e)}, status=500)
 
 @login_required
+@usar_replica
 def listar_turnos(request):
     # Filtrar turnos por permisos del usuario - OPTIMIZADO
     if request.user.can_manage_all_contracts():
@@ -1972,6 +2011,11 @@ def listar_turnos(request):
     if filtros['fecha_hasta']:
         turnos_query = turnos_query.filter(fecha__lte=filtros['fecha_hasta'])
     
+    # ExportaciÃ³n completa (sin paginar) con los mismos filtros
+    formato = request.GET.get('exportar')
+    if formato in FORMATOS_EXPORTACION:
+        return exportar_queryset(turnos_query.order_by('-fecha', '-id'), COLUMNAS_TURNOS, 'turnos', formato)
+    
     # SELECT_RELATED y PREFETCH_RELATED con nombres correctos
     # For M2M relations use prefetch_related; select_related only for FKs
     turnos = turnos_query.select_related(
@@ -1993,25 +2037,18 @@ def listar_turnos(request):
         # Si el nombre difiere en tu modelo, ignorar y continuar
         pass
     
-    # EstadÃ­sticas
-    total_turnos = turnos.count()
-    
-    # Metros con nombre correcto del modelo
-    metros_total = 0
-    try:
-        # Ajustar segÃºn el nombre real de tu modelo de avance
-        from django.db.models import Sum
-        metros_result = TurnoAvance.objects.filter(
-            turno__in=turnos
-        ).aggregate(total=Sum('metros_perforados'))
-        metros_total = metros_result['total'] or 0
-    except:
-        metros_total = 0
-    
-    # Turnos mes actual
+    # EstadÃ­sticas (total, metros y turnos del mes en un solo round-trip)
+    from django.db.models import Sum
     from django.utils import timezone
     hoy = timezone.now().date()
-    turnos_mes = turnos.filter(fecha__month=hoy.month, fecha__year=hoy.year).count()
+    estadisticas = batch_counts({
+        'total_turnos': turnos,
+        'metros_total': (TurnoAvance.objects.filter(turno__in=turnos), Sum('metros_perforados')),
+        'turnos_mes': turnos.filter(filtro_periodo('fecha', hoy.year, mes=hoy.month)),
+    })
+    total_turnos = estadisticas['total_turnos']
+    metros_total = estadisticas['metros_total'] or 0
+    turnos_mes = estadisticas['turnos_mes']
     
     # Promedio
     promedio_avance = metros_total / total_turnos if total_turnos > 0 else 0
@@ -2065,17 +2102,132 @@ def aprobar_turno(request, pk):
 
     if request.method == 'POST':
         turno.estado = 'APROBADO'
-        turno.save(update_fields=['estado'])
+        turno.save(update_fields=['estado', 'updated_at'])
         messages.success(request, f'Turno #{turno.id} marcado como APROBADO')
         return redirect('listar-turnos')
 
     return render(request, 'drilling/turno/confirm_approve.html', {'turno': turno})
 
+
+@login_required
+def aprobar_turnos_lote(request):
+    """
+    AprobaciÃ³n por lotes: mueve de COMPLETADO a APROBADO todos los turnos del
+    contrato, rango de fechas y mÃ¡quinas seleccionados con un Ãºnico UPDATE.
+    GET muestra el formulario y cuÃ¡ntos turnos se aprobarÃ­an; POST ejecuta.
+    """
+    from .utils.transiciones_turno import (
+        TransicionInvalida, puede_aprobar, transicionar_turnos, turnos_en_alcance,
+    )
+
+    if not puede_aprobar(request.user):
+        messages.error(request, 'No tiene permisos para aprobar turnos')
+        return redirect('listar-turnos')
+
+    datos = request.POST if request.method == 'POST' else request.GET
+    filtros = {
+        'contrato': datos.get('contrato', ''),
+        'fecha_desde': datos.get('fecha_desde', ''),
+        'fecha_hasta': datos.get('fecha_hasta', ''),
+        'maquinas': [m for m in datos.getlist('maquinas') if m],
+    }
+
+    turnos = None
+    error = None
+    if filtros['fecha_desde'] or filtros['fecha_hasta'] or request.method == 'POST':
+        try:
+            turnos = turnos_en_alcance(
+                request.user,
+                contrato_id=filtros['contrato'] or None,
+                fecha_desde=filtros['fecha_desde'],
+                fecha_hasta=filtros['fecha_hasta'],
+                maquina_ids=filtros['maquinas'],
+            )
+        except (TransicionInvalida, ValueError) as e:
+            error = str(e)
+
+    if request.method == 'POST':
+        if error:
+            messages.error(request, error)
+            return redirect('turnos-aprobar-lote')
+        resultado = transicionar_turnos(turnos, 'COMPLETADO', 'APROBADO')
+        if resultado['actualizados']:
+            messages.success(request, f"{resultado['actualizados']} turno(s) marcados como APROBADO")
+        else:
+            messages.warning(request, 'No habÃ­a turnos COMPLETADOS con esos filtros')
+        return redirect('listar-turnos')
+
+    if request.user.is_system_admin or request.user.can_manage_all_contracts():
+        contratos = Contrato.objects.filter(estado='ACTIVO').order_by('nombre_contrato')
+        maquinas = Maquina.objects.filter(contrato_id=filtros['contrato']) if filtros['contrato'] else Maquina.objects.none()
+    else:
+        contratos = Contrato.objects.none()
+        maquinas = Maquina.objects.filter(contrato=request.user.contrato)
+
+    # Vista previa: turnos por estado dentro del alcance (un solo GROUP BY)
+    por_estado = {}
+    if turnos is not None:
+        por_estado = dict(turnos.values_list('estado').annotate(n=Count('id')).order_by())
+    if error:
+        messages.error(request, error)
+
+    context = {
+        'filtros': filtros,
+        'contratos': contratos,
+        'maquinas': maquinas.order_by('nombre'),
+        'preview': turnos is not None,
+        'a_aprobar': por_estado.get('COMPLETADO', 0),
+        'borradores': por_estado.get('BORRADOR', 0),
+        'ya_aprobados': por_estado.get('APROBADO', 0),
+    }
+    return render(request, 'drilling/turno/aprobar_lote.html', context)
+
+
+@login_required
+@require_http_methods(["POST"])
+def api_aprobar_turnos_lote(request):
+    """
+    API de aprobaciÃ³n por lotes.
+    Body JSON: {"contrato_id", "fecha_desde", "fecha_hasta", "maquina_ids": [...]}
+    Responde con la cantidad de turnos aprobados y sus ids.
+    """
+    from .utils.transiciones_turno import (
+        TransicionInvalida, puede_aprobar, transicionar_turnos, turnos_en_alcance,
+    )
+
+    if not puede_aprobar(request.user):
+        return JsonResponse({'success': False, 'error': 'No tiene permisos para aprobar turnos'}, status=403)
+
+    try:
+        data = json.loads(request.body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({'success': False, 'error': 'JSON invÃ¡lido'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'success': False, 'error': 'JSON invÃ¡lido'}, status=400)
+
+    try:
+        turnos = turnos_en_alcance(
+            request.user,
+            contrato_id=data.get('contrato_id'),
+            fecha_desde=data.get('fecha_desde'),
+            fecha_hasta=data.get('fecha_hasta'),
+            maquina_ids=data.get('maquina_ids') or None,
+        )
+    except (TransicionInvalida, ValueError, TypeError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    resultado = transicionar_turnos(turnos, 'COMPLETADO', 'APROBADO')
+    return JsonResponse({
+        'success': True,
+        'aprobados': resultado['actualizados'],
+        'turno_ids': resultado['turno_ids'],
+    })
+
 # ===============================
 # ABASTECIMIENTO VIEWS - COMPLETO
 # ===============================
 
-class AbastecimientoListView(AdminOrContractFilterMixin, ListView):
+class AbastecimientoListView(ReplicaReadMixin, AdminOrContractFilterMixin, ListView):
     model = Abastecimiento
     template_name = 'drilling/abastecimiento/list.html'
     context_object_name = 'abastecimientos'
@@ -2224,7 +2376,8 @@ def importar_abastecimiento_excel(request):
             messages.error(request, 'El archivo debe ser formato Excel (.xlsx o .xls)')
             return redirect('importar-abastecimiento')
         
-        # Procesar archivo
+        # Procesar archivo (pandas se carga solo aquÃ­, no al importar views)
+        from .utils.excel_importer import AbastecimientoExcelImporter
         importer = AbastecimientoExcelImporter(request.user)
         result = importer.process_excel(excel_file, delete_existing)
         
@@ -2279,7 +2432,7 @@ def importar_abastecimiento_excel(request):
 # CONSUMO STOCK VIEWS - COMPLETO
 # ===============================
 
-class ConsumoStockListView(AdminOrContractFilterMixin, ListView):
+class ConsumoStockListView(ReplicaReadMixin, AdminOrContractFilterMixin, ListView):
     model = ConsumoStock
     template_name = 'drilling/consumo/list.html'
     context_object_name = 'consumos'
@@ -2426,60 +2579,43 @@ class StockDisponibleView(AdminOrContractFilterMixin, TemplateView):
     template_name = 'drilling/stock/disponible.html'
     
     def get_context_data(self, **kwargs):
+        from .utils.movimientos_stock import saldos_al
+
         context = super().get_context_data(**kwargs)
         
-        # Calcular stock disponible por producto
-        stock_query = '''
-            SELECT 
-                a.id,
-                a.descripcion,
-                a.familia,
-                a.serie,
-                um.simbolo as unidad,
-                SUM(a.cantidad) as abastecido,
-                COALESCE(SUM(c.cantidad_consumida), 0) as consumido,
-                SUM(a.cantidad) - COALESCE(SUM(c.cantidad_consumida), 0) as disponible,
-                a.precio_unitario,
-                (SUM(a.cantidad) - COALESCE(SUM(c.cantidad_consumida), 0)) * a.precio_unitario as valor_stock
-            FROM abastecimiento a
-            LEFT JOIN consumo_stock c ON a.id = c.abastecimiento_id
-            LEFT JOIN unidades_medida um ON a.unidad_medida_id = um.id
-            WHERE a.contrato_id = %s
-            GROUP BY a.id, a.descripcion, a.familia, a.serie, um.simbolo, a.precio_unitario
-            HAVING SUM(a.cantidad) - COALESCE(SUM(c.cantidad_consumida), 0) > 0
-            ORDER BY a.familia, a.descripcion
-        '''
-        
-        from django.db import connection
-        with connection.cursor() as cursor:
-            cursor.execute(stock_query, [self.request.user.contrato.id])
-            stock_data = cursor.fetchall()
+        # Saldo a una fecha (cierre de mes) o actual, desde el libro de movimientos
+        fecha_corte = None
+        if self.request.GET.get('fecha'):
+            try:
+                fecha_corte = datetime.strptime(self.request.GET['fecha'], '%Y-%m-%d').date()
+            except ValueError:
+                messages.warning(self.request, 'Fecha invÃ¡lida, se muestra el stock actual')
         
         # Organizar por familia
         stock_por_familia = {}
         total_valor = 0
         
-        for row in stock_data:
-            familia = row[2]
-            if familia not in stock_por_familia:
-                stock_por_familia[familia] = []
-            
-            stock_por_familia[familia].append({
-                'id': row[0],
-                'descripcion': row[1],
-                'serie': row[3],
-                'unidad': row[4],
-                'abastecido': row[5],
-                'consumido': row[6],
-                'disponible': row[7],
-                'precio_unitario': row[8],
-                'valor_stock': row[9] or 0
+        for lote in saldos_al(self.request.user.contrato.id, fecha_corte):
+            if lote['saldo'] <= 0:
+                continue
+            valor_stock = lote['saldo'] * lote['precio_unitario']
+            stock_por_familia.setdefault(lote['familia'], []).append({
+                'id': lote['lote_id'],
+                'descripcion': lote['descripcion'],
+                'serie': lote['serie'],
+                'unidad': lote['unidad'],
+                'abastecido': lote['cantidad_lote'],
+                'consumido': lote['cantidad_lote'] - lote['saldo'],
+                'disponible': lote['saldo'],
+                'precio_unitario': lote['precio_unitario'],
+                'valor_stock': valor_stock,
             })
             
-            total_valor += row[9] or 0
+            total_valor += valor_stock
         
         context['stock_por_familia'] = stock_por_familia
         context['total_valor_stock'] = total_valor
+        context['fecha_corte'] = fecha_corte
         
         return context
 
@@ -2530,6 +2666,7 @@ def api_abastecimiento_detalle(request, pk):
 # ===============================
 
 @login_required
+@usar_replica
 def reporte_metraje_complementos(request):
     """
     Reporte de metraje acumulado por cada producto diamantado (complemento)
@@ -2621,6 +2758,7 @@ def reporte_metraje_complementos(request):
 # ===============================
 
 @login_required
+@usar_replica
 def metas_maquina_list(request):
     """Lista de metas de mÃ¡quinas con cumplimiento en tiempo real"""
     
@@ -2659,27 +2797,24 @@ def metas_maquina_list(request):
     metas = metas.order_by('-año', '-mes', 'contrato__nombre_contrato', 'maquina__nombre')
     
     # Calcular mÃ©tricas de cumplimiento para cada meta
+    # (metros reales de todas las metas en una sola query)
+    metas = list(metas)
+    avance_por_meta = MetaMaquina.calcular_metros_reales(metas)
+    # ProyecciÃ³n al cierre de las metas en curso (series diarias en cachÃ©)
+    hoy = date.today()
+    pronosticos = pronosticar_metas(
+        [meta for meta in metas if meta.get_fecha_inicio_periodo() <= hoy <= meta.get_fecha_fin_periodo()],
+        hoy=hoy,
+    )
     metas_con_cumplimiento = []
     for meta in metas:
         fecha_inicio = meta.get_fecha_inicio_periodo()
         fecha_fin = meta.get_fecha_fin_periodo()
         
-        # Calcular metros reales perforados en el perÃ­odo
-        # Nota: el campo 'estado' estÃ¡ en el modelo Turno, no en TurnoAvance
-        turnos_en_periodo = TurnoAvance.objects.filter(
-            turno__maquina=meta.maquina,
-            turno__contrato=meta.contrato,
-            turno__fecha__gte=fecha_inicio,
-            turno__fecha__lte=fecha_fin,
-            turno__estado__in=['COMPLETADO', 'APROBADO']
-        )
-        
-        metros_reales = turnos_en_periodo.aggregate(
-            total=Sum('metros_perforados')
-        )['total'] or Decimal('0')
+        metros_reales = avance_por_meta[meta.pk]['metros']
         
         # Debug: contar turnos encontrados
-        total_turnos = turnos_en_periodo.count()
+        total_turnos = avance_por_meta[meta.pk]['turnos']
         
         # Calcular cumplimiento
         porcentaje_cumplimiento = meta.calcular_cumplimiento(metros_reales)
@@ -2726,6 +2861,7 @@ def metas_maquina_list(request):
             'badge_class': badge_class,
             'estado_periodo': estado_periodo,
             'periodo_badge': periodo_badge,
+            'pronostico': pronosticos.get(meta.pk),
         })
     
     # Datos para filtros
@@ -3070,16 +3206,10 @@ def metas_maquina_gestionar(request):
         ).order_by('nombre')
         
         # Calcular perÃ­odo
-        from datetime import datetime
-        from dateutil.relativedelta import relativedelta
-        
         año_int = int(año)
         mes_int = int(mes)
         
-        primer_dia_mes = datetime(año_int, mes_int, 1).date()
-        mes_anterior = primer_dia_mes - relativedelta(months=1)
-        fecha_inicio = datetime(mes_anterior.year, mes_anterior.month, 26).date()
-        fecha_fin = datetime(año_int, mes_int, 25).date()
+        fecha_inicio, fecha_fin = rango_mes_operativo(año_int, mes_int)
         
         # Para cada mÃ¡quina, obtener su meta y metraje real
         for maquina in maquinas:
@@ -3144,15 +3274,9 @@ def metas_maquina_gestionar(request):
     # Calcular perÃ­odo para mostrar
     periodo_texto = ''
     if año and mes:
-        from datetime import datetime
-        from dateutil.relativedelta import relativedelta
-        
         año_int = int(año)
         mes_int = int(mes)
-        primer_dia_mes = datetime(año_int, mes_int, 1).date()
-        mes_anterior = primer_dia_mes - relativedelta(months=1)
-        fecha_inicio = datetime(mes_anterior.year, mes_anterior.month, 26).date()
-        fecha_fin = datetime(año_int, mes_int, 25).date()
+        fecha_inicio, fecha_fin = rango_mes_operativo(año_int, mes_int)
         periodo_texto = f"{fecha_inicio.strftime('%d/%m/%Y')} - {fecha_fin.strftime('%d/%m/%Y')}"
     
     # Obtener servicios disponibles para el contrato
@@ -3511,30 +3635,35 @@ def equipos_dashboard(request):
             return redirect('home')
         equipos = Equipo.objects.filter(contrato=contrato)
     
-    # EstadÃ­sticas generales
-    stats = {
-        'total': equipos.count(),
-        'disponibles': equipos.filter(estado='DISPONIBLE').count(),
-        'asignados': equipos.filter(estado='ASIGNADO').count(),
-        'mantenimiento': equipos.filter(estado='MANTENIMIENTO').count(),
-    }
+    # EstadÃ­sticas generales (un solo round-trip)
+    stats = batch_counts({
+        'total': equipos,
+        'disponibles': equipos.filter(estado='DISPONIBLE'),
+        'asignados': equipos.filter(estado='ASIGNADO'),
+        'mantenimiento': equipos.filter(estado='MANTENIMIENTO'),
+    })
     
-    # Equipos por tipo
+    # Equipos por tipo: conteos condicionales agrupados (antes 4 queries por tipo)
     from django.db.models import Count, Q
     equipos_por_tipo = []
     
-    tipos = equipos.values_list('tipo', flat=True).distinct()
-    for tipo in tipos:
-        equipos_tipo = equipos.filter(tipo=tipo)
+    tipos = equipos.order_by().values('tipo').annotate(
+        total=Count('id'),
+        disponibles=Count('id', filter=Q(estado='DISPONIBLE')),
+        asignados=Count('id', filter=Q(estado='ASIGNADO')),
+        mantenimiento=Count('id', filter=Q(estado='MANTENIMIENTO')),
+    )
+    for fila in tipos:
+        tipo = fila['tipo']
         tipo_display = dict(Equipo.TIPO_CHOICES).get(tipo, tipo)
         
         equipos_por_tipo.append({
             'tipo': tipo,
             'tipo_display': tipo_display,
-            'total': equipos_tipo.count(),
-            'disponibles': equipos_tipo.filter(estado='DISPONIBLE').count(),
-            'asignados': equipos_tipo.filter(estado='ASIGNADO').count(),
-            'mantenimiento': equipos_tipo.filter(estado='MANTENIMIENTO').count(),
+            'total': fila['total'],
+            'disponibles': fila['disponibles'],
+            'asignados': fila['asignados'],
+            'mantenimiento': fila['mantenimiento'],
         })
     
     # Ordenar por total descendente
@@ -3905,6 +4034,7 @@ def precios_unitarios_delete(request, pk):
 
 
 @login_required
+@usar_replica
 def metas_valorizacion_reporte(request):
     """Reporte consolidado de valorizaciÃ³n de metas"""
     
@@ -3912,6 +4042,9 @@ def metas_valorizacion_reporte(request):
     contrato_id = request.GET.get('contrato')
     año = request.GET.get('año') or str(date.today().year)
     mes = request.GET.get('mes') or str(date.today().month)
+    moneda_reporte = request.GET.get('moneda')
+    if moneda_reporte not in dict(MONEDA_CHOICES):
+        moneda_reporte = 'USD'
     
     # Filtrar contratos segÃºn permisos
     contratos = Contrato.objects.filter(estado='ACTIVO').order_by('nombre_contrato')
@@ -3925,12 +4058,15 @@ def metas_valorizacion_reporte(request):
     
     contrato = None
     valorizacion_data = []
+    valorizacion_turnos = []
+    valorizacion_turnos_total = None
+    consolidado = []
     resumen = {
         'total_meta_metros': Decimal('0'),
         'total_real_metros': Decimal('0'),
         'total_meta_monto': Decimal('0'),
         'total_real_monto': Decimal('0'),
-        'moneda': None,
+        'moneda': moneda_reporte,
     }
     
     if contrato_id:
@@ -3943,16 +4079,10 @@ def metas_valorizacion_reporte(request):
                 return redirect('metas-valorizacion-reporte')
         
         # Obtener metas del perÃ­odo
-        from datetime import datetime
-        from dateutil.relativedelta import relativedelta
-        
         año_int = int(año)
         mes_int = int(mes)
         
-        primer_dia_mes = datetime(año_int, mes_int, 1).date()
-        mes_anterior = primer_dia_mes - relativedelta(months=1)
-        fecha_inicio = datetime(mes_anterior.year, mes_anterior.month, 26).date()
-        fecha_fin = datetime(año_int, mes_int, 25).date()
+        fecha_inicio, fecha_fin = rango_mes_operativo(año_int, mes_int)
         
         metas = MetaMaquina.objects.filter(
             contrato=contrato,
@@ -3961,22 +4091,18 @@ def metas_valorizacion_reporte(request):
             activo=True
         ).select_related('maquina', 'servicio')
         
+        # Metros reales y precios vigentes de todas las metas en dos queries
+        metas = list(metas)
+        avance_por_meta = MetaMaquina.calcular_metros_reales(metas, periodo=(fecha_inicio, fecha_fin))
+        precios = PrecioUnitarioServicio.vigentes_por_servicio(
+            contrato, {meta.servicio_id for meta in metas if meta.servicio_id}, fecha_fin
+        )
+        
         for meta in metas:
-            # Calcular metros reales
-            turnos_con_avance = TurnoAvance.objects.filter(
-                turno__maquina=meta.maquina,
-                turno__contrato=contrato,
-                turno__fecha__gte=fecha_inicio,
-                turno__fecha__lte=fecha_fin,
-                turno__estado__in=['COMPLETADO', 'APROBADO']
-            )
-            
-            metros_reales = turnos_con_avance.aggregate(
-                total=Sum('metros_perforados')
-            )['total'] or Decimal('0')
+            metros_reales = avance_por_meta[meta.pk]['metros']
             
             # Calcular valorizaciÃ³n
-            valorizacion = meta.calcular_valorizacion_completa(metros_reales, fecha_fin)
+            valorizacion = meta.valorizar_con_precio(metros_reales, precios.get(meta.servicio_id))
             
             if valorizacion['tiene_precio']:
                 valorizacion_data.append({
@@ -3989,9 +4115,32 @@ def metas_valorizacion_reporte(request):
                 # Acumular totales
                 resumen['total_meta_metros'] += valorizacion['meta_metros']
                 resumen['total_real_metros'] += valorizacion['real_metros']
-                resumen['total_meta_monto'] += valorizacion['meta_monto']
-                resumen['total_real_monto'] += valorizacion['real_monto']
-                resumen['moneda'] = valorizacion['moneda']
+        
+        # Montos de todas las metas en la moneda de reporte en una pasada (tipo
+        # de cambio del cierre del perÃ­odo, el mismo dÃ­a que el precio unitario)
+        valorizaciones = [item['valorizacion'] for item in valorizacion_data]
+        monedas = [v['moneda'] for v in valorizaciones]
+        tabla = TablaTiposCambio.cargar(monedas, fecha_fin, fecha_fin)
+        convertidos = tabla.convertir(
+            [v['meta_monto'] for v in valorizaciones] + [v['real_monto'] for v in valorizaciones],
+            monedas * 2, fecha_fin, moneda_reporte,
+        )
+        n = len(valorizaciones)
+        sin_tipo = set()
+        for item, meta_monto, real_monto in zip(valorizacion_data, convertidos[:n], convertidos[n:]):
+            item['meta_monto_reporte'] = a_decimal(meta_monto)
+            item['real_monto_reporte'] = a_decimal(real_monto)
+            if item['meta_monto_reporte'] is None:
+                sin_tipo.add(item['valorizacion']['moneda'])
+                continue
+            resumen['total_meta_monto'] += item['meta_monto_reporte']
+            resumen['total_real_monto'] += item['real_monto_reporte']
+        if sin_tipo:
+            messages.warning(
+                request,
+                f"Sin tipo de cambio {', '.join(sorted(sin_tipo))}/{moneda_reporte} al {fecha_fin:%d/%m/%Y}: "
+                f"esas metas no se incluyen en los totales"
+            )
         
         # Calcular porcentajes del resumen
         if resumen['total_meta_metros'] > 0:
@@ -4009,6 +4158,29 @@ def metas_valorizacion_reporte(request):
             resumen['porcentaje_valor'] = Decimal('0')
         
         resumen['diferencia_monto'] = resumen['total_real_monto'] - resumen['total_meta_monto']
+        
+        # ValorizaciÃ³n por turnos del libro valorizacion_turno (un SUM indexado)
+        valorizacion_turnos = valorizacion_mensual(contrato.pk, año_int, mes_int)
+        
+        # Totales del libro por contrato en la moneda de reporte (una query para
+        # todos los contratos visibles, tipo de cambio de cada dÃ­a)
+        contratos_visibles = list(contratos)
+        totales = valorizacion_consolidada(
+            fecha_inicio, fecha_fin, moneda_reporte, contratos=[c.pk for c in contratos_visibles]
+        )
+        valorizacion_turnos_total = totales['por_contrato'].get(contrato.pk)
+        if len(contratos_visibles) > 1:
+            consolidado = [
+                {'contrato': c, 'monto': totales['por_contrato'].get(c.pk, Decimal('0'))}
+                for c in contratos_visibles
+            ]
+            resumen['total_consolidado'] = totales['total']
+        if totales['monedas_sin_tipo']:
+            messages.warning(
+                request,
+                f"Sin tipo de cambio {', '.join(totales['monedas_sin_tipo'])}/{moneda_reporte} para algunos "
+                f"dÃ­as del perÃ­odo: esos turnos no se incluyen en los totales por turnos"
+            )
     
     # años y meses
     año_actual = date.today().year
@@ -4027,7 +4199,11 @@ def metas_valorizacion_reporte(request):
         'mes': mes,
         'años_disponibles': años_disponibles,
         'meses': meses,
+        'monedas': MONEDA_CHOICES,
         'valorizacion_data': valorizacion_data,
+        'valorizacion_turnos': valorizacion_turnos,
+        'valorizacion_turnos_total': valorizacion_turnos_total,
+        'consolidado': consolidado,
         'resumen': resumen,
     }
     
@@ -0,0 +1,65 @@
+"""
+Reportes de análisis entre contratos calculados con DuckDB
+(ver drilling/utils/analitica.py). Solo GERENCIA y CONTROL_PROYECTOS.
+"""
+
+import time
+from datetime import datetime
+
+from django.shortcuts import render, redirect
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from .models import Contrato, TipoComplemento
+from .utils.analitica import REPORTES, AnaliticaError, conectar
+
+
+def _mes(valor):
+    try:
+        datetime.strptime(valor, '%Y-%m')
+        return valor
+    except (TypeError, ValueError):
+        return None
+
+
+@login_required
+def reporte_analitica(request):
+    """Metros por máquina y mes, rendimiento de brocas y consumo de aditivos por metro."""
+    if not request.user.can_manage_all_contracts():
+        messages.error(request, "No tienes permisos para acceder a esta sección.")
+        return redirect('dashboard')
+
+    reporte = request.GET.get('reporte', 'metros')
+    if reporte not in REPORTES:
+        reporte = 'metros'
+    contratos = [int(c) for c in request.GET.getlist('contrato') if c.isdigit()]
+    desde = _mes(request.GET.get('desde'))
+    hasta = _mes(request.GET.get('hasta'))
+    categoria = request.GET.get('categoria') or None
+
+    filtros = {'contratos': contratos, 'desde': desde, 'hasta': hasta}
+    if reporte == 'brocas':
+        filtros['categoria'] = categoria
+
+    titulo, funcion = REPORTES[reporte]
+    filas = []
+    segundos = None
+    try:
+        inicio = time.perf_counter()
+        with conectar(contratos=contratos, desde=desde, hasta=hasta) as con:
+            filas = funcion(con, **filtros)
+        segundos = round(time.perf_counter() - inicio, 3)
+    except AnaliticaError as e:
+        messages.error(request, f"No se pudo generar el reporte: {e}")
+
+    context = {
+        'reporte': reporte,
+        'titulo': titulo,
+        'reportes': [(clave, nombre) for clave, (nombre, _) in REPORTES.items()],
+        'filas': [[round(v, 2) if isinstance(v, float) else v for v in fila.values()] for fila in filas],
+        'columnas': list(filas[0]) if filas else [],
+        'segundos': segundos,
+        'contratos': Contrato.objects.order_by('nombre_contrato'),
+        'categorias': TipoComplemento.CATEGORIA_CHOICES,
+        'filtros': {'contratos': contratos, 'desde': desde or '', 'hasta': hasta or '', 'categoria': categoria or ''},
+    }
+    return render(request, 'drilling/analitica/reporte.html', context)
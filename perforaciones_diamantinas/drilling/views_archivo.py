@@ -0,0 +1,57 @@
+"""
+Vistas de solo lectura para contratos archivados en Parquet.
+Los datos no están en la base de datos: se leen de los archivos bajo demanda
+(ver drilling/utils/archivo_contrato.py y el comando archive_contract).
+"""
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from .models import ArchivoContrato, Maquina
+
+
+@login_required
+def contratos_archivados(request):
+    """Listado de contratos archivados."""
+    if not request.user.can_manage_all_contracts():
+        messages.error(request, "No tiene permisos para ver contratos archivados")
+        return redirect('dashboard')
+
+    archivos = ArchivoContrato.objects.select_related('contrato', 'contrato__cliente').order_by('-created_at')
+    return render(request, 'drilling/archivo/lista.html', {'archivos': archivos})
+
+
+@login_required
+def reporte_contrato_archivado(request, pk):
+    """Resumen mensual y por máquina de un contrato archivado, leído de los Parquet."""
+    if not request.user.can_manage_all_contracts():
+        messages.error(request, "No tiene permisos para ver contratos archivados")
+        return redirect('dashboard')
+
+    archivo = get_object_or_404(ArchivoContrato.objects.select_related('contrato'), contrato_id=pk)
+    meses_disponibles = sorted(archivo.manifiesto.get('turnos', {}))
+    mes_desde = request.GET.get('desde', '')
+    mes_hasta = request.GET.get('hasta', '')
+    meses = [
+        mes for mes in meses_disponibles
+        if (not mes_desde or mes >= mes_desde) and (not mes_hasta or mes <= mes_hasta)
+    ]
+
+    from .utils.archivo_contrato import resumen_archivado
+    try:
+        resumen = resumen_archivado(archivo.contrato_id, meses=meses)
+    except (ImportError, OSError) as e:
+        messages.error(request, f"No se pudieron leer los archivos del contrato: {e}")
+        return redirect('contratos-archivados')
+
+    # Las máquinas siguen en la base de datos (solo se archivan los turnos)
+    nombres = {m.pk: m.nombre for m in Maquina.objects.filter(pk__in=[f['maquina_id'] for f in resumen['por_maquina']])}
+    for fila in resumen['por_maquina']:
+        fila['maquina'] = nombres.get(fila['maquina_id'], f"Máquina {fila['maquina_id']}")
+
+    context = {
+        'archivo': archivo,
+        'resumen': resumen,
+        'meses_disponibles': meses_disponibles,
+        'filtros': {'desde': mes_desde, 'hasta': mes_hasta},
+    }
+    return render(request, 'drilling/archivo/reporte.html', context)
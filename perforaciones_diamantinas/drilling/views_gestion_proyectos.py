@@ -10,9 +10,12 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Sum, OuterRef, Subquery, DecimalField
 from .models import Contrato, Turno, TurnoAvance, Sondaje
+from .db_router import usar_replica
+from .utils.exportacion import COLUMNAS_TURNOS, FORMATOS as FORMATOS_EXPORTACION, exportar_queryset
 
 
 @login_required
+@usar_replica
 def gestion_proyectos_stock_turnos(request):
     """
     Vista integral para Control de Proyectos con:
@@ -69,6 +72,11 @@ def gestion_proyectos_stock_turnos(request):
     if filtros['fecha_hasta']:
         turnos_query = turnos_query.filter(fecha__lte=filtros['fecha_hasta'])
     
+    # Exportación completa con los mismos filtros (la tabla muestra 100 registros)
+    formato = request.GET.get('exportar')
+    if formato in FORMATOS_EXPORTACION:
+        return exportar_queryset(turnos_query.order_by('-fecha', '-id'), COLUMNAS_TURNOS, 'turnos', formato)
+    
     # Optimizar queries con select_related y prefetch_related
     turnos = turnos_query.select_related(
         'maquina', 'tipo_turno'
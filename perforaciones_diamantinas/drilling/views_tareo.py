@@ -16,21 +16,19 @@ from django.db import transaction
 from django.db.models import Count
 from datetime import datetime, timedelta, date
 from calendar import monthrange
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
 from .models import Contrato, Trabajador, AsistenciaTrabajador
+from .db_router import usar_replica
 import json
-import locale
 
-# Configurar locale para español
-try:
-    locale.setlocale(locale.LC_TIME, 'es_ES.UTF-8')
-except:
-    try:
-        locale.setlocale(locale.LC_TIME, 'Spanish_Spain.1252')
-    except:
-        pass  # Usar locale por defecto si no se puede configurar español
+# openpyxl se importa dentro de las funciones de exportación: solo se carga al
+# generar un Excel, no en cada arranque de worker o comando de manage.py.
+# Los nombres de mes se toman de esta tabla en lugar de locale.setlocale, que
+# cambiaba el locale de todo el proceso al importar el módulo.
+MESES_ES = {
+    1: 'Enero', 2: 'Febrero', 3: 'Marzo', 4: 'Abril',
+    5: 'Mayo', 6: 'Junio', 7: 'Julio', 8: 'Agosto',
+    9: 'Septiembre', 10: 'Octubre', 11: 'Noviembre', 12: 'Diciembre'
+}
 
 
 @login_required
@@ -237,11 +235,7 @@ def tareo_mensual_view(request):
         fecha_siguiente = fecha_inicio + timedelta(days=dias_diff)
     
     # Nombre del período
-    meses_es = {
-        1: 'Enero', 2: 'Febrero', 3: 'Marzo', 4: 'Abril',
-        5: 'Mayo', 6: 'Junio', 7: 'Julio', 8: 'Agosto',
-        9: 'Septiembre', 10: 'Octubre', 11: 'Noviembre', 12: 'Diciembre'
-    }
+    meses_es = MESES_ES
     
     if modo == 'mes':
         nombre_periodo = f"{meses_es[fecha_inicio.month]} {fecha_inicio.year}"
@@ -444,6 +438,7 @@ LEYENDA = {
 
 
 @login_required
+@usar_replica
 def exportar_asistencias_excel(request):
     """
     Exportar asistencias a Excel en formato completo con 3 hojas:
@@ -539,7 +534,7 @@ def exportar_asistencias_excel(request):
     response = HttpResponse(
         content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
-    mes_nombre = fecha_inicio.strftime('%B').capitalize()
+    mes_nombre = MESES_ES[fecha_inicio.month]
     filename = f"Tareo_{contrato.nombre_contrato.replace(' ', '_')}_{mes_nombre}_{fecha_inicio.year}.xlsx"
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
     
@@ -549,6 +544,9 @@ def exportar_asistencias_excel(request):
 
 def _crear_hoja_tareo(ws, contrato, fecha_inicio, fecha_fin, num_dias):
     """Crea la hoja principal de tareo"""
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    from openpyxl.utils import get_column_letter
+
     # Estilos
     header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
     header_font = Font(bold=True, color="FFFFFF", size=10)
@@ -563,7 +561,7 @@ def _crear_hoja_tareo(ws, contrato, fecha_inicio, fecha_fin, num_dias):
     # FILA 1: Encabezado principal
     ws.merge_cells('A1:D1')
     cell = ws['A1']
-    cell.value = f"TAREO MES DE : {fecha_inicio.strftime('%B %Y').upper()}"
+    cell.value = f"TAREO MES DE : {MESES_ES[fecha_inicio.month].upper()} {fecha_inicio.year}"
     cell.font = Font(bold=True, size=12)
     cell.alignment = Alignment(horizontal='center', vertical='center')
     
@@ -685,7 +683,7 @@ def _crear_hoja_tareo(ws, contrato, fecha_inicio, fecha_fin, num_dias):
         ws.cell(row=row_num, column=5).number_format = 'DD/MM/YYYY'
         ws.cell(row=row_num, column=6).value = "INT"  # Tipo de trabajo
         ws.cell(row=row_num, column=7).value = trabajador.get_grupo_display() if trabajador.grupo else ""
-        ws.cell(row=row_num, column=8).value = trabajador.guardia if trabajador.guardia else ""
+        ws.cell(row=row_num, column=8).value = trabajador.guardia_asignada or ""
         ws.cell(row=row_num, column=9).value = "ACTIVO"
         
         # Marcaciones diarias
@@ -751,6 +749,8 @@ def _crear_hoja_tareo(ws, contrato, fecha_inicio, fecha_fin, num_dias):
 
 def _crear_hoja_leyenda(ws):
     """Crea la hoja de leyenda con códigos"""
+    from openpyxl.styles import Font, Alignment
+
     ws.merge_cells('A1:B1')
     cell = ws['A1']
     cell.value = "LEYENDA: CODIFICACION"
@@ -770,6 +770,8 @@ def _crear_hoja_leyenda(ws):
 
 def _crear_hoja_informe(ws, contrato, fecha_inicio, fecha_fin):
     """Crea la hoja de informe con estadísticas"""
+    from openpyxl.styles import Font
+
     ws['A1'] = f"INFORME DE TAREO - {contrato.nombre_contrato.upper()}"
     ws['A1'].font = Font(bold=True, size=14)
     ws['A2'] = f"Período: {fecha_inicio.strftime('%d/%m/%Y')} - {fecha_fin.strftime('%d/%m/%Y')}"
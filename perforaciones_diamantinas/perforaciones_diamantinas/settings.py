@@ -84,6 +84,7 @@ MIDDLEWARE = [
     # Middleware personalizado
     'drilling.middleware.ContractSecurityMiddleware',
     'drilling.middleware.RoleBasedTemplateMiddleware',  # Asigna template según rol
+    'drilling.middleware.ReplicaStickyMiddleware',  # Lecturas al primario tras escribir
     # 'drilling.middleware.LoginRequiredMiddleware',  # Opcional - descomenta si quieres forzar login en todas las URLs
 ]
 ROOT_URLCONF = 'perforaciones_diamantinas.urls'
@@ -106,6 +107,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'perforaciones_diamantinas.wsgi.application'
+# Perfil ASGI (uvicorn): ver DESPLIEGUE_PRODUCCION.md
+ASGI_APPLICATION = 'perforaciones_diamantinas.asgi.application'
 
 DATABASES = {
     'default': {
@@ -124,6 +127,23 @@ DATABASES = {
     }
 }
 
+# Réplica de solo lectura para reportes y listados (opcional).
+# Si DB_REPLICA_HOST no está definido, todas las lecturas van al primario.
+DB_REPLICA_HOST = env('DB_REPLICA_HOST', default='')
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': env('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'HOST': DB_REPLICA_HOST,
+        'PORT': env('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['drilling.db_router.ReplicaRouter']
+REPLICA_DB_ALIAS = 'replica'
+# Segundos que un usuario lee del primario después de escribir (ver sus propios cambios)
+REPLICA_STICKY_SECONDS = env.int('REPLICA_STICKY_SECONDS', default=15)
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',},
@@ -146,6 +166,14 @@ if not DEBUG:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Archivos Parquet de contratos archivados (ver comando archive_contract)
+ARCHIVO_PARQUET_DIR = env('ARCHIVO_PARQUET_DIR', default=str(BASE_DIR / 'archivo'))
+
+# Datasets Parquet de hechos para análisis (ver comando export_facts)
+HECHOS_PARQUET_DIR = env('HECHOS_PARQUET_DIR', default=str(BASE_DIR / 'hechos'))
+# Fuente de los reportes de análisis (DuckDB): 'parquet' (HECHOS_PARQUET_DIR) o 'postgres'
+ANALITICA_FUENTE = env('ANALITICA_FUENTE', default='parquet')
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'drilling.CustomUser'
@@ -205,6 +233,16 @@ ACTIVATION_TOKEN_EXPIRY_HOURS = 24
 # Configuración de APIs externas Vilbragroup TIC
 VILBRAGROUP_API_TOKEN = env('VILBRAGROUP_API_TOKEN', default='cff25a36-682a-4570-ad84-aaaabffc89bf')
 CENTRO_COSTO_DEFAULT = env('CENTRO_COSTO_DEFAULT', default='000003')
+VILBRAGROUP_API_URL = env('VILBRAGROUP_API_URL', default='https://tic.vilbragroup.net/API/DrillControl')
+VILBRAGROUP_API_TIMEOUT = env.int('VILBRAGROUP_API_TIMEOUT', default=30)
+# Caché de respuestas: frescas por CACHE_TTL, luego viejas (refresco en segundo plano) por STALE_TTL
+VILBRAGROUP_API_CACHE_TTL = env.int('VILBRAGROUP_API_CACHE_TTL', default=300)
+VILBRAGROUP_API_STALE_TTL = env.int('VILBRAGROUP_API_STALE_TTL', default=3600)
+# Circuit breaker: fallos seguidos para abrir y segundos sin llamar a la API
+VILBRAGROUP_API_FALLOS_CIRCUITO = env.int('VILBRAGROUP_API_FALLOS_CIRCUITO', default=5)
+VILBRAGROUP_API_CIRCUITO_ABIERTO = env.int('VILBRAGROUP_API_CIRCUITO_ABIERTO', default=60)
+# Conexiones simultáneas del cliente async (httpx) por event loop
+VILBRAGROUP_API_MAX_CONEXIONES = env.int('VILBRAGROUP_API_MAX_CONEXIONES', default=20)
 
 # Logging para APIs
 LOGGING = {
@@ -2,6 +2,8 @@
 -- VISTA: vw_cumplimiento_metas
 -- Descripción: Comparativa de metas vs metraje real por máquina
 -- Calcula automáticamente el cumplimiento considerando meses operativos (26-25)
+-- Para refrescos programados de Power BI usar la tabla materializada equivalente,
+-- mantenida incrementalmente con `python manage.py refresh_bi_facts` (fact_meta_cumplimiento).
 -- ============================================================
 
 CREATE OR REPLACE VIEW public.vw_cumplimiento_metas AS
@@ -17,16 +19,14 @@ WITH metas_expandidas AS (
         m.tipo AS maquina_tipo,
         mm.año,
         mm.mes,
-        -- Calcular fecha de inicio del período
-        CASE 
-            WHEN mm.fecha_inicio IS NOT NULL THEN mm.fecha_inicio
-            ELSE MAKE_DATE(mm.año, mm.mes, 1) - INTERVAL '1 month' + INTERVAL '25 days'
-        END AS fecha_inicio_periodo,
-        -- Calcular fecha de fin del período
-        CASE 
-            WHEN mm.fecha_fin IS NOT NULL THEN mm.fecha_fin
-            ELSE MAKE_DATE(mm.año, mm.mes, 25)
-        END AS fecha_fin_periodo,
+        -- Período: fechas personalizadas o el mes operativo de calendario_operativo.
+        -- Fuera del rango cargado en el calendario se calcula el 26-25 directamente.
+        COALESCE(
+            mm.fecha_inicio,
+            cal.inicio_mes_operativo,
+            (MAKE_DATE(mm.año, mm.mes, 1) - INTERVAL '1 month' + INTERVAL '25 days')::date
+        ) AS fecha_inicio_periodo,
+        COALESCE(mm.fecha_fin, cal.fin_mes_operativo, MAKE_DATE(mm.año, mm.mes, 25)) AS fecha_fin_periodo,
         -- Indicador de si es período personalizado
         CASE 
             WHEN mm.fecha_inicio IS NOT NULL AND mm.fecha_fin IS NOT NULL THEN TRUE
@@ -41,6 +41,8 @@ WITH metas_expandidas AS (
     FROM public.meta_maquina mm
     INNER JOIN public.contratos c ON mm.contrato_id = c.id
     INNER JOIN public.maquinas m ON mm.maquina_id = m.id
+    -- El día 25 siempre pertenece al mes operativo (año, mes)
+    LEFT JOIN public.calendario_operativo cal ON cal.fecha = MAKE_DATE(mm.año, mm.mes, 25)
 ),
 metraje_real AS (
     -- Calcular el metraje real perforado por cada máquina en cada período de meta
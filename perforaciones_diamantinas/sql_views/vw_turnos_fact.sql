@@ -1,6 +1,8 @@
 -- vw_turnos_fact.sql
 -- Vista aplanada (fact) pensada para Power BI: trae turno + métricas relacionadas
 -- Evita duplicaciones por M2M; si necesitas detalle por sondaje/actividad importa esas vistas por separado.
+-- Para refrescos programados de Power BI usar la tabla materializada equivalente,
+-- mantenida incrementalmente con `python manage.py refresh_bi_facts` (fact_turno).
 
 CREATE OR REPLACE VIEW public.vw_turnos_fact AS
 SELECT
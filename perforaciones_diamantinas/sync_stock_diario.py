@@ -2,6 +2,11 @@
 Script de sincronización diaria de stock desde APIs de Vilbragroup
 Sincroniza PDD (Productos Diamantados) y ADIT (Aditivos) para todos los contratos
 
+Guarda una foto del stock por centro de costo y familia solo si el contenido
+cambió desde la última (ver drilling/utils/fotos_almacen.py); las páginas de
+stock leen esa foto en lugar de llamar a la API. La respuesta se lee en
+streaming y por lotes, así la memoria no crece con el catálogo.
+
 Ejecutar manualmente: python sync_stock_diario.py
 """
 import os
@@ -17,6 +22,7 @@ django.setup()
 
 from drilling.models import CustomUser, Contrato
 from drilling.api_client import get_api_client
+from drilling.utils.fotos_almacen import tomar_foto_por_lotes
 
 # Configurar logging
 log_dir = os.path.join(os.path.dirname(__file__), 'logs')
@@ -34,25 +40,34 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-def sync_pdd(centro_costo, nombre_contrato):
+def _guardar_foto(contrato, familia):
+    """Lee el stock de la API en lotes, guarda la foto y registra si hubo cambios"""
+    client = get_api_client()
+    foto, nueva = tomar_foto_por_lotes(
+        contrato, familia, client.iterar_articulos_almacen(familia, contrato.codigo_centro_costo),
+    )
+    if foto is None:
+        return None
+    logger.info(f"✅ {contrato.nombre_contrato}: {foto.total_articulos} artículos {familia} obtenidos")
+    if nueva:
+        logger.info(f"💾 {contrato.nombre_contrato}: foto {familia} guardada ({foto.cambios.count()} cambios)")
+    else:
+        logger.info(f"= {contrato.nombre_contrato}: stock {familia} sin cambios desde {foto.tomada_en:%Y-%m-%d %H:%M}")
+    return foto
+
+def sync_pdd(contrato):
     """Sincroniza Productos Diamantados (PDD)"""
+    centro_costo = contrato.codigo_centro_costo
+    nombre_contrato = contrato.nombre_contrato
     logger.info(f"{'='*80}")
     logger.info(f"Sincronizando PDD para {nombre_contrato} (CC: {centro_costo})")
     logger.info(f"{'='*80}")
     
     try:
-        client = get_api_client()
-        productos = client.obtener_productos_diamantados(centro_costo=centro_costo)
-        
-        if not productos:
+        if _guardar_foto(contrato, 'PDD') is None:
             logger.warning(f"⚠️ No se obtuvieron productos PDD para {nombre_contrato}")
             return False
         
-        logger.info(f"✅ {nombre_contrato}: {len(productos)} artículos PDD obtenidos")
-        
-        # Aquí se puede agregar lógica para guardar en BD si es necesario
-        # Por ahora solo registramos la consulta exitosa
-        
         return True
     except KeyboardInterrupt:
         logger.warning(f"⚠️ Sincronización interrumpida manualmente en PDD {nombre_contrato}")
@@ -61,25 +76,19 @@ def sync_pdd(centro_costo, nombre_contrato):
         logger.error(f"❌ Error sincronizando PDD para {nombre_contrato}: {str(e)}", exc_info=True)
         return False
 
-def sync_adit(centro_costo, nombre_contrato):
+def sync_adit(contrato):
     """Sincroniza Aditivos (ADIT)"""
+    centro_costo = contrato.codigo_centro_costo
+    nombre_contrato = contrato.nombre_contrato
     logger.info(f"{'='*80}")
     logger.info(f"Sincronizando ADIT para {nombre_contrato} (CC: {centro_costo})")
     logger.info(f"{'='*80}")
     
     try:
-        client = get_api_client()
-        aditivos = client.obtener_aditivos(centro_costo=centro_costo)
-        
-        if not aditivos:
+        if _guardar_foto(contrato, 'ADIT') is None:
             logger.warning(f"⚠️ No se obtuvieron aditivos para {nombre_contrato}")
             return False
         
-        logger.info(f"✅ {nombre_contrato}: {len(aditivos)} artículos ADIT obtenidos")
-        
-        # Aquí se puede agregar lógica para guardar en BD si es necesario
-        # Por ahora solo registramos la consulta exitosa
-        
         return True
     except KeyboardInterrupt:
         logger.warning(f"⚠️ Sincronización interrumpida manualmente en ADIT {nombre_contrato}")
@@ -121,7 +130,7 @@ def main():
             
             # Sincronizar PDD
             try:
-                if sync_pdd(contrato.codigo_centro_costo, contrato.nombre_contrato):
+                if sync_pdd(contrato):
                     resultados['pdd_exitosos'] += 1
                 else:
                     resultados['pdd_fallidos'] += 1
@@ -134,7 +143,7 @@ def main():
             
             # Sincronizar ADIT
             try:
-                if sync_adit(contrato.codigo_centro_costo, contrato.nombre_contrato):
+                if sync_adit(contrato):
                     resultados['adit_exitosos'] += 1
                 else:
                     resultados['adit_fallidos'] += 1